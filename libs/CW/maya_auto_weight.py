@@ -4,6 +4,9 @@ import maya.cmds as cmds
 import maya.api.OpenMaya as om
 import numpy as np
 
+from rpdecorator import meshsnapshot, transformsnapshot
+from CW import mesh_containment
+from CW import region_query
 
 
 def create_bounding_box_cube(bounding_box, name='bounds_cube', parent=None):
@@ -69,9 +72,12 @@ def sort_jnts_in_xy(joints):
     if not joints:
         return [], None, None
 
+    # every position in one pass, the sorting below only reads from this
+    positions = dict(zip(joints, transformsnapshot.get_positions(joints).tolist()))
+
     # Determine the bounding box for the cloud of joints
-    x_positions = [cmds.xform(joint, q=True, ws=True, t=True)[0] for joint in joints]
-    y_positions = [cmds.xform(joint, q=True, ws=True, t=True)[1] for joint in joints]
+    x_positions = [positions[joint][0] for joint in joints]
+    y_positions = [positions[joint][1] for joint in joints]
 
     # Calculate the length of the bounding box in X and Y directions
     x_length = max(x_positions) - min(x_positions)
@@ -89,22 +95,17 @@ def sort_jnts_in_xy(joints):
         # Set sort order based on side/position.
         # Arms are sort rules depend on side, left 
         if side == 'right':
-            sorted_joints = sorted(joints, key=lambda j: cmds.xform(j, q=True, 
-                                                                    ws=True, t=True)[axis_index],
-                                                                    reverse=True)
+            sorted_joints = sorted(joints, key=lambda j: positions[j][axis_index], reverse=True)
             joint_chain_direction = '-x'  # highest to lowest for left side
         else:
-            sorted_joints = sorted(joints, key=lambda j: cmds.xform(j, q=True, 
-                                                                    ws=True, t=True)[axis_index])
+            sorted_joints = sorted(joints, key=lambda j: positions[j][axis_index])
             joint_chain_direction = '+x'  # lowest to highest for right side
     
     else:  # primary_axis == 'y'
-        sorted_joints = sorted(joints, key=lambda j: cmds.xform(j, q=True,
-                                                                ws=True, t=True)[axis_index],
-                                                                reverse=True)
+        sorted_joints = sorted(joints, key=lambda j: positions[j][axis_index], reverse=True)
         joint_chain_direction = '-y'  # always highest to lowest for Y axis
 
-    ordered_joint_positions = [cmds.xform(p, q=True, ws=True, t=True) for p in sorted_joints]
+    ordered_joint_positions = [positions[p] for p in sorted_joints]
     joint_data = {'sorted_joints':sorted_joints,
                    'ordered_joint_positions': ordered_joint_positions,
                    'axis_plane': axis_plane,
@@ -189,8 +190,7 @@ def create_oriented_bounding_box(mesh, debug=False):
     :rtype: tuple[om.MPoint, om.MPoint]
     """
     # Step 1: Get mesh points in world space
-    points = get_mesh_points(mesh)
-    points_array = np.array([[point.x, point.y, point.z] for point in points])
+    points_array = meshsnapshot.get_points(mesh)
     
     # Step 2: Compute the covariance matrix of the points
     cov_matrix = np.cov(points_array.T)
@@ -270,30 +270,14 @@ def find_points_between(from_point, to_point, point_list):
     :return: List of points that lie between the two transforms.
     :rtype: list[str]
     """
-    # Get the translation vectors for the from_point and to_point
-    from_vector = get_xform_as_mvector(to_point)-get_xform_as_mvector(from_point)
-    to_vector = get_xform_as_mvector(from_point)-get_xform_as_mvector(to_point)
-    from_vector.normalize()
-    to_vector.normalize()
-
-    # List to hold the points that are between
-    points_between = []
-
-    # Iterate through the points and check if they lie between the two transforms
-    for point in point_list:
-        point_vector = get_xform_as_mvector(point)
-        
-        # Calculate direction from from_point to this point
-        from_vector_to_point = point_vector - from_vector
-        from_vector_to_point.normalize()
-
-        to_vector_to_point = point_vector - to_vector
-        to_vector_to_point.normalize()
-
-        # Dot product test: Check if the point lies between the two direction vectors
-        if (from_vector * from_vector_to_point) >= 0:
-        # if (from_vector * from_vector_to_point) >= 0 and (to_vector * from_vector_to_point) >= 0:
-            points_between.append(point)
+    if not point_list:
+        return []
+    # positions are read once, the plane test runs on all of them at once
+    positions = np.array([cmds.xform(point, q=True, ws=True, t=True)[:3] for point in point_list])
+    between = region_query.between_planes(positions,
+                                          cmds.xform(from_point, q=True, ws=True, t=True),
+                                          cmds.xform(to_point, q=True, ws=True, t=True))
+    points_between = [point for point, inside in zip(point_list, between) if inside]
 
     # Select the points that are found between the transforms
     cmds.select(points_between)
@@ -825,56 +809,60 @@ def is_point_inside_mesh(point, mesh):
     else:
         return False  # Outside
 
-def inside_points_between_bounds(mesh, axis, curve, axis_bounds_start, axis_bounds_end):
-    # Finds all points that fall between two bounds on a specified axis.
-    axis_index = {'x': 0, 'y': 1, 'z': 2}[axis]
-    # make the bounds a bit more agnostic just in case...
-    lower_bound = min(axis_bounds_start[axis_index], axis_bounds_end[axis_index])
-    upper_bound = max(axis_bounds_start[axis_index], axis_bounds_end[axis_index])
-    start_vector = om.MVector(axis_bounds_start)
-    # Get the mesh vertices in world space
-    mfn_mesh = om.MFnMesh(get_dag_path(mesh))
-    vertex_array = mfn_mesh.getPoints(space=om.MSpace.kWorld)
-    
-    # Initialize the result dictionary
-    result = {'points': [], 'point_indices': [], 'point_on_curve_params': [],
-              'point_normals': [], 'face_indices': [], 'normal_jnt_dot_products': [], }
-    curve_fn = om.MFnNurbsCurve( get_dag_path(curve))
+def points_inside_or_outside_normals(points, mesh_points, normals):
+    """
+    Batch version of point_inside_or_outside_normal, one dot product per row.
 
+    Args:
+        points (np.array): (N, 3) points to test.
+        mesh_points (np.array): (N, 3) the closest mesh point to each point.
+        normals (np.array): (N, 3) the mesh normal at each mesh point.
 
-    # Initialize vertex iterator
-    vertex_iter = om.MItMeshVertex(get_dag_path(mesh))
-    
-    # Loop through each point in the mesh
-    for i, point in enumerate(vertex_array):
-        # Check if the point falls within the bounds along the specified axis
-        if lower_bound <= point[axis_index] <= upper_bound:
-            point = om.MPoint(round(point.x, 3), round(point.y, 3), round(point.z, 3))
-            normal = vertex_iter.getNormal() # vectorA of dot product
-            dir_vector = start_vector-om.MVector(point) # vectorB of dot product
-            point_on_curve, param = curve_fn.closestPoint(point, space=om.MSpace.kWorld)
-            # inside = point_inside_or_outside_normal(point=point,
-            #                                         mesh_point=point_on_curve, normal=normal)
-            result['points'].append(point)
-            result['point_indices'].append(i)
-            result['point_on_curve_params'].append(param)
-            result['point_normals'].append(normal)
+    Returns:
+        np.array: (N,) bool, True where the point is on the outside of the normal.
+    """
+    directional_vectors = np.asarray(mesh_points, dtype=np.float64) - np.asarray(points, dtype=np.float64)
+    return np.einsum('ij,ij->i', directional_vectors, np.asarray(normals, dtype=np.float64)) < 0
 
-            # face_indices
-            connected_faces = vertex_iter.getConnectedFaces()
-            [result['face_indices'].append(i) for i in connected_faces]
+def points_inside_mesh(points, mesh, report=False):
+    """
+    Batch version of is_point_inside_mesh. Classifies every point in one call instead of
+    an allIntersections call per point, see CW.mesh_containment.
 
-            # normal_jnt_dot_products
-            result['normal_jnt_dot_products'].append(normal*dir_vector)
-            # next
-            vertex_iter.setIndex(i)
+    Args:
+        points (np.array): (N, 3) world space points to test.
+        mesh (str): Name of the mesh to test against.
+        report (bool): Also return a report of points the three test rays disagreed on,
+                       and the number of open edges when the mesh isn't watertight.
 
+    Returns:
+        np.array: (N,) bool, True for points inside the mesh. (mask, report dict) if report is True.
+    """
+    return mesh_containment.points_inside_mesh(points, mesh, report=report)
 
+def inside_points_between_bounds(mesh, axis, curve, axis_bounds_start, axis_bounds_end):
+    # Finds all points that fall between two bounds on a specified axis.
+    # Points and normals are pulled once and filtered as arrays, see CW.region_query
+    points, normals = region_query.get_mesh_arrays(mesh)
+    point_indices = np.flatnonzero(region_query.axis_slab(points, axis, axis_bounds_start, axis_bounds_end))
+    points = np.round(points[point_indices], 3)
+    normals = normals[point_indices]
+
+    # one closest point query for all points, against the curve sampled once
+    _, params, _ = region_query.closest_points_on_curve(points, curve)
+    # vectorA of dot product is the normal, vectorB the direction from the point to the start bound
+    dir_vectors = np.asarray(axis_bounds_start, dtype=np.float64) - points
+    dot_products = np.einsum('ij,ij->i', normals, dir_vectors)
 
     # Return map
-    # {'points', 'point_indices', 'point_normals',
+    # {'points', 'point_indices', 'point_on_curve_params', 'point_normals',
     #  'face_indices', 'normal_jnt_dot_products'}
-
+    result = {'points': [om.MPoint(*p) for p in points],
+              'point_indices': point_indices.tolist(),
+              'point_on_curve_params': params.tolist(),
+              'point_normals': [om.MVector(*n) for n in normals],
+              'face_indices': region_query.get_vertex_faces(mesh, point_indices).tolist(),
+              'normal_jnt_dot_products': dot_products.tolist(), }
     return result
 # Example usage:
 # mesh = 'pCube1'  # Replace with your actual mesh name
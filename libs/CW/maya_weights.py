@@ -3,6 +3,9 @@ import re, math, textwrap, inspect
 import maya.cmds as cmds
 import maya.api.OpenMaya as om
 import maya.api.OpenMayaAnim as omAnim
+import numpy as np
+
+from CW import region_query
 
 # TODO: entry point for future implementation.
 #       Supported needed for weighting MFnLattice, MFnNurbsCurve, MFnNurbsSurface
@@ -127,8 +130,8 @@ class Weights:
 
 
         mfn_mesh = om.MFnMesh(self.get_dag_path(geom))
-        point_vectors=[mfn_mesh.getPoint(p, space=om.MSpace.kWorld) for p in point_indices]
-        point_vectors = [om.MVector(p.x,p.y,p.z) for p in point_vectors]
+        all_points = mfn_mesh.getPoints(om.MSpace.kWorld)
+        point_vectors = [om.MVector(all_points[p]) for p in point_indices]
         point_indices, point_vectors = self.points_between_startend(point_indices,
                                                                     point_vectors,
                                                                     start_plane,
@@ -277,8 +280,8 @@ class Weights:
         end = self.get_xform_as_mvector(end)
         indices = self.all_points_in_geom(geo)[1]
         mfn_mesh = om.MFnMesh(self.get_dag_path(geo))
-        point_vectors=[mfn_mesh.getPoint(p, space=om.MSpace.kWorld) for p in indices]
-        point_vectors = [om.MVector(p.x,p.y,p.z) for p in point_vectors]
+        all_points = mfn_mesh.getPoints(om.MSpace.kWorld)
+        point_vectors = [om.MVector(all_points[p]) for p in indices]
 
         indices, _ = self.points_between_startend(indices,
                                                   point_vectors,
@@ -848,49 +851,20 @@ class Weights:
                                 projections onto the defined planes.
         :rtype: tuple[list[int], list[om.MVector]]
         """
-        if threshold_start:
-            # vector lerp the start point away from itself using by the amount of threshold start
-            start_point=((end_point - start_point).normalize() * (-1*threshold_start)) + start_point
-            end_point=((start_point - end_point).normalize() * (-1*threshold_end)) + end_point
-
-        # Calculate the direction of the from_plane to the to_plane
-        direction = end_point - start_point
-        
-        # Normalize the direction to get the plane's normal
-        direction.normalize()
-
-        vector_from = end_point - start_point
-        vector_from.normalize()
-        vector_to = start_point - end_point
-        vector_to.normalize()
-
-        # important to return as a pair these are both of these have to match in order! 
-        return_indices = []
-        return_point_vectors = []
-        
-        for idx, point in zip(point_indices, point_vectors):
-            # direction of the start point in relation to the start & end infinite planes
-            direction_start = self.project_point_to_plane(point, start_point, direction)[1]
-            # Dot product to determine whether outside of the start_point plane
-            dot_product_start = direction_start * vector_from
-
-            # direction of the end point in relation to the start & end infinite planes
-            direction_end = self.project_point_to_plane(point, end_point, direction)[1]
-            # Dot product to determine whether outside of the end_point plane
-            dot_product_end = direction_end * vector_to
-
-            # to avoid near 0 values
-            dot_product_start = round(dot_product_start, 1)
-            dot_product_end = round(dot_product_end, 1)
-
-            # if the point is between, both of the dot products will either 1.0 or .9999
-            # if either are below 0 they are not between
-            # if they are 0 they are on a plane, technically not between, but we will treat
-            # them as such
-            if dot_product_start >= 0 and dot_product_end >= 0:
-                return_indices.append(idx)
-                return_point_vectors.append(point)
-
+        if not point_vectors:
+            return [], []
+        # both planes share the start to end direction, so the test is where each point projects on that
+        # line, all points at once. The thresholds push the planes outwards, same as the old vector lerp.
+        positions = np.array([(p.x, p.y, p.z) for p in point_vectors], dtype=np.float64)
+        between = region_query.between_planes(positions,
+                                              (start_point.x, start_point.y, start_point.z),
+                                              (end_point.x, end_point.y, end_point.z),
+                                              threshold_start=threshold_start or 0.0,
+                                              threshold_end=threshold_end or 0.0)
+
+        # important to return as a pair these are both of these have to match in order!
+        return_indices = [idx for idx, inside in zip(point_indices, between) if inside]
+        return_point_vectors = [point for point, inside in zip(point_vectors, between) if inside]
         return return_indices, return_point_vectors
 
     def move_to_plane_projection(self, obj_to_project, start_obj, end_obj, orient_startend=False):
@@ -1,5 +1,8 @@
 import maya.cmds as cmds
 import maya.api.OpenMaya as om
+import numpy as np
+
+from rpdecorator import meshsnapshot
 
 r'''
 Note on the term shapes:
@@ -119,239 +122,148 @@ class MeshAnalyzer:
         self.axis_direction = None
         self.limb_dict = None
         self.categorized_vertices = None
-        self.vertex_positions = None
-        self.all_vertices = None
+        # (N, 3) float64 world space positions, every other result is an index array into it
+        self.points = None
 
     def get_mesh_vertices(self):
         """
-        Retrieves vertex positions and indices from the given mesh.
-        
-        Args:
-            mesh_name (str): The name of the mesh to retrieve vertices from.
-        
+        Retrieves vertex positions from the given mesh, shared through rpdecorator.meshsnapshot.
+
         Returns:
-            dict: A dictionary where keys are the vertex indices and values are the MPoint positions in world space.
+            np.array: Read-only (N, 3) float64 world space positions, row i is vertex i.
         """
         # Ensure the mesh exists in the scene
         if not cmds.objExists(self.mesh):
             raise RuntimeError(f"Mesh object '{self.mesh}' does not exist in the scene.")
-        
-        # Create a selection list and add the mesh to it
-        sel = om.MSelectionList()
-        sel.add(mesh_name)
-
-        # Get the DAG path for the mesh
-        dag_path = sel.getDagPath(0)
 
-        # Create the MFnMesh function set to access the mesh data
-        mfn_mesh = om.MFnMesh(dag_path)
+        self.points = meshsnapshot.get_points(self.mesh)
+        return self.points
 
-        # Get all vertex positions (in world space) directly from getPoints
-        vertex_array = mfn_mesh.getPoints(space=om.MSpace.kWorld)
-
-        # Create a dictionary where keys are vertex indices and values are MPoint objects
-        vertex_dict = {i: vertex_array[i] for i in range(len(vertex_array))}
-
-        return vertex_dict
-
-    def analyze_and_sort_vertices(self):
+    def analyze_and_sort_vertices(self, indices=None):
         """
         Analyze a cloud of vertices to determine if it is longer along the X or Y axis.
         Sorts the vertices based on the primary axis and determines the axis direction.
 
         Args:
-            vertices (list): List of vertex positions.
+            indices (np.array): Vertex indices of the cloud to analyze. Defaults to the whole mesh.
 
         Returns:
-            tuple: (sorted_vertices, primary_axis, axis_direction), where:
-                - sorted_vertices (list): List of vertices ordered by position along the primary axis.
+            tuple: (sorted_points, primary_axis, axis_direction), where:
+                - sorted_points (dict): {'verts': (K, 3) positions, 'indices': (K,) vertex indices}
+                                        ordered by position along the primary axis.
                 - primary_axis (str): The primary axis ('x' or 'y') based on the longest dimension.
                 - axis_direction (str): Direction ('+' or '-') based on the orientation of the sorted vertices.
         """
-        if not self.vertex_positions:
-            return [], None, None
-
-        # Extract X and Y positions from the vertex positions dictionary
-        x_positions = [v[0] for v in self.vertex_positions.values()]
-        y_positions = [v[1] for v in self.vertex_positions.values()]
-
-        # Calculate the lengths along X and Y axes
-        x_length = max(x_positions) - min(x_positions)
-        y_length = max(y_positions) - min(y_positions)
+        indices = np.arange(len(self.points)) if indices is None else np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return {'verts': np.zeros((0, 3)), 'indices': indices}, None, None
+        cloud = self.points[indices]
 
         # Determine the primary axis (the axis with the greatest length)
+        x_length, y_length = np.ptp(cloud[:, 0]), np.ptp(cloud[:, 1])
         primary_axis = 'x' if x_length > y_length else 'y'
-        axis_index = 0 if primary_axis == 'x' else 1
 
-        # Sorting based on the primary axis
         if primary_axis == 'x':
-            avg_x_position = sum(x_positions) / len(x_positions)
-            side = 'left' if avg_x_position < 0 else 'right'
-
-            # Sort vertices by the X position
-            sorted_vertices = sorted(self.vertex_positions.items(), key=lambda item: item[1][axis_index], reverse=(side == 'left'))
+            side = 'left' if cloud[:, 0].mean() < 0 else 'right'
+            # left sorts descending, the stable argsort of the negated values keeps ties in index order
+            keys = -cloud[:, 0] if side == 'left' else cloud[:, 0]
             axis_direction = '-x' if side == 'left' else '+x'
         else:
-            # Sort vertices by the Y position
-            sorted_vertices = sorted(self.vertex_positions.items(), key=lambda item: item[1][axis_index], reverse=True)
+            keys = -cloud[:, 1]
             axis_direction = '-y'
+        order = np.argsort(keys, kind='stable')
 
-        # Extract the sorted indices
-        sorted_indices = [item[0] for item in sorted_vertices]
-        sorted_vertex_positions = [item[1] for item in sorted_vertices]
         # Store the sorted result and axis direction
-        self.sorted_vertices = sorted_indices
+        self.sorted_vertices = indices[order]
         self.primary_axis = primary_axis
         self.axis_direction = axis_direction
 
-        sorted_points = {'verts':sorted_vertex_positions,
-                         'indices':sorted_indices}
+        sorted_points = {'verts': cloud[order],
+                         'indices': indices[order]}
 
         return sorted_points, primary_axis, axis_direction
 
     def sort_limbs(self):
         """
         Splits vertices representing arms and legs into sorted lists for left and right sides.
-
-        Args:
-            vertices (list): List of vertex positions.
+        Everything above the median height is arm, everything below leg.
 
         Returns:
-            dict: Dictionary with lists of vertices ordered for 'left_arm', 'right_arm', 'left_leg', 'right_leg'.
+            dict: {'left_arm', 'right_arm', 'left_leg', 'right_leg'} each the sorted_points dict of
+                  analyze_and_sort_vertices for that limb.
         """
-        if not self.vertex_positions:
-            return {'left_arm': [], 'right_arm': [], 'left_leg': [], 'right_leg': []}
-
-        # Split vertices into left and right based on X position
-        left_vertices = [i for i, v in self.vertex_positions.items() if v[0] < 0]
-        right_vertices = [i for i, v in self.vertex_positions.items() if v[0] >= 0]
-
-        # Sort vertices by Y position
-        y_positions = [v[1] for v in self.vertex_positions.values()]
-        median_y = sorted(y_positions)[len(y_positions) // 2]
-
-        def sort(vertex_list, is_arm):
-            return sorted(vertex_list, key=lambda i: self.vertex_positions[i][1], reverse=True)
-
-        # Sort limbs based on Y positions
-        l_arm = sort([i for i in left_vertices if self.vertex_positions[i][1] >= median_y], is_arm=True)
-        l_leg = sort([i for i in left_vertices if self.vertex_positions[i][1] < median_y], is_arm=False)
-        r_arm = sort([i for i in right_vertices if self.vertex_positions[i][1] >= median_y], is_arm=True)
-        r_leg = sort([i for i in right_vertices if self.vertex_positions[i][1] < median_y], is_arm=False)
-
-        # Create the dictionary with sorted limbs
-        limb_dict = {
-            'left_arm': l_arm,
-            'right_arm': r_arm,
-            'left_leg': l_leg,
-            'right_leg': r_leg
-        }
-
-        # Analyze and sort each limb further if needed
-        for limb in limb_dict:
-            limb_dict[limb] = self.analyze_and_sort_vertices()[0]
-
-        self.limb_dict = limb_dict
-
-        return limb_dict
+        if self.points is None or not len(self.points):
+            empty = {'verts': np.zeros((0, 3)), 'indices': np.zeros(0, dtype=np.int64)}
+            self.limb_dict = {limb: dict(empty) for limb in ('left_arm', 'right_arm', 'left_leg', 'right_leg')}
+            return self.limb_dict
+
+        x, y = self.points[:, 0], self.points[:, 1]
+        left = x < 0
+        # the upper median, found with a partition instead of a full sort
+        median_index = len(y) // 2
+        median_y = np.partition(y, median_index)[median_index]
+        upper = y >= median_y
+
+        limb_masks = {'left_arm': left & upper,
+                      'right_arm': ~left & upper,
+                      'left_leg': left & ~upper,
+                      'right_leg': ~left & ~upper}
+        # each limb is analyzed on its own vertices only
+        self.limb_dict = {limb: self.analyze_and_sort_vertices(np.flatnonzero(mask))[0]
+                          for limb, mask in limb_masks.items()}
+        return self.limb_dict
 
     def categorize_vertices(self):
         """
         Categorizes vertices into left and right based on their X position.
         Also categorizes center vertices into torso, neck, and head.
 
-        Args:
-            mesh_name (str): Name of the mesh to analyze.
-
         Returns:
             dict: Dictionary containing categorized vertices for left_arm, right_arm, left_leg,
-                right_leg, torso, neck, and head, each with indices and positions.
+                right_leg, torso, neck, and head, each with 'point_index' and 'point_positions' arrays.
         """
-        # Get all vertex positions (in world space)
-        self.all_vertices = self.get_mesh_vertices()
-        self.vertex_positions = {i: (v.x, v.y, v.z) for i, v in self.all_vertices.items()}
-
-        # Categorizing vertices into left and right based on their X position
-        left_vertices = [i for i, v in self.all_vertices.items() if v.x < 0]
-        right_vertices = [i for i, v in self.all_vertices.items() if v.x >= 0]
+        points = self.get_mesh_vertices()
 
         # Create a dictionary with the categorized vertices
         categorized_vertices = {
-            'left': left_vertices,
-            'right': right_vertices
+            'left': np.flatnonzero(points[:, 0] < 0),
+            'right': np.flatnonzero(points[:, 0] >= 0)
         }
 
         # Sort and categorize limbs (arms and legs)
         self.sort_limbs()
-        # Categorizing center vertices into torso, neck, and head
-        center_vertices = [v for i, v in self.all_vertices.items() if abs(v.x) < 0.01]
-        center_vertices_sorted = sorted(center_vertices, key=lambda v: v.y, reverse=True)
-
-        torso, neck, head = [], None, None
+        for limb, sorted_points in self.limb_dict.items():
+            categorized_vertices[limb] = {'point_positions': sorted_points['verts'],
+                                          'point_index': sorted_points['indices']}
 
+        # Categorizing center vertices into torso, neck, and head, highest first
+        center = np.flatnonzero(np.abs(points[:, 0]) < 0.01)
+        center = center[np.argsort(-points[center, 1], kind='stable')]
 
         # REFERENCE: limb dict map
         # limb_dict[limb] = {'verts':sorted_vertex_positions,
         #                    'indices':sorted_indices}
-        arm_y_position = self.limb_dict['left_arm']['verts'][0][1] if self.limb_dict['left_arm'] else 0
-
-        for v in center_vertices_sorted:
-            if not neck and self.limb_dict['left_arm'] and self.limb_dict['right_arm'] and v.y > arm_y_position:
-                neck = v
-            elif neck and not head:
-                head = v
-            else:
-                torso.append(v)
-
-        tmp_vertex_positions = [self.vertex_positions[i] for i in self.vertex_positions]
-        print("tmp_vertex_positions : ", tmp_vertex_positions)
-
-        print("self.vertex_positions : ", self.vertex_positions)
-        # print("self.vertex_positions : ", self.vertex_positions)
-        torso = [(t.x, t.y, t.z) for t in torso]
-        torso = [(t.x, t.y, t.z) for t in torso]
-        print("TORSO : ", torso)
-
-        categorized_vertices.update({
-            'left_arm': {
-                'point_positions': [self.vertex_positions[i] for i in self.limb_dict['left_arm']['indices']],  # Use indices to get positions
-                'point_index': self.limb_dict['left_arm']['indices']
-            },
-            'right_arm': {
-                'point_positions': [self.vertex_positions[i] for i in self.limb_dict['right_arm']['indices']],
-                'point_index': self.limb_dict['right_arm']['indices']
-            },
-            'left_leg': {
-                'point_positions': [self.vertex_positions[i] for i in self.limb_dict['left_leg']['indices']],
-                'point_index': self.limb_dict['left_leg']['indices']
-            },
-            'right_leg': {
-                'point_positions': [self.vertex_positions[i] for i in self.limb_dict['right_leg']['indices']],
-                'point_index': self.limb_dict['right_leg']['indices']
-            },
-            'torso': {
-                'point_positions': [self.vertex_positions[i] for i in torso],
-                'point_index': torso
-            },
-            'neck': {
-                'point_positions': [self.vertex_positions[i] for i in [self.vertex_positions.index(neck)]] if neck else [],
-                'point_index': [self.vertex_positions.index(neck)] if neck else []
-            },
-            'head': {
-                'point_positions': [self.vertex_positions[i] for i in [self.vertex_positions.index(head)]] if head else [],
-                'point_index': [self.vertex_positions.index(head)] if head else []
-            }
-        }
-        )
+        has_arms = len(self.limb_dict['left_arm']['indices']) and len(self.limb_dict['right_arm']['indices'])
+        arm_y_position = self.limb_dict['left_arm']['verts'][0, 1] if has_arms else 0
+        # the highest center vertex is the neck if it is above the arms, the next one the head, the rest torso
+        if has_arms and len(center) and points[center[0], 1] > arm_y_position:
+            neck, head, torso = center[:1], center[1:2], center[2:]
+        else:
+            neck, head, torso = center[:0], center[:0], center
+
+        for part, part_indices in (('torso', torso), ('neck', neck), ('head', head)):
+            categorized_vertices[part] = {'point_positions': points[part_indices],
+                                          'point_index': part_indices}
 
         self.categorized_vertices = categorized_vertices
+        return categorized_vertices
 
     def select_vertices(self, body_part):
         """
-        Select vertices based on the specified body part.
+        Select vertices based on the specified body part, through one component object
+        instead of a component string per vertex.
 
         Args:
-            mesh_name (str): Name of the mesh.
             body_part (str): The body part to select (e.g., 'left_arm', 'torso').
         """
         # Select vertices based on body part
@@ -360,37 +272,34 @@ class MeshAnalyzer:
             return
 
         body_part_data = self.categorized_vertices[body_part]
-        vertex_indices = body_part_data['point_index']
-
-        if vertex_indices:
-            selection = [f'{self.mesh_name}.vtx[{idx}]' for idx in vertex_indices]
-            cmds.select(selection, replace=True)
-        else:
+        vertex_indices = body_part_data['point_index'] if isinstance(body_part_data, dict) else body_part_data
+        if not len(vertex_indices):
             print(f"No vertices found for {body_part}.")
+            return
 
-
-mesh_name = 'jsh_base_body_geo'
-
-# Create an instance of MeshAnalyzer
-mesh_analysis = MeshAnalyzer(mesh_name=mesh_name)
-
-# Categorize vertices
-mesh_analysis.categorize_vertices()
-
-# Access categorized vertices
-print('Categorized Vertices:', mesh_analysis.categorized_vertices)
-
-# Example: Select vertices for the left arm
-left_arm_indices = mesh_analysis.categorized_vertices['left_arm']['indices']
-cmds.select([f'{mesh_name}.vtx[{idx}]' for idx in left_arm_indices], replace=True)
-
-# Example: Select vertices for the torso
-torso_indices = mesh_analysis.categorized_vertices['torso']['indices']
-cmds.select([f'{mesh_name}.vtx[{idx}]' for idx in torso_indices], replace=True)
-
-# Example: Print positions for left arm and torso
-left_arm_positions = mesh_analysis.categorized_vertices['left_arm']['positions']
-torso_positions = mesh_analysis.categorized_vertices['torso']['positions']
-
-print('Left Arm Positions:', left_arm_positions)
-print('Torso Positions:', torso_positions)
+        sel = om.MSelectionList()
+        sel.add(self.mesh)
+        comp_fn = om.MFnSingleIndexedComponent()
+        components = comp_fn.create(om.MFn.kMeshVertComponent)
+        comp_fn.addElements(np.asarray(vertex_indices, dtype=np.int64).tolist())
+        selection = om.MSelectionList()
+        selection.add((sel.getDagPath(0), components))
+        om.MGlobal.setActiveSelectionList(selection, om.MGlobal.kReplaceList)
+
+
+# ---- Example Usage ----
+# mesh_name = 'jsh_base_body_geo'
+#
+# # Create an instance of MeshAnalyzer
+# mesh_analysis = MeshAnalyzer(mesh_name=mesh_name)
+#
+# # Categorize vertices
+# mesh_analysis.categorize_vertices()
+#
+# # Select vertices for the left arm, then the torso
+# mesh_analysis.select_vertices('left_arm')
+# mesh_analysis.select_vertices('torso')
+#
+# # Print positions for left arm and torso
+# print('Left Arm Positions:', mesh_analysis.categorized_vertices['left_arm']['point_positions'])
+# print('Torso Positions:', mesh_analysis.categorized_vertices['torso']['point_positions'])
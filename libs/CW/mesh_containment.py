@@ -0,0 +1,242 @@
+'''
+Batched inside/outside classification of points against a triangle mesh.
+
+Every point casts one ray along each of three directions and counts how many triangles it crosses,
+an odd count means inside. The rays are cast in a slightly rotated frame so exactly axis aligned
+meshes (boxes, mirrored topology) don't put rays through shared edges.
+
+To avoid testing every point against every triangle, triangles are binned into a 2D grid perpendicular to
+each ray direction (CSR arrays, cell -> triangle ids). A point only tests the triangles in its own cell column.
+The grids are cached per mesh and reused until the mesh points or topology change.
+
+Non watertight meshes (vendor meshes with holes) make the three rays disagree near the holes. The majority
+vote is returned, and the report lists the points where the rays disagreed and how many open edges the mesh has.
+'''
+
+import numpy as np
+# only needed to pull mesh data, the containment math below is plain numpy
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+from rpdecorator import meshsnapshot
+
+# a fixed, arbitrary rotation so the ray directions are never exactly aligned with the mesh
+_ANGLES = (0.3781, 0.5923, 0.2137)
+# points are expanded to (point, triangle) candidate pairs this many points at a time
+POINT_BLOCK = 65536
+# mesh name -> (snapshot, snapshot version, ContainmentGrid)
+_GRID_CACHE = {}
+
+
+def _rotation_matrix(angles=_ANGLES):
+    x, y, z = angles
+    rx = np.array([[1, 0, 0], [0, np.cos(x), -np.sin(x)], [0, np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), -np.sin(z), 0], [np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def _expand_ranges(starts, counts):
+    """
+    For ranges given as (start, count), returns the owner of every element and its value,
+    e.g. starts [5, 0] counts [2, 3] -> owners [0, 0, 1, 1, 1], values [5, 6, 0, 1, 2].
+    """
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + offsets
+
+
+class _AxisGrid:
+    def __init__(self, tri_u, tri_v, tri_w, resolution):
+        """
+        Bins triangles by their bounds in the (u, v) plane perpendicular to the ray axis w.
+
+        Args:
+            tri_u, tri_v, tri_w (np.array): (T, 3) coordinates of each triangle corner in the rotated frame.
+            resolution (int): Cells per side of the grid.
+        """
+        self.tri_u, self.tri_v, self.tri_w = tri_u, tri_v, tri_w
+        self.resolution = resolution
+        self.u_min, self.v_min = tri_u.min(), tri_v.min()
+        self.cell_size = max(tri_u.max() - self.u_min, tri_v.max() - self.v_min, 1e-12) / resolution
+
+        u0, v0 = self._cells(tri_u.min(axis=1), tri_v.min(axis=1))
+        u1, v1 = self._cells(tri_u.max(axis=1), tri_v.max(axis=1))
+        nu, nv = u1 - u0 + 1, v1 - v0 + 1
+        # every cell each triangle's bounds touch
+        tri_ids, offsets = _expand_ranges(np.zeros(len(nu), dtype=np.int64), nu * nv)
+        cells = (u0[tri_ids] + offsets % nu[tri_ids]) * resolution + (v0[tri_ids] + offsets // nu[tri_ids])
+
+        order = np.argsort(cells, kind='stable')
+        self.cell_tris = tri_ids[order]
+        self.indptr = np.zeros(resolution * resolution + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=resolution * resolution), out=self.indptr[1:])
+
+    def _cells(self, u, v):
+        cu = np.clip(((u - self.u_min) / self.cell_size).astype(np.int64), 0, self.resolution - 1)
+        cv = np.clip(((v - self.v_min) / self.cell_size).astype(np.int64), 0, self.resolution - 1)
+        return cu, cv
+
+    def crossings(self, pu, pv, pw):
+        """
+        Counts how many triangles the ray from each point in the +w direction crosses.
+        """
+        counts = np.zeros(len(pu), dtype=np.int64)
+        cu, cv = self._cells(pu, pv)
+        # points outside the grid can't hit anything
+        outside = ((pu < self.u_min) | (pv < self.v_min)
+                   | (pu > self.u_min + self.cell_size * self.resolution)
+                   | (pv > self.v_min + self.cell_size * self.resolution))
+        cells = cu * self.resolution + cv
+        starts = self.indptr[cells]
+        num = np.where(outside, 0, self.indptr[cells + 1] - starts)
+
+        for block in range(0, len(pu), POINT_BLOCK):
+            block_slice = slice(block, block + POINT_BLOCK)
+            point_ids, slots = _expand_ranges(starts[block_slice], num[block_slice])
+            point_ids += block
+            tris = self.cell_tris[slots]
+
+            # 2D barycentric coordinates of the point in the triangle's projection
+            u, v = pu[point_ids], pv[point_ids]
+            au, bu, cu_ = self.tri_u[tris, 0], self.tri_u[tris, 1], self.tri_u[tris, 2]
+            av, bv, cv_ = self.tri_v[tris, 0], self.tri_v[tris, 1], self.tri_v[tris, 2]
+            det = (bv - cv_) * (au - cu_) + (cu_ - bu) * (av - cv_)
+            safe = np.where(det == 0.0, 1.0, det)
+            l0 = ((bv - cv_) * (u - cu_) + (cu_ - bu) * (v - cv_)) / safe
+            l1 = ((cv_ - av) * (u - cu_) + (au - cu_) * (v - cv_)) / safe
+            l2 = 1.0 - l0 - l1
+            inside = (det != 0.0) & (l0 >= 0.0) & (l1 >= 0.0) & (l2 >= 0.0)
+
+            # the ray only counts triangles in front of the point
+            hit_w = l0 * self.tri_w[tris, 0] + l1 * self.tri_w[tris, 1] + l2 * self.tri_w[tris, 2]
+            hit = inside & (hit_w > pw[point_ids])
+            counts += np.bincount(point_ids[hit], minlength=len(pu))
+        return counts
+
+
+class ContainmentGrid:
+    def __init__(self, points, triangles, cells_per_side=None):
+        """
+        Args:
+            points (np.array): (N, 3) mesh vertex positions.
+            triangles (np.array): (T, 3) vertex ids per triangle.
+            cells_per_side (int): Grid resolution. Defaults to about 4 triangles per cell.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.rotation = _rotation_matrix()
+        rotated = points @ self.rotation.T
+        corners = rotated[self.triangles]  # (T, 3 corners, 3 axes)
+        resolution = cells_per_side or max(1, int(np.sqrt(len(self.triangles) / 4.0)))
+        # one grid per ray axis, the ray runs along w and the grid spans the other two axes
+        self.grids = [_AxisGrid(corners[:, :, (w + 1) % 3], corners[:, :, (w + 2) % 3], corners[:, :, w], resolution)
+                      for w in range(3)]
+        self.open_edges = count_open_edges(self.triangles)
+
+    def classify(self, query_points):
+        """
+        Returns:
+            tuple: (inside bool mask, number of rays out of 3 that said inside for each point)
+        """
+        rotated = np.asarray(query_points, dtype=np.float64).reshape(-1, 3) @ self.rotation.T
+        votes = np.zeros(len(rotated), dtype=np.int64)
+        for w, grid in enumerate(self.grids):
+            crossings = grid.crossings(rotated[:, (w + 1) % 3], rotated[:, (w + 2) % 3], rotated[:, w])
+            votes += crossings % 2
+        return votes >= 2, votes
+
+
+def count_open_edges(triangles):
+    """
+    Counts the edges used by only one triangle. A watertight mesh has none.
+    """
+    edges = np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    return int((counts == 1).sum())
+
+
+def points_inside_triangles(query_points, points, triangles, report=False):
+    """
+    Inside/outside classification of many points against a triangle mesh, without maya.
+
+    Args:
+        query_points (np.array): (N, 3) points to classify.
+        points (np.array): (V, 3) mesh vertex positions.
+        triangles (np.array): (T, 3) vertex ids per triangle.
+        report (bool): Also return a report dict, see points_inside_mesh.
+
+    Returns:
+        np.array: (N,) bool, True for points inside the mesh. (mask, report) if report is True.
+    """
+    grid = ContainmentGrid(points, triangles)
+    inside, votes = grid.classify(query_points)
+    if not report:
+        return inside
+    return inside, _report(grid, votes)
+
+
+def _report(grid, votes):
+    ambiguous = (votes == 1) | (votes == 2)
+    return {'ambiguous': ambiguous,
+            'num_ambiguous': int(ambiguous.sum()),
+            'votes': votes,
+            'open_edges': grid.open_edges,
+            'watertight': grid.open_edges == 0}
+
+
+def get_mesh_data(mesh):
+    """
+    World space points and triangle vertex ids of a mesh, shared through rpdecorator.meshsnapshot.
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh)
+    return snapshot.points, snapshot.triangles
+
+
+def get_containment_grid(mesh):
+    """
+    Returns the cached ContainmentGrid of a mesh, rebuilt only when the mesh's snapshot was refreshed.
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh)
+    points, triangles = snapshot.points, snapshot.triangles
+    cached = _GRID_CACHE.get(mesh)
+    if cached and cached[0] is snapshot and cached[1] == snapshot.version:
+        return cached[2]
+    grid = ContainmentGrid(points, triangles)
+    _GRID_CACHE[mesh] = (snapshot, snapshot.version, grid)
+    return grid
+
+
+def points_inside_mesh(query_points, mesh, report=False):
+    """
+    Inside/outside classification of many points against a maya mesh in a single call.
+
+    Args:
+        query_points (np.array): (N, 3) world space points.
+        mesh (str): The mesh to test against.
+        report (bool): Also return a report dict.
+
+    Returns:
+        np.array: (N,) bool, True for points inside the mesh. When report is True, (mask, report) where report is
+                  {'ambiguous': bool mask of points where the three rays disagreed,
+                   'num_ambiguous': int, 'votes': rays out of 3 that said inside,
+                   'open_edges': int, 'watertight': bool}
+    """
+    grid = get_containment_grid(mesh)
+    inside, votes = grid.classify(query_points)
+    if not report:
+        return inside
+    result = _report(grid, votes)
+    if not result['watertight']:
+        print(f'{mesh} has {result["open_edges"]} open edges, '
+              f'{result["num_ambiguous"]} points were classified by majority vote')
+    return inside, result
+
+
+def clear_cache(mesh=None):
+    if mesh is None:
+        _GRID_CACHE.clear()
+    else:
+        _GRID_CACHE.pop(mesh, None)
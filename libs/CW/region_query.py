@@ -0,0 +1,231 @@
+'''
+Vectorized region queries over full vertex arrays.
+
+Mesh points and normals come from the shared rpdecorator.meshsnapshot cache and curve samples are pulled once, every query after that is
+a handful of array operations over all points instead of a python loop with an API call per vertex.
+Every region query returns a bool mask over the points, combine them with & and | and turn the result
+into indices with np.flatnonzero.
+
+# --- Example
+from CW import region_query
+points, normals = region_query.get_mesh_arrays('body_geo')
+crv_points, crv_params = region_query.sample_curve('arm_crv')
+mask = region_query.between_planes(points, shoulder_pos, wrist_pos)
+mask &= region_query.capsule(points, shoulder_pos, wrist_pos, radius=12.0)
+closest, params, distances = region_query.closest_points_on_polyline(points[mask], crv_points, crv_params)
+'''
+import numpy as np
+# only needed to pull data out of the scene, the queries are plain numpy
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+from rpdecorator import meshsnapshot
+
+AXIS_INDEX = {'x': 0, 'y': 1, 'z': 2}
+# closest point queries test this many (point, segment) pairs at a time
+PAIR_BLOCK = 4000000
+
+
+# ---- Scene Data ----
+def _dag_path(node):
+    sel = om.MSelectionList()
+    sel.add(node)
+    return sel.getDagPath(0)
+
+
+def get_mesh_arrays(mesh, space=None):
+    """
+    World space points and per vertex normals of a mesh, read-only arrays shared through rpdecorator.meshsnapshot.
+
+    Returns:
+        tuple: (points (N, 3) float64 array, normals (N, 3) float64 array)
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh, space)
+    return snapshot.points, snapshot.normals
+
+
+def get_vertex_faces(mesh, vertex_indices):
+    """
+    The faces touching any of the given vertices, from the mesh's snapshot connectivity.
+
+    Returns:
+        np.array: Sorted unique face indices.
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh)
+    face_ids = np.repeat(np.arange(len(snapshot.face_counts)), snapshot.face_counts)
+    selected = np.zeros(len(snapshot.points), dtype=bool)
+    selected[np.asarray(vertex_indices, dtype=np.int64)] = True
+    return np.unique(face_ids[selected[snapshot.face_vertices]])
+
+
+def sample_curve(curve, samples_per_span=16, space=None):
+    """
+    Samples a nurbs curve into a polyline once, so closest point queries can run on arrays.
+    A linear curve is returned as its own cvs, which is exact.
+
+    Args:
+        curve (str): The curve.
+        samples_per_span (int): Samples per span for curves above degree 1.
+        space (om.MSpace): Defaults to world space.
+
+    Returns:
+        tuple: (points (S, 3) float64 array, params (S,) float64 array of the curve parameter at each sample)
+    """
+    space = om.MSpace.kWorld if space is None else space
+    curve_fn = om.MFnNurbsCurve(_dag_path(curve))
+    start, end = curve_fn.knotDomain
+    if curve_fn.degree == 1:
+        points = np.array(curve_fn.cvPositions(space), dtype=np.float64)[:, :3]
+        # a degree 1 curve has exactly one knot per cv
+        return points, np.array(curve_fn.knots(), dtype=np.float64)
+    params = np.linspace(start, end, curve_fn.numSpans * samples_per_span + 1)
+    points = np.array([curve_fn.getPointAtParam(param, space) for param in params], dtype=np.float64)[:, :3]
+    return points, params
+
+
+# ---- Regions ----
+def axis_slab(points, axis, bound_a, bound_b):
+    """
+    Points whose coordinate on an axis falls between two bounds, inclusive. The bounds can be in either order.
+
+    Args:
+        points (np.array): (N, 3) points.
+        axis (str/int): 'x', 'y', 'z' or 0, 1, 2.
+        bound_a (float/list): A value, or a point whose coordinate on the axis is used.
+        bound_b (float/list): A value, or a point whose coordinate on the axis is used.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    axis = AXIS_INDEX.get(axis, axis)
+    bound_a = bound_a[axis] if np.ndim(bound_a) else bound_a
+    bound_b = bound_b[axis] if np.ndim(bound_b) else bound_b
+    values = np.asarray(points)[:, axis]
+    return (values >= min(bound_a, bound_b)) & (values <= max(bound_a, bound_b))
+
+
+def segment_parameters(points, start, end):
+    """
+    Where each point projects on the line from start to end, 0 at start and 1 at end.
+
+    Returns:
+        tuple: (params (N,) array, segment length)
+    """
+    start = np.asarray(start, dtype=np.float64)
+    axis = np.asarray(end, dtype=np.float64) - start
+    length = np.linalg.norm(axis)
+    if length == 0.0:
+        return np.zeros(len(points)), 0.0
+    return (np.asarray(points, dtype=np.float64) - start) @ axis / (length * length), length
+
+
+def between_planes(points, start, end, threshold_start=0.0, threshold_end=0.0):
+    """
+    Points between the two planes through start and end whose normal is the start to end direction.
+    Points on a plane count as between.
+
+    Args:
+        points (np.array): (N, 3) points.
+        start (list): A point on the start plane.
+        end (list): A point on the end plane.
+        threshold_start (float): Distance to push the start plane outwards, away from end.
+        threshold_end (float): Distance to push the end plane outwards, away from start.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    params, length = segment_parameters(points, start, end)
+    if length == 0.0:
+        return np.zeros(len(points), dtype=bool)
+    return (params >= -threshold_start / length) & (params <= 1.0 + threshold_end / length)
+
+
+def _distance_to_axis(points, start, end):
+    params, length = segment_parameters(points, start, end)
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    on_axis = start + params[:, None] * (end - start)
+    return params, np.linalg.norm(np.asarray(points, dtype=np.float64) - on_axis, axis=1)
+
+
+def cylinder(points, start, end, radius):
+    """
+    Points inside the capped cylinder around the segment start to end.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    params, distances = _distance_to_axis(points, start, end)
+    return (params >= 0.0) & (params <= 1.0) & (distances <= radius)
+
+
+def capsule(points, start, end, radius):
+    """
+    Points within radius of the segment start to end, a cylinder with rounded caps.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    _, _, distances = closest_points_on_polyline(points, np.array([start, end], dtype=np.float64))
+    return distances <= radius
+
+
+# ---- Closest Points ----
+def closest_points_on_polyline(points, polyline, params=None):
+    """
+    The closest point on a polyline to every point, every point against every segment as arrays.
+
+    Args:
+        points (np.array): (N, 3) points.
+        polyline (np.array): (S, 3) polyline points, for example from sample_curve.
+        params (np.array): (S,) parameter at each polyline point. Defaults to the polyline point index,
+                           the same 0 to S - 1 parameterization as a linear curve made from the points.
+
+    Returns:
+        tuple: (closest points (N, 3), params (N,) interpolated between the polyline params, distances (N,))
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    polyline = np.asarray(polyline, dtype=np.float64).reshape(-1, 3)
+    params = np.arange(len(polyline), dtype=np.float64) if params is None else np.asarray(params, dtype=np.float64)
+    if len(polyline) == 1:
+        distances = np.linalg.norm(points - polyline[0], axis=1)
+        return np.repeat(polyline, len(points), axis=0), np.full(len(points), params[0]), distances
+
+    seg_start = polyline[:-1]
+    seg_axis = polyline[1:] - seg_start
+    seg_length_sq = np.maximum(np.einsum('ij,ij->i', seg_axis, seg_axis), 1e-20)
+
+    best_segment = np.zeros(len(points), dtype=np.int64)
+    best_t = np.zeros(len(points))
+    best_dist_sq = np.full(len(points), np.inf)
+    block = max(1, PAIR_BLOCK // len(seg_start))
+    for first in range(0, len(points), block):
+        chunk = points[first:first + block]
+        # (points, segments) position along each segment, clamped to its ends
+        to_point = chunk[:, None, :] - seg_start[None, :, :]
+        t = np.clip(np.einsum('psj,sj->ps', to_point, seg_axis) / seg_length_sq, 0.0, 1.0)
+        offset = to_point - t[:, :, None] * seg_axis[None, :, :]
+        dist_sq = np.einsum('psj,psj->ps', offset, offset)
+        nearest = np.argmin(dist_sq, axis=1)
+        rows = np.arange(len(chunk))
+        best_segment[first:first + block] = nearest
+        best_t[first:first + block] = t[rows, nearest]
+        best_dist_sq[first:first + block] = dist_sq[rows, nearest]
+
+    closest = seg_start[best_segment] + best_t[:, None] * seg_axis[best_segment]
+    closest_params = params[best_segment] + best_t * (params[best_segment + 1] - params[best_segment])
+    return closest, closest_params, np.sqrt(best_dist_sq)
+
+
+def closest_points_on_curve(points, curve, samples_per_span=16):
+    """
+    Batched replacement for a closestPoint call per point. The curve is sampled once with sample_curve,
+    params are interpolated between samples so they are approximate for curves above degree 1.
+
+    Returns:
+        tuple: (closest points (N, 3), params (N,), distances (N,))
+    """
+    polyline, params = sample_curve(curve, samples_per_span=samples_per_span)
+    return closest_points_on_polyline(points, polyline, params)
@@ -1,6 +1,135 @@
+'''
+Chunk (voxel) analysis of mesh points.
+
+Every point is assigned to its chunk with one floor pass over the point array, and the chunks are stored
+CSR style: indices holds the point indices sorted by chunk and indptr[c]:indptr[c + 1] is the slice of chunk c.
+Per chunk counts, centroids and extents come from bincount and reduceat, so the cost does not grow with
+the number of chunks the way testing every point against every chunk box did.
+Grids can be 1D, 2D or 3D, give 1 division to an axis that isn't chunked.
+'''
+
 import maya.cmds as cmds
-import maya.api.OpenMaya as om
-from itertools import product
+import numpy as np
+
+from rpdecorator import meshsnapshot
+
+
+def get_mesh_points(mesh_name, space=None):
+    """
+    The points of a mesh as a read-only (N, 3) float64 array, shared through rpdecorator.meshsnapshot.
+    """
+    return meshsnapshot.get_points(mesh_name, space)
+
+
+class ChunkGrid:
+    def __init__(self, points, divisions, min_bound=None, max_bound=None):
+        """
+        Bins points into an even grid of chunks.
+
+        Args:
+            points (np.array): (N, 3) points.
+            divisions (list): Chunks along x, y and z, e.g. (24, 1, 1) for 24 chunks along x.
+            min_bound (list): Grid minimum, defaults to the points' bounding box.
+            max_bound (list): Grid maximum, defaults to the points' bounding box.
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.divisions = np.array(divisions, dtype=np.int64)
+        self.min_bound = self.points.min(axis=0) if min_bound is None else np.asarray(min_bound, dtype=np.float64)
+        self.max_bound = self.points.max(axis=0) if max_bound is None else np.asarray(max_bound, dtype=np.float64)
+        self.chunk_size = (self.max_bound - self.min_bound) / self.divisions
+        self.num_chunks = int(np.prod(self.divisions))
+
+        # cell coordinates per axis, points on the max bound belong to the last chunk
+        safe_size = np.where(self.chunk_size > 0.0, self.chunk_size, 1.0)
+        cells = np.floor((self.points - self.min_bound) / safe_size).astype(np.int64)
+        self.cells = np.clip(cells, 0, self.divisions - 1)
+        # x major flat ids, the same order as looping x, then y, then z
+        self.chunk_ids = (self.cells[:, 0] * self.divisions[1] + self.cells[:, 1]) * self.divisions[2] + self.cells[:, 2]
+        # points outside explicit bounds are left out of every chunk
+        self.valid = np.all((self.points >= self.min_bound) & (self.points <= self.max_bound), axis=1)
+
+        valid_ids = np.flatnonzero(self.valid)
+        self.counts = np.bincount(self.chunk_ids[valid_ids], minlength=self.num_chunks)
+        self.indices = valid_ids[np.argsort(self.chunk_ids[valid_ids], kind='stable')]
+        self.indptr = np.zeros(self.num_chunks + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.indptr[1:])
+
+    def __len__(self):
+        return self.num_chunks
+
+    def chunk_indices(self, chunk):
+        """
+        The point indices in a chunk, a view into self.indices.
+        """
+        return self.indices[self.indptr[chunk]:self.indptr[chunk + 1]]
+
+    def chunk_coordinates(self, chunks=None):
+        """
+        (C, 3) grid coordinates of flat chunk ids, all chunks by default.
+        """
+        chunks = np.arange(self.num_chunks) if chunks is None else np.asarray(chunks)
+        return np.stack(np.unravel_index(chunks, tuple(self.divisions)), axis=1)
+
+    def chunk_bounds(self, chunks=None):
+        """
+        Returns:
+            tuple: ((C, 3) chunk minimums, (C, 3) chunk maximums) of the grid cells, all chunks by default.
+        """
+        chunk_min = self.min_bound + self.chunk_coordinates(chunks) * self.chunk_size
+        return chunk_min, chunk_min + self.chunk_size
+
+    def stats(self):
+        """
+        Per chunk statistics of the points in each chunk, all chunks at once.
+        Empty chunks have a count of 0 and nan centroids and extents.
+
+        Returns:
+            dict: {'counts': (C,), 'centroids': (C, 3), 'min': (C, 3), 'max': (C, 3)}
+        """
+        ids = self.chunk_ids[self.valid]
+        points = self.points[self.valid]
+        safe_counts = np.maximum(self.counts, 1)
+        centroids = np.stack([np.bincount(ids, weights=points[:, axis], minlength=self.num_chunks)
+                              for axis in range(3)], axis=1) / safe_counts[:, None]
+
+        chunk_min = np.full((self.num_chunks, 3), np.nan)
+        chunk_max = np.full((self.num_chunks, 3), np.nan)
+        filled = np.flatnonzero(self.counts)
+        if len(filled):
+            sorted_points = self.points[self.indices]
+            chunk_min[filled] = np.minimum.reduceat(sorted_points, self.indptr[filled], axis=0)
+            chunk_max[filled] = np.maximum.reduceat(sorted_points, self.indptr[filled], axis=0)
+        centroids[self.counts == 0] = np.nan
+        return {'counts': self.counts, 'centroids': centroids, 'min': chunk_min, 'max': chunk_max}
+
+
+def create_debug_cubes(grid, chunks, names):
+    """
+    Creates poly cubes representing the given chunks of a ChunkGrid.
+    """
+    chunk_min, chunk_max = grid.chunk_bounds(chunks)
+    for name, low, high in zip(names, chunk_min, chunk_max):
+        size = high - low
+        center = (low + high) * 0.5
+        cube = cmds.polyCube(w=size[0], h=size[1], d=size[2], name=name)[0]
+        cmds.move(center[0], center[1], center[2], cube)
+        cmds.setAttr(f"{cube}.overrideEnabled", 1)
+        cmds.setAttr(f"{cube}.overrideColor", 17)  # Optional: set color for debug (green)
+
+
+def _delete_debug_cubes(names):
+    # a single ls call to find leftover cubes from a previous run
+    existing = cmds.ls(names)
+    if existing:
+        cmds.delete(existing)
+
+
+def _chunk_entry(mesh_name, grid, chunk):
+    indices = grid.chunk_indices(chunk)
+    return {'points': [tuple(p) for p in np.round(grid.points[indices], 4).tolist()],
+            'indices': indices.tolist(),  # Using indices as integer values
+            'maya_verts': [f"{mesh_name}.vtx[{idx}]" for idx in indices]}  # Maya vertex selection strings
+
 
 def chunk_mesh_bounding_box(mesh_name, chunk_count, chunk_direction='vertical', debug=False):
     """
@@ -21,99 +150,26 @@ def chunk_mesh_bounding_box(mesh_name, chunk_count, chunk_direction='vertical',
         cmds.error("chunk_count cannot be less than 2.")
     if chunk_count % 2 != 0:
         chunk_count += 1  # Make chunk_count even if it is odd
-    
-    # Get the exact world bounding box of the mesh
-    min_x, min_y, min_z, max_x, max_y, max_z = cmds.exactWorldBoundingBox(mesh_name)
-    
-    # Calculate width, height, and depth based on Maya's axes
-    width = max_x - min_x  # X-axis difference (length)
-    height = max_y - min_y  # Y-axis difference (width)
-    depth = max_z - min_z  # Z-axis difference (height)
-
-    # Determine the chunk size and the axis to subdivide based on the direction
-    chunk_size = None
-    if chunk_direction == 'vertical':  # Subdivide along X-axis (height)
-        chunk_size = width / chunk_count
-    elif chunk_direction == 'horizontal':  # Subdivide along Y-axis (width)
-        chunk_size = height / chunk_count
+
+    # vertical chunks are divided along X, horizontal chunks along Y
+    if chunk_direction == 'vertical':
+        divisions = (chunk_count, 1, 1)
+    elif chunk_direction == 'horizontal':
+        divisions = (1, chunk_count, 1)
     else:
         cmds.error("Invalid chunk_direction. Must be 'vertical' or 'horizontal'.")
-    
-    # Create the list to store bounding boxes of the chunks
-    chunk_bboxes = []
-    chunk_details = {}
 
-    # Create a Mesh function set to access mesh geometry
-    selection_list = om.MSelectionList()
-    selection_list.add(mesh_name)
-    mesh_dag_path = selection_list.getDagPath(0)
-    mfn_mesh = om.MFnMesh(mesh_dag_path)
-
-    # Iterate over chunks
-    for index in range(chunk_count):
-        # Calculate the min and max for each chunk based on its position
-        if chunk_direction == 'vertical':  # Vertical chunking, divide by X-axis
-            chunk_min_x = min_x + index * chunk_size
-            chunk_max_x = chunk_min_x + chunk_size
-            chunk_min_y = min_y
-            chunk_max_y = max_y
-            chunk_min_z = min_z
-            chunk_max_z = max_z
-        elif chunk_direction == 'horizontal':  # Horizontal chunking, divide by Y-axis
-            chunk_min_x = min_x
-            chunk_max_x = max_x
-            chunk_min_y = min_y + index * chunk_size
-            chunk_max_y = chunk_min_y + chunk_size
-            chunk_min_z = min_z
-            chunk_max_z = max_z
-        
-        # Create an empty bounding box
-        chunk_bbox = om.MBoundingBox()
-        
-        # Expand the bounding box using the min and max points
-        chunk_bbox.expand(om.MPoint(chunk_min_x, chunk_min_y, chunk_min_z))
-        chunk_bbox.expand(om.MPoint(chunk_max_x, chunk_max_y, chunk_max_z))
-        
-        chunk_bboxes.append(chunk_bbox)
-        
-        # In debug mode, create poly cubes to represent each chunk
-        chunk_name = f'chunk{index:02}'
-        if cmds.objExists(chunk_name): cmds.delete(chunk_name)
-
-        if debug:
-            cube = cmds.polyCube(w=chunk_bbox.width, h=chunk_bbox.height, d=chunk_bbox.depth, name=chunk_name)[0]
-            cmds.move(chunk_bbox.center.x, chunk_bbox.center.y, chunk_bbox.center.z, cube)
-            cmds.setAttr(f"{cube}.overrideEnabled", 1)
-            cmds.setAttr(f"{cube}.overrideColor", 17)  # Optional: set color for debug (green)
-
-        # Create point_index dictionary for points within this chunk
-        point_index = {}
-        maya_verts = []
-        points = []
-        # Get mesh vertices and iterate through them
-        mfn_mesh.getPoints(om.MSpace.kWorld)
-        vertex_array = mfn_mesh.getPoints(space=om.MSpace.kWorld)
-
-        for idx, point in enumerate(vertex_array):
-            points.append((round(point.x, 4), round(point.x, 4), round(point.x, 4)))
-            point_position = point
-            point_x, point_y, point_z = point_position.x, point_position.y, point_position.z
-
-            # Check if the point lies within the chunk's bounding box using inside() method
-            point = om.MPoint(point_x, point_y, point_z)
-            if chunk_bbox.contains(point):
-                # Add the vertex index and its Maya vertex string
-                point_index[idx] = point
-                maya_verts.append(f"{mesh_name}.vtx[{idx}]")
-
-        # Create dictionary entry for the chunk details
-        chunk_details[f'chunk{index:02}'] = {
-            'chunk_direction': chunk_direction,
-            'points': points,
-            'indices': list(point_index.keys()),  # Using indices as integer values
-            'maya_verts': maya_verts  # Maya vertex selection strings
-        }
+    min_x, min_y, min_z, max_x, max_y, max_z = cmds.exactWorldBoundingBox(mesh_name)
+    grid = ChunkGrid(get_mesh_points(mesh_name), divisions, (min_x, min_y, min_z), (max_x, max_y, max_z))
+
+    names = [f'chunk{index:02}' for index in range(chunk_count)]
+    _delete_debug_cubes(names)
+    if debug:
+        create_debug_cubes(grid, range(chunk_count), names)
 
+    chunk_details = {}
+    for index, chunk_name in enumerate(names):
+        chunk_details[chunk_name] = dict(chunk_direction=chunk_direction, **_chunk_entry(mesh_name, grid, index))
     return chunk_details
 
 
@@ -121,8 +177,6 @@ def chunk_mesh_bounding_box(mesh_name, chunk_count, chunk_direction='vertical',
 chunk_dict = chunk_mesh_bounding_box('full_body', chunk_count=4, chunk_direction='vertical', debug=True)
 print(chunk_dict)
 '''
-import maya.cmds as cmds
-import maya.api.OpenMaya as om
 
 def subdivide_by_chunk(mesh_name, num_vertical_chunks, num_horizontal_chunks, vertical=True, horizontal=False, reverse_vertical_chunks=True, debug=False):
     """
@@ -147,82 +201,31 @@ def subdivide_by_chunk(mesh_name, num_vertical_chunks, num_horizontal_chunks, ve
     if num_horizontal_chunks % 2 != 0:
         num_horizontal_chunks += 1  # Make num_horizontal_chunks even if it is odd
 
-    # Get the exact world bounding box of the mesh
+    # chunk ids keep the old numbering, one id per (vertical, horizontal) pair even when an axis isn't chunked,
+    # so an unchunked axis repeats the full range
+    divisions = (num_vertical_chunks if vertical else 1, num_horizontal_chunks if horizontal else 1, 1)
     min_x, min_y, min_z, max_x, max_y, max_z = cmds.exactWorldBoundingBox(mesh_name)
-    
-    # Calculate width, height, and depth based on Maya's axes
-    width = max_x - min_x  # X-axis difference (length)
-    height = max_y - min_y  # Y-axis difference (width)
-    depth = max_z - min_z  # Z-axis difference (height)
-
-    # Determine the chunk sizes based on vertical and horizontal parameters
-    chunk_size_vertical = width / num_vertical_chunks if vertical else None
-    chunk_size_horizontal = height / num_horizontal_chunks if horizontal else None
+    grid = ChunkGrid(get_mesh_points(mesh_name), divisions, (min_x, min_y, min_z), (max_x, max_y, max_z))
+    centers_x = np.mean(grid.chunk_bounds(), axis=0)[:, 0]
 
-    # Create the list to store bounding boxes of the chunks
+    chunk_names = []
+    chunks = []
     chunk_details = {}
-
-    # Create a Mesh function set to access mesh geometry
-    selection_list = om.MSelectionList()
-    selection_list.add(mesh_name)
-    mesh_dag_path = selection_list.getDagPath(0)
-    mfn_mesh = om.MFnMesh(mesh_dag_path)
-
-    # Iterate over chunks
-    chunk_index = 0
-    for v_index, h_index in product(range(num_vertical_chunks), range(num_horizontal_chunks)):
-        # Calculate the min and max for each chunk based on its position
-        chunk_min_x = min_x + (v_index * chunk_size_vertical if vertical else 0)
-        chunk_max_x = chunk_min_x + (chunk_size_vertical if vertical else width)
-        chunk_min_y = min_y + (h_index * chunk_size_horizontal if horizontal else 0)
-        chunk_max_y = chunk_min_y + (chunk_size_horizontal if horizontal else height)
-        chunk_min_z = min_z
-        chunk_max_z = max_z
-
-        # Initialize a new bounding box for the current chunk
-        chunk_bbox = om.MBoundingBox()
-        chunk_bbox.expand(om.MPoint(chunk_min_x, chunk_min_y, chunk_min_z))
-        chunk_bbox.expand(om.MPoint(chunk_max_x, chunk_max_y, chunk_max_z))
-        
-        # In debug mode, create poly cubes to represent each chunk
-        chunk_name = f'chunk{chunk_index:02}'
-        if cmds.objExists(chunk_name): cmds.delete(chunk_name)
-
-        if debug:
-            cube = cmds.polyCube(w=chunk_bbox.width, h=chunk_bbox.height,
-                                d=chunk_bbox.depth, name=chunk_name)[0]
-            cmds.move(chunk_bbox.center.x, chunk_bbox.center.y, chunk_bbox.center.z, cube)
-            cmds.setAttr(f"{cube}.overrideEnabled", 1)
-            cmds.setAttr(f"{cube}.overrideColor", 17)  # Optional: set color for debug (green)
-
-        # Create point_index dictionary for points within this chunk
-        point_index = {}
-        maya_verts = []
-        points = []
-
-        # Get mesh vertices and iterate through them
-        vertex_array = mfn_mesh.getPoints(space=om.MSpace.kWorld)
-
-        for idx, point in enumerate(vertex_array):
-            point_position = om.MPoint(point.x, point.y, point.z)
-
-            # Check if the point lies within the chunk's bounding box
-            if chunk_bbox.contains(point_position):
-                points.append((round(point.x, 4), round(point.y, 4), round(point.z, 4)))
-                point_index[idx] = point
-                maya_verts.append(f"{mesh_name}.vtx[{idx}]")
-
-        # Only add chunks that contain points
-        if point_index:
-            # Create dictionary entry for the chunk details
-            chunk_details[f'chunk{chunk_index:02}'] = {
-                'chunk_center_x': chunk_bbox.center.x,
-                'points': points,
-                'indices': list(point_index.keys()),  # Using indices as integer values
-                'maya_verts': maya_verts  # Maya vertex selection strings
-            }
-
-        chunk_index += 1
+    for v_index in range(num_vertical_chunks):
+        for h_index in range(num_horizontal_chunks):
+            chunk_name = f'chunk{v_index * num_horizontal_chunks + h_index:02}'
+            chunk = ((v_index if vertical else 0) * divisions[1]) + (h_index if horizontal else 0)
+            chunk_names.append(chunk_name)
+            chunks.append(chunk)
+            # Only add chunks that contain points
+            if not grid.counts[chunk]:
+                continue
+            chunk_details[chunk_name] = dict(chunk_center_x=float(centers_x[chunk]),
+                                             **_chunk_entry(mesh_name, grid, chunk))
+
+    _delete_debug_cubes(chunk_names)
+    if debug:
+        create_debug_cubes(grid, chunks, chunk_names)
 
     # Create the mirrored chunks dictionary
     mirrored_chunks = {'left': {}, 'right': {}}
@@ -233,7 +236,6 @@ def subdivide_by_chunk(mesh_name, num_vertical_chunks, num_horizontal_chunks, ve
             mirrored_chunks['left'][chunk_name] = chunk_info
         else:  # Negative X direction (right)
             mirrored_chunks['right'][chunk_name] = chunk_info
-    print('working')
     # Sort the chunks by their X-center values
     mirrored_chunks['left'] = {k: v for k, v in sorted(mirrored_chunks['left'].items(),
                                                        key=lambda item: item[1]['chunk_center_x'],
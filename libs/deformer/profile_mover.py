@@ -1,142 +1,239 @@
-import maya.api.OpenMaya as om
-import maya.api.OpenMayaMPx as ompx
-import maya.cmds as cmds
-import numpy as np
+'''
+Curve net deformer, moves points toward points on a set of profile curves.
 
-class CurveNetDeformerNode(ompx.MPxDeformerNode):
-    # Node name and ID
-    kNodeName = "curveNetDeformer"
-    kNodeId = om.MTypeId(0x87007)
+    p' = p + sum_i(w_i * (curve_i(t_i) - p))
 
-    def __init__(self):
-        super(CurveNetDeformerNode, self).__init__()
+scaled by the envelope and the painted weights. Curves come in through the profile[i].profileCurve
+plugs (connect a curve's worldSpace[0]), so nothing is looked up by name during evaluation.
 
-    def deform(self, dataBlock, geoIterator, matrix, multiIndex):
-        # Get input and output geometry
-        inputGeom = geoIterator.inputGeometry()
-        outputGeom = geoIterator.outputGeometry()
+Every evaluation:
+- pulls all positions with allPositions and writes them back with setAllPositions
+- evaluates each curve once, not once per vertex
+- applies the deformation as one numpy expression over all points
 
-        # Get profile curves and compute weights
-        profileCurves = self.get_profile_curves()
-        weights = self.get_weights(profileCurves, geoIterator)
-        tValues = self.get_t_values(profileCurves, geoIterator)
+The weights and parameters per curve are only recomputed by compute_curve_weights_and_parameters when
+the profile inputs that define them change, and the painted weights and point indices per geometry are
+cached until the geometry's point count changes.
 
-        # Loop through all points and apply deformation
-        while not geoIterator.isDone():
-            pos = geoIterator.position()
-            pos_np = np.array([pos.x, pos.y, pos.z])
+# --- Example
+cmds.loadPlugin('profile_mover.py')
+deformer = cmds.deformer('body_geo', type='curveNetDeformer')[0]
+cmds.connectAttr('curve1.worldSpace[0]', f'{deformer}.profile[0].profileCurve')
+cmds.connectAttr('curve2.worldSpace[0]', f'{deformer}.profile[1].profileCurve')
+'''
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import numpy as np
 
-            # Apply deformation
-            deformed_pos_np = self.deform_point(pos_np, profileCurves, weights, tValues)
-            geoIterator.setPosition(om.MPoint(deformed_pos_np[0], deformed_pos_np[1], deformed_pos_np[2]))
 
-            geoIterator.next()
+def maya_useNewAPI():
+    # tells maya this plugin uses the python API 2.0
+    pass
 
-    def deform_point(self, p, profile_curves, weights, t_values):
-        """
-        Deform a point using a set of profile curves.
 
-        Args:
-        p (np.array): The original point vector [x, y, z].
-        profile_curves (list of MObject): Profile curves.
-        weights (list of float): Weights for each profile curve.
-        t_values (list of float): Parameter values for each profile curve.
+def deform_points(points, curve_points, curve_weights, vertex_weights=None, envelope=1.0):
+    """
+    The deformation for all points at once, plain numpy.
 
-        Returns:
-        np.array: The deformed point vector.
-        """
-        p_deformed = p.copy()
+    Args:
+        points (np.array): (N, 3) positions.
+        curve_points (np.array): (C, 3) the point on each profile curve at its parameter.
+        curve_weights (np.array): (C,) weight of each curve.
+        vertex_weights (np.array): (N,) painted weights, 1 for every point by default.
+        envelope (float): The deformer envelope.
 
-        for curve, w_i, t_i in zip(profile_curves, weights, t_values):
-            curve_point = self.profile_curve(curve, t_i)
-            p_deformed += w_i * (curve_point - p)
+    Returns:
+        np.array: (N, 3) deformed positions.
+    """
+    # sum_i(w_i * (c_i - p)) is the same as sum_i(w_i * c_i) - p * sum_i(w_i)
+    offset = curve_weights @ curve_points - points * curve_weights.sum()
+    scale = envelope if vertex_weights is None else envelope * vertex_weights
+    return points + np.multiply(scale, offset.T).T
 
-        return p_deformed
 
-    def profile_curve(self, curve, t):
-        """
-        Compute the position on a NURBS curve at parameter t.
+class CurveNetDeformerNode(oma.MPxDeformerNode):
+    # Node name and ID
+    kNodeName = "curveNetDeformer"
+    kNodeId = om.MTypeId(0x87007)
 
-        Args:
-        curve (MObject): NURBS curve MObject.
-        t (float): Parameter value.
+    profile = None
+    profileCurve = None
+    profileWeight = None
+    profileParameter = None
 
-        Returns:
-        np.array: Position on the curve at parameter t.
-        """
-        curve_fn = om.MFnNurbsCurve(curve)
-        point = curve_fn.getPointAtParam(t, om.MSpace.kWorld)
-        return np.array([point.x, point.y, point.z])
+    def __init__(self):
+        super(CurveNetDeformerNode, self).__init__()
+        # (weights, parameters, key of the inputs they were computed from)
+        self._curve_cache = None
+        # multiIndex -> (point count, point indices, painted weights or None)
+        self._geometry_cache = {}
 
-    def get_profile_curves(self):
+    def setDependentsDirty(self, plug, affected_plugs):
+        # painted weights changed, drop the cached weights of that geometry
+        if plug.attribute() in (self.weights, self.weightList):
+            self._geometry_cache = {}
+        return super(CurveNetDeformerNode, self).setDependentsDirty(plug, affected_plugs)
+
+    def deform(self, dataBlock, geoIterator, matrix, multiIndex):
+        envelope = dataBlock.inputValue(self.envelope).asFloat()
+        if envelope == 0.0:
+            return
+
+        curves, user_weights, user_parameters = self.get_profile_curves(dataBlock)
+        # Check for curves
+        if not curves:
+            return
+
+        weights, parameters = self.get_cached_weights_and_parameters(curves, user_weights, user_parameters)
+        # each curve is evaluated once, in the deformed geometry's local space
+        to_local = matrix.inverse()
+        curve_points = np.array([list(om.MFnNurbsCurve(curve).getPointAtParam(t, om.MSpace.kObject) * to_local)[:3]
+                                 for curve, t in zip(curves, parameters)], dtype=np.float64)
+
+        positions = geoIterator.allPositions()
+        points = np.array(positions, dtype=np.float64)[:, :3]
+        vertex_weights = self.get_vertex_weights(dataBlock, geoIterator, multiIndex, len(points))
+
+        deformed = deform_points(points, curve_points, np.asarray(weights, dtype=np.float64),
+                                 vertex_weights, envelope)
+        geoIterator.setAllPositions(om.MPointArray(deformed.tolist()))
+
+    def get_profile_curves(self, dataBlock):
         """
-        Get the profile curves from the scene.
+        Get the profile curves connected to the profile[i].profileCurve plugs.
 
         Returns:
-        list of MObject: List of profile curve MObjects.
+        tuple: (list of curve data MObjects, list of user weights, list of user parameters),
+               a negative user weight or parameter means automatic.
         """
-        # Example: Replace with actual retrieval of NURBS curve nodes
-        return [self.get_curve_by_name(name) for name in ["curve1", "curve2"]]
-
-    def get_curve_by_name(self, name):
+        curves, user_weights, user_parameters = [], [], []
+        profile_handle = dataBlock.inputArrayValue(self.profile)
+        for i in range(len(profile_handle)):
+            profile_handle.jumpToPhysicalElement(i)
+            element = profile_handle.inputValue()
+            curve = element.child(self.profileCurve).asNurbsCurveTransformed()
+            if curve.isNull():
+                continue
+            curves.append(curve)
+            user_weights.append(element.child(self.profileWeight).asDouble())
+            user_parameters.append(element.child(self.profileParameter).asDouble())
+        return curves, user_weights, user_parameters
+
+    def get_cached_weights_and_parameters(self, curves, user_weights, user_parameters):
         """
-        Get an MObject for a curve by its name.
-
-        Args:
-        name (str): Name of the curve.
-
-        Returns:
-        MObject: MObject for the curve.
+        Returns the bind time weights and parameters, only recomputed when the number of curves,
+        their cv counts or the user weights and parameters change.
         """
-        sel_list = om.MSelectionList()
-        sel_list.add(name)
-        return sel_list.getDependNode(0)
-
-    def get_weights(self, profile_curves, geoIterator):
+        key = (tuple(om.MFnNurbsCurve(curve).numCVs for curve in curves),
+               tuple(user_weights), tuple(user_parameters))
+        if self._curve_cache is None or self._curve_cache[2] != key:
+            weights, parameters = self.compute_curve_weights_and_parameters(curves, user_weights, user_parameters)
+            self._curve_cache = (weights, parameters, key)
+        return self._curve_cache[0], self._curve_cache[1]
+
+    def compute_curve_weights_and_parameters(self, curves, user_weights, user_parameters):
         """
-        Compute weights based on parameterization of profile curves.
-
-        Args:
-        profile_curves (list of MObject): List of profile curve MObjects.
-        geoIterator (MItMeshVertex): Geometry iterator.
+        Computes weights and parameter values for the curves.
+        Curves without a user weight share the weight left over by the ones that have one, curves without
+        a user parameter use the middle of their knot domain.
 
         Returns:
-        list of float: List of weights.
+        tuple: (list of float weights, list of float parameters)
         """
-        # Dummy implementation - replace with actual weight computation
-        return [1.0 / len(profile_curves)] * len(profile_curves)
-
-    def get_t_values(self, profile_curves, geoIterator):
+        fixed = sum(w for w in user_weights if w >= 0.0)
+        num_auto = sum(1 for w in user_weights if w < 0.0)
+        auto_weight = max(1.0 - fixed, 0.0) / num_auto if num_auto else 0.0
+        weights = [w if w >= 0.0 else auto_weight for w in user_weights]
+
+        parameters = []
+        for curve, t in zip(curves, user_parameters):
+            if t >= 0.0:
+                parameters.append(t)
+                continue
+            start, end = om.MFnNurbsCurve(curve).knotDomain
+            parameters.append((start + end) * 0.5)
+        return weights, parameters
+
+    def get_vertex_weights(self, dataBlock, geoIterator, multiIndex, count):
+        """
+        The painted weights of the iterated points as an (N,) array, None when nothing is painted.
+        Cached per geometry until the point count or the painted weights change.
         """
-        Compute parameter values for each curve.
+        cached = self._geometry_cache.get(multiIndex)
+        if cached and cached[0] == count:
+            return cached[2]
 
-        Args:
-        profile_curves (list of MObject): List of profile curve MObjects.
-        geoIterator (MItMeshVertex): Geometry iterator.
+        indices = []
+        geoIterator.reset()
+        while not geoIterator.isDone():
+            indices.append(geoIterator.index())
+            geoIterator.next()
+        geoIterator.reset()
+        indices = np.array(indices, dtype=np.int64)
+
+        # only the painted entries are stored, everything else defaults to 1
+        weight_list = dataBlock.inputArrayValue(self.weightList)
+        vertex_weights = None
+        try:
+            weight_list.jumpToLogicalElement(multiIndex)
+            weights_handle = om.MArrayDataHandle(weight_list.inputValue().child(self.weights))
+        except RuntimeError:
+            weights_handle = None
+        if weights_handle is not None and len(weights_handle):
+            painted_ids, painted_values = [], []
+            for i in range(len(weights_handle)):
+                weights_handle.jumpToPhysicalElement(i)
+                painted_ids.append(weights_handle.elementLogicalIndex())
+                painted_values.append(weights_handle.inputValue().asFloat())
+            lookup = np.ones(max(int(indices.max(initial=-1)), max(painted_ids)) + 1, dtype=np.float64)
+            lookup[painted_ids] = painted_values
+            vertex_weights = lookup[indices]
+
+        self._geometry_cache[multiIndex] = (count, indices, vertex_weights)
+        return vertex_weights
 
-        Returns:
-        list of float: List of parameter values.
-        """
-        # Dummy implementation - replace with actual parameter computation
-        return [0.5] * len(profile_curves)
 
 def nodeCreator():
-    return ompx.asMPxPtr(CurveNetDeformerNode())
+    return CurveNetDeformerNode()
+
 
 def nodeInitializer():
-    # Initialize node attributes here if needed
-    pass
+    typed_attr = om.MFnTypedAttribute()
+    numeric_attr = om.MFnNumericAttribute()
+    compound_attr = om.MFnCompoundAttribute()
+
+    CurveNetDeformerNode.profileCurve = typed_attr.create('profileCurve', 'pc', om.MFnData.kNurbsCurve)
+    CurveNetDeformerNode.profileWeight = numeric_attr.create('profileWeight', 'pw', om.MFnNumericData.kDouble, -1.0)
+    numeric_attr.keyable = True
+    CurveNetDeformerNode.profileParameter = numeric_attr.create('profileParameter', 'pp',
+                                                                om.MFnNumericData.kDouble, -1.0)
+    numeric_attr.keyable = True
+
+    CurveNetDeformerNode.profile = compound_attr.create('profile', 'pr')
+    compound_attr.addChild(CurveNetDeformerNode.profileCurve)
+    compound_attr.addChild(CurveNetDeformerNode.profileWeight)
+    compound_attr.addChild(CurveNetDeformerNode.profileParameter)
+    compound_attr.array = True
+    CurveNetDeformerNode.addAttribute(CurveNetDeformerNode.profile)
+
+    output_geom = oma.MPxGeometryFilter.outputGeom
+    CurveNetDeformerNode.attributeAffects(CurveNetDeformerNode.profile, output_geom)
+    CurveNetDeformerNode.attributeAffects(CurveNetDeformerNode.profileCurve, output_geom)
+    CurveNetDeformerNode.attributeAffects(CurveNetDeformerNode.profileWeight, output_geom)
+    CurveNetDeformerNode.attributeAffects(CurveNetDeformerNode.profileParameter, output_geom)
+
 
 def initializePlugin(mobject):
-    mplugin = ompx.MFnPlugin(mobject)
+    mplugin = om.MFnPlugin(mobject)
     try:
         mplugin.registerNode(CurveNetDeformerNode.kNodeName, CurveNetDeformerNode.kNodeId,
-                             nodeCreator, nodeInitializer, ompx.MPxNode.kDeformerNode)
+                             nodeCreator, nodeInitializer, om.MPxNode.kDeformerNode)
     except:
         om.MGlobal.displayError("Failed to register node: " + CurveNetDeformerNode.kNodeName)
 
+
 def uninitializePlugin(mobject):
-    mplugin = ompx.MFnPlugin(mobject)
+    mplugin = om.MFnPlugin(mobject)
     try:
         mplugin.deregisterNode(CurveNetDeformerNode.kNodeId)
     except:
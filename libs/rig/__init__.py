@@ -0,0 +1,4 @@
+# submodules are imported on first attribute access, see rpdecorator.lazyload
+from rpdecorator import lazyload
+
+__getattr__, __dir__ = lazyload.lazy_submodules(__name__)
@@ -24,6 +24,8 @@ if os not in sys.path:
 
 from maya import cmds
 import maya.OpenMaya as OpenMaya
+import maya.api.OpenMaya as om2
+from rpdecorator import meshsnapshot, transformsnapshot
 from rig.utils import misc
 importlib.reload(misc)
 from rig.utils import exportUtils
@@ -268,14 +270,8 @@ def mirrorSelectedLocatorLToRSingle(ctrl=None):
     cmds.xform(rParent, ws=True, ro=rParentRotate, t=rParentTranslate, s=rParentScale)
 
 def getMirroredTransform(position, rotation):
-    rootGrp  = cmds.createNode("transform", n="TEMP_ROOT_GRP")
-    tmpRootJnt = cmds.joint(rootGrp, name = "ROOT", o=[0,0,0], p=[0,0,0])
-    tmpJnt = cmds.joint(tmpRootJnt, name = "TEMPO", o=rotation, p=position)
-    tmpFinal = cmds.mirrorJoint(tmpJnt, mirrorBehavior=True, mirrorYZ=True, sr = ["L_", "R_"])[0]
-    rotate = cmds.xform(tmpFinal, q=True, ws=True, ro=True)
-    scale = cmds.xform(tmpFinal, q=True, ws=True, s=True)
-    cmds.delete([rootGrp, tmpRootJnt, tmpJnt, tmpFinal])
-    return rotate, scale
+    # the mirrorJoint -mirrorBehavior -mirrorYZ result, worked out with matrices instead of temp joints
+    return transformsnapshot.mirror_rotation(rotation, rotate_order=0, plane="YZ", behavior=True)
 
 
 def getMatrixDeformerCtrls(matrixDeformer=None):
@@ -357,10 +353,68 @@ def rebuildMatDefWeightOverrides(weightDict):
             cmds.setAttr(weightAttr, weightValues, type="doubleArray")
             cmds.connectAttr(weightAttr, weightPlug, f=True)
 
+def getMatrixDeformerData(matrixDeformer):
+    """
+    Exports what rig_2.weights.reference.matrix_deform needs to evaluate a matrix deformer outside of maya,
+    plain lists so it can be written to json.
+    The points are read with the envelope turned off, in the object space of the deformed geometry.
+    """
+    geo = cmds.deformer(matrixDeformer, q=True, geometry=True)[0]
+    envelope = cmds.getAttr(matrixDeformer + ".envelope")
+    cmds.setAttr(matrixDeformer + ".envelope", 0.0)
+    try:
+        points = meshsnapshot.get_points(geo, om2.MSpace.kObject).tolist()
+    finally:
+        # put the envelope back even if the read fails, the rig would be left switched off otherwise
+        cmds.setAttr(matrixDeformer + ".envelope", envelope)
+
+    matrices, baseMatrices, weights = [], [], []
+    for idx in cmds.getAttr(matrixDeformer + ".inputs", mi=True) or []:
+        elem = "{0}.inputs[{1}]".format(matrixDeformer, idx)
+        matrices.append(cmds.getAttr(elem + ".matrix"))
+        baseMatrices.append(cmds.getAttr(elem + ".matrixBase"))
+        # an unset weight array means the input moves every point fully
+        weights.append(cmds.getAttr(elem + ".matrixWeight") or [1.0] * len(points))
+    return {"geometry": geo,
+            "envelope": envelope,
+            "points": points,
+            "matrices": matrices,
+            "base_matrices": baseMatrices,
+            "weights": weights}
+
 ################################################################################################
 ############################ Weight Stack utils ################################################
 ################################################################################################
 
+# the LHWeightNode attributes getWeightStackData exports the normalize and clamp state from, first one found
+WEIGHT_STACK_FLAG_ATTRS = {"normalize": ("normalize", "normalizeWeights"),
+                           "clamp": ("clamp", "clampWeights")}
+
+def getWeightStackData(weightStack):
+    """
+    Exports the inputs of an LHWeightNode for rig_2.weights.reference.evaluate_weight_stack_data,
+    along with the node's current output so the two can be compared.
+    The normalize and clamp state is None when the node has neither of the attribute names looked for.
+    """
+    flags = {}
+    for key, attrNames in WEIGHT_STACK_FLAG_ATTRS.items():
+        attrName = next((name for name in attrNames if cmds.attributeQuery(name, node=weightStack, exists=True)),
+                        None)
+        flags[key] = bool(cmds.getAttr(weightStack + "." + attrName)) if attrName else None
+    inputWeights, factors, operations = [], [], []
+    for idx in cmds.getAttr(weightStack + ".inputs", mi=True) or []:
+        elem = "{0}.inputs[{1}]".format(weightStack, idx)
+        inputWeights.append(cmds.getAttr(elem + ".inputWeights") or [])
+        factors.append(cmds.getAttr(elem + ".factor"))
+        operations.append(cmds.getAttr(elem + ".operation"))
+    return {"input_weights": inputWeights,
+            "factors": factors,
+            "operations": operations,
+            "normalize": flags["normalize"],
+            "clamp": flags["clamp"],
+            "out_weights": cmds.getAttr(weightStack + ".outWeightsDoubleArray") or []}
+
+
 
 def cacheOutAllSlideDeformers(cache=True):
     # need to write a filter so you can only save out anim curve weights per component if you so choose...
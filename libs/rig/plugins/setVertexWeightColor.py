@@ -1,54 +1,59 @@
-import maya.OpenMaya as OpenMaya
-import maya.OpenMayaMPx as OpenMayaMPx
- 
-class SetVertexWeightColor(OpenMayaMPx.MPxCommand):
-    originalWeightValuesShort = "-owv"
-    originalWeightValuesLong = "-originalWeightValues"
-    newWeightValuesShort = "-nwv"
-    newWeightValuesLong = "-newWeightValues"
-    fnMeshShort = "-fnm"
-    fnMeshLong = "-fnMesh"
-    vertexColorListShort = "-vcl"
-    vertexColorListLong = "-vertexColorList"
-    vertexIndexListShort = "-vil"
-    vertexIndexListLong = "-vertexIndexList"
+import maya.api.OpenMaya as OpenMaya
 
+from rig.utils import weightingUtils
 
 
-    def __init__(self):
-        OpenMayaMPx.MPxCommand.__init__(self)
-        self._dgmod = OpenMaya.MDGModifier()
+def maya_useNewAPI():
+    # tells maya this plugin uses the python API 2.0
+    pass
+
+
+class SetVertexWeightColor(OpenMaya.MPxCommand):
+    """
+    Colors a mesh by a weight attribute, undoable.
 
+    cmds.setVertexWeightColor(weightAttribute="C_face_GEO.L_lipWeights", colormap="heat")
+    """
+    weightAttributeShort = "-wa"
+    weightAttributeLong = "-weightAttribute"
+    colormapShort = "-cm"
+    colormapLong = "-colormap"
+    bandsShort = "-b"
+    bandsLong = "-bands"
 
+    def __init__(self):
+        OpenMaya.MPxCommand.__init__(self)
+        self._dgmod = OpenMaya.MDGModifier()
 
     @classmethod
     def command_syntax(cls):
         syntax = OpenMaya.MSyntax()
-        syntax.addFlag(cls.originalWeightValuesShort, cls.originalWeightValuesLong, OpenMaya.MSyntax.kNone)
-        syntax.addFlag(cls.newWeightValuesShort, cls.newWeightValuesLong, OpenMaya.MSyntax.kNone)
-        syntax.addFlag(cls.fnMeshShort, cls.fnMeshLong, OpenMaya.MSyntax.kNone)
-        syntax.addFlag(cls.vertexColorListShort, cls.vertexColorListLong, OpenMaya.MSyntax.kNone)
-        syntax.addFlag(cls.vertexIndexListShort, cls.vertexIndexListLong, OpenMaya.MSyntax.kNone)
-        # syntax.setObjectType(OpenMaya.MSyntax.kSelectionList, 2, 2)
+        syntax.addFlag(cls.weightAttributeShort, cls.weightAttributeLong, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.colormapShort, cls.colormapLong, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.bandsShort, cls.bandsLong, OpenMaya.MSyntax.kLong)
         syntax.useSelectionAsDefault(False)
         syntax.enableEdit(False)
         syntax.enableQuery(False)
         return syntax
 
-
     def doIt(self, args):
         arg_data = OpenMaya.MArgDatabase(self.syntax(), args)
-        if arg_data.isFlagSet(self.originalWeightValuesShort):
-            self.originalWeightValues = arg_data.flagArgumentString(self.originalWeightValuesShort, 0)
-        if arg_data.isFlagSet(self.newWeightValuesShort):
-            self.newWeightValues = arg_data.flagArgumentString(self.newWeightValuesShort, 0)
-        if arg_data.isFlagSet(self.fnMeshShort):
-            self.fnMesh = arg_data.flagArgumentString(self.fnMeshShort, 0)
-        if arg_data.isFlagSet(self.vertexColorListShort):
-            self.vertexColorList = arg_data.flagArgumentString(self.vertexColorListShort, 0)
-        if arg_data.isFlagSet(self.vertexIndexListShort):
-            self.vertexIndexList = arg_data.flagArgumentString(self.vertexIndexListShort, 0)
-        setVertexColors(self.newWeightValues, self.fnMesh, self.vertexColorList, self.vertexIndexList)
+        if not arg_data.isFlagSet(self.weightAttributeShort):
+            raise RuntimeError("setVertexWeightColor needs a -weightAttribute")
+        weightAttr = arg_data.flagArgumentString(self.weightAttributeShort, 0)
+        colormap = "ramp"
+        if arg_data.isFlagSet(self.colormapShort):
+            colormap = arg_data.flagArgumentString(self.colormapShort, 0)
+        kwargs = {}
+        if arg_data.isFlagSet(self.bandsShort):
+            kwargs["bands"] = arg_data.flagArgumentInt(self.bandsShort, 0)
+
+        # the colors come from the weight color cache, every mesh is set with one setVertexColors call
+        for geo, cacheKey, colors in weightingUtils.getWeightColors(weightAttr, colormap, **kwargs):
+            weightingUtils.applyVertexColors(geo, colors, displayVertexColors=False, modifier=self._dgmod,
+                                             cacheKey=cacheKey)
+            self._dgmod.commandToExecute("setAttr {0}.displayColors 1".format(geo))
+        self.redoIt()
 
     def undoIt(self, ):
         self._dgmod.undoIt()
@@ -58,31 +63,23 @@ class SetVertexWeightColor(OpenMayaMPx.MPxCommand):
 
     def isUndoable(self):
         return True
- 
+
+
 def creator():
-    return OpenMayaMPx.asMPxPtr(SetVertexWeightColor())
- 
+    return SetVertexWeightColor()
+
+
 def initializePlugin(obj):
-    plugin = OpenMayaMPx.MFnPlugin(obj, 'Levi Harrison', '1.0', 'Any')
+    plugin = OpenMaya.MFnPlugin(obj, 'Levi Harrison', '1.0', 'Any')
     try:
-        plugin.registerCommand('setVertexWeightColor', creator)
+        plugin.registerCommand('setVertexWeightColor', creator, SetVertexWeightColor.command_syntax)
     except:
         raise RuntimeError('Failed to register command')
- 
+
+
 def uninitializePlugin(obj):
-    plugin = OpenMayaMPx.MFnPlugin(obj)
+    plugin = OpenMaya.MFnPlugin(obj)
     try:
         plugin.deregisterCommand('setVertexWeightColor')
     except:
         raise RuntimeError('Failed to unregister command')
-
-
-def setVertexColors(allWeightValues, fnMesh, vertexColorList, vertexIndexList):
-    for c in range(vertexColorList.length()):
-        # print c
-        # print allWeightValues[c]
-        vertexColorList[c].r = float(allWeightValues[0][c])
-        vertexColorList[c].g = float(allWeightValues[0][c])
-        vertexColorList[c].b = float(allWeightValues[0][c])
-        vertexColorList[c].a = float(1.0)
-    fnMesh.setVertexColors(vertexColorList, vertexIndexList, None)
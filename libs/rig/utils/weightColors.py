@@ -0,0 +1,151 @@
+'''
+Weight values to vertex colors, plain numpy so it runs and can be checked without maya.
+
+Every colormap turns an (N,) weight array into an (N, 4) RGBA float array in one go, ready for a single
+MFnMesh.setVertexColors call:
+- ramp: black to white, what the weight dragger always showed
+- heat: blue, cyan, green, yellow, red
+- banded: heat with dark isolines every 1 / bands, to read gradients and plateaus at a glance
+
+WeightColorCache keeps the colors per weight attribute so switching between weight maps doesn't refetch or
+recolor anything. Whatever is built from the colors (the MColorArray and vertex id array weightingUtils hands
+to setVertexColors) is kept next to them with getDerived, and dropped with them. The cache doesn't know about maya, whoever watches the weights calls markDirty when they
+change (see weightingUtils for the attribute changed callbacks).
+
+# --- Example
+from rig.utils import weightColors
+colors = weightColors.weightsToColors([0.0, 0.5, 1.0], colormap="heat")
+'''
+import numpy as np
+
+# (weight, r, g, b) stops of the heat colormap
+HEAT_STOPS = np.array([[0.0, 0.0, 0.0, 1.0],
+                       [0.25, 0.0, 1.0, 1.0],
+                       [0.5, 0.0, 1.0, 0.0],
+                       [0.75, 1.0, 1.0, 0.0],
+                       [1.0, 1.0, 0.0, 0.0]])
+
+
+def _normalized(weights, low, high):
+    weights = np.asarray(weights, dtype=np.float64).reshape(-1)
+    span = high - low if high != low else 1.0
+    return np.clip((weights - low) / span, 0.0, 1.0)
+
+
+def _rgba(rgb):
+    return np.concatenate([rgb, np.ones((len(rgb), 1))], axis=1)
+
+
+def rampColors(weights, low=0.0, high=1.0):
+    values = _normalized(weights, low, high)
+    return _rgba(np.repeat(values[:, None], 3, axis=1))
+
+
+def heatColors(weights, low=0.0, high=1.0):
+    values = _normalized(weights, low, high)
+    rgb = np.stack([np.interp(values, HEAT_STOPS[:, 0], HEAT_STOPS[:, channel]) for channel in (1, 2, 3)], axis=1)
+    return _rgba(rgb)
+
+
+def bandedColors(weights, low=0.0, high=1.0, bands=10, lineWidth=0.15, lineDarken=0.6):
+    """
+    Heat colors darkened along isolines.
+
+    Args:
+        bands (int): Number of bands between low and high.
+        lineWidth (float): Width of a line as a fraction of a band.
+        lineDarken (float): How much the lines darken the color, 0 to 1.
+    """
+    values = _normalized(weights, low, high)
+    colors = heatColors(values)
+    # distance to the nearest band edge, in bands
+    scaled = values * bands
+    edge = np.abs(scaled - np.round(scaled))
+    onLine = edge < lineWidth * 0.5
+    colors[onLine, :3] *= 1.0 - lineDarken
+    return colors
+
+
+COLORMAPS = {"ramp": rampColors,
+             "heat": heatColors,
+             "banded": bandedColors}
+
+
+def weightsToColors(weights, colormap="ramp", **kwargs):
+    """
+    Args:
+        weights (list): (N,) weight values.
+        colormap (str): A key of COLORMAPS.
+        kwargs: Passed to the colormap, e.g. low, high, bands.
+
+    Returns:
+        np.array: (N, 4) RGBA float64 colors.
+    """
+    return COLORMAPS[colormap](weights, **kwargs)
+
+
+class WeightColorCache(object):
+    def __init__(self):
+        # key -> (colormap settings, colors)
+        self._colors = {}
+        # key -> {name: whatever was built from the colors}
+        self._derived = {}
+        self._dirty = set()
+
+    def markDirty(self, key=None):
+        """
+        Flags the colors of a weight attribute, or of every attribute, to be recomputed on next use.
+        """
+        if key is None:
+            self._dirty.update(self._colors)
+        else:
+            self._dirty.add(key)
+
+    def isCached(self, key, colormap="ramp", **kwargs):
+        settings = (colormap, tuple(sorted(kwargs.items())))
+        return key in self._colors and key not in self._dirty and self._colors[key][0] == settings
+
+    def getColors(self, key, fetchWeights, colormap="ramp", **kwargs):
+        """
+        Returns the cached colors of a weight attribute, fetchWeights is only called when they
+        are dirty, missing or were made with different colormap settings.
+
+        Args:
+            key (str): The weight attribute.
+            fetchWeights (callable): Returns the (N,) weights of the attribute.
+            colormap (str): A key of COLORMAPS.
+
+        Returns:
+            np.array: (N, 4) RGBA colors.
+        """
+        settings = (colormap, tuple(sorted(kwargs.items())))
+        if not self.isCached(key, colormap, **kwargs):
+            self._colors[key] = (settings, weightsToColors(fetchWeights(), colormap, **kwargs))
+            self._derived.pop(key, None)
+            self._dirty.discard(key)
+        return self._colors[key][1]
+
+    def getDerived(self, key, name, build):
+        """
+        Returns something built from the current colors of a weight attribute, build is only called
+        again after the colors were recomputed.
+
+        Args:
+            key (str): The weight attribute, its colors must have been fetched with getColors.
+            name (hashable): What is built, one key can hold many.
+            build (callable): Takes the (N, 4) colors and returns the object to keep.
+        """
+        derived = self._derived.setdefault(key, {})
+        if name not in derived:
+            derived[name] = build(self._colors[key][1])
+        return derived[name]
+
+    def clear(self, key=None):
+        if key is None:
+            self._colors = {}
+            self._derived = {}
+            self._dirty = set()
+            return
+        self._colors.pop(key, None)
+        self._derived.pop(key, None)
+        self._dirty.discard(key)
@@ -1,5 +1,9 @@
 from maya import cmds
 import maya.OpenMaya as OpenMaya
+import maya.api.OpenMaya as om2
+import numpy as np
+from rig.utils import weightColors
+from rig_2.tools import drag_session
 # from plugins import setVertexWeightColor
 # import maya.mel as mel
 
@@ -17,6 +21,8 @@ class weightValueDragger(object):
         self.vertexColorWeightVis= True
         self.toggleVisOnDrag= False
         self.originalWeightValues=""
+        self.session = None
+        self.chunkOpen = False
         # self.vertexWeightVis= False
 
     def clickAndMoveCommand(self):
@@ -26,6 +32,12 @@ class weightValueDragger(object):
             vec = tuple(cmds.draggerContext(Context, query=1, anchorPoint=1 ))
             self.vectorStart = OpenMaya.MVector(vec[0], vec[1], vec[2])
             self.vectorEnd = OpenMaya.MVector(vec[0], vec[1], vec[2])
+            self.wt = 0.0
+            # snapshot of the weights, the drag is always applied to these so it doesn't drift
+            self.session = weightDragSession(self.weightAttr, showColors=self.vertexColorWeightVis)
+            cmds.undoInfo(openChunk=True)
+            self.chunkOpen = True
+            self.session.start(self.wt)
 
         def getCursorPosition():
             vec = tuple(cmds.draggerContext(Context, query=1, dragPoint=1))
@@ -37,21 +49,38 @@ class weightValueDragger(object):
             if dotProd >= 0:
                 posNeg = 1
             self.wt = (length*.001)*posNeg
-            # self.setWeights()
-            allWeightValues = setWeightsOnSelectedAcculmulative(self.weightAttr, self.wt)
-            if self.vertexColorWeightVis:
-                setVertexColorsToWeightValue(allWeightValues, True)
-            vec = tuple(cmds.draggerContext(Context, query=1, dragPoint=1 ))
-            self.vectorStart = OpenMaya.MVector(vec[0], vec[1], vec[2])
+            if self.session.update(self.wt):
+                cmds.refresh(force=True)
+            elif self.session.pending is not None:
+                # the mouse may stop before the next event, write the held back value once maya is idle
+                cmds.evalDeferred(flushPending, lowestPriority=True)
+
+        def flushPending():
+            if self.session.active and self.session.flush():
+                cmds.refresh(force=True)
 
         def releaseClick():
+            # one undoable setAttr per weight attribute that changed
+            self.session.end(self.wt)
+            closeChunk()
             self.vectorStart = OpenMaya.MVector(0.0, 0.0, 0.0)
             self.wt = 0.0
             sel = cmds.ls(sl=True, fl=True)
-            geo = sel[0].split(".")[0]
-            if self.toggleVisOnDrag:
+            if self.toggleVisOnDrag and sel:
+                geo = sel[0].split(".")[0]
                 cmds.setAttr(geo + '.displayColors', False)
 
+        def closeChunk():
+            if self.chunkOpen:
+                self.chunkOpen = False
+                cmds.undoInfo(closeChunk=True)
+
+        def finalize():
+            # leaving the tool mid drag puts the snapshot weights back and closes the press's chunk
+            if self.session:
+                self.session.cancel()
+            closeChunk()
+
         def holdCommand():
             vec = tuple(cmds.draggerContext(Context, query=1, anchorPoint=1 ))
             self.vectorStart = OpenMaya.MVector(vec[0], vec[1], vec[2])
@@ -61,19 +90,92 @@ class weightValueDragger(object):
             cmds.deleteUI(Context)
 
         cmds.draggerContext(Context, um="sequence", pressCommand=getFirstClick, dragCommand=getCursorPosition, name=Context,
-                            cursor='crossHair', sp="screen", pr="viewPlane", rc=releaseClick)
+                            cursor='crossHair', sp="screen", pr="viewPlane", rc=releaseClick, finalize=finalize)
         cmds.setToolTo(Context)
         if self.weightAttr and self.vertexColorWeightVis:
-            allWeightValues = getAllWeightValues(self.weightAttr)[0]
-            setVertexColorsToWeightValue(allWeightValues, True)
+            showWeightColors(self.weightAttr, displayVertexColors=True)
+
+
+def weightDragSession(weightAttr, showColors=True, colormap="ramp", frameRate=drag_session.FRAME_RATE):
+    """
+    A drag session that adds the drag value to the weights of the selected points, clamped between 0 and 1.
+
+    While dragging only the weight arrays with changed points are written, through the API so they stay out of
+    the undo queue, and only the changed vertices are recolored. Release sets each changed weight attribute once
+    with setAttr, the one undoable step.
+
+    Args:
+        weightAttr (str): The weight attribute, see getWeightAttrs.
+        showColors (bool): Recolor the changed vertices while dragging.
+
+    Returns:
+        drag_session.Array_Drag_Session
+    """
+    geoTransform, weightAttrs = getWeightAttrs(weightAttr)
+    plugs = []
+    for attr in weightAttrs:
+        sel = om2.MSelectionList()
+        sel.add(attr)
+        plugs.append(sel.getPlug(0))
+    allWeightValues = [np.array(cmds.getAttr(attr) or [], dtype=np.float64) for attr in weightAttrs]
+    # every weight array one after the other, offsets[i] is where the array of geoTransform[i] starts
+    offsets = np.cumsum([0] + [len(weights) for weights in allWeightValues])
+    # one MDoubleArray per plug kept for the whole drag, a write only sets the changed entries before setMObject
+    doubleArrays = [om2.MDoubleArray(weights.tolist()) for weights in allWeightValues]
+
+    # ---make sure selected are points, and are in the deformer
+    points = [i for i in cmds.ls(sl=True, fl=True) if ".vtx[" in i or ".cv[" in i]
+    selected = []
+    for i in range(len(geoTransform)):
+        for point in points:
+            if geoTransform[i] not in point:
+                continue
+            idx = int(point.split("[")[1].split("]")[0])
+            if idx < len(allWeightValues[i]):
+                selected.append(offsets[i] + idx)
+    selected = np.unique(np.array(selected, dtype=np.int64))
+
+    def read():
+        return np.concatenate(allWeightValues) if allWeightValues else np.zeros(0)
+
+    def compute(snapshot, value):
+        values = snapshot.copy()
+        values[selected] = np.clip(snapshot[selected] + value, 0.0, 1.0)
+        return values
+
+    def segments(indices):
+        # the weight arrays the indices fall in, with the indices local to each array
+        arrays = np.searchsorted(offsets, indices, side="right") - 1
+        for i in np.unique(arrays):
+            yield i, indices[arrays == i] - offsets[i]
+
+    def writeColors(i, ids, weights):
+        if showColors:
+            applyVertexColors(geoTransform[i], weightColors.weightsToColors(weights[ids], colormap), False, vertexIds=ids)
+
+    def write(indices, current):
+        for i, ids in segments(indices):
+            weights = current[offsets[i]:offsets[i + 1]]
+            doubleArray = doubleArrays[i]
+            for idx, weight in zip(ids.tolist(), weights[ids].tolist()):
+                doubleArray[idx] = weight
+            plugs[i].setMObject(om2.MFnDoubleArrayData().create(doubleArray))
+            writeColors(i, ids, weights)
+
+    def commit(snapshot, final):
+        changed = np.flatnonzero(final != snapshot)
+        for i, ids in segments(changed):
+            weights = final[offsets[i]:offsets[i + 1]]
+            cmds.setAttr(weightAttrs[i], weights.tolist(), typ='doubleArray')
+            # the snapshot was put back before the commit, the colors go back to the final weights
+            writeColors(i, ids, weights)
+
+    return drag_session.Array_Drag_Session(read, compute, write, commit_func=commit, frame_rate=frameRate)
+
 
 def turnOnVertexColor(weightAttr, *args):
     if weightAttr:
-        allWeightValues = getAllWeightValues(weightAttr)[0]
-        setVertexColorsToWeightValue(allWeightValues, True)
-        sel = cmds.ls(sl=True, fl=True)
-        geo = sel[0].split(".")[0]
-        cmds.setAttr(geo + '.displayColors', True)
+        showWeightColors(weightAttr, displayVertexColors=True)
 
 def turnOffVertexColor(*args):
     sel = cmds.ls(sl=True, fl=True)
@@ -133,7 +235,13 @@ def setWeightsOnSelectedAcculmulative(weightAttr="LHWeightDeformer.C_testFace_SL
     return allWeightValues
 
 
-def getAllWeightValues(weightAttr):
+def getWeightAttrs(weightAttr):
+    """
+    The geometry a weight attribute is on and the weight attribute of each of them.
+
+    Returns:
+        tuple: (geo transforms, weight attrs)
+    """
     weightAttrSplit = weightAttr.split(".")
     if len(weightAttrSplit) == 2:
         # ---get deformer
@@ -144,20 +252,24 @@ def getAllWeightValues(weightAttr):
         geo = cmds.deformer(deformer, q=True, g=True)
 
     geoTransform = [cmds.listRelatives(i, parent=True)[0] for i in geo]
-    # ---make sure selected are points, and are in the deformer
-    selected = cmds.ls(sl=True, fl=True)
-    vtx = [i for i in selected if ".vtx[" in i]
-    cv = [i for i in selected if ".cv[" in i]
-    points = vtx + cv
-    finalPoints = []
     weightAttrs = []
-    allWeightValues = []
     for i in range(len(geoTransform)):
         if len(weightAttrSplit) == 2:
             weightAttrs.append( weightAttr)
         elif not len(weightAttrSplit) > 2:
             weightAttrs.append( weightAttrSplit[1] + "." + weightAttrSplit[2] + "s[" + str(i) + "]." + weightAttrSplit[2])
-        allWeightValues.append(cmds.getAttr(weightAttrs[i]))
+    return geoTransform, weightAttrs
+
+
+def getAllWeightValues(weightAttr):
+    geoTransform, weightAttrs = getWeightAttrs(weightAttr)
+    # ---make sure selected are points, and are in the deformer
+    selected = cmds.ls(sl=True, fl=True)
+    vtx = [i for i in selected if ".vtx[" in i]
+    cv = [i for i in selected if ".cv[" in i]
+    points = vtx + cv
+    finalPoints = []
+    allWeightValues = [cmds.getAttr(attr) for attr in weightAttrs]
     return allWeightValues, finalPoints, geoTransform, points, weightAttrs
 
 
@@ -294,7 +406,7 @@ def gradientWeightsBetween2Points(weightAttribute="LHWeightDeformer.C_testFace_S
     gttrPoint = OpenMaya.MPoint()
     util = OpenMaya.MScriptUtil()
     # util.createFromInt(0)
-    :param = util.asDoublePtr()
+    param = util.asDoublePtr()
     for id in indicies:
         mesh.getPoint(id, gttrPoint, OpenMaya.MSpace.kWorld)
         fnCurve.closestPoint(gttrPoint, param, OpenMaya.MSpace.kWorld)
@@ -433,7 +545,7 @@ def gradientBetweenPoints(weightAttr = "LHWeightDeformer.C_testFace_SLD.lSideWei
 
 
     # util.createFromInt(0)
-    :param = util.asDoublePtr()
+    param = util.asDoublePtr()
     for id in indicies:
         mesh.getPoint(id, gttrPoint, OpenMaya.MSpace.kWorld)
         fnCurve.closestPoint(gttrPoint, param, OpenMaya.MSpace.kWorld)
@@ -627,45 +739,134 @@ class stayInPointSelectionMode:
             sel = cmds.ls(sl=True, fl=True)
             cmds.hilite(sel[0].split(".")[0])
 
-def setVertexColorsToWeightValue(allWeightValues, displayVertexColors):
-    sel = cmds.ls(sl=True, fl=True)
-    geo = sel[0].split(".")[0]
-    fnMesh = getMFnMesh(geo)
-    util = OpenMaya.MScriptUtil()
+###################################################################################################
+############################ Weight colors ########################################################
+###################################################################################################
 
-    # indexList = [util.createFromInt(x).asInPtr() for x in range(len(allWeightValues))]
+# colors per weight attribute plug, marked dirty by attribute changed callbacks on the weight's node,
+# or by node dirty plug callbacks for weights driven by a connection (outWeightsDoubleArray -> matrixWeight),
+# those never fire attribute changed, their values are only pulled on evaluation
+_COLOR_CACHE = weightColors.WeightColorCache()
+# node name -> ({callback kind: callback id}, {plug name: cache key})
+_WATCHED = {}
 
-    # vertexIndexList = OpenMaya.MIntArray(indexList)
-    vertexColorList = OpenMaya.MColorArray()
 
-    # Check to see if vertex colors exist
-    colors = fnMesh.numColors()
-    if not colors:
-        fnMesh.createColorSetWithName("weightColors")
+def _markWeightDirty(plug, clientData):
+    watched = _WATCHED.get(clientData)
+    if not watched:
+        return
+    key = watched[1].get(plug.name())
+    if key:
+        _COLOR_CACHE.markDirty(key)
+
+
+def _weightChanged(msg, plug, otherPlug, clientData):
+    _markWeightDirty(plug, clientData)
+
+
+def _weightDirty(node, plug, clientData):
+    _markWeightDirty(plug, clientData)
+
+
+def _watchWeights(plugName):
+    node = plugName.split(".")[0]
+    sel = om2.MSelectionList()
+    sel.add(plugName)
+    nodeObject = sel.getDependNode(0)
+    if node not in _WATCHED:
+        callbackId = om2.MNodeMessage.addAttributeChangedCallback(nodeObject, _weightChanged, node)
+        _WATCHED[node] = ({"attributeChanged": callbackId}, {})
+    callbackIds = _WATCHED[node][0]
+    if sel.getPlug(0).isDestination and "dirtyPlug" not in callbackIds:
+        callbackIds["dirtyPlug"] = om2.MNodeMessage.addNodeDirtyPlugCallback(nodeObject, _weightDirty, node)
+    _WATCHED[node][1][plugName] = plugName
+
+
+def clearWeightColorCache():
+    for callbackIds, plugs in _WATCHED.values():
+        for callbackId in callbackIds.values():
+            om2.MMessage.removeCallback(callbackId)
+    _WATCHED.clear()
+    _COLOR_CACHE.clear()
+
+
+def getWeightColors(weightAttr, colormap="ramp", **kwargs):
+    """
+    The vertex colors of every geometry of a weight attribute, each cached until its weights change.
+
+    Returns:
+        list: (geo, cache key, (N, 4) RGBA colors) per geometry, pass the cache key on to applyVertexColors.
+    """
+    geoTransform, weightAttrs = getWeightAttrs(weightAttr)
+    result = []
+    for geo, attr in zip(geoTransform, weightAttrs):
+        if not _COLOR_CACHE.isCached(attr, colormap, **kwargs):
+            _watchWeights(attr)
+        colors = _COLOR_CACHE.getColors(attr, lambda attr=attr: cmds.getAttr(attr) or [], colormap, **kwargs)
+        result.append((geo, attr, colors))
+    return result
 
-    fnMesh.getVertexColors(vertexColorList)
 
-    lenVertexList = vertexColorList.length()
-    fnComponent = OpenMaya.MFnSingleIndexedComponent()
-    fnComponent.create(OpenMaya.MFn.kMeshVertComponent)
-    fnComponent.setCompleteData(lenVertexList);
-    vertexIndexList = OpenMaya.MIntArray()
-    fnComponent.getElements(vertexIndexList)
+def _colorArray(colors):
+    return om2.MColorArray([om2.MColor(color) for color in np.asarray(colors).tolist()])
 
-    util.asDoublePtr()
-    # percent = util.getDouble(param)
 
-    setVertexColors(allWeightValues, fnMesh, vertexColorList, vertexIndexList)
+def applyVertexColors(geo, colors, displayVertexColors=True, modifier=None, vertexIds=None, cacheKey=None):
+    """
+    Sets the color of every vertex with one setVertexColors call.
+
+    Args:
+        geo (str): The mesh.
+        colors (np.array): (N, 4) RGBA colors, one per vertex.
+        modifier (om2.MDGModifier): Queue the change on a modifier instead of applying it, for undoable commands.
+        vertexIds (list): Only color these vertices, colors has one color per id.
+        cacheKey (str): The weight attribute the colors came from in getWeightColors. The MColorArray and the
+                        vertex ids are then built once and kept in the color cache until the weights change.
+    """
+    sel = om2.MSelectionList()
+    sel.add(geo)
+    fnMesh = om2.MFnMesh(sel.getDagPath(0))
+    # Check to see if vertex colors exist
+    if not fnMesh.numColorSets:
+        fnMesh.setCurrentColorSetName(fnMesh.createColorSet("weightColors", False))
+
+    if vertexIds is not None:
+        fnMesh.setVertexColors(_colorArray(colors), om2.MIntArray(np.asarray(vertexIds).tolist()), modifier)
+        if displayVertexColors:
+            cmds.setAttr(geo+'.displayColors', True)
+        return
+
+    numVertices = fnMesh.numVertices
+    if cacheKey is None:
+        colorArray = _colorArray(colors[:numVertices])
+        vertexIds = om2.MIntArray(range(numVertices))
+    else:
+        # keyed on the vertex count as well, a weight array longer than the mesh is cut to it
+        colorArray = _COLOR_CACHE.getDerived(cacheKey, ("MColorArray", numVertices),
+                                             lambda cached: _colorArray(cached[:numVertices]))
+        vertexIds = _COLOR_CACHE.getDerived(cacheKey, ("MIntArray", numVertices),
+                                            lambda cached: om2.MIntArray(range(min(numVertices, len(cached)))))
+    fnMesh.setVertexColors(colorArray, vertexIds, modifier)
 
     if displayVertexColors:
         cmds.setAttr(geo+'.displayColors', True)
 
-def setVertexColors(allWeightValues, fnMesh, vertexColorList, vertexIndexList):
-    for c in range(vertexColorList.length()):
-        # print c
-        # print allWeightValues[c]
-        vertexColorList[c].r = float(allWeightValues[0][c])
-        vertexColorList[c].g = float(allWeightValues[0][c])
-        vertexColorList[c].b = float(allWeightValues[0][c])
-        vertexColorList[c].a = float(1.0)
-    fnMesh.setVertexColors(vertexColorList, vertexIndexList, None)
+
+def showWeightColors(weightAttr, colormap="ramp", displayVertexColors=True, **kwargs):
+    """
+    Colors the meshes of a weight attribute by their weights. Switching back to a weight map that was shown before
+    reuses its colors as long as its weights haven't changed.
+
+    Args:
+        weightAttr (str): The weight attribute.
+        colormap (str): "ramp", "heat" or "banded", see weightColors.
+        kwargs: Passed to the colormap.
+    """
+    for geo, cacheKey, colors in getWeightColors(weightAttr, colormap, **kwargs):
+        applyVertexColors(geo, colors, displayVertexColors, cacheKey=cacheKey)
+
+
+def setVertexColorsToWeightValue(allWeightValues, displayVertexColors, colormap="ramp"):
+    sel = cmds.ls(sl=True, fl=True)
+    geo = sel[0].split(".")[0]
+    applyVertexColors(geo, weightColors.weightsToColors(allWeightValues[0], colormap), displayVertexColors)
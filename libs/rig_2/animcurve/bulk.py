@@ -0,0 +1,159 @@
+'''
+Whole curve reads and writes of anim curve keys.
+
+getAnimCurve and setAnimCurveShape used to go through MScriptUtil pointers key by key. Here a curve is read
+into one set of arrays (times, values, tangents, tangent types, locks) with one array query per key
+attribute, and written back with:
+- the keys in a single keyTimeValue setAttr over the whole index range
+- the tangent x/y values, locks and breakdowns in one ranged setAttr per key attribute, the way maya files
+  store them, so a curve costs the same number of calls whatever its tangents are
+- the tangent types in one keyTangent call per type used, the kit/kot attributes don't use the
+  MFnAnimCurve enum (maya files store auto as 18) so they go through the type names
+Everything goes through cmds, so a write is a normal undoable edit.
+Both directions convert to and from the getAnimCurve dict format without changing any value, so exported
+weight curve files stay compatible. Tangent types are the MFnAnimCurve enum ints in the arrays and dicts,
+cmds uses their names.
+
+The read and write functions only use cmds.keyframe, cmds.keyTangent, cmds.cutKey and cmds.setAttr, setting
+bulk.cmds to a stand-in with the same calls is how they are exercised without maya.
+
+# --- Example
+from rig_2.animcurve import bulk
+arrays = bulk.read_curve_arrays("L_brow00_ACV")
+arrays["values"] *= 0.5
+bulk.write_curve_arrays("L_brow00_ACV", arrays)
+'''
+import numpy as np
+
+from rig_2.animcurve import evaluate
+
+# the arrays are plain numpy, maya is only needed to read and write the curves
+try:
+    from maya import cmds
+except ImportError:
+    cmds = None
+
+# getAnimCurve dict key -> array key, dtype
+DICT_KEYS = (("frame_times", "times", np.float64),
+             ("frame_values", "values", np.float64),
+             ("tangents_locked", "tangents_locked", bool),
+             ("weights_locked", "weights_locked", bool),
+             ("is_weighted", "is_weighted", bool),
+             ("is_breakdown", "is_breakdown", bool),
+             ("in_x_tangents", "in_x", np.float64),
+             ("in_y_tangents", "in_y", np.float64),
+             ("out_x_tangents", "out_x", np.float64),
+             ("out_y_tangents", "out_y", np.float64),
+             ("in_tangents_type", "in_types", np.int64),
+             ("out_tangents_type", "out_types", np.int64))
+
+# array key -> the anim curve key attribute it is written to with a ranged setAttr
+KEY_ATTRS = (("in_x", "keyTanInX"),
+             ("in_y", "keyTanInY"),
+             ("out_x", "keyTanOutX"),
+             ("out_y", "keyTanOutY"),
+             ("tangents_locked", "keyTanLocked"),
+             ("weights_locked", "keyWeightLocked"),
+             ("is_breakdown", "keyBreakdown"))
+
+# MFnAnimCurve tangent type -> the keyTangent name, "smooth" is only an alias of spline
+TANGENT_TYPE_NAMES = {index: name for name, index in evaluate.TANGENT_NAMES.items() if name != "smooth"}
+
+
+def _tangent_types(names):
+    return np.array([evaluate.TANGENT_NAMES[name] for name in names], dtype=np.int64)
+
+
+def _index_groups(values):
+    """
+    The keys that share a value, so a flag only needs one edit call per distinct value.
+
+    Returns:
+        dict: {value: [(index, index), ...]} in the form the keyTangent index flag takes.
+    """
+    groups = {}
+    for index, value in enumerate(np.asarray(values).tolist()):
+        groups.setdefault(value, []).append((index, index))
+    return groups
+
+
+def read_curve_arrays(anim_curve):
+    """
+    Reads every key of a curve, one query per key attribute.
+
+    Args:
+        anim_curve (str): The anim curve node.
+
+    Returns:
+        dict: Arrays of length num keys, see DICT_KEYS for the array keys.
+    """
+    times = np.array(cmds.keyframe(anim_curve, query=True, timeChange=True) or [], dtype=np.float64)
+    num_keys = len(times)
+    if not num_keys:
+        return {array_key: np.empty(0, dtype=dtype) for _, array_key, dtype in DICT_KEYS}
+
+    def query(**flag):
+        return cmds.keyTangent(anim_curve, query=True, **flag)
+
+    breakdowns = cmds.keyframe(anim_curve, query=True, breakdown=True) or []
+    weighted = query(weightedTangents=True)
+    return {"times": times,
+            "values": np.array(cmds.keyframe(anim_curve, query=True, valueChange=True), dtype=np.float64),
+            "in_x": np.array(query(inTangentX=True), dtype=np.float64),
+            "in_y": np.array(query(inTangentY=True), dtype=np.float64),
+            "out_x": np.array(query(outTangentX=True), dtype=np.float64),
+            "out_y": np.array(query(outTangentY=True), dtype=np.float64),
+            "in_types": _tangent_types(query(inTangentType=True)),
+            "out_types": _tangent_types(query(outTangentType=True)),
+            "tangents_locked": np.array(query(lock=True), dtype=bool),
+            "weights_locked": np.array(query(weightLock=True), dtype=bool),
+            # weighting is per curve, kept per key to match the dict format
+            "is_weighted": np.full(num_keys, bool(weighted and weighted[0])),
+            "is_breakdown": np.isin(times, np.asarray(breakdowns, dtype=np.float64))}
+
+
+def write_curve_arrays(anim_curve, arrays):
+    """
+    Replaces every key of a curve with the given arrays. The tangents are set in the same order
+    setAnimCurveShape always used, values first and tangent types last, so the types end up exactly as given.
+    The tangent values go straight to the key attributes, locked tangents don't drag the other side along.
+
+    Args:
+        anim_curve (str): The anim curve node.
+        arrays (dict): Arrays as returned by read_curve_arrays.
+    """
+    times = np.asarray(arrays["times"], dtype=np.float64)
+    values = np.asarray(arrays["values"], dtype=np.float64)
+    num_keys = len(times)
+    cmds.cutKey(anim_curve, clear=True)
+    if not num_keys:
+        return
+
+    # keyTimeValue takes time, value pairs for the whole range, the way maya files store the keys
+    cmds.setAttr(f"{anim_curve}.keyTimeValue[0:{num_keys - 1}]",
+                 *np.stack([times, values], axis=1).reshape(-1).tolist(), size=num_keys)
+
+    cmds.keyTangent(anim_curve, edit=True, weightedTangents=bool(arrays["is_weighted"][0]))
+    for array_key, attr in KEY_ATTRS:
+        cmds.setAttr(f"{anim_curve}.{attr}[0:{num_keys - 1}]", *np.asarray(arrays[array_key]).tolist(),
+                     size=num_keys)
+    for flag, array_key in (("inTangentType", "in_types"), ("outTangentType", "out_types")):
+        for value, indices in _index_groups(np.asarray(arrays[array_key], dtype=np.int64)).items():
+            cmds.keyTangent(anim_curve, edit=True, index=indices, **{flag: TANGENT_TYPE_NAMES[value]})
+
+
+def arrays_to_dict(arrays, name):
+    """
+    The getAnimCurve dict of a curve's arrays, plain python lists so it can be written to json.
+    """
+    curve_dict = {"name": name}
+    for dict_key, array_key, _ in DICT_KEYS:
+        curve_dict[dict_key] = np.asarray(arrays[array_key]).tolist()
+    return curve_dict
+
+
+def dict_to_arrays(curve_dict):
+    """
+    The arrays of a getAnimCurve dict, the inverse of arrays_to_dict.
+    """
+    return {array_key: np.asarray(curve_dict[dict_key], dtype=dtype) for dict_key, array_key, dtype in DICT_KEYS}
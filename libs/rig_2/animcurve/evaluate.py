@@ -0,0 +1,360 @@
+'''
+Pure numpy evaluation of anim curves, from the curve dicts written by rig_2.animcurve.utils.getAnimCurve.
+
+Weight curves are animCurveTU nodes, so turning them into per vertex weights used to mean asking maya for
+one value at a time. Here a curve is compiled once into per segment Bezier control points and then any
+number of samples are evaluated in a single call, without maya, straight from an exported weights file.
+
+Tangents:
+- the dicts store the tangents maya resolved for every key (getTangent), those are used as is, so spline,
+  clamped, plateau, auto, flat and fixed keys evaluate exactly like they do in maya
+- step and step next out tangents hold the value of the segment start or end
+- compute_tangents fills in the tangents from the tangent types for curves built outside of maya
+
+Tangent x values are in seconds like the API returns them, frames_per_second converts them to frames.
+Infinity modes are read from optional "pre_infinity" and "post_infinity" dict keys, constant by default.
+
+# --- Example
+import json
+from rig_2.animcurve import evaluate
+import_dict = json.load(open(filename))
+curves = [evaluate.AnimCurve(curve) for curve in import_dict["weight_curves"].values()]
+values = curves[0].evaluate(np.linspace(-10, 10, 5000))
+stack = evaluate.evaluate_stack(list(import_dict["weight_curves"].values()), samples, normalize=True)
+'''
+import numpy as np
+
+# MFnAnimCurve.TangentType
+TANGENT_GLOBAL = 0
+TANGENT_FIXED = 1
+TANGENT_LINEAR = 2
+TANGENT_FLAT = 3
+TANGENT_SPLINE = 4
+TANGENT_STEP = 5
+TANGENT_SLOW = 6
+TANGENT_FAST = 7
+TANGENT_CLAMPED = 8
+TANGENT_PLATEAU = 9
+TANGENT_STEP_NEXT = 10
+TANGENT_AUTO = 11
+
+# the names cmds.keyTangent uses for itt and ott
+TANGENT_NAMES = {"global": TANGENT_GLOBAL, "fixed": TANGENT_FIXED, "linear": TANGENT_LINEAR,
+                 "flat": TANGENT_FLAT, "spline": TANGENT_SPLINE, "smooth": TANGENT_SPLINE,
+                 "step": TANGENT_STEP, "slow": TANGENT_SLOW, "fast": TANGENT_FAST,
+                 "clamped": TANGENT_CLAMPED, "plateau": TANGENT_PLATEAU, "stepnext": TANGENT_STEP_NEXT,
+                 "auto": TANGENT_AUTO}
+
+# MFnAnimCurve.InfinityType
+INFINITY_CONSTANT = 0
+INFINITY_LINEAR = 1
+INFINITY_CYCLE = 3
+INFINITY_CYCLE_RELATIVE = 4
+INFINITY_OSCILLATE = 5
+
+INFINITY_NAMES = {"constant": INFINITY_CONSTANT, "linear": INFINITY_LINEAR, "cycle": INFINITY_CYCLE,
+                  "cycleRelative": INFINITY_CYCLE_RELATIVE, "oscillate": INFINITY_OSCILLATE}
+
+# bisection steps when solving weighted segments for their bezier parameter, 2^-40 of the segment length
+WEIGHTED_ITERATIONS = 40
+
+
+def _tangent_type(value):
+    return TANGENT_NAMES[value] if isinstance(value, str) else int(value)
+
+
+def _infinity_type(value):
+    return INFINITY_NAMES[value] if isinstance(value, str) else int(value)
+
+
+def compute_tangents(times, values, in_types, out_types):
+    """
+    Slopes for every key from its tangent types, for curves that don't come with maya's resolved tangents.
+    Follows maya's rules closely, not bit for bit, fixed and global keys are treated as spline.
+
+    Args:
+        times (np.array): (K,) key times in frames, increasing.
+        values (np.array): (K,) key values.
+        in_types (list): Tangent type per key, ints or keyTangent names.
+        out_types (list): Tangent type per key, ints or keyTangent names.
+
+    Returns:
+        tuple: (in slopes (K,), out slopes (K,)) in value per frame.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    num = len(times)
+    if num < 2:
+        return np.zeros(num), np.zeros(num)
+
+    # slope of the segment before and after each key, the ends copy their only neighbour
+    seg_slope = np.diff(values) / np.maximum(np.diff(times), 1e-12)
+    before = np.concatenate([seg_slope[:1], seg_slope])
+    after = np.concatenate([seg_slope, seg_slope[-1:]])
+
+    spline = np.empty(num)
+    spline[1:-1] = (values[2:] - values[:-2]) / np.maximum(times[2:] - times[:-2], 1e-12)
+    spline[0], spline[-1] = seg_slope[0], seg_slope[-1]
+
+    # clamped goes flat next to an equal neighbour
+    prev_values = np.concatenate([values[:1] + 1.0, values[:-1]])
+    next_values = np.concatenate([values[1:], values[-1:] + 1.0])
+    clamped = np.where(np.isclose(values, prev_values) | np.isclose(values, next_values), 0.0, spline)
+
+    # plateau goes flat on the ends and on extremes, and never overshoots its neighbours
+    extreme = (before * after) <= 0.0
+    extreme[0] = extreme[-1] = True
+    limit = 3.0 * np.minimum(np.abs(before), np.abs(after))
+    plateau = np.where(extreme, 0.0, np.clip(spline, -limit, limit))
+
+    by_type = {TANGENT_LINEAR: None, TANGENT_FLAT: np.zeros(num), TANGENT_STEP: np.zeros(num),
+               TANGENT_STEP_NEXT: np.zeros(num), TANGENT_CLAMPED: clamped, TANGENT_PLATEAU: plateau,
+               TANGENT_AUTO: plateau}
+    slopes = []
+    for types, linear in ((in_types, before), (out_types, after)):
+        types = np.array([_tangent_type(t) for t in types], dtype=np.int64)
+        result = spline.copy()
+        for tangent_type, typed in by_type.items():
+            mask = types == tangent_type
+            result[mask] = (linear if typed is None else typed)[mask]
+        slopes.append(result)
+    return slopes[0], slopes[1]
+
+
+class AnimCurve:
+    def __init__(self, curve_dict, frames_per_second=24.0, pre_infinity=None, post_infinity=None,
+                 use_tangent_types=False):
+        """
+        Compiles a curve dict into per segment control points.
+
+        Args:
+            curve_dict (dict): A dict from getAnimCurve.
+            frames_per_second (float): Converts the API's tangent x values from seconds to frames.
+            pre_infinity (int/str): Overrides the dict's "pre_infinity", constant if neither is set.
+            post_infinity (int/str): Overrides the dict's "post_infinity", constant if neither is set.
+            use_tangent_types (bool): Ignore the stored tangents and compute them with compute_tangents.
+        """
+        self.name = curve_dict.get("name")
+        order = np.argsort(np.asarray(curve_dict["frame_times"], dtype=np.float64), kind="stable")
+        self.times = np.asarray(curve_dict["frame_times"], dtype=np.float64)[order]
+        self.values = np.asarray(curve_dict["frame_values"], dtype=np.float64)[order]
+        self.out_types = np.array([_tangent_type(t) for t in curve_dict["out_tangents_type"]], dtype=np.int64)[order]
+        in_types = [curve_dict["in_tangents_type"][i] for i in order]
+        # is_weighted is stored per key but it is a curve wide setting
+        self.weighted = bool(curve_dict.get("is_weighted")) and bool(curve_dict["is_weighted"][0])
+
+        if pre_infinity is None:
+            pre_infinity = curve_dict.get("pre_infinity", INFINITY_CONSTANT)
+        if post_infinity is None:
+            post_infinity = curve_dict.get("post_infinity", INFINITY_CONSTANT)
+        self.pre_infinity = _infinity_type(pre_infinity)
+        self.post_infinity = _infinity_type(post_infinity)
+
+        if use_tangent_types or "in_x_tangents" not in curve_dict:
+            in_slopes, out_slopes = compute_tangents(self.times, self.values, in_types, self.out_types)
+            # unit length tangents, only the slope matters for non weighted curves
+            in_x, out_x = np.ones(len(self.times)), np.ones(len(self.times))
+            in_y, out_y = in_slopes, out_slopes
+            self.weighted = False
+        else:
+            in_x = np.asarray(curve_dict["in_x_tangents"], dtype=np.float64)[order] * frames_per_second
+            in_y = np.asarray(curve_dict["in_y_tangents"], dtype=np.float64)[order]
+            out_x = np.asarray(curve_dict["out_x_tangents"], dtype=np.float64)[order] * frames_per_second
+            out_y = np.asarray(curve_dict["out_y_tangents"], dtype=np.float64)[order]
+        self.in_slopes = in_y / np.where(in_x == 0.0, 1e-12, in_x)
+        self.out_slopes = out_y / np.where(out_x == 0.0, 1e-12, out_x)
+        self._compile(in_x, in_y, out_x, out_y)
+
+    def _compile(self, in_x, in_y, out_x, out_y):
+        """
+        The four Bezier control points of every segment, times (S, 4) and values (S, 4).
+        """
+        t0, t1 = self.times[:-1], self.times[1:]
+        v0, v1 = self.values[:-1], self.values[1:]
+        length = t1 - t0
+        if self.weighted:
+            # weighted tangents place the inner control points at a third of the tangent vector,
+            # kept inside the segment so time stays increasing
+            x1 = t0 + np.clip(out_x[:-1] / 3.0, 0.0, length)
+            x2 = t1 - np.clip(in_x[1:] / 3.0, 0.0, length)
+            y1 = v0 + out_y[:-1] / 3.0
+            y2 = v1 - in_y[1:] / 3.0
+        else:
+            # non weighted segments are hermite curves, only the slope counts and the control points sit at thirds
+            x1 = t0 + length / 3.0
+            x2 = t1 - length / 3.0
+            y1 = v0 + self.out_slopes[:-1] * length / 3.0
+            y2 = v1 - self.in_slopes[1:] * length / 3.0
+        self.segment_times = np.stack([t0, x1, x2, t1], axis=1)
+        self.segment_values = np.stack([v0, y1, y2, v1], axis=1)
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def _to_range(self, samples):
+        """
+        Maps samples outside of the keys back into the key range for the cycling infinity modes.
+
+        Returns:
+            tuple: (samples inside the key range, value offset to add for cycle relative)
+        """
+        samples = samples.copy()
+        offsets = np.zeros(len(samples))
+        span = self.end - self.start
+        if span <= 0.0:
+            return samples, offsets
+        for mode, side in ((self.pre_infinity, samples < self.start), (self.post_infinity, samples > self.end)):
+            if mode not in (INFINITY_CYCLE, INFINITY_CYCLE_RELATIVE, INFINITY_OSCILLATE) or not side.any():
+                continue
+            cycles = np.floor((samples[side] - self.start) / span)
+            local = samples[side] - self.start - cycles * span
+            if mode == INFINITY_OSCILLATE:
+                # every other cycle runs backwards
+                odd = np.mod(cycles, 2.0) != 0.0
+                local[odd] = span - local[odd]
+            if mode == INFINITY_CYCLE_RELATIVE:
+                offsets[side] = cycles * (self.values[-1] - self.values[0])
+            samples[side] = self.start + local
+        return samples, offsets
+
+    def evaluate(self, samples):
+        """
+        Evaluates the curve at any number of times in one call.
+
+        Args:
+            samples (np.array): Times in frames, any shape.
+
+        Returns:
+            np.array: float64 values, the same shape as samples.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        shape = samples.shape
+        flat = samples.reshape(-1)
+        if len(self.times) == 1:
+            return np.full(shape, self.values[0])
+
+        local, offsets = self._to_range(flat)
+        clamped = np.clip(local, self.start, self.end)
+        segment = np.clip(np.searchsorted(self.times, clamped, side="right") - 1, 0, len(self.times) - 2)
+        result = self._evaluate_segments(segment, clamped) + offsets
+
+        # linear infinity extends the first and last tangent, constant is already handled by the clamp
+        if self.pre_infinity == INFINITY_LINEAR:
+            before = local < self.start
+            result[before] = self.values[0] + (local[before] - self.start) * self.in_slopes[0]
+        if self.post_infinity == INFINITY_LINEAR:
+            after = local > self.end
+            result[after] = self.values[-1] + (local[after] - self.end) * self.out_slopes[-1]
+        return result.reshape(shape)
+
+    def _evaluate_segments(self, segment, samples):
+        xs = self.segment_times[segment]
+        ys = self.segment_values[segment]
+        if self.weighted:
+            # time along a weighted segment is a cubic too, solve it for the bezier parameter
+            low, high = np.zeros(len(samples)), np.ones(len(samples))
+            for _ in range(WEIGHTED_ITERATIONS):
+                mid = (low + high) * 0.5
+                below = _bezier(xs, mid) < samples
+                low = np.where(below, mid, low)
+                high = np.where(below, high, mid)
+            s = (low + high) * 0.5
+        else:
+            length = xs[:, 3] - xs[:, 0]
+            s = (samples - xs[:, 0]) / np.where(length == 0.0, 1.0, length)
+        result = _bezier(ys, s)
+
+        step = self.out_types[segment] == TANGENT_STEP
+        result[step] = ys[step, 0]
+        step_next = self.out_types[segment] == TANGENT_STEP_NEXT
+        result[step_next] = ys[step_next, 3]
+        # and a step next segment only jumps to the next value after its own key
+        on_start = step_next & (samples == xs[:, 0])
+        result[on_start] = ys[on_start, 0]
+        # a step segment still lands on the next key's value exactly on that key
+        on_end = samples == xs[:, 3]
+        result[on_end] = ys[on_end, 3]
+        return result
+
+
+def _bezier(points, s):
+    """
+    Cubic Bezier of (N, 4) control values at (N,) parameters.
+    """
+    inv = 1.0 - s
+    return (inv * inv * inv * points[:, 0] + 3.0 * inv * inv * s * points[:, 1]
+            + 3.0 * inv * s * s * points[:, 2] + s * s * s * points[:, 3])
+
+
+def evaluate_curve(curve_dict, samples, **kwargs):
+    """
+    Evaluates a curve dict at many times, see AnimCurve for the keyword arguments.
+    """
+    return AnimCurve(curve_dict, **kwargs).evaluate(samples)
+
+
+def evaluate_stack(curve_dicts, samples, normalize=False, **kwargs):
+    """
+    Evaluates a stack of weight curves, like the ones createNormalizedAnimWeights builds, at the same samples.
+
+    Args:
+        curve_dicts (list): Curve dicts, e.g. list(import_dict["weight_curves"].values()).
+        samples (np.array): (S,) times in frames.
+        normalize (bool): Scale every sample so the curves sum to 1, samples where they are all 0 stay 0.
+
+    Returns:
+        np.array: (C, S) weight per curve per sample.
+    """
+    samples = np.asarray(samples, dtype=np.float64).reshape(-1)
+    stack = np.array([evaluate_curve(curve_dict, samples, **kwargs) for curve_dict in curve_dicts],
+                     dtype=np.float64).reshape(len(curve_dicts), len(samples))
+    if normalize:
+        stack = normalize_stack(stack)
+    return stack
+
+
+def normalize_stack(stack):
+    """
+    Scales a (C, S) stack so every column sums to 1, columns that sum to 0 are left at 0.
+    """
+    totals = stack.sum(axis=0)
+    return stack / np.where(np.abs(totals) < 1e-12, 1.0, totals)
+
+
+def evaluate_weights(curve_dicts, u_samples, falloff_dicts=None, v_samples=None, normalize=True, **kwargs):
+    """
+    Per point weights of a stack of weight curves and their falloff curves, the offline version of
+    what the curve weight node computes.
+    The weight curves are evaluated at u and normalized across the stack, then each one is multiplied
+    by its falloff curve evaluated at v. Normalizing before the falloff keeps the falloff shape intact.
+
+    Args:
+        curve_dicts (list): The weight curve dicts.
+        u_samples (np.array): (N,) u position of every point, in the weight curves' time.
+        falloff_dicts (list): A falloff curve dict per weight curve, or a single dict shared by all of them.
+        v_samples (np.array): (N,) v position of every point, in the falloff curves' time.
+        normalize (bool): Normalize the weight curves across the stack.
+
+    Returns:
+        np.array: (C, N) weights.
+    """
+    weights = evaluate_stack(curve_dicts, u_samples, normalize=normalize, **kwargs)
+    if not falloff_dicts:
+        return weights
+    if isinstance(falloff_dicts, dict):
+        falloff_dicts = [falloff_dicts]
+    v_samples = np.asarray(v_samples, dtype=np.float64).reshape(-1)
+    # the same falloff curve is often shared by every weight curve, evaluate each one only once
+    falloffs = {}
+    for idx in range(len(curve_dicts)):
+        falloff_dict = falloff_dicts[idx if len(falloff_dicts) > 1 else 0]
+        key = id(falloff_dict)
+        if key not in falloffs:
+            falloffs[key] = evaluate_curve(falloff_dict, v_samples, **kwargs)
+        weights[idx] *= falloffs[key]
+    return weights
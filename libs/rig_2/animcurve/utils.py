@@ -8,6 +8,8 @@ importlib.reload(node_utils)
 
 from rig_2 import decorator
 importlib.reload(decorator)
+from rig_2.animcurve import bulk
+importlib.reload(bulk)
 
 def initUKeyframes(animCurves):
     for animCurve in animCurves:
@@ -120,126 +122,30 @@ def initVFalloff(animCurves, falloffCurveDict = None, falloffStart=-10, falloffS
 
 
 def getAnimCurve(animCurve):
-    frame_values             = []
-    frame_times              = []
-    weights_locked           = []
-    tangents_locked          = []
-    is_weighted              = []
-    is_breakdown             = []
-    in_x_tangents            = []
-    in_y_tangents            = []
-    out_x_tangents           = []
-    out_y_tangents           = []
-    in_tangents_type         = []
-    out_tangents_type        = []
-    #--- get all keys and times of frame_values
-    # and num frame_values and frame range
-    api_anim_curve = misc.getOMAnimCurve(animCurve)
-    num_keys = api_anim_curve.numKeys()
-    #---get all info for anim curve
-    fn_x = OpenMaya.MScriptUtil()
-    fn_x.createFromDouble(0.0)
-    x = fn_x.asFloatPtr()
-    fn_y = OpenMaya.MScriptUtil()
-    fn_y.createFromDouble(0.0)
-    y = fn_y.asFloatPtr()
-    for i in range(num_keys):
-        tmp_times = api_anim_curve.time(i)
-        frame_times.append(tmp_times.value())
-        frame_values.append(api_anim_curve.value(i))
-
-        weights_locked.append(api_anim_curve.weightsLocked(i))
-        tangents_locked.append(api_anim_curve.tangentsLocked(i))
-        is_weighted.append(api_anim_curve.isWeighted())
-        is_breakdown.append(api_anim_curve.isBreakdown(i))
-
-
-        #get tangent types
-        in_tangents_type.append(api_anim_curve.inTangentType(i))
-        out_tangents_type.append(api_anim_curve.outTangentType(i))
-        # get in tangents
-        api_anim_curve.getTangent(i,x,y,True)
-        in_x_tangents.append(OpenMaya.MScriptUtil.getFloat(x))
-        in_y_tangents.append(OpenMaya.MScriptUtil.getFloat(y))
-        # get out tangents
-        api_anim_curve.getTangent(i,x,y,False)
-        out_x_tangents.append(OpenMaya.MScriptUtil.getFloat(x))
-        out_y_tangents.append(OpenMaya.MScriptUtil.getFloat(y))
-
-    curve_dict = {"name": animCurve,
-                "frame_values":     frame_values,
-                "frame_times":      frame_times,
-                "tangents_locked":  tangents_locked,
-                "weights_locked":   weights_locked,
-                "is_weighted":      is_weighted,
-                "is_breakdown":     is_breakdown,
-                "in_x_tangents":    in_x_tangents,
-                "in_y_tangents":    in_y_tangents,
-                "out_x_tangents":   out_x_tangents,
-                "out_y_tangents":   out_y_tangents,
-                "in_tangents_type": in_tangents_type,
-                "out_tangents_type":out_tangents_type
-                }
-    return curve_dict
+    return bulk.arrays_to_dict(bulk.read_curve_arrays(animCurve), animCurve)
 
 
 def setAnimCurveShape(animCurve, animCurveDict):
-    api_anim_curve = misc.getOMAnimCurve(animCurve)
-
-    # anim_curves = animCurveDict["name"]
-    frame_values = animCurveDict["frame_values"]
-    frame_times= animCurveDict["frame_times"]
-    in_x_tangents= animCurveDict["in_x_tangents"]
-    in_y_tangents= animCurveDict["in_y_tangents"]
-    out_x_tangents= animCurveDict["out_x_tangents"]
-    out_y_tangents= animCurveDict["out_y_tangents"]
-    in_tangents_type= animCurveDict["in_tangents_type"]
-    out_tangents_type= animCurveDict["out_tangents_type"]
-
-    tangents_locked= animCurveDict["tangents_locked"]
-    weights_locked= animCurveDict["weights_locked"]
-    is_weighted= animCurveDict["is_weighted"]
-    is_breakdown= animCurveDict["is_breakdown"]
-
-
-    num_keys = api_anim_curve.numKeys()
-    # delete any existing keys
-    if num_keys>0:
-        for i in range(num_keys):
-            api_anim_curve.remove(api_anim_curve.numKeys()-1)
-    # set keys based on args
-    for i in range(len(frame_times)):
-        time = OpenMaya.MTime(frame_times[i])
-        index = api_anim_curve.addKey(time,
-                                        frame_values[i],
-                                        in_tangents_type[i],
-                                        out_tangents_type[i])
-        api_anim_curve.setIsWeighted(is_weighted[i])
-        api_anim_curve.setWeightsLocked(i, weights_locked[i])
-        api_anim_curve.setTangentsLocked(i, tangents_locked[i])
-        api_anim_curve.setIsWeighted(is_weighted[i])
-        api_anim_curve.setIsBreakdown(i, is_breakdown[i])
-
-
-
-        api_anim_curve.setTangent(index,
-                                    in_x_tangents[i],
-                                    in_y_tangents[i],
-                                    True,
-                                    None,
-                                    False)
-        # set out tangent 0
-        api_anim_curve.setTangent(index,
-                                    out_x_tangents[i],
-                                    out_y_tangents[i],
-                                    False,
-                                    None,
-                                    False)
-        api_anim_curve.setInTangentType(index,
-                                    in_tangents_type[i])
-        # set out tangent 0
-        api_anim_curve.setOutTangentType(index,
-                                    out_tangents_type[i])
+    bulk.write_curve_arrays(animCurve, bulk.dict_to_arrays(animCurveDict))
+
+
+def get_anim_curves(animCurves):
+    """
+    Reads many curves, returns {curve name: getAnimCurve dict}.
+    """
+    return {animCurve: getAnimCurve(animCurve) for animCurve in animCurves}
+
+
+@decorator.undo_chunk
+def set_anim_curve_shapes(animCurveDicts):
+    """
+    Sets the keys of many curves in one undo chunk, the edits are cmds calls so one ctrl+z reverts all of them.
+
+    Args:
+        animCurveDicts (dict): {curve name: getAnimCurve dict}
+    """
+    for animCurve, animCurveDict in animCurveDicts.items():
+        setAnimCurveShape(animCurve, animCurveDict)
 
 
 def create_set_anim_curves(animCurveDictList, falloff=False, component_name=""):
@@ -247,14 +153,16 @@ def create_set_anim_curves(animCurveDictList, falloff=False, component_name=""):
     if falloff:
         tag_name = "FALLOFF_WEIGHT_CURVE"
     retCurves=[]
+    shapes = {}
     for animCurveDict in animCurveDictList:
         newCurve = node_utils.get_node_agnostic(nodeType="animCurveTU",
                                                 name=animCurveDict["name"],
                                                 parent=None,
                                                 tag_name=tag_name,
                                                 component_name=component_name)
-        setAnimCurveShape(newCurve, animCurveDict)
+        shapes[newCurve] = animCurveDict
         retCurves.append(newCurve)
+    set_anim_curve_shapes(shapes)
     return retCurves
 
 # class mirror_anim_curves():
@@ -482,27 +390,14 @@ class mirror_anim_curves():
     def get_anim_curve_info(self):
         type = cmds.nodeType(self.anim_curve)
         if "animCurve" in type:
-            #--- get all keys and times of all_frame_values and num all_frame_values and frame range
-            anim_curve_node = OpenMaya.MSelectionList()
-            anim_curve_node.add(self.anim_curve)
-            c_plug = OpenMaya.MPlug()
-            anim_curve_node.getPlug(0,c_plug)
-            oAnimCurve = OpenMaya.MObject()
-            oAnimCurve = c_plug.node()
-            self.api_anim_curve = OpenMayaAnim.MFnAnimCurve(oAnimCurve)
-            self.num_keys = self.api_anim_curve.numKeys()
-            if self.num_keys > 1:
-                for i in range(self.num_keys):
-                    tmp_x = 0
-                    tmp_y = 0
-                    tmp_times = self.api_anim_curve.time(i)
-                    self.all_frame_times.append(tmp_times.value())
-
-            else:
-                raise Exception( self.api_anim_curve + ''' doesn't have enough keys to mirror ''')
+            #--- get all key times in one query
+            self.all_frame_times = cmds.keyframe(self.anim_curve, query=True, timeChange=True) or []
+            self.num_keys = len(self.all_frame_times)
+            if self.num_keys < 2:
+                raise Exception( self.anim_curve + ''' doesn't have enough keys to mirror ''')
                 quit()        
         else:
-            raise Exception( self.api_anim_curve + ''' is not an anim_curve ''')
+            raise Exception( self.anim_curve + ''' is not an anim_curve ''')
             quit()
 
     def flatten_opposite(self):
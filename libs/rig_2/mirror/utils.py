@@ -1,10 +1,14 @@
-import random, ast
+import ast
 
 from rig.utils import misc
 import importlib
 importlib.reload(misc)
 
 from maya import cmds, OpenMaya
+import maya.api.OpenMaya as om2
+import numpy as np
+
+from rpdecorator import meshsnapshot, transformsnapshot
 
 from rig_2.animcurve import utils as animcurve_utils
 importlib.reload(animcurve_utils)
@@ -72,11 +76,13 @@ def mirror_transform(maya_object,
     opposite_object = get_opposite_side(maya_object)
     if not opposite_object:
         return
+    # both sides come from one snapshot instead of an xform query per value
+    snapshot = transformsnapshot.get_snapshot([maya_object, opposite_object])
     # current translation, if not translating
-    opposite_translate = cmds.xform(opposite_object, q=True, ws = True, t=True)
+    opposite_translate = snapshot.position(opposite_object).tolist()
 
-    maya_object_translate = cmds.xform(maya_object, q=True, ws = True, t=True)
-    maya_object_rotate = cmds.xform(maya_object, q=True, ws = True, ro=True)
+    maya_object_translate = snapshot.position(maya_object).tolist()
+    maya_object_rotate = snapshot.rotations([maya_object])[0].tolist()
     mirrorBehavior = False
     if auto_all:
         mirrorBehavior = get_auto_mirror_behavior(opposite_object)
@@ -99,12 +105,12 @@ def mirror_transform(maya_object,
                                                                 mirrorXY=mirrorXY,
                                                                 mirrorYZ=mirrorYZ,
                                                                 mirrorXZ=mirrorXZ,
-                                                            
+                                                                rotate_order=int(snapshot.rotate_orders([maya_object])[0]),
                                                             )
 
     # Set back to current if not rotating
     if not rotate:
-        opposite_rotate=cmds.xform(opposite_object, q=True, ws = True, ro=True)
+        opposite_rotate=snapshot.rotations([opposite_object])[0].tolist()
 
     # Set back to current if not rotating
     if not scale:
@@ -134,54 +140,14 @@ def mirror_rivet(maya_object):
 
 
 def standard_mirror(maya_object):
-    opposite_object = get_opposite_side(maya_object)
-    maya_object_translate = cmds.xform(maya_object, q=True, t=True, ws=True,a=True)
-    maya_object_rotate = cmds.xform(maya_object, q=True, ro=True, ws=True,a=True)
-    maya_object_scale = cmds.xform(maya_object, q=True, s=True, ws=True, a=True)
-
-    dummy_parent = cmds.createNode("joint", n="dummyParent{0:02}".format(random.randint(1,10000001)))
-    dummy_origin_parent = cmds.createNode("joint", n="dummy{0:02}".format(random.randint(1,10000001)), p=dummy_parent)
-    # cmds.xform(dummy_origin_parent, ws=True, ro=maya_object_rotate, t=maya_object_translate, s=maya_object_scale)
-
-    dummy_origin = cmds.createNode("joint", n="dummy_origin{0:02}".format(random.randint(1,10000001)))
-    dummy_aim_target = cmds.createNode("joint", n="dummy_aim_target{0:02}".format(random.randint(1,10000001)), )
-    dummy_aim_up_target = cmds.createNode("joint", n="dummy_aim_up_target{0:02}".format(random.randint(1,10000001)), )
-
-    cmds.xform(dummy_origin, ws=True, ro=maya_object_rotate, t=maya_object_translate, s=maya_object_scale)
-    cmds.xform(dummy_aim_target, ws=True, ro=maya_object_rotate, t=maya_object_translate, s=maya_object_scale)
-    cmds.xform(dummy_aim_up_target, ws=True, ro=maya_object_rotate, t=maya_object_translate, s=maya_object_scale)
-
-    cmds.move(1, dummy_aim_target, z=True, r=True, os=True)
-    cmds.move(1, dummy_aim_up_target, y=True, r=True, os=True)
-    
-    opposite_origin = cmds.xform(dummy_origin, q=True, t=True, ws=True,a=True)
-    opposite_aim = cmds.xform(dummy_aim_target, q=True, t=True, ws=True,a=True)
-    opposite_aim_up = cmds.xform(dummy_aim_up_target, q=True, t=True, ws=True,a=True)
-    
-
-    cmds.xform(dummy_origin, ws=True, t= [opposite_origin[0] *-1, opposite_origin[1], opposite_origin[2] ])
-    cmds.xform(dummy_aim_target, ws=True, t= [opposite_aim[0] *-1, opposite_aim[1], opposite_aim[2] ])
-    cmds.xform(dummy_aim_up_target, ws=True, t= [opposite_aim_up[0] *-1, opposite_aim_up[1], opposite_aim_up[2] ])
-
-    # opposite_origin = [opposite_origin[0] *-1, opposite_origin[1], opposite_origin[2] ]
-    # opposite_aim = [opposite_aim[0] *-1, opposite_aim[1], opposite_aim[2] ]
-    # opposite_aim_up = [opposite_aim_up[0] *-1, opposite_aim_up[1], opposite_aim_up[2] ]
-    
-
-
-    # cmds.scale(-1, dummy_parent, x=True, r=True, os=True)
-    cmds.makeIdentity(dummy_parent, apply=True, t=1, r=1, s=1, n=0, pn=1);
-    # cmds.xform(dummy_parent, ws=True,  s=[-1,0,0])
-    cmds.aimConstraint(dummy_aim_target, dummy_origin, aimVector=[0,0,1], worldUpObject=dummy_aim_up_target, worldUpType="object")
-
-    # return
-    opposite_translate = cmds.xform(dummy_origin, q=True, t=True, ws=True)
-    opposite_rotate = cmds.xform(dummy_origin, q=True, ro=True, ws=True)
-    opposite_scale = cmds.xform(dummy_origin, q=True, s=True, ws=True)
-
-    # cmds.xform(opposite_object, ws=True, t=opposite_translate, ro=opposite_rotate)
-    cmds.delete( dummy_origin, dummy_aim_target, dummy_parent, dummy_aim_up_target)
-    return opposite_rotate, opposite_scale
+    # the aim (z) and up (y) axes are mirrored across YZ, x is flipped to keep the matrix right handed,
+    # the same result the old aim constraint on temp joints gave, straight from the world matrix
+    snapshot = transformsnapshot.get_snapshot([maya_object])
+    opposite_translate, opposite_rotate, opposite_scale = snapshot.mirrored_transforms([maya_object],
+                                                                                       plane="YZ",
+                                                                                       behavior=False,
+                                                                                       flip_axis=0)
+    return opposite_rotate[0].tolist(), opposite_scale[0].tolist()
 
 def getMirroredTransform(position,
                          rotation,
@@ -189,22 +155,15 @@ def getMirroredTransform(position,
                          mirrorXY=True,
                          mirrorYZ=False,
                          mirrorXZ=False,
-                         
-                         
+                         rotate_order=0,
                          ):
-    rootGrp  = cmds.createNode("transform", n="TEMP_ROOT_GRP")
-    tmpRootJnt = cmds.joint(rootGrp, name = "ROOT", o=[0,0,0], p=[0,0,0])
-    tmpJnt = cmds.joint(tmpRootJnt, name = "TEMPO", o=rotation, p=position)
-    tmpFinal = cmds.mirrorJoint(tmpJnt,
-                                mirrorBehavior=mirrorBehavior,
-                                mirrorXY=mirrorXY,
-                                mirrorYZ=mirrorYZ,
-                                mirrorXZ=mirrorXZ,
-                                sr = ["L_", "R_"])[0]
-    rotate = cmds.xform(tmpFinal, q=True, ws=True, ro=True)
-    scale = cmds.xform(tmpFinal, q=True, ws=True, s=True)
-    cmds.delete([rootGrp, tmpRootJnt, tmpJnt, tmpFinal])
-    return rotate, scale
+    # what mirrorJoint gives a joint with this world rotation, worked out with matrices instead of temp joints
+    # without behavior mirrorJoint keeps the world orientation, only the position is mirrored
+    if not mirrorBehavior:
+        return list(rotation), [1.0, 1.0, 1.0]
+    # mirrorJoint takes one plane, the first one set wins
+    plane = "XY" if mirrorXY else "YZ" if mirrorYZ else "XZ" if mirrorXZ else "YZ"
+    return transformsnapshot.mirror_rotation(rotation, rotate_order=rotate_order, plane=plane, behavior=True)
 
 ##################################################################################################################################################
 ########################################################## WEIGHTS ###############################################################################
@@ -221,52 +180,31 @@ def get_symmetry_dict(maya_object, retrieve_if_exists=True, retrieve_L_dict=Fals
         if retrieve_R_dict:
             return ast.literal_eval(str(cmds.getAttr(maya_object + ".right_dict")))
         return ast.literal_eval(str(cmds.getAttr(maya_object + ".symmetry_dict")))
-    regular_idx = []
-    flipped_idx = []
-    left_ids = []
-    right_ids = []
     fnMesh = misc.getOMMesh(maya_object)
-    points = OpenMaya.MPointArray()
-    fnMesh.getPoints(points)
+    # points and face vertices come from the shared snapshot, only the closest face lookup goes through the API
+    snapshot = meshsnapshot.get_snapshot(maya_object, space=om2.MSpace.kObject)
+    points = snapshot.points
+    face_indptr = snapshot.face_indptr
+    face_vertices = snapshot.face_vertices
+    left_ids = np.flatnonzero(points[:, 0] >= 0.0).tolist()
+    right_ids = np.flatnonzero(points[:, 0] < 0.0).tolist()
     dummy_point = OpenMaya.MPoint()
-    for i in range(points.length()):
-        l_side = True
-        if points[i].x < 0.0:
-            l_side = False
-        
-        if l_side:
-            left_ids.append(i)
-        else:
-            right_ids.append(i)
-        opposite_point = OpenMaya.MPoint(points[i].x*-1,
-                                            points[i].y,
-                                            points[i].z)
-        util = OpenMaya.MScriptUtil()
-        util.createFromInt(0)
-        face_id = util.asIntPtr()
+    util = OpenMaya.MScriptUtil()
+    util.createFromInt(0)
+    face_id_ptr = util.asIntPtr()
+    regular_idx = list(range(len(points)))
+    flipped_idx = []
+    for x, y, z in points.tolist():
+        opposite_point = OpenMaya.MPoint(x*-1, y, z)
         fnMesh.getClosestPoint(opposite_point,
                                 dummy_point,
                                 OpenMaya.MSpace.kObject,
-                                face_id)
-        face_id = OpenMaya.MScriptUtil(face_id).asInt()
-        point_ids = OpenMaya.MIntArray()
-        fnMesh.getPolygonVertices(face_id,point_ids)
-        closest_lengths = []
-        for j in point_ids:
-            fnMesh.getPoint(j,dummy_point)
-            vector_to = OpenMaya.MVector(dummy_point.x,
-                                            dummy_point.y,
-                                            dummy_point.z)
-            vector_from = OpenMaya.MVector(opposite_point.x,
-                                            opposite_point.y,
-                                            opposite_point.z)
-            vector_from = vector_from - vector_to
-            closest_lengths.append(vector_from.length())
-        #make dictionary
-        id_dict = dict(list(zip(closest_lengths,point_ids)))
-        smallest_id = min(closest_lengths)
-        regular_idx.append(i)
-        flipped_idx.append(id_dict.get(smallest_id))
+                                face_id_ptr)
+        face_id = OpenMaya.MScriptUtil(face_id_ptr).asInt()
+        # the vertex of the closest face nearest to the mirrored point
+        point_ids = face_vertices[face_indptr[face_id]:face_indptr[face_id + 1]]
+        closest_lengths = np.linalg.norm(points[point_ids] - (-x, y, z), axis=1)
+        flipped_idx.append(int(point_ids[np.argmin(closest_lengths)]))
     symmetry_dict = dict(list(zip(regular_idx,flipped_idx)))
     left_dict = {i:symmetry_dict[i] for i in left_ids }
     right_dict = {i:symmetry_dict[i] for i in right_ids }
@@ -0,0 +1,181 @@
+'''
+Array based bounding volume hierarchy over a triangle mesh, plain numpy.
+
+Triangles are sorted along a Morton curve and grouped into leaves of leaf_size consecutive triangles.
+The tree is a perfect binary tree over those leaves, stored as one (min, max) bounds array per level,
+so building it and walking it are a handful of vectorized operations per level instead of a python
+object per node. Padding leaves at the end of the last level have inverted (inf, -inf) bounds and
+never overlap anything.
+
+Used for mesh/mesh intersection in rig_2.shape.meshcompare.
+'''
+import numpy as np
+
+from rig_2.shape import octreecompare
+
+# leaf pairs are expanded to triangle pairs in blocks of this many, to keep memory in check
+LEAF_PAIR_BLOCK = 16384
+
+
+class TriangleBVH:
+    def __init__(self, points, triangles, leaf_size=8):
+        """
+        Args:
+            points (np.array): (N, 3) vertex positions.
+            triangles (np.array): (T, 3) vertex ids per triangle.
+            leaf_size (int): Triangles per leaf.
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+
+        v0, v1, v2 = (self.points[self.triangles[:, i]] for i in range(3))
+        tri_min = np.minimum(np.minimum(v0, v1), v2)
+        tri_max = np.maximum(np.maximum(v0, v1), v2)
+        num_tris = len(self.triangles)
+
+        # sorting along a morton curve keeps neighbouring triangles in the same leaves
+        if num_tris:
+            self.order = np.argsort(octreecompare.morton_codes((tri_min + tri_max) * 0.5, 10), kind='stable')
+        else:
+            self.order = np.zeros(0, dtype=np.int64)
+        self.tri_min = tri_min[self.order]
+        self.tri_max = tri_max[self.order]
+        # the sorted triangle corners, tri tests read these directly
+        self.v0, self.v1, self.v2 = v0[self.order], v1[self.order], v2[self.order]
+
+        num_leaves = max(1, -(-num_tris // leaf_size))
+        self.depth = int(np.ceil(np.log2(num_leaves))) if num_leaves > 1 else 0
+        padded = 1 << self.depth
+
+        leaf_min = np.full((padded, 3), np.inf)
+        leaf_max = np.full((padded, 3), -np.inf)
+        if num_tris:
+            starts = np.arange(0, num_tris, leaf_size)
+            leaf_min[:len(starts)] = np.minimum.reduceat(self.tri_min, starts, axis=0)
+            leaf_max[:len(starts)] = np.maximum.reduceat(self.tri_max, starts, axis=0)
+
+        # level 0 is the root, level self.depth the leaves, node i at a level has children 2i and 2i + 1
+        self.node_min = [None] * (self.depth + 1)
+        self.node_max = [None] * (self.depth + 1)
+        self.node_min[self.depth] = leaf_min
+        self.node_max[self.depth] = leaf_max
+        for level in range(self.depth - 1, -1, -1):
+            below_min = self.node_min[level + 1]
+            below_max = self.node_max[level + 1]
+            self.node_min[level] = np.minimum(below_min[0::2], below_min[1::2])
+            self.node_max[level] = np.maximum(below_max[0::2], below_max[1::2])
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def leaf_triangles(self, leaves):
+        """
+        Returns the sorted triangle slots of each leaf as a (len(leaves), leaf_size) array
+        and a mask of which of those slots hold a triangle.
+        """
+        slots = leaves[:, None] * self.leaf_size + np.arange(self.leaf_size)
+        valid = slots < len(self.triangles)
+        return np.where(valid, slots, 0), valid
+
+
+def _boxes_overlap(min_a, max_a, min_b, max_b, tolerance=0.0):
+    return np.all((min_a <= max_b + tolerance) & (min_b <= max_a + tolerance), axis=1)
+
+
+def overlapping_leaf_pairs(bvh_a, bvh_b, tolerance=0.0):
+    """
+    Walks both trees together and returns the pairs of leaves whose bounds overlap.
+    All node pairs at one step of the walk are tested at once.
+
+    Returns:
+        tuple: (leaves of a, leaves of b) int arrays of equal length.
+    """
+    a = np.zeros(1, dtype=np.int64)
+    b = np.zeros(1, dtype=np.int64)
+    steps = max(bvh_a.depth, bvh_b.depth)
+    for step in range(steps + 1):
+        level_a = min(step, bvh_a.depth)
+        level_b = min(step, bvh_b.depth)
+        overlap = _boxes_overlap(bvh_a.node_min[level_a][a], bvh_a.node_max[level_a][a],
+                                 bvh_b.node_min[level_b][b], bvh_b.node_max[level_b][b], tolerance)
+        a, b = a[overlap], b[overlap]
+        if step == steps or not len(a):
+            break
+        # descend whichever trees still have levels below, a shallower tree waits at its leaves
+        if step < bvh_a.depth:
+            a, b = np.concatenate([2 * a, 2 * a + 1]), np.concatenate([b, b])
+        if step < bvh_b.depth:
+            a, b = np.concatenate([a, a]), np.concatenate([2 * b, 2 * b + 1])
+    return a, b
+
+
+def segments_hit_triangles(p, q, v0, v1, v2):
+    """
+    Vectorized Moller-Trumbore test of segments p->q against triangles v0, v1, v2, all (N, 3) arrays.
+
+    Returns:
+        np.array: (N,) bool, True where the segment crosses the triangle.
+    """
+    d = q - p
+    e1 = v1 - v0
+    e2 = v2 - v0
+    h = np.cross(d, e2)
+    a = np.einsum('ij,ij->i', e1, h)
+    # relative tolerance, a is a triple product so it scales with the cube of the mesh size
+    scale = np.linalg.norm(d, axis=1) * np.linalg.norm(e1, axis=1) * np.linalg.norm(e2, axis=1)
+    parallel = np.abs(a) <= 1e-10 * scale
+    f = 1.0 / np.where(parallel, 1.0, a)
+    s = p - v0
+    u = f * np.einsum('ij,ij->i', s, h)
+    qv = np.cross(s, e1)
+    v = f * np.einsum('ij,ij->i', d, qv)
+    t = f * np.einsum('ij,ij->i', e2, qv)
+    return ~parallel & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0) & (t <= 1.0)
+
+
+def triangles_intersect(a0, a1, a2, b0, b1, b2):
+    """
+    Vectorized triangle/triangle intersection for (N, 3) corner arrays.
+    Two non coplanar triangles intersect when an edge of one crosses the other, so this is six
+    segment/triangle tests. Exactly coplanar overlapping triangles are not reported.
+
+    Returns:
+        np.array: (N,) bool.
+    """
+    hit = segments_hit_triangles(a0, a1, b0, b1, b2)
+    hit |= segments_hit_triangles(a1, a2, b0, b1, b2)
+    hit |= segments_hit_triangles(a2, a0, b0, b1, b2)
+    hit |= segments_hit_triangles(b0, b1, a0, a1, a2)
+    hit |= segments_hit_triangles(b1, b2, a0, a1, a2)
+    hit |= segments_hit_triangles(b2, b0, a0, a1, a2)
+    return hit
+
+
+def intersecting_triangle_pairs(bvh_a, bvh_b):
+    """
+    Finds every intersecting pair of triangles between two meshes.
+    Only triangles in overlapping leaves whose own bounds overlap are tested.
+
+    Returns:
+        np.array: (K, 2) original triangle ids (a, b) of each intersecting pair.
+    """
+    leaves_a, leaves_b = overlapping_leaf_pairs(bvh_a, bvh_b)
+    pairs = []
+    for start in range(0, len(leaves_a), LEAF_PAIR_BLOCK):
+        slots_a, valid_a = bvh_a.leaf_triangles(leaves_a[start:start + LEAF_PAIR_BLOCK])
+        slots_b, valid_b = bvh_b.leaf_triangles(leaves_b[start:start + LEAF_PAIR_BLOCK])
+        # every triangle of leaf a against every triangle of leaf b
+        ta = np.broadcast_to(slots_a[:, :, None], slots_a.shape + (slots_b.shape[1],)).ravel()
+        tb = np.broadcast_to(slots_b[:, None, :], (slots_b.shape[0], slots_a.shape[1], slots_b.shape[1])).ravel()
+        valid = (valid_a[:, :, None] & valid_b[:, None, :]).ravel()
+        ta, tb = ta[valid], tb[valid]
+
+        overlap = _boxes_overlap(bvh_a.tri_min[ta], bvh_a.tri_max[ta], bvh_b.tri_min[tb], bvh_b.tri_max[tb])
+        ta, tb = ta[overlap], tb[overlap]
+        hit = triangles_intersect(bvh_a.v0[ta], bvh_a.v1[ta], bvh_a.v2[ta],
+                                  bvh_b.v0[tb], bvh_b.v1[tb], bvh_b.v2[tb])
+        pairs.append(np.stack([bvh_a.order[ta[hit]], bvh_b.order[tb[hit]]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.concatenate(pairs)
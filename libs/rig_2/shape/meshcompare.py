@@ -6,32 +6,61 @@ import maya.api.OpenMaya as om
 import maya.cmds as cmds
 
 
+from rpdecorator import meshsnapshot
+from rig_2.shape import bvh
+
+
 #### algorithm 1 ####
+def get_mesh_triangles(mesh):
+    """
+    Return the world space points, triangles and the polygon face id of every triangle of a mesh,
+    shared through rpdecorator.meshsnapshot.
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh)
+    return snapshot.points, snapshot.triangles, snapshot.triangle_faces
+
+
+def get_intersections(mesh_a, mesh_b, leaf_size=8):
+    """
+    Find the intersecting faces between two meshes.
+
+    Both meshes get a bounding volume hierarchy, the two trees are walked together and only
+    triangles in overlapping leaves are tested, all at once, see rig_2.shape.bvh.
+
+    Returns:
+        dict: {'count': number of intersecting face pairs,
+               'face_pairs': (K, 2) int array of intersecting (face of a, face of b),
+               'faces_a': bool array, True for every face of a that intersects b,
+               'faces_b': bool array, True for every face of b that intersects a}
+    """
+    points_a, triangles_a, face_ids_a = get_mesh_triangles(mesh_a)
+    points_b, triangles_b, face_ids_b = get_mesh_triangles(mesh_b)
+    # from the polygon counts, trailing faces without triangles (zero area) still get an entry
+    num_faces_a = len(meshsnapshot.get_snapshot(mesh_a).face_counts)
+    num_faces_b = len(meshsnapshot.get_snapshot(mesh_b).face_counts)
+
+    triangle_pairs = bvh.intersecting_triangle_pairs(bvh.TriangleBVH(points_a, triangles_a, leaf_size),
+                                                     bvh.TriangleBVH(points_b, triangles_b, leaf_size))
+    # several triangles of one polygon can hit the same polygon, count each face pair once
+    face_pairs = np.unique(np.stack([face_ids_a[triangle_pairs[:, 0]],
+                                     face_ids_b[triangle_pairs[:, 1]]], axis=1), axis=0)
+    faces_a = np.zeros(num_faces_a, dtype=bool)
+    faces_b = np.zeros(num_faces_b, dtype=bool)
+    faces_a[face_pairs[:, 0]] = True
+    faces_b[face_pairs[:, 1]] = True
+    return {'count': len(face_pairs),
+            'face_pairs': face_pairs,
+            'faces_a': faces_a,
+            'faces_b': faces_b}
+
+
 def get_intersections_count(mesh_a, mesh_b):
     """
     Return the number of intersecting faces between two meshes.
+    Meshes whose bounds don't overlap cost one box test in get_intersections, the roots of the two trees.
     """
-    mfn_mesh_a = om.MFnMesh(cmds.ls(mesh_a, long=True)[0])
-    mfn_mesh_b = om.MFnMesh(cmds.ls(mesh_b, long=True)[0])
-    
-    # Get bounding boxes for intersection check
-    bbox_a = mfn_mesh_a.boundingBox()
-    bbox_b = mfn_mesh_b.boundingBox()
-    
-    if not bbox_a.intersects(bbox_b):
-        return 0
+    return get_intersections(mesh_a, mesh_b)['count']
 
-    # Check for intersections
-    intersection_count = 0
-    faces_a = mfn_mesh_a.getPolygonFaces()
-    faces_b = mfn_mesh_b.getPolygonFaces()
-    
-    for face_a in faces_a:
-        for face_b in faces_b:
-            if mfn_mesh_a.hasIntersection(mfn_mesh_b, face_a, face_b):
-                intersection_count += 1
-    
-    return intersection_count
 
 def find_mesh_with_most_intersections(mesh_a, *meshes_b):
     max_intersections = -1
@@ -1,122 +1,174 @@
-import maya.api.OpenMaya as om
-import maya.cmds as cmds
 import numpy as np
 
-# ---- Octree Node Definition ----
-class OctreeNode:
-    def __init__(self, min_bound, max_bound, depth=0, max_depth=5):
-        """
-        Initialize an Octree node. Each node either contains points (leaf) or subdivides into 8 children.
+# the sampling and octree math is plain numpy, maya is only needed to pull mesh data
+# so the rest of the module can also be used in a process pool or outside of maya
+try:
+    import maya.api.OpenMaya as om
+    import maya.cmds as cmds
+except ImportError:
+    om = None
+    cmds = None
 
-        Args:
-            min_bound (list or array): The minimum coordinates (x, y, z) of this node's bounding box.
-            max_bound (list or array): The maximum coordinates (x, y, z) of this node's bounding box.
-            depth (int): Current depth level of this node in the octree.
-            max_depth (int): Maximum depth to which the octree will be subdivided.
-        """
-        self.min_bound = np.array(min_bound)  # Minimum boundary of the node's 3D region
-        self.max_bound = np.array(max_bound)  # Maximum boundary of the node's 3D region
-        self.center = (self.min_bound + self.max_bound) / 2  # Center of the bounding box
-        self.depth = depth  # Depth of this node in the octree
-        self.max_depth = max_depth  # Maximum depth allowed for subdivision
-        self.is_leaf = True  # True if the node is a leaf (contains points, not subdivided)
-        self.points = []  # Points contained in this node if it's a leaf
-        self.children = [None] * 8  # Array for the 8 child octants (subdivided regions)
-
-    def insert(self, point):
-        """
-        Insert a point into the octree. If the node is a leaf and has too many points, it subdivides.
+from rpdecorator import meshsnapshot
 
-        Args:
-            point (array): A 3D point (x, y, z) to be inserted into the octree.
-        """
-        if self.is_leaf:
-            self.points.append(point)  # Add point to the current leaf node
-            # If the number of points exceeds a threshold (8 points here) and depth is within limit:
-            if len(self.points) > 8 and self.depth < self.max_depth:
-                self.subdivide()  # Subdivide the node into 8 child octants
-                # Re-insert all the points into the correct children nodes
-                for p in self.points:
-                    self._insert_in_child(p)
-                self.points = []  # Clear the points list once subdivided
-        else:
-            # If it's already subdivided, directly insert the point into the correct child
-            self._insert_in_child(point)
-
-    def _insert_in_child(self, point):
-        """
-        Helper function to insert a point into one of the 8 children based on its location.
+# 21 bits per axis is the most that fits 3 interleaved axes in an int64
+MAX_DEPTH = 21
 
-        Args:
-            point (array): A 3D point (x, y, z).
-        """
-        index = 0  # This index determines in which of the 8 child octants the point belongs
-        if point[0] > self.center[0]: index |= 1
-        if point[1] > self.center[1]: index |= 2
-        if point[2] > self.center[2]: index |= 4
-        
-        # Create a child node if it doesn't exist
-        if not self.children[index]:
-            new_min_bound = self.min_bound.copy()
-            new_max_bound = self.max_bound.copy()
-            # Adjust the bounds to form the child octant based on the index
-            if index & 1: new_min_bound[0] = self.center[0]
-            else: new_max_bound[0] = self.center[0]
-            if index & 2: new_min_bound[1] = self.center[1]
-            else: new_max_bound[1] = self.center[1]
-            if index & 4: new_min_bound[2] = self.center[2]
-            else: new_max_bound[2] = self.center[2]
-            # Create the child octant node
-            self.children[index] = OctreeNode(new_min_bound, new_max_bound, self.depth + 1, self.max_depth)
-        # Insert the point into the appropriate child node
-        self.children[index].insert(point)
-
-    def subdivide(self):
-        """
-        Subdivide this node into 8 child octants. Each octant represents a smaller region of space.
-        """
-        self.is_leaf = False  # After subdivision, this node is no longer a leaf
 
-    def count_voxels(self):
-        """
-        Count the number of voxels (leaf nodes) in the octree.
+# ---- Mesh Data ----
+def get_mesh_triangles(mesh_name, space=None):
+    """
+    The points and triangle vertex ids of a mesh, read-only arrays shared through rpdecorator.meshsnapshot.
 
-        Returns:
-            int: Number of leaf nodes (each representing a voxel).
-        """
-        if self.is_leaf:
-            return 1  # Each leaf node represents one voxel
-        # Recursively count the voxels in child nodes
-        return sum(child.count_voxels() for child in self.children if child)
+    Args:
+        mesh_name (str): Name of the mesh in Maya.
+        space (om.MSpace): The space to get points in. Defaults to world space.
+
+    Returns:
+        tuple: (points (N, 3) float64 array, triangles (T, 3) int array)
+    """
+    snapshot = meshsnapshot.get_snapshot(mesh_name, space)
+    return snapshot.points, snapshot.triangles
+
+
+# ---- Point Sampling ----
+def sample_triangles(points, triangles, num_samples=10000, seed=None):
+    """
+    Area weighted, uniform random sampling of a triangle soup.
+    Bigger triangles get proportionally more samples and each sample is a random barycentric point,
+    so the samples cover the surface evenly instead of clumping at triangle centroids.
+
+    Args:
+        points (np.array): (N, 3) vertex positions.
+        triangles (np.array): (T, 3) vertex ids per triangle.
+        num_samples (int): Number of points to sample.
+        seed (int): Random seed, pass one to get the same samples every time.
 
-# ---- Point Sampling and Octree Building ----
-def sample_surface_points(mesh_name, num_samples=10000):
+    Returns:
+        np.array: (num_samples, 3) sampled points.
+    """
+    rng = np.random.default_rng(seed)
+    p0 = points[triangles[:, 0]]
+    p1 = points[triangles[:, 1]]
+    p2 = points[triangles[:, 2]]
+    areas = 0.5 * np.linalg.norm(np.cross(p1 - p0, p2 - p0), axis=1)
+    total = areas.sum()
+    if not len(triangles) or total <= 0.0:
+        return np.zeros((0, 3))
+
+    # pick triangles proportionally to area by binary searching the cumulative area
+    tri_ids = np.searchsorted(np.cumsum(areas), rng.random(num_samples) * total, side='right')
+    tri_ids = np.minimum(tri_ids, len(triangles) - 1)
+
+    # sqrt trick for uniform barycentric coordinates
+    r1 = np.sqrt(rng.random(num_samples))[:, None]
+    r2 = rng.random(num_samples)[:, None]
+    return (1.0 - r1) * p0[tri_ids] + r1 * (1.0 - r2) * p1[tri_ids] + r1 * r2 * p2[tri_ids]
+
+
+def sample_surface_points(mesh_name, num_samples=10000, seed=None):
     """
     Sample points on the surface of the given mesh.
 
     Args:
         mesh_name (str): Name of the mesh in Maya.
         num_samples (int): Number of points to sample on the mesh surface.
+        seed (int): Random seed, pass one to get the same samples every time.
 
     Returns:
         np.array: Array of sampled 3D points on the mesh surface.
     """
-    sel_list = om.MSelectionList()
-    sel_list.add(mesh_name)
-    dag_path = sel_list.getDagPath(0)
-    mesh_fn = om.MFnMesh(dag_path)
-    
-    points = mesh_fn.getPoints(om.MSpace.kWorld)  # Get the mesh vertices in world space
-    faces = mesh_fn.getTriangles()[1]  # Get mesh faces (triangles)
-    face_ids = np.random.choice(len(faces), num_samples, replace=True)  # Randomly select faces
-    
-    sampled_points = []
-    # For each selected face, sample a point by averaging the face vertices
-    for face_id in face_ids:
-        p1, p2, p3 = [points[i] for i in mesh_fn.getPolygonVertices(face_id)]
-        sampled_points.append(np.mean([p1, p2, p3], axis=0))  # Take the mean of vertices as sample
-    
-    return np.array(sampled_points)
+    points, triangles = get_mesh_triangles(mesh_name)
+    return sample_triangles(points, triangles, num_samples, seed=seed)
+
+
+# ---- Morton Codes ----
+def _spread_bits(values):
+    """
+    Spread the low 21 bits of each value so there are two zero bits between every bit,
+    ready to be interleaved with the other two axes.
+    """
+    v = values.astype(np.uint64) & np.uint64(0x1fffff)
+    v = (v | (v << np.uint64(32))) & np.uint64(0x1f00000000ffff)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x1f0000ff0000ff)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x100f00f00f00f00f)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x10c30c30c30c30c3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return v
+
+
+def morton_codes(points, max_depth=5, min_bound=None, max_bound=None):
+    """
+    Quantize points to a 2**max_depth grid inside their bounding box and return their Morton (z-order) codes.
+    The top 3 bits of a code are the octant at depth 1, the next 3 the octant at depth 2, and so on,
+    so shifting a code right by 3 * n gives the code of the cell n levels up.
+
+    Args:
+        points (np.array): (N, 3) points.
+        max_depth (int): Depth of the finest level, up to MAX_DEPTH.
+        min_bound (np.array): Bounding box minimum, defaults to the points' own bounds.
+        max_bound (np.array): Bounding box maximum, defaults to the points' own bounds.
+
+    Returns:
+        np.array: (N,) uint64 Morton codes.
+    """
+    if max_depth > MAX_DEPTH:
+        raise ValueError(f'max_depth can be at most {MAX_DEPTH}, got {max_depth}')
+    min_bound = points.min(axis=0) if min_bound is None else np.asarray(min_bound, dtype=np.float64)
+    max_bound = points.max(axis=0) if max_bound is None else np.asarray(max_bound, dtype=np.float64)
+    # a flat axis would divide by zero, give it a size so everything lands in cell 0
+    extent = np.where(max_bound - min_bound > 0.0, max_bound - min_bound, 1.0)
+
+    resolution = 1 << max_depth
+    cells = np.floor((points - min_bound) / extent * resolution).astype(np.int64)
+    cells = np.clip(cells, 0, resolution - 1)
+    return (_spread_bits(cells[:, 0])
+            | (_spread_bits(cells[:, 1]) << np.uint64(1))
+            | (_spread_bits(cells[:, 2]) << np.uint64(2)))
+
+
+# ---- Linear Octree ----
+class LinearOctree:
+    def __init__(self, points, max_depth=5):
+        """
+        An octree stored as the sorted unique Morton codes of the occupied cells at each level.
+        There are no node objects, every level is a single uint64 array, so building is one sort
+        and comparing two trees is a sorted array intersection.
+
+        Args:
+            points (np.array): (N, 3) points, quantized inside their own bounding box like the old OctreeNode root.
+            max_depth (int): Depth of the finest level.
+        """
+        self.max_depth = max_depth
+        self.min_bound = points.min(axis=0) if len(points) else np.zeros(3)
+        self.max_bound = points.max(axis=0) if len(points) else np.zeros(3)
+        codes = np.unique(morton_codes(points, max_depth, self.min_bound, self.max_bound)) if len(points) \
+            else np.zeros(0, dtype=np.uint64)
+        # levels[d] holds the occupied cells at depth d, levels[0] is the root
+        self.levels = [None] * (max_depth + 1)
+        self.levels[max_depth] = codes
+        for depth in range(max_depth - 1, -1, -1):
+            # codes are sorted, so the parent codes are already sorted and only need deduplicating
+            parents = self.levels[depth + 1] >> np.uint64(3)
+            if len(parents):
+                keep = np.empty(len(parents), dtype=bool)
+                keep[0] = True
+                np.not_equal(parents[1:], parents[:-1], out=keep[1:])
+                parents = parents[keep]
+            self.levels[depth] = parents
+
+    def count_voxels(self, depth=None):
+        """
+        Count the number of occupied voxels.
+
+        Args:
+            depth (int): The level to count at, defaults to the finest level.
+
+        Returns:
+            int: Number of occupied voxels.
+        """
+        return len(self.levels[self.max_depth if depth is None else depth])
+
 
 def build_octree(points, max_depth=5):
     """
@@ -127,68 +179,34 @@ def build_octree(points, max_depth=5):
         max_depth (int): Maximum depth for the octree.
 
     Returns:
-        OctreeNode: Root node of the octree.
+        LinearOctree: The octree.
     """
-    # Compute the bounding box of the points
-    min_bound = np.min(points, axis=0)
-    max_bound = np.max(points, axis=0)
-    # Create the root node of the octree covering the entire bounding box
-    octree = OctreeNode(min_bound, max_bound, max_depth=max_depth)
-    
-    # Insert all points into the octree
-    for point in points:
-        octree.insert(point)
-    
-    return octree
+    return LinearOctree(np.asarray(points, dtype=np.float64), max_depth=max_depth)
+
 
 # ---- Octree Comparison ----
-def compare_octrees(octreeA, octreeB):
+def compare_octrees(octreeA, octreeB, depth=None):
     """
     Compare two octrees using Intersection over Union (IoU) metric.
 
     Args:
-        octreeA (OctreeNode): Octree for mesh A.
-        octreeB (OctreeNode): Octree for mesh B.
+        octreeA (LinearOctree): Octree for mesh A.
+        octreeB (LinearOctree): Octree for mesh B.
+        depth (int): The level to compare at, defaults to the finest level both trees have.
 
     Returns:
         float: IoU score representing the similarity between the two meshes.
     """
-    voxelsA = octreeA.count_voxels()  # Number of voxels in octree A
-    voxelsB = octreeB.count_voxels()  # Number of voxels in octree B
-    
-    intersection = _compare_octree_nodes(octreeA, octreeB)  # Count the intersecting voxels
-    union = voxelsA + voxelsB - intersection  # Union of voxels
-    
-    return intersection / union if union != 0 else 0  # Return IoU score
-
-def _compare_octree_nodes(nodeA, nodeB):
-    """
-    Recursively compare two octree nodes to find the number of intersecting voxels.
+    depth = min(octreeA.max_depth, octreeB.max_depth) if depth is None else depth
+    codesA = octreeA.levels[depth]
+    codesB = octreeB.levels[depth]
+    intersection = len(np.intersect1d(codesA, codesB, assume_unique=True))
+    union = len(codesA) + len(codesB) - intersection
+    return intersection / union if union != 0 else 0
 
-    Args:
-        nodeA (OctreeNode): Node from octree A.
-        nodeB (OctreeNode): Node from octree B.
-
-    Returns:
-        int: Number of intersecting voxels (overlapping regions).
-    """
-    # If both nodes are leaves, we count one intersection
-    if nodeA.is_leaf and nodeB.is_leaf:
-        return 1
-    # If one node is a leaf and the other is not, there is no overlap
-    if nodeA.is_leaf or nodeB.is_leaf:
-        return 0
-    
-    # Recursively compare the children of the two nodes
-    intersection = 0
-    for i in range(8):
-        if nodeA.children[i] and nodeB.children[i]:
-            intersection += _compare_octree_nodes(nodeA.children[i], nodeB.children[i])
-    
-    return intersection
 
 # ---- Main Function to Find Most Similar Mesh ----
-def find_most_similar_mesh(meshA, meshesB, max_depth=5, num_samples=10000):
+def find_most_similar_mesh(meshA, meshesB, max_depth=5, num_samples=10000, seed=0):
     """
     Find the mesh from meshesB that is most similar to meshA using an octree-based comparison.
 
@@ -197,73 +215,63 @@ def find_most_similar_mesh(meshA, meshesB, max_depth=5, num_samples=10000):
         meshesB (list of str): List of mesh names to compare against.
         max_depth (int): Maximum depth of the octree.
         num_samples (int): Number of surface points to sample from each mesh.
+        seed (int): Random seed for the surface sampling, so the same meshes always get the same scores.
 
     Returns:
-        tuple: (best_match, best_score) where best_match is the name of the most similar mesh, 
+        tuple: (best_match, best_score) where best_match is the name of the most similar mesh,
                and best_score is the IoU similarity score.
     """
-    # Sample points and build an octree for meshA
-    pointsA = sample_surface_points(meshA, num_samples)
-    octreeA = build_octree(pointsA, max_depth=max_depth)
-    
+    octreeA = build_octree(sample_surface_points(meshA, num_samples, seed=seed), max_depth=max_depth)
+
     best_match = None  # Variable to store the best match
     best_score = 0  # Variable to store the highest similarity score
-    
+
     # Compare meshA's octree with each mesh in meshesB
     for meshB in meshesB:
-        pointsB = sample_surface_points(meshB, num_samples)  # Sample points from meshB
-        octreeB = build_octree(pointsB, max_depth=max_depth)  # Build octree for meshB
-        
+        octreeB = build_octree(sample_surface_points(meshB, num_samples, seed=seed), max_depth=max_depth)
         score = compare_octrees(octreeA, octreeB)  # Compare the octrees using IoU
         print(f"Similarity score for {meshB}: {score}")
-        
+
         # If this score is the highest, update the best match
         if score > best_score:
             best_score = score
             best_match = meshB
-    
+
     return best_match, best_score  # Return the best match and its similarity score
 
 # ---- Example Usage ----
-meshA = 'pCube1'  # Name of the reference mesh
-meshesB = ['pSphere1', 'pCone1', 'pTorus1']  # List of meshes to compare
-
-best_match, score = find_most_similar_mesh(meshA, meshesB)
-print(f"The most similar mesh to {meshA} is {best_match} with a similarity score of {score}")
+# meshA = 'pCube1'  # Name of the reference mesh
+# meshesB = ['pSphere1', 'pCone1', 'pTorus1']  # List of meshes to compare
+#
+# best_match, score = find_most_similar_mesh(meshA, meshesB)
+# print(f"The most similar mesh to {meshA} is {best_match} with a similarity score of {score}")
 
 
 
 '''
 Verbose documentation:
-Detailed Explanations:
-Octree Node (OctreeNode class):
-
-The octree divides 3D space into smaller regions recursively. Each node in the tree represents a region of space, defined by a bounding box (min_bound and max_bound).
-Each node can either contain points (making it a leaf node) or it can subdivide into 8 child nodes (octants) if it contains too many points.
-This hierarchical division allows us to efficiently store and compare 3D spatial data without needing to use a fixed grid for the entire space.
-Bounding Box:
-
-The bounding box is used for spatial organization only. It helps determine how to subdivide space and where to place points. We are not directly comparing bounding boxes but rather using them to efficiently divide space into octants.
-The actual shape of the mesh is captured by sampling surface points, which are then organized into the octree. The comparison is done based on the distribution of these points, not the bounding box itself.
-Point Sampling (sample_surface_points function):
-
-We sample a specified number of points from the surface of each mesh. These points represent the geometry of the mesh and are used to construct the octree.
-The MFnMesh class from the Maya API is used to access the mesh’s vertices and faces. We randomly select triangles on the surface and sample points from them.
-Octree Construction (build_octree function):
-
-We insert the sampled points into the octree, starting with a root node that covers the entire bounding box of the points.
-As points are inserted, the octree subdivides itself if the number of points in a region exceeds a threshold (8 points in this case). This subdivision stops when the maximum depth is reached or the points are sufficiently divided.
-Shape Comparison (compare_octrees function):
-
-The comparison between two meshes is done by comparing their octrees using the Intersection over Union (IoU) metric.
-We count the number of leaf nodes (voxels) in each octree and compute the number of intersecting voxels between the two octrees. The IoU score is the ratio of the intersection to the union of the voxels, providing a measure of similarity.
-Finding the Most Similar Mesh (find_most_similar_mesh function):
-
-This function builds an octree for meshA and compares it with each mesh in meshesB.
-The comparison is based on the IoU score, and the mesh with the highest score is considered the most similar to meshA.
-Summary of the Bounding Box Role:
-The bounding box is not used directly for shape comparison. Instead, it helps divide space efficiently into octants, which contain points that represent the actual shape of the mesh.
-We compare the shapes of the meshes by sampling points from their surfaces and organizing those points into octree structures. The octrees are then compared based on how their occupied regions overlap (using the IoU metric).
-This method provides a robust way to compare complex 3D shapes while keeping memory and computation efficient through the use of the octree. Let me know if you'd like to explore any further details or enhancements!
-
-'''
\ No newline at end of file
+
+Point Sampling (sample_surface_points / sample_triangles):
+The points and triangles of the mesh are pulled once with getPoints and getTriangles.
+Triangles are picked with a probability proportional to their area, and a uniformly random barycentric
+point is taken on each picked triangle. The samples are spread evenly over the surface, no matter how
+unevenly the mesh is triangulated.
+
+Morton Codes (morton_codes):
+Each sample is quantized to a 2**max_depth grid inside the bounding box of the samples, the bounding box is
+only used to normalize position and scale, the same as the old pointer based octree root.
+The three integer cell coordinates are bit interleaved into a single Morton (z-order) code. The code's top
+3 bits are the octant at depth 1, the next 3 bits the octant inside that, etc.
+
+Linear Octree (LinearOctree):
+Instead of a tree of node objects, each level of the octree is the sorted array of unique codes of the
+occupied cells at that level. A parent level is the child level shifted right by 3 bits and deduplicated.
+
+Shape Comparison (compare_octrees):
+Two meshes are compared with Intersection over Union of their occupied cells at the finest level.
+Both levels are sorted unique arrays, so the intersection is a single np.intersect1d.
+
+Finding the Most Similar Mesh (find_most_similar_mesh):
+Builds the octree for meshA once and scores it against each mesh in meshesB, the highest IoU wins.
+A fixed seed keeps the scores stable between runs.
+'''
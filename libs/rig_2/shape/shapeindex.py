@@ -0,0 +1,293 @@
+r'''
+Persistent shape descriptor index for matching one mesh against a library of many.
+
+find_most_similar_mesh resamples and rebuilds every candidate on every query. The index computes a small
+descriptor once per mesh, keyed by a hash of its points and triangles, and stores it on disk:
+- occupancy: a packed bitset of the occupied cells of a 2**depth grid in the mesh's bounding box
+- d2: the D2 shape distribution, a histogram of distances between random surface point pairs
+- moments: the normalized eigenvalues of the surface point covariance, plus the log of the rms radius
+
+A query is then one vectorized distance computation against every row in the library.
+
+# --- Example
+from rig_2.shape import shapeindex
+index = shapeindex.ShapeIndex(r'C:\Users\harri\Documents\BDP\asset_library\shape_index.npz')
+index.add_meshes(cmds.ls(type='mesh', noIntermediate=True), processes=8)
+index.save()
+index.query_mesh('vendor_body_geo', k=5)
+'''
+# builtins
+import hashlib, json, os, sys
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from rig_2.shape import octreecompare
+
+# lookup table for counting set bits in packed occupancy bytes
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int32)
+
+DEFAULT_SETTINGS = {'num_samples': 4096,
+                    'depth': 4,
+                    'd2_pairs': 16384,
+                    'd2_bins': 32,
+                    # pair distances are divided by their mean, almost everything ends up below this
+                    'd2_range': 4.0,
+                    'seed': 0}
+
+
+def geometry_hash(points, triangles):
+    """
+    Hash of the point positions and triangles of a mesh.
+    Points are rounded to float32 so tiny floating point noise from the API doesn't change the hash.
+    """
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(points, dtype=np.float32).tobytes())
+    sha.update(np.ascontiguousarray(triangles, dtype=np.int32).tobytes())
+    return sha.hexdigest()
+
+
+def compute_descriptor(points, triangles, settings=None):
+    """
+    Computes the descriptor of a mesh. Plain numpy so it can run in a process pool outside of maya.
+
+    Args:
+        points (np.array): (N, 3) vertex positions.
+        triangles (np.array): (T, 3) vertex ids per triangle.
+        settings (dict): Overrides for DEFAULT_SETTINGS.
+
+    Returns:
+        dict: {'occupancy': packed uint8 bits, 'd2': float32 histogram, 'moments': float32 (4,)}
+    """
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    rng = np.random.default_rng(settings['seed'])
+    samples = octreecompare.sample_triangles(points, triangles, settings['num_samples'], seed=settings['seed'])
+    num_cells = 1 << (3 * settings['depth'])
+    if not len(samples):
+        return {'occupancy': np.zeros(num_cells // 8, dtype=np.uint8),
+                'd2': np.zeros(settings['d2_bins'], dtype=np.float32),
+                'moments': np.zeros(4, dtype=np.float32)}
+
+    # occupancy, the morton code of a cell at this depth is also its index in the bitset
+    occupied = np.zeros(num_cells, dtype=bool)
+    occupied[octreecompare.morton_codes(samples, settings['depth']).astype(np.int64)] = True
+
+    # D2, distances between random pairs normalized by their mean so it is scale invariant
+    pairs = rng.integers(0, len(samples), size=(settings['d2_pairs'], 2))
+    distances = np.linalg.norm(samples[pairs[:, 0]] - samples[pairs[:, 1]], axis=1)
+    mean = distances.mean()
+    distances = distances / mean if mean > 0.0 else distances
+    d2, _ = np.histogram(np.minimum(distances, settings['d2_range']), bins=settings['d2_bins'],
+                         range=(0.0, settings['d2_range']))
+    d2 = d2 / max(d2.sum(), 1)
+
+    # moments, covariance eigenvalues normalized to sum to 1 describe the shape's proportions
+    centered = samples - samples.mean(axis=0)
+    eigenvalues = np.sort(np.linalg.eigvalsh(centered.T @ centered / len(centered)))[::-1]
+    total = eigenvalues.sum()
+    moments = np.append(eigenvalues / total if total > 0.0 else eigenvalues, np.log(max(np.sqrt(total), 1e-12)))
+
+    return {'occupancy': np.packbits(occupied),
+            'd2': d2.astype(np.float32),
+            'moments': moments.astype(np.float32)}
+
+
+def _compute_descriptor_job(args):
+    # module level so it can be pickled for the process pool
+    points, triangles, settings = args
+    return compute_descriptor(points, triangles, settings)
+
+
+def _pool_context():
+    """
+    Returns a spawn multiprocessing context. Inside the maya gui sys.executable is maya itself,
+    so the pool is pointed at mayapy next to it instead.
+    """
+    context = multiprocessing.get_context('spawn')
+    exe_dir, exe_name = os.path.split(sys.executable)
+    if exe_name.lower().startswith('maya') and not exe_name.lower().startswith('mayapy'):
+        mayapy = os.path.join(exe_dir, 'mayapy.exe' if sys.platform.startswith('win') else 'mayapy')
+        if os.path.isfile(mayapy):
+            context.set_executable(mayapy)
+    return context
+
+
+class ShapeIndex:
+    def __init__(self, filepath=None, settings=None):
+        """
+        Args:
+            filepath (str): The .npz the index is saved to and loaded from. Loaded if it exists.
+            settings (dict): Overrides for DEFAULT_SETTINGS. Must match the settings of an existing file.
+        """
+        self.filepath = filepath
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        num_cells = 1 << (3 * self.settings['depth'])
+        self.names = []
+        self.hashes = []
+        self.occupancy = np.zeros((0, num_cells // 8), dtype=np.uint8)
+        self.d2 = np.zeros((0, self.settings['d2_bins']), dtype=np.float32)
+        self.moments = np.zeros((0, 4), dtype=np.float32)
+        if filepath and os.path.isfile(filepath):
+            self.load(filepath, settings=settings)
+
+    def __len__(self):
+        return len(self.names)
+
+    def load(self, filepath, settings=None):
+        with np.load(filepath) as data:
+            saved_settings = json.loads(data['settings'].tobytes().decode('utf-8'))
+            if settings and any(saved_settings.get(key) != value for key, value in settings.items()):
+                raise ValueError(f'{filepath} was built with settings {saved_settings}, not {settings}')
+            self.settings = saved_settings
+            self.names = data['names'].tolist()
+            self.hashes = data['hashes'].tolist()
+            self.occupancy = data['occupancy']
+            self.d2 = data['d2']
+            self.moments = data['moments']
+        self.filepath = filepath
+
+    def save(self, filepath=None):
+        filepath = filepath or self.filepath
+        if not filepath:
+            raise ValueError('No filepath given to save the shape index to')
+        if os.path.dirname(filepath):
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        np.savez_compressed(filepath,
+                            settings=np.frombuffer(json.dumps(self.settings).encode('utf-8'), dtype=np.uint8),
+                            names=np.array(self.names, dtype=str),
+                            hashes=np.array(self.hashes, dtype=str),
+                            occupancy=self.occupancy,
+                            d2=self.d2,
+                            moments=self.moments)
+        self.filepath = filepath
+
+    def _set_row(self, name, geo_hash, descriptor):
+        if name in self.names:
+            row = self.names.index(name)
+            self.hashes[row] = geo_hash
+            self.occupancy[row] = descriptor['occupancy']
+            self.d2[row] = descriptor['d2']
+            self.moments[row] = descriptor['moments']
+            return
+        self.names.append(name)
+        self.hashes.append(geo_hash)
+        self.occupancy = np.vstack([self.occupancy, descriptor['occupancy'][None]])
+        self.d2 = np.vstack([self.d2, descriptor['d2'][None]])
+        self.moments = np.vstack([self.moments, descriptor['moments'][None]])
+
+    def add(self, name, points, triangles):
+        """
+        Adds or updates one mesh. Nothing is computed if the geometry hash has not changed.
+
+        Returns:
+            bool: True if a descriptor was computed.
+        """
+        geo_hash = geometry_hash(points, triangles)
+        if name in self.names and self.hashes[self.names.index(name)] == geo_hash:
+            return False
+        self._set_row(name, geo_hash, compute_descriptor(points, triangles, self.settings))
+        return True
+
+    def add_meshes(self, mesh_names, processes=None):
+        """
+        Adds or updates meshes from the maya scene. Mesh data is pulled in this process,
+        descriptors for meshes whose hash changed are computed in a process pool if processes is given.
+
+        Args:
+            mesh_names (list): Mesh names in the scene.
+            processes (int): Number of worker processes. None computes everything in this process.
+
+        Returns:
+            list: The names that were (re)computed.
+        """
+        todo = []
+        for name in mesh_names:
+            points, triangles = octreecompare.get_mesh_triangles(name)
+            geo_hash = geometry_hash(points, triangles)
+            if name in self.names and self.hashes[self.names.index(name)] == geo_hash:
+                continue
+            todo.append((name, geo_hash, points, triangles))
+        if not todo:
+            return []
+
+        jobs = [(points, triangles, self.settings) for _, _, points, triangles in todo]
+        if processes and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=_pool_context()) as pool:
+                descriptors = list(pool.map(_compute_descriptor_job, jobs))
+        else:
+            descriptors = [_compute_descriptor_job(job) for job in jobs]
+
+        for (name, geo_hash, _, _), descriptor in zip(todo, descriptors):
+            self._set_row(name, geo_hash, descriptor)
+        return [name for name, _, _, _ in todo]
+
+    def remove(self, name):
+        if name not in self.names:
+            return
+        row = self.names.index(name)
+        del self.names[row]
+        del self.hashes[row]
+        self.occupancy = np.delete(self.occupancy, row, axis=0)
+        self.d2 = np.delete(self.d2, row, axis=0)
+        self.moments = np.delete(self.moments, row, axis=0)
+
+    def distances(self, descriptor, weights=None):
+        """
+        Distances from a descriptor to every mesh in the index, all rows at once.
+
+        Args:
+            descriptor (dict): From compute_descriptor.
+            weights (dict): Weights for 'occupancy', 'd2', 'moments' and 'scale'.
+                            Defaults to 1 for the first three, 0 for scale so size is ignored.
+
+        Returns:
+            np.array: (len(self),) combined distances, lower is more similar.
+        """
+        weights = dict({'occupancy': 1.0, 'd2': 1.0, 'moments': 1.0, 'scale': 0.0}, **(weights or {}))
+
+        # jaccard distance of the occupancy bitsets
+        intersection = _POPCOUNT[self.occupancy & descriptor['occupancy']].sum(axis=1)
+        union = _POPCOUNT[self.occupancy | descriptor['occupancy']].sum(axis=1)
+        occupancy = 1.0 - intersection / np.maximum(union, 1)
+        # half the L1 distance between normalized histograms, 0 to 1
+        d2 = 0.5 * np.abs(self.d2 - descriptor['d2']).sum(axis=1)
+        moments = np.linalg.norm(self.moments[:, :3] - descriptor['moments'][:3], axis=1)
+        scale = np.abs(self.moments[:, 3] - descriptor['moments'][3])
+
+        return (weights['occupancy'] * occupancy + weights['d2'] * d2
+                + weights['moments'] * moments + weights['scale'] * scale)
+
+    def query(self, points, triangles, k=5, weights=None, exclude=None):
+        """
+        Finds the k meshes in the index most similar to the given geometry.
+
+        Args:
+            points (np.array): (N, 3) vertex positions.
+            triangles (np.array): (T, 3) vertex ids per triangle.
+            k (int): How many matches to return.
+            weights (dict): See distances.
+            exclude (list): Names to leave out, for example the query mesh itself.
+
+        Returns:
+            list: (name, distance) tuples, most similar first.
+        """
+        if not len(self):
+            return []
+        distances = self.distances(compute_descriptor(points, triangles, self.settings), weights=weights)
+        if exclude:
+            for name in exclude:
+                if name in self.names:
+                    distances[self.names.index(name)] = np.inf
+        k = min(k, len(distances))
+        # partition to the k best, then only sort those
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best])]
+        return [(self.names[i], float(distances[i])) for i in best if np.isfinite(distances[i])]
+
+    def query_mesh(self, mesh_name, k=5, weights=None):
+        """
+        Same as query, for a mesh in the maya scene. The mesh itself is left out of the results.
+        """
+        points, triangles = octreecompare.get_mesh_triangles(mesh_name)
+        return self.query(points, triangles, k=k, weights=weights, exclude=[mesh_name])
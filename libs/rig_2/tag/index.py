@@ -0,0 +1,173 @@
+'''
+Bidirectional tag index, tag -> nodes and node -> tags.
+
+Plain python so it can be built and queried without maya, utils keeps the maya side:
+filling a tag with one ls call, and renaming / removing nodes from the scene callbacks so the index
+never needs a full rescan after the first query of a tag.
+
+Nodes keep the order they were added in, so lists come back in the order the scene listed them,
+same as the old cmds.ls() scans.
+
+A tag the index has never been filled for is unknown, not empty, is_indexed tells them apart.
+
+# --- Example
+from rig_2.tag import index
+tag_index = index.TagIndex.from_tag_dict({"L_brow_CTL": ["CONTROL"], "L_brow_GUIDE": ["GUIDE", "NO_EXPORT"]})
+tag_index.query(any_of=["CONTROL", "GUIDE"], none_of=["NO_EXPORT"])
+# ['L_brow_CTL']
+'''
+
+
+class TagIndex(object):
+    def __init__(self):
+        # tag -> {node: None}, dicts as ordered sets
+        self._tag_nodes = {}
+        # node -> {tag: None}
+        self._node_tags = {}
+
+    @classmethod
+    def from_tag_dict(cls, tag_dict):
+        """
+        Args:
+            tag_dict (dict): {node: [tags]}, the get_tag_dict / exported tag format.
+        """
+        tag_index = cls()
+        for node, tags in tag_dict.items():
+            for tag in tags:
+                tag_index.add(node, tag)
+        return tag_index
+
+    # --- building
+    def is_indexed(self, tag):
+        return tag in self._tag_nodes
+
+    def set_tag(self, tag, nodes):
+        """
+        Replaces every node of a tag, e.g. with a fresh scan of the scene. Marks the tag indexed even with no nodes.
+        """
+        self.clear(tag)
+        self._tag_nodes[tag] = {}
+        for node in nodes:
+            self.add(node, tag)
+
+    def add(self, node, tag):
+        self._tag_nodes.setdefault(tag, {})[node] = None
+        self._node_tags.setdefault(node, {})[tag] = None
+
+    def remove(self, node, tag):
+        self._tag_nodes.get(tag, {}).pop(node, None)
+        tags = self._node_tags.get(node)
+        if tags is None:
+            return
+        tags.pop(tag, None)
+        if not tags:
+            del self._node_tags[node]
+
+    def remove_node(self, node):
+        for tag in self._node_tags.pop(node, {}):
+            self._tag_nodes[tag].pop(node, None)
+
+    def rename_node(self, old_name, new_name):
+        """
+        Moves the tags of a renamed node. A node that isn't indexed is left alone.
+        """
+        tags = self._node_tags.pop(old_name, None)
+        if tags is None:
+            return
+        for tag in tags:
+            nodes = self._tag_nodes[tag]
+            nodes.pop(old_name, None)
+            nodes[new_name] = None
+        self._node_tags[new_name] = tags
+
+    def clear(self, tag=None):
+        """
+        Forgets one tag, or everything, the next query of it has to fill it again.
+        """
+        if tag is None:
+            self._tag_nodes = {}
+            self._node_tags = {}
+            return
+        for node in self._tag_nodes.pop(tag, {}):
+            self.remove(node, tag)
+
+    # --- queries
+    def __contains__(self, node):
+        return node in self._node_tags
+
+    def has(self, node, tag):
+        return tag in self._node_tags.get(node, ())
+
+    def nodes(self, tag):
+        return list(self._tag_nodes.get(tag, ()))
+
+    def tags(self, node):
+        return list(self._node_tags.get(node, ()))
+
+    def all_tags(self):
+        return list(self._tag_nodes)
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """
+        Set algebra across tags.
+
+        Args:
+            all_of (list): Nodes must have every one of these tags (AND).
+            any_of (list): Nodes must have at least one of these tags (OR).
+            none_of (list): Nodes must have none of these tags (NOT).
+
+        Returns:
+            list: The matching nodes in index order. With only none_of, every indexed node without those tags.
+        """
+        if all_of:
+            # start from the smallest tag, the rest are membership checks
+            smallest = min(all_of, key=lambda tag: len(self._tag_nodes.get(tag, ())))
+            candidates = self._tag_nodes.get(smallest, {})
+        elif any_of:
+            candidates = {}
+            for tag in any_of:
+                candidates.update(self._tag_nodes.get(tag, {}))
+        else:
+            candidates = self._node_tags
+
+        result = []
+        for node in candidates:
+            tags = self._node_tags[node]
+            if all_of and not all(tag in tags for tag in all_of):
+                continue
+            if any_of and not any(tag in tags for tag in any_of):
+                continue
+            if any(tag in tags for tag in none_of):
+                continue
+            result.append(node)
+        return result
+
+    def tag_dict(self, tag_filter, exclude=()):
+        """
+        {node: [tags]} of the nodes with any of the tags in tag_filter, tags in tag_filter order.
+
+        Args:
+            exclude (list): Nodes with any of these tags are left out, e.g. EXPORT_OVERRIDE.
+        """
+        tag_dict = {}
+        for tag in tag_filter:
+            for node in self._tag_nodes.get(tag, ()):
+                if any(self.has(node, ex) for ex in exclude):
+                    continue
+                tag_dict.setdefault(node, []).append(tag)
+        return tag_dict
+
+    def missing(self, tag_dict):
+        """
+        The tags of a {node: [tags]} dict the index doesn't have yet, what is left to create.
+
+        Returns:
+            dict: {tag: [nodes]}, grouped by tag so every tag can be added to all its nodes at once.
+        """
+        missing = {}
+        for node, tags in tag_dict.items():
+            for tag in tags:
+                if self.has(node, tag):
+                    continue
+                missing.setdefault(tag, {})[node] = None
+        return {tag: list(nodes) for tag, nodes in missing.items()}
@@ -1,5 +1,7 @@
 import ast
+import re
 from maya import cmds
+import maya.api.OpenMaya as om2
 from rig.utils import misc
 import importlib
 importlib.reload(misc)
@@ -10,6 +12,201 @@ importlib.reload(attr_utils)
 
 from rig_2.tag import constants as tag_constants
 importlib.reload(tag_constants)
+from rig_2.tag import index as tag_index
+importlib.reload(tag_index)
+
+
+# ################# TAG INDEX ################# #
+# Every tag query used to scan cmds.ls() with an objExists per node. The index fills a tag with one
+# ls call on its first query and after that is kept in sync instead of rescanned:
+# - create_tag, remove_tag, create_tags and create_component_tag update it
+# - node removed and name changed callbacks drop or rename nodes
+# - new nodes (duplicate, instance, import of a single node) are checked for indexed tags on the next query,
+#   by then a duplicate has its attributes copied over
+# - an addAttr from anywhere else drops the indexed tags it names with -ln / -longName, they refill on their
+#   next query
+# - undo, redo, imports and references clear it, tags refill on their next query
+# - a new or opened scene, like reset_tag_index, drops the index and removes every callback,
+#   the next query builds a new index and adds them again
+_TAG_INDEX = None
+# handles of nodes added since the last query
+_ADDED_NODES = []
+# indexed tags a bare addAttr may have added to nodes, dropped on the next query
+_STALE_TAGS = set()
+# kept through importlib.reload so the callbacks of the previous load can be removed
+_CALLBACK_IDS = globals().get("_CALLBACK_IDS", [])
+# the long names an addAttr command gives, mel -ln "TAG" / -longName TAG or python longName="TAG"
+_LONG_NAME = re.compile(r"""(?:-(?:ln|longName)\s+|\b(?:ln|longName)\s*=\s*)["']?([\w:]+)""")
+
+
+def _index_name(node):
+    # index keys are the shortest unique names, what ls gives back
+    if "|" not in node:
+        return node
+    names = cmds.ls(node)
+    return names[0] if names else node
+
+
+def _mobject_name(mobject):
+    if mobject.hasFn(om2.MFn.kDagNode):
+        return om2.MDagPath.getAPathTo(mobject).partialPathName()
+    return om2.MFnDependencyNode(mobject).name()
+
+
+def _node_removed(mobject, client_data):
+    if _TAG_INDEX is None:
+        # callbacks of a previous load, removed with the next get_tag_index
+        return
+    try:
+        name = _mobject_name(mobject)
+    except RuntimeError:
+        _TAG_INDEX.clear()
+        return
+    _TAG_INDEX.remove_node(name)
+
+
+def _name_changed(mobject, prev_name, client_data):
+    if _TAG_INDEX is None or not prev_name:
+        return
+    try:
+        name = _mobject_name(mobject)
+    except RuntimeError:
+        _TAG_INDEX.clear()
+        return
+    if prev_name in _TAG_INDEX:
+        _TAG_INDEX.rename_node(prev_name, name)
+    elif "|" in name:
+        # the previous partial path can't be rebuilt from the short name
+        _TAG_INDEX.clear()
+
+
+def _node_added(mobject, client_data):
+    if _TAG_INDEX is not None and _TAG_INDEX.all_tags():
+        _ADDED_NODES.append(om2.MObjectHandle(mobject))
+
+
+def _command_ran(command, client_data):
+    if _TAG_INDEX is None or "addAttr" not in command:
+        return
+    names = set(_LONG_NAME.findall(command))
+    _STALE_TAGS.update(tag for tag in _TAG_INDEX.all_tags() if tag in names)
+
+
+def _sync_tag_index():
+    """
+    Catches up on the nodes and attributes added since the last query.
+    """
+    for tag in _STALE_TAGS:
+        _TAG_INDEX.clear(tag)
+    _STALE_TAGS.clear()
+    tags = _TAG_INDEX.all_tags()
+    for handle in _ADDED_NODES:
+        if not tags:
+            break
+        if not handle.isValid():
+            continue
+        mobject = handle.object()
+        node_fn = om2.MFnDependencyNode(mobject)
+        node_tags = [tag for tag in tags if node_fn.hasAttribute(tag)]
+        if node_tags:
+            name = _index_name(_mobject_name(mobject))
+            for tag in node_tags:
+                _TAG_INDEX.add(name, tag)
+    del _ADDED_NODES[:]
+
+
+def _scene_changed(*args):
+    _clear_tag_index()
+
+
+def _scene_replaced(*args):
+    reset_tag_index()
+
+
+def remove_tag_index_callbacks():
+    for callback_id in _CALLBACK_IDS:
+        try:
+            om2.MMessage.removeCallback(callback_id)
+        except RuntimeError:
+            pass
+    del _CALLBACK_IDS[:]
+
+
+def get_tag_index(tags=None):
+    """
+    The scene's tag index, made and hooked up to the scene callbacks on first use.
+
+    Args:
+        tags (list): Tags to make sure are filled, each tag not yet indexed costs one ls call.
+
+    Returns:
+        tag_index.TagIndex
+    """
+    global _TAG_INDEX
+    if _TAG_INDEX is None:
+        remove_tag_index_callbacks()
+        _TAG_INDEX = tag_index.TagIndex()
+        _CALLBACK_IDS.append(om2.MDGMessage.addNodeRemovedCallback(_node_removed, "dependNode"))
+        _CALLBACK_IDS.append(om2.MDGMessage.addNodeAddedCallback(_node_added, "dependNode"))
+        _CALLBACK_IDS.append(om2.MCommandMessage.addCommandCallback(_command_ran))
+        _CALLBACK_IDS.append(om2.MNodeMessage.addNameChangedCallback(om2.MObject(), _name_changed))
+        for event in ("Undo", "Redo"):
+            _CALLBACK_IDS.append(om2.MEventMessage.addEventCallback(event, _scene_changed))
+        for message in (om2.MSceneMessage.kAfterImport, om2.MSceneMessage.kAfterCreateReference,
+                        om2.MSceneMessage.kAfterRemoveReference):
+            _CALLBACK_IDS.append(om2.MSceneMessage.addCallback(message, _scene_changed))
+        for message in (om2.MSceneMessage.kAfterNew, om2.MSceneMessage.kAfterOpen):
+            _CALLBACK_IDS.append(om2.MSceneMessage.addCallback(message, _scene_replaced))
+    _sync_tag_index()
+    for tag in tags or []:
+        if _TAG_INDEX.is_indexed(tag):
+            continue
+        # every node with the attribute, in all namespaces, instanced shapes only once
+        nodes = cmds.ls("*." + tag, objectsOnly=True, recursive=True) or []
+        _TAG_INDEX.set_tag(tag, dict.fromkeys(nodes))
+    return _TAG_INDEX
+
+
+def _clear_tag_index():
+    del _ADDED_NODES[:]
+    _STALE_TAGS.clear()
+    if _TAG_INDEX is not None:
+        _TAG_INDEX.clear()
+
+
+def reset_tag_index():
+    """
+    Drops the tag index and removes its callbacks, the command callback included, until the next tag query.
+    """
+    global _TAG_INDEX
+    _clear_tag_index()
+    remove_tag_index_callbacks()
+    _TAG_INDEX = None
+
+
+def _index_add(node, tag):
+    # only tags that are filled, a partial tag would look complete to the next query
+    if _TAG_INDEX is not None and _TAG_INDEX.is_indexed(tag):
+        _TAG_INDEX.add(_index_name(node), tag)
+        # the addAttr that made the tag was this one, the index is already up to date
+        _STALE_TAGS.discard(tag)
+
+
+def query_tags(all_of=(), any_of=(), none_of=()):
+    """
+    Nodes by tag set algebra, e.g. every guide that is exported:
+    query_tags(all_of=["GUIDE"], none_of=["NO_EXPORT"])
+
+    Args:
+        all_of (list): Every one of these tags (AND).
+        any_of (list): At least one of these tags (OR).
+        none_of (list): None of these tags (NOT), with only none_of every node in the scene without them.
+    """
+    index = get_tag_index(list(all_of) + list(any_of) + list(none_of))
+    if all_of or any_of:
+        return index.query(all_of=all_of, any_of=any_of, none_of=none_of)
+    return [node for node in cmds.ls() if not any(index.has(node, tag) for tag in none_of)]
+#################################################
 
 
 def get_no_exports(check_component_class_no_export=True):
@@ -17,76 +214,81 @@ def get_no_exports(check_component_class_no_export=True):
                         check_component_class_no_export=check_component_class_no_export)
 
 def get_tag_dict(tag_filter=["NO_EXPORT"], check_component_class_no_export=True):
-    tag_dict = {}
-    for tag in tag_filter:
-        for node in get_all_with_tag(tag):
-            # Make sure to remove from the dict if EXPORT_OVERRIDE exists
-            if node in list(tag_dict.keys()) and cmds.objExists(node + ".EXPORT_OVERRIDE"):
-                del tag_dict[node]
-                # if node not in tag_dict.keys():
-                #     tag_dict[node] = []
-                # if "DELETE_NOEXPORT_IF_EXISTS" not in tag_dict[node]:
-                #     tag_dict[node].append("DELETE_NOEXPORT_IF_EXISTS")
-                continue
-            if cmds.objExists(node + ".EXPORT_OVERRIDE"):
-                continue
-            # Create key entry if the key does not yet exist
-            if node not in list(tag_dict.keys()):
-                tag_dict[node] = []
-            tag_dict[node].append(tag)
+    index = get_tag_index(list(tag_filter) + ["EXPORT_OVERRIDE", "NO_EXPORT"])
+    # EXPORT_OVERRIDE keeps a node out of the dict no matter what it is tagged with
+    tag_dict = index.tag_dict(tag_filter, exclude=["EXPORT_OVERRIDE"])
     if not check_component_class_no_export:
         return tag_dict
     # This is strictly for enforcing the class NO EXPORT NODES tag
+    no_export_nodes = []
     for component in get_all_component_names():
         component_class_node = get_class_node_from_component_name(component)
-        if not cmds.objExists(component_class_node + ".NO_EXPORT"):
-            # for node in get_nodes_by_component_name(component):
-            #     if node not in tag_dict.keys():
-            #         tag_dict[node] = []
-            #     if "DELETE_NOEXPORT_IF_EXISTS" not in tag_dict[node]:
-            #         tag_dict[node].append("DELETE_NOEXPORT_IF_EXISTS")
+        if not index.has(component_class_node, "NO_EXPORT"):
             continue
         for node in get_nodes_by_component_name(component):
-            # Failsafe make sure to remove from the dict if EXPORT_OVERRIDE exists
-            if node in list(tag_dict.keys()) and cmds.objExists(node + ".EXPORT_OVERRIDE"):
-                # if "DELETE_NOEXPORT_IF_EXISTS" not in tag_dict[node]:
-                #     tag_dict[node].append("DELETE_NOEXPORT_IF_EXISTS")
-                del tag_dict[node]
-
-            if cmds.objExists(node + ".EXPORT_OVERRIDE"):
+            if index.has(node, "EXPORT_OVERRIDE"):
+                # Failsafe make sure to remove from the dict if EXPORT_OVERRIDE exists
+                tag_dict.pop(node, None)
                 continue
             # Create key entry if the key does not yet exist
-            if node not in list(tag_dict.keys()):
-                tag_dict[node] = []
-            tag_dict[node].append("NO_EXPORT")
-            # Create the tag 
-            create_tag(node, "NO_EXPORT")
+            tag_dict.setdefault(node, []).append("NO_EXPORT")
+            no_export_nodes.append(node)
+    # Create the tags
+    create_tags({"NO_EXPORT": no_export_nodes})
     return tag_dict
 
 # Temp, for testing, REMOVE ME
 TAG_DICT = {'C_upperLipPrimaryGimbal_CTL': ['NO_EXPORT'], 'C_upperLipPrimary01_BUF': ['NO_EXPORT'], 'C_upperLipPrimary_CTL': ['NO_EXPORT'], 'C_upperLipPrimary_GUIDE': ['NO_EXPORT']}
 
 def set_tags_from_dict(tag_dict = TAG_DICT, check_component_class_no_export=True):
-    for node in list(tag_dict.keys()):
-        for tag in tag_dict[node]:
-            create_tag(node, tag)
+    index = get_tag_index(list(dict.fromkeys(tag for tags in tag_dict.values() for tag in tags)))
+    create_tags(index.missing(tag_dict))
     if not check_component_class_no_export:
         return
     # This is strictly for enforcing the class NO EXPORT NODES tag
+    index = get_tag_index(["EXPORT_OVERRIDE", "NO_EXPORT"])
+    no_export_nodes = []
     for component in get_all_component_names():
         component_class_node = get_class_node_from_component_name(component)
-        if not cmds.objExists(component_class_node + ".NO_EXPORT"):
+        if not index.has(component_class_node, "NO_EXPORT"):
             continue
         for node in get_nodes_by_component_name(component):
-            if cmds.objExists(node + ".EXPORT_OVERRIDE"):
+            if index.has(node, "EXPORT_OVERRIDE"):
                 continue
-            create_tag(node, "NO_EXPORT")
-        # Create key entry if the key does not yet exist
-            if node not in list(tag_dict.keys()):
-                tag_dict[node] = []
-            tag_dict[node].append("NO_EXPORT")
+            no_export_nodes.append(node)
+            # Create key entry if the key does not yet exist
+            tag_dict.setdefault(node, []).append("NO_EXPORT")
+    create_tags({"NO_EXPORT": no_export_nodes})
     return tag_dict
 
+def create_tags(tag_nodes):
+    """
+    Tags many nodes at once, each tag is added to all its nodes with one addAttr call.
+    Nodes that already have the tag or don't exist are skipped.
+
+    Args:
+        tag_nodes (dict): {tag: [nodes]}
+    """
+    index = get_tag_index(list(tag_nodes))
+    for tag, nodes in tag_nodes.items():
+        nodes = [node for node in dict.fromkeys(nodes) if not index.has(node, tag) and cmds.objExists(node)]
+        if not nodes:
+            continue
+        try:
+            cmds.addAttr(nodes, ln = tag,
+                         at = "bool",)
+        except RuntimeError:
+            # a node the index had under a different name already has the tag, go one by one
+            for node in nodes:
+                create_tag(node, tag)
+            continue
+        for node in nodes:
+            cmds.setAttr(node + "." + tag, True,
+                         l = True,
+                         k=False)
+            index.add(_index_name(node), tag)
+        _STALE_TAGS.discard(tag)
+
 def create_tag(node_to_tag, tag_name="TAG", warn=False):
     if cmds.objExists(node_to_tag + "." + tag_name):
         if warn:
@@ -102,6 +304,7 @@ def create_tag(node_to_tag, tag_name="TAG", warn=False):
     cmds.setAttr(node_to_tag +"." + tag_name,
                     l = True,
                     k=False)
+    _index_add(node_to_tag, tag_name)
 
 def get_class_node_from_component_name(component_name):
     return "{0}_CLASS".format(component_name)
@@ -122,6 +325,7 @@ def create_component_tag(node_to_tag, component_name, connect_to_class_node=True
             return attr
         attr_utils.get_attr(node, "COMPONENT_MEMBERSHIP", dataType="string")
         cmds.setAttr(attr, component_name, type="string")
+        _index_add(node, "COMPONENT_MEMBERSHIP")
         
         return attr
 
@@ -195,6 +399,8 @@ def remove_tag(tagged_node, tag_name="TAG"):
     cmds.setAttr(tagged_node + "." + tag_name,
                 l = False)
     cmds.deleteAttr(attr_full_name)
+    if _TAG_INDEX is not None:
+        _TAG_INDEX.remove(_index_name(tagged_node), tag_name)
 
 
 def tag_no_export(node_to_tag):
@@ -344,7 +550,7 @@ def tag_dynamic_mirrored(node_to_tag):
 
 def get_all_with_tag(tag, hint_list=None):
     if not hint_list:
-        hint_list = cmds.ls()
+        return get_tag_index([tag]).nodes(tag)
     if type(hint_list) != list:
         hint_list = cmds.listRelatives(hint_list, allDescendents = True)
     return [x for x in hint_list if cmds.objExists(x + "." + tag)]
@@ -549,10 +755,8 @@ def tag_no_export_from_control_message(message_name, add=True, checkbox_on=False
     return nodes
 
 def remove_nodes_with_tags_from_list(tag_name, node_list):
-    for idx, curve in enumerate(node_list):
-        if cmds.objExists(curve + "." + tag_name):
-            node_list.pop(idx)
-    return node_list
+    index = get_tag_index([tag_name])
+    return [node for node in node_list if not index.has(_index_name(node), tag_name)]
 
 def tag_no_export_from_control_connection_dict(add=True,
                                                weight_curves=True,
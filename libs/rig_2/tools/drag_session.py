@@ -0,0 +1,277 @@
+'''
+Drag sessions, what a dragger does between press and release, without maya.
+
+Draggers used to write the whole attribute or weight array on every mouse move event. A session instead:
+- snapshots the values it affects when the drag starts
+- coalesces drag events to a frame rate, only the latest value of a frame is applied
+- writes only the indices that changed since the last write
+- commits the final values as one undoable operation on release
+
+Drag_Session is the common base, it does the throttling and records the events so a drag can be replayed.
+Func_Drag_Session wraps the start / change / end functions Value_Dragger always took.
+Array_Drag_Session does the snapshot, diff and commit for anything that is an array of values.
+
+The read / write / commit functions are the only part that touches maya, replay() runs a recorded
+event stream through a session with a fake clock, so the throttling and diffing can be checked headless.
+
+# --- Example
+from rig_2.tools import drag_session
+values = [0.0] * 10
+session = drag_session.Array_Drag_Session(read_func=lambda: values,
+                                          compute_func=lambda snapshot, value: snapshot + value,
+                                          write_func=lambda indices, current: None,
+                                          commit_func=lambda snapshot, final: values.__init__(final.tolist()))
+drag_session.replay(session, [(0.0, "press", 0.0), (0.01, "drag", 0.1), (0.02, "drag", 0.2), (0.1, "release", 0.3)])
+session.stats   # {'events': 4, 'writes': 2, 'written_indices': 20}
+'''
+# builtins
+import json
+import time
+
+# third party
+import numpy as np
+
+FRAME_RATE = 30.0
+
+PRESS = "press"
+DRAG = "drag"
+RELEASE = "release"
+CANCEL = "cancel"
+
+
+class Drag_Session(object):
+    def __init__(self, frame_rate=FRAME_RATE, clock=time.perf_counter, record=True):
+        """
+        Args:
+            frame_rate (float): Most writes per second, drag events in between only update the pending value.
+                                0 applies every event.
+            clock (callable): Returns the time in seconds, replay passes the recorded times instead.
+            record (bool): Keep the (time, kind, value) events of the last drag in self.events.
+        """
+        self.frame_rate = frame_rate
+        self.clock = clock
+        self.record = record
+        self.events = []
+        self.active = False
+        self.pending = None
+        self.value = None
+        self.last_write_time = None
+        self.stats = {"events": 0, "writes": 0, "written_indices": 0}
+
+    # --- hooks, override these
+    def on_start(self):
+        return
+
+    def on_update(self, value):
+        """
+        Applies a drag value. Returns the number of written indices, 0 when nothing had to change.
+        """
+        return 0
+
+    def on_end(self):
+        return
+
+    def on_cancel(self):
+        return
+
+    # --- events
+    def _record(self, kind, value, now):
+        self.stats["events"] += 1
+        if self.record:
+            self.events.append((now, kind, value))
+
+    def _now(self, now):
+        return self.clock() if now is None else now
+
+    def start(self, value=0.0, now=None):
+        now = self._now(now)
+        self.events = []
+        self.stats = {"events": 0, "writes": 0, "written_indices": 0}
+        self._record(PRESS, value, now)
+        self.active = True
+        self.pending = None
+        self.value = value
+        self.last_write_time = None
+        self.on_start()
+
+    def update(self, value, now=None):
+        """
+        A drag event, applied right away if a frame has passed since the last write, otherwise kept as pending.
+
+        Returns:
+            bool: True if something was written, the viewport needs a refresh.
+        """
+        if not self.active:
+            return False
+        now = self._now(now)
+        self._record(DRAG, value, now)
+        self.pending = value
+        if self.frame_rate and self.last_write_time is not None and now - self.last_write_time < 1.0 / self.frame_rate:
+            return False
+        return self.flush(now)
+
+    def flush(self, now=None):
+        """
+        Applies the pending value, if there is one.
+        """
+        if self.pending is None:
+            return False
+        value, self.pending = self.pending, None
+        self.last_write_time = self._now(now)
+        self.value = value
+        written = self.on_update(value)
+        if not written:
+            return False
+        self.stats["writes"] += 1
+        self.stats["written_indices"] += written
+        return True
+
+    def end(self, value=None, now=None):
+        """
+        Release, applies the last value and commits.
+        """
+        if not self.active:
+            return
+        now = self._now(now)
+        self._record(RELEASE, value, now)
+        if value is not None and value != self.value:
+            self.pending = value
+        self.flush(now)
+        self.active = False
+        self.on_end()
+
+    def cancel(self, now=None):
+        """
+        Puts everything back the way it was at start.
+        """
+        if not self.active:
+            return
+        self._record(CANCEL, None, self._now(now))
+        self.active = False
+        self.pending = None
+        self.on_cancel()
+
+
+class Func_Drag_Session(Drag_Session):
+    """
+    The start / change / end functions of a dragger, change_func is throttled to the frame rate.
+    cancel_func is called instead of end_func when the drag is cancelled, it should put back what
+    start_func and change_func changed. Without one a cancelled drag keeps its last applied value.
+    """
+    def __init__(self, start_func=None, change_func=None, end_func=None, cancel_func=None, **kwargs):
+        super(Func_Drag_Session, self).__init__(**kwargs)
+        self.start_func = start_func
+        self.change_func = change_func
+        self.end_func = end_func
+        self.cancel_func = cancel_func
+
+    def on_start(self):
+        if self.start_func:
+            self.start_func()
+
+    def on_update(self, value):
+        if not self.change_func:
+            return 0
+        self.change_func(value)
+        return 1
+
+    def on_end(self):
+        if self.end_func:
+            self.end_func()
+
+    def on_cancel(self):
+        if self.cancel_func:
+            self.cancel_func()
+
+
+class Array_Drag_Session(Drag_Session):
+    def __init__(self, read_func, compute_func, write_func, commit_func=None, restore_func=None,
+                 tolerance=1e-9, **kwargs):
+        """
+        Args:
+            read_func (callable): Returns the values the drag affects, snapshot once at start.
+            compute_func (callable): compute_func(snapshot, value) returns the values for a drag value.
+                                     Always computed from the snapshot, so drags don't drift.
+            write_func (callable): write_func(indices, current) writes the changed indices interactively,
+                                   current is the whole array with the changes in. Shouldn't go into the undo queue.
+            commit_func (callable): commit_func(snapshot, final) the one undoable write on release. The interactive
+                                    writes have to be undone first so undo goes back to the snapshot,
+                                    write_func(changed, snapshot) is called for that before commit_func.
+            restore_func (callable): restore_func(snapshot) puts the snapshot back on cancel,
+                                     write_func with every changed index by default.
+            tolerance (float): Values closer than this count as unchanged.
+        """
+        super(Array_Drag_Session, self).__init__(**kwargs)
+        self.read_func = read_func
+        self.compute_func = compute_func
+        self.write_func = write_func
+        self.commit_func = commit_func
+        self.restore_func = restore_func
+        self.tolerance = tolerance
+        self.snapshot = None
+        self.current = None
+
+    def on_start(self):
+        self.snapshot = np.array(self.read_func(), dtype=np.float64)
+        self.current = self.snapshot.copy()
+
+    def on_update(self, value):
+        values = np.asarray(self.compute_func(self.snapshot, value), dtype=np.float64)
+        changed = np.flatnonzero(np.abs(values - self.current) > self.tolerance)
+        if not len(changed):
+            return 0
+        self.current[changed] = values[changed]
+        self.write_func(changed, self.current)
+        return len(changed)
+
+    def changed_indices(self):
+        return np.flatnonzero(np.abs(self.current - self.snapshot) > self.tolerance)
+
+    def _restore(self):
+        changed = self.changed_indices()
+        if len(changed):
+            self.write_func(changed, self.snapshot)
+
+    def on_end(self):
+        if not len(self.changed_indices()) or not self.commit_func:
+            return
+        final = self.current.copy()
+        self._restore()
+        self.commit_func(self.snapshot, final)
+        self.current = final
+
+    def on_cancel(self):
+        if self.restore_func:
+            self.restore_func(self.snapshot)
+        else:
+            self._restore()
+        self.current = self.snapshot.copy()
+
+
+def replay(session, events):
+    """
+    Runs recorded (time, kind, value) events through a session, the times stand in for the clock.
+
+    Returns:
+        dict: The session's stats, events, writes and written_indices.
+    """
+    for now, kind, value in events:
+        if kind == PRESS:
+            session.start(value, now=now)
+        elif kind == DRAG:
+            session.update(value, now=now)
+        elif kind == RELEASE:
+            session.end(value, now=now)
+        elif kind == CANCEL:
+            session.cancel(now=now)
+    return session.stats
+
+
+def save_events(events, file_path):
+    with open(file_path, "w") as json_file:
+        json.dump([list(event) for event in events], json_file, indent=4)
+
+
+def load_events(file_path):
+    with open(file_path, "r") as json_file:
+        return [tuple(event) for event in json.load(json_file)]
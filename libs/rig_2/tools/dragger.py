@@ -1,30 +1,51 @@
 from maya import cmds
 import maya.OpenMaya as OpenMaya
 import maya.mel as mel
+import importlib
+from rig_2.tools import drag_session
+importlib.reload(drag_session)
 
 
 # drag = dragger.Value_Dragger(start_func = ka_weightBlender.start,
 #                              change_func = ka_weightBlender.change,
-#                              end_func = None)
+#                              end_func = None,
+#                              cancel_func = None)  # puts the values back if the tool is left mid drag
+# Or hand it a drag_session.Drag_Session, the session gets the drag values throttled to its frame rate:
+# drag = dragger.Value_Dragger(session = drag_session.Array_Drag_Session(read_func, compute_func, write_func, commit_func))
+# drag.clickAndMoveCommand()
+# The events of the last drag are in drag.session.events, drag_session.replay runs them again without maya.
 
 
 class Value_Dragger(object):
     # You will want to set add cmds.setToolTo("valueDragger") in your hotkeys to be able to use this feature
     # value_func is a function that will be setting the values, make sure this function only has one arg and that is for a -100 to 100 range
+    # change_func is called at most frame_rate times a second, drag events in between only keep the latest value
     CONTEXTNAME = "valueDragger"
     print("NEW CONTEXT")
     def __init__(self,
                  start_func = None,
                  change_func = None,
                  end_func = None,
+                 exit_func = None,
+                 cancel_func = None,
                  range_start = 0,
                  range_min = -100,
                  range_max = 100,
-                 sensitivity=.2):
+                 sensitivity=.2,
+                 frame_rate=drag_session.FRAME_RATE,
+                 session=None):
         # args
         self.start_func = start_func
         self.change_func = change_func
         self.end_func = end_func
+        self.exit_func = exit_func
+        self.cancel_func = cancel_func
+        # the start, change and end funcs are a session too
+        self.session = session or drag_session.Func_Drag_Session(start_func=start_func,
+                                                                 change_func=change_func,
+                                                                 end_func=end_func,
+                                                                 cancel_func=cancel_func,
+                                                                 frame_rate=frame_rate)
         self.range_start = range_start
         self.range_min = range_min
         self.range_max = range_max
@@ -36,6 +57,7 @@ class Value_Dragger(object):
         self.originalWeightValues=""
         self.left = None
         self.right = None
+        self.chunk_open = False
     
 
     def clickAndMoveCommand(self):
@@ -44,14 +66,14 @@ class Value_Dragger(object):
 
         def getFirstClick():
             cmds.undoInfo(openChunk=True)
+            self.chunk_open = True
             
             vec = tuple(cmds.draggerContext(Context, query=1, anchorPoint=1 ))
             self.vectorStart = OpenMaya.MVector(vec[0], vec[1], vec[2])
             self.vectorEnd = OpenMaya.MVector(vec[0], vec[1], vec[2])
+            self.wt = self.range_start
 
-            if self.start_func:
-                # self.left, self.right, self.up, self.down = self.start_func()
-                self.start_func()
+            self.session.start(self.wt)
             # print vec[0], vec[1], vec[2]
 
         def getCursorPosition():
@@ -64,20 +86,34 @@ class Value_Dragger(object):
                 posNeg = 1
             self.wt = (length * self.sensitivity)*posNeg + self.range_start
             self.wt = clamp(self.wt, self.range_min, self.range_max)
-            if self.change_func:
-                self.change_func(self.wt)
-            cmds.refresh()
+            if self.session.update(self.wt):
+                cmds.refresh()
+            elif self.session.pending is not None:
+                # the mouse may stop before the next event, write the held back value once maya is idle
+                cmds.evalDeferred(flushPending, lowestPriority=True)
+
+        def flushPending():
+            if self.session.active and self.session.flush():
+                cmds.refresh()
 
         def releaseClick():
+            self.session.end(self.wt)
             self.vectorStart = OpenMaya.MVector(0.0, 0.0, 0.0)
             self.wt = 0.0
-            sel = cmds.ls(sl=True, fl=True)
-            geo = sel[0].split(".")[0]
+            close_chunk()
 
-            if self.end_func:
-                self.end_func()
+        def close_chunk():
+            if self.chunk_open:
+                self.chunk_open = False
+                cmds.undoInfo(closeChunk=True)
 
-            cmds.undoInfo(closeChunk=True)
+        def finalize():
+            # leaving the tool mid drag cancels the session, its cancel hook puts the values back
+            # (a Func_Drag_Session's cancel_func, an Array_Drag_Session's snapshot), then the press's chunk is closed
+            self.session.cancel()
+            close_chunk()
+            if self.exit_func:
+                self.exit_func()
 
         def holdCommand():
             vec = tuple(cmds.draggerContext(Context, query=1, anchorPoint=1 ))
@@ -90,7 +126,7 @@ class Value_Dragger(object):
             cmds.deleteUI(Context)
 
         cmds.draggerContext(Context, um="sequence", pressCommand=getFirstClick, dragCommand=getCursorPosition, name=Context,
-                            cursor='crossHair', sp="screen", pr="viewPlane", rc=releaseClick)
+                            cursor='crossHair', sp="screen", pr="viewPlane", rc=releaseClick, finalize=finalize)
         cmds.setToolTo(Context)
 
 def clamp(_val, _min, _max):
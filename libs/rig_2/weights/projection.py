@@ -0,0 +1,260 @@
+'''
+World -> camera -> screen projection of points and screen space selections, plain numpy so it runs without maya.
+
+The weight blender used to push every point through an MMatrix one at a time. Here a whole mesh is projected
+in one go, and the screen space queries the blending tools need (what is under a brush, inside a lasso,
+how strongly a point is affected) are array operations on the result.
+
+Conventions follow maya:
+- matrices are 4x4 row major with the translation on the last row, points are row vectors (p * M),
+  cmds.getAttr on worldInverseMatrix gives the flat 16 values
+- the camera looks down -Z, camera space depth is -z
+- focal length is in mm, film apertures in inches, screen coordinates are pixels from the bottom left,
+  the same as M3dView.worldToView
+
+Camera settings are a plain dict (see camera_settings), katools reads one from a maya camera.
+
+# --- Example
+from rig_2.weights import projection
+camera = projection.camera_settings(world_inverse_matrix=cmds.getAttr("persp.worldInverseMatrix"), width=960, height=540)
+screen, depth = projection.world_to_screen(mesh_points, camera)
+inside = projection.lasso_select(screen, [(100, 100), (400, 120), (300, 400)], depth=depth)
+weights = projection.radius_falloff(screen, center=(480, 270), radius=150, falloff="smooth", depth=depth)
+'''
+import numpy as np
+
+INCH_TO_MM = 25.4
+
+FILM_FIT_FILL = "fill"
+FILM_FIT_HORIZONTAL = "horizontal"
+FILM_FIT_VERTICAL = "vertical"
+FILM_FIT_OVERSCAN = "overscan"
+# the camera.filmFit enum
+FILM_FITS = (FILM_FIT_FILL, FILM_FIT_HORIZONTAL, FILM_FIT_VERTICAL, FILM_FIT_OVERSCAN)
+
+FALLOFF_LINEAR = "linear"
+FALLOFF_SMOOTH = "smooth"
+FALLOFF_GAUSSIAN = "gaussian"
+FALLOFF_CONSTANT = "constant"
+
+
+def camera_settings(world_inverse_matrix, width, height, focal_length=35.0, horizontal_aperture=1.41732,
+                    vertical_aperture=0.94488, film_fit=FILM_FIT_FILL, orthographic=False, orthographic_width=30.0,
+                    near_clip=0.1):
+    """
+    The camera a projection needs, maya's persp camera defaults.
+
+    Args:
+        world_inverse_matrix (list): The camera's worldInverseMatrix, flat 16 values or 4x4.
+        width (int): Viewport width in pixels.
+        height (int): Viewport height in pixels.
+        focal_length (float): mm.
+        horizontal_aperture (float): Film width in inches.
+        vertical_aperture (float): Film height in inches.
+        film_fit (str or int): One of FILM_FITS, or the filmFit enum index.
+        orthographic (bool): Orthographic camera, orthographic_width is then the visible width in scene units.
+        near_clip (float): Points closer than this count as behind the camera.
+
+    Returns:
+        dict: The settings, with the matrix as a (4, 4) float64 array.
+    """
+    if not isinstance(film_fit, str):
+        film_fit = FILM_FITS[int(film_fit)]
+    return {"world_inverse_matrix": np.asarray(world_inverse_matrix, dtype=np.float64).reshape(4, 4),
+            "width": float(width),
+            "height": float(height),
+            "focal_length": float(focal_length),
+            "horizontal_aperture": float(horizontal_aperture),
+            "vertical_aperture": float(vertical_aperture),
+            "film_fit": film_fit,
+            "orthographic": bool(orthographic),
+            "orthographic_width": float(orthographic_width),
+            "near_clip": float(near_clip)}
+
+
+def _points(points):
+    return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+
+def to_camera_space(points, world_inverse_matrix):
+    """
+    (N, 3) world space points to camera space, points * worldInverseMatrix.
+    """
+    matrix = np.asarray(world_inverse_matrix, dtype=np.float64).reshape(4, 4)
+    return _points(points) @ matrix[:3, :3] + matrix[3, :3]
+
+
+def _pixels_per_unit(camera):
+    """
+    Pixels per mm on the film back, or per scene unit for orthographic cameras.
+    """
+    width, height = camera["width"], camera["height"]
+    if camera["orthographic"]:
+        # the orthographic width fits the larger side of the viewport
+        return max(width, height) / camera["orthographic_width"]
+    horizontal = width / (camera["horizontal_aperture"] * INCH_TO_MM)
+    vertical = height / (camera["vertical_aperture"] * INCH_TO_MM)
+    film_fit = camera["film_fit"]
+    if film_fit == FILM_FIT_HORIZONTAL:
+        return horizontal
+    if film_fit == FILM_FIT_VERTICAL:
+        return vertical
+    if film_fit == FILM_FIT_OVERSCAN:
+        return min(horizontal, vertical)
+    return max(horizontal, vertical)
+
+
+def camera_to_screen(camera_points, camera):
+    """
+    Camera space points to pixels.
+
+    Returns:
+        tuple: (screen, depth) (N, 2) pixel positions and (N,) distances in front of the camera.
+               Points at or behind the near clip plane get nan screen positions.
+    """
+    camera_points = _points(camera_points)
+    depth = -camera_points[:, 2]
+    scale = _pixels_per_unit(camera)
+    if camera["orthographic"]:
+        film = camera_points[:, :2]
+    else:
+        in_front = depth > camera["near_clip"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            film = camera["focal_length"] * camera_points[:, :2] / depth[:, None]
+        film[~in_front] = np.nan
+    screen = film * scale + (camera["width"] * 0.5, camera["height"] * 0.5)
+    return screen, depth
+
+
+def world_to_screen(points, camera):
+    """
+    (N, 3) world space points to pixels, see camera_to_screen.
+    """
+    return camera_to_screen(to_camera_space(points, camera["world_inverse_matrix"]), camera)
+
+
+def _visible(screen, depth, near_clip):
+    visible = ~np.isnan(screen).any(axis=1)
+    if depth is not None:
+        visible &= np.asarray(depth) > near_clip
+    return visible
+
+
+# --- selection
+def radius_select(screen, center, radius, depth=None, near_clip=0.0):
+    """
+    Points within radius pixels of center.
+
+    Args:
+        screen (np.array): (N, 2) pixel positions.
+        center (tuple): (x, y) pixels.
+        radius (float): Pixels.
+        depth (np.array): (N,) depths, points behind the camera are never selected.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    offset = np.asarray(screen, dtype=np.float64) - np.asarray(center, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        inside = np.einsum("ij,ij->i", offset, offset) <= radius * radius
+    return inside & _visible(screen, depth, near_clip)
+
+
+def lasso_select(screen, polygon, depth=None, near_clip=0.0):
+    """
+    Points inside a lasso, even-odd rule so self intersecting lassos behave like maya's.
+
+    Args:
+        screen (np.array): (N, 2) pixel positions.
+        polygon (list): (P, 2) lasso points in pixels, closed automatically.
+
+    Returns:
+        np.array: (N,) bool mask.
+    """
+    screen = np.asarray(screen, dtype=np.float64)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(screen), dtype=bool)
+    if len(polygon) < 3:
+        return inside
+    x, y = screen[:, 0], screen[:, 1]
+    # one edge at a time against every point, P small numpy ops instead of N * P python ones
+    for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            crosses = (y0 > y) != (y1 > y)
+            intersect_x = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            inside ^= crosses & (x < intersect_x)
+    return inside & _visible(screen, depth, near_clip)
+
+
+def distance_to_polygon(screen, polygon):
+    """
+    (N,) pixel distance of every point to the closest lasso edge.
+    """
+    screen = np.asarray(screen, dtype=np.float64)
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    distance = np.full(len(screen), np.inf)
+    for start, end in zip(polygon, np.roll(polygon, -1, axis=0)):
+        edge = end - start
+        length = edge.dot(edge)
+        offset = screen - start
+        t = np.clip(offset @ edge / length, 0.0, 1.0) if length else np.zeros(len(screen))
+        closest = offset - t[:, None] * edge
+        distance = np.fmin(distance, np.sqrt(np.einsum("ij,ij->i", closest, closest)))
+    return distance
+
+
+# --- falloff
+def falloff_curve(t, falloff=FALLOFF_SMOOTH):
+    """
+    Weights for normalized distances, 1 at t=0 down to 0 at t>=1.
+    """
+    t = np.clip(np.nan_to_num(np.asarray(t, dtype=np.float64), nan=1.0), 0.0, 1.0)
+    if falloff == FALLOFF_CONSTANT:
+        return (t < 1.0).astype(np.float64)
+    if falloff == FALLOFF_LINEAR:
+        return 1.0 - t
+    if falloff == FALLOFF_SMOOTH:
+        return 1.0 - t * t * (3.0 - 2.0 * t)
+    if falloff == FALLOFF_GAUSSIAN:
+        # reaches ~0.01 at the edge, cut to 0 outside
+        return np.where(t < 1.0, np.exp(-4.6 * t * t), 0.0)
+    raise ValueError(f"Unknown falloff {falloff}, use one of linear, smooth, gaussian, constant.")
+
+
+def radius_falloff(screen, center, radius, falloff=FALLOFF_SMOOTH, depth=None, near_clip=0.0):
+    """
+    Brush weights, 1 at center down to 0 at radius pixels.
+
+    Returns:
+        np.array: (N,) weights, 0 for points behind the camera.
+    """
+    offset = np.asarray(screen, dtype=np.float64) - np.asarray(center, dtype=np.float64)
+    distance = np.sqrt(np.einsum("ij,ij->i", offset, offset))
+    weights = falloff_curve(distance / float(radius) if radius else np.where(distance > 0, 1.0, 0.0), falloff)
+    return np.where(_visible(screen, depth, near_clip), weights, 0.0)
+
+
+def lasso_falloff(screen, polygon, softness, falloff=FALLOFF_SMOOTH, depth=None, near_clip=0.0):
+    """
+    1 inside the lasso, fading to 0 over softness pixels outside of it.
+
+    Returns:
+        np.array: (N,) weights, 0 for points behind the camera.
+    """
+    inside = lasso_select(screen, polygon)
+    if softness <= 0:
+        weights = inside.astype(np.float64)
+    else:
+        weights = np.where(inside, 1.0, falloff_curve(distance_to_polygon(screen, polygon) / float(softness), falloff))
+    return np.where(_visible(screen, depth, near_clip), weights, 0.0)
+
+
+def nearest(screen, center, depth=None, near_clip=0.0):
+    """
+    Index of the visible point closest to center on screen, None if nothing is visible.
+    """
+    offset = np.asarray(screen, dtype=np.float64) - np.asarray(center, dtype=np.float64)
+    distance = np.where(_visible(screen, depth, near_clip), np.einsum("ij,ij->i", offset, offset), np.inf)
+    if not len(distance) or not np.isfinite(distance.min()):
+        return None
+    return int(np.argmin(distance))
@@ -0,0 +1,197 @@
+'''
+Headless reference evaluation of the LH weight stacks and deformers.
+
+The LHWeightNode stacks and the LHMatrixDeformer only run inside maya. This evaluates the same math with numpy
+on exported data (mesh points, weight arrays, driver matrices), so a rig's weights and deformation can be
+diffed numerically outside of maya, or previewed for many frames without evaluating the scene.
+
+Conventions follow maya:
+- matrices are 4x4 row major with the translation on the last row, points are row vectors (p * M),
+  cmds.getAttr on a matrix plug gives the flat 16 values, reshape(4, 4) gives the matrix
+- weight arrays are the kDoubleArray values of the weight maps, one value per point
+
+Weight stack operations are the enum on inputs[i].operation:
+    0 add, 1 subtract, 2 multiply, 3 divide
+every input contributes inputWeights * factor, combined in element order.
+
+# --- Example
+from rig_2.weights import reference
+# exported in maya with rig.deformers.utils.getWeightStackData and getMatrixDeformerData
+stack = json.load(open("lip_weight_stack.json"))
+weights = reference.evaluate_weight_stack_data(stack)
+reference.compare_weights(weights, stack["out_weights"])
+data = json.load(open("lip_matrix_deformer.json"))
+deformed = reference.matrix_deform(data["points"], data["matrices"], data["base_matrices"], data["weights"])
+'''
+import numpy as np
+
+OPERATION_ADD = 0
+OPERATION_SUBTRACT = 1
+OPERATION_MULTIPLY = 2
+OPERATION_DIVIDE = 3
+
+OPERATION_NAMES = {"add": OPERATION_ADD, "subtract": OPERATION_SUBTRACT,
+                   "multiply": OPERATION_MULTIPLY, "divide": OPERATION_DIVIDE}
+
+
+def as_matrices(matrices):
+    """
+    (M, 4, 4) float64 matrices from flat 16 value lists or 4x4 nested lists.
+    """
+    return np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+
+
+def _homogeneous(points):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return np.concatenate([points, np.ones((len(points), 1))], axis=1)
+
+
+def normalize_weights(weights):
+    """
+    Scales a (K, N) stack of weight arrays so every point's weights sum to 1, points that are 0 everywhere stay 0.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    totals = weights.sum(axis=0)
+    return weights / np.where(np.abs(totals) < 1e-12, 1.0, totals)
+
+
+def evaluate_weight_stack(input_weights, factors=None, operations=None, normalize=False, clamp=False):
+    """
+    The output weights of an LHWeightNode.
+
+    Args:
+        input_weights (list): (K, N) the inputWeights array of every input.
+        factors (list): (K,) the factor of every input, 1 by default.
+        operations (list): (K,) the operation of every input as ints or names, add by default.
+                           A stack that starts with multiply or divide starts from 1 instead of 0.
+        normalize (bool): Normalize the input weights across the stack before combining them.
+        clamp (bool): Clamp the result between 0 and 1.
+
+    Returns:
+        np.array: (N,) weights.
+    """
+    input_weights = np.atleast_2d(np.asarray(input_weights, dtype=np.float64))
+    num_inputs = len(input_weights)
+    factors = np.ones(num_inputs) if factors is None else np.asarray(factors, dtype=np.float64).reshape(-1)
+    operations = [OPERATION_ADD] * num_inputs if operations is None else operations
+    operations = [OPERATION_NAMES[op] if isinstance(op, str) else int(op) for op in operations]
+    if normalize:
+        input_weights = normalize_weights(input_weights)
+
+    terms = input_weights * factors[:, None]
+    # runs of add and subtract collapse into one sum, only multiply and divide need the running result
+    if all(op in (OPERATION_ADD, OPERATION_SUBTRACT) for op in operations):
+        signs = np.where(np.array(operations) == OPERATION_SUBTRACT, -1.0, 1.0)
+        result = signs @ terms
+    else:
+        start = 1.0 if operations and operations[0] in (OPERATION_MULTIPLY, OPERATION_DIVIDE) else 0.0
+        result = np.full(input_weights.shape[1], start)
+        for term, op in zip(terms, operations):
+            if op == OPERATION_ADD:
+                result += term
+            elif op == OPERATION_SUBTRACT:
+                result -= term
+            elif op == OPERATION_MULTIPLY:
+                result *= term
+            elif op == OPERATION_DIVIDE:
+                # dividing by a zero weight leaves the point untouched
+                result = np.divide(result, term, out=result.copy(), where=term != 0.0)
+    if clamp:
+        result = np.clip(result, 0.0, 1.0)
+    return result
+
+
+def evaluate_weight_stack_data(stack_data):
+    """
+    evaluate_weight_stack on a dict exported by rig.deformers.utils.getWeightStackData, with the node's
+    normalize and clamp state. A node without those attributes exports None, which evaluates as off.
+    """
+    return evaluate_weight_stack(stack_data["input_weights"], stack_data["factors"], stack_data["operations"],
+                                 normalize=bool(stack_data.get("normalize")), clamp=bool(stack_data.get("clamp")))
+
+
+def compare_weights(weights, reference_weights, tolerance=1e-6):
+    """
+    Diffs weights against a reference, e.g. the out_weights getWeightStackData exports.
+
+    Returns:
+        dict: {"max_difference": float, "num_different": int,
+               "different": indices of the points further than tolerance}
+    """
+    differences = np.abs(np.asarray(weights, dtype=np.float64) - np.asarray(reference_weights, dtype=np.float64))
+    different = np.flatnonzero(differences > tolerance)
+    return {"max_difference": float(differences.max(initial=0.0)),
+            "num_different": len(different),
+            "different": different}
+
+
+def matrix_deform(points, matrices, base_matrices, weights, envelope=1.0, membership_weights=None):
+    """
+    The LHMatrixDeformer. Every input moves the points by how its matrix moved away from its base matrix,
+    scaled by its weights:
+
+        p' = p + sum_i(w_i * (p * base_i^-1 * matrix_i - p))
+
+    The per input offsets are blended into one matrix per point, so the cost is one 4x4 product per point
+    no matter how many inputs there are.
+
+    Args:
+        points (np.array): (N, 3) undeformed points.
+        matrices (list): (M,) inputs[i].matrix, flat 16 values or 4x4.
+        base_matrices (list): (M,) inputs[i].matrixBase.
+        weights (list): (M, N) inputs[i].matrixWeight arrays.
+        envelope (float): The deformer envelope.
+        membership_weights (np.array): (N,) the deformer's own painted weights, 1 by default.
+
+    Returns:
+        np.array: (N, 3) deformed points.
+    """
+    points_h = _homogeneous(points)
+    matrices = as_matrices(matrices)
+    base_matrices = as_matrices(base_matrices)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    # how far every input moved, as a matrix that is all zeros when the input sits on its base
+    offsets = np.linalg.inv(base_matrices) @ matrices - np.eye(4)
+    blended = np.einsum("mn,mij->nij", weights, offsets)
+    delta = np.einsum("ni,nij->nj", points_h, blended)[:, :3]
+    scale = envelope if membership_weights is None else envelope * np.asarray(membership_weights, dtype=np.float64)
+    return points_h[:, :3] + np.multiply(scale, delta.T).T
+
+
+def matrix_deform_frames(points, matrix_frames, base_matrices, weights, **kwargs):
+    """
+    matrix_deform for many frames of driver matrices, e.g. a baked animation for per frame validation.
+
+    Args:
+        matrix_frames (list): (F, M) matrices per frame.
+
+    Returns:
+        np.array: (F, N, 3) deformed points per frame.
+    """
+    return np.stack([matrix_deform(points, frame, base_matrices, weights, **kwargs) for frame in matrix_frames])
+
+
+def vector_deform(points, start, end, weights, envelope=1.0):
+    """
+    The LHVectorDeformerSimple, points move along the vector of its two point vector curve, scaled by their weights.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    vector = np.asarray(end, dtype=np.float64) - np.asarray(start, dtype=np.float64)
+    return points + envelope * np.asarray(weights, dtype=np.float64)[:, None] * vector
+
+
+def compare_points(points, reference_points, tolerance=1e-4):
+    """
+    Diffs deformed points against a reference, for rig regression checks.
+
+    Returns:
+        dict: {"max_distance": float, "mean_distance": float, "num_different": int,
+               "different": indices of the points further than tolerance}
+    """
+    distances = np.linalg.norm(np.asarray(points, dtype=np.float64) - np.asarray(reference_points, dtype=np.float64),
+                               axis=1)
+    different = np.flatnonzero(distances > tolerance)
+    return {"max_distance": float(distances.max(initial=0.0)),
+            "mean_distance": float(distances.mean()) if len(distances) else 0.0,
+            "num_different": len(different),
+            "different": different}
@@ -9,6 +9,10 @@ import maya.OpenMaya as OpenMaya
 import math
 import traceback
 import maya.api.OpenMaya as om2
+import maya.api.OpenMayaUI as omui
+import numpy as np
+
+from rig_2.weights import projection
 
 
 # import ka_rigTools.ka_math as ka_math #;reload(ka_math)
@@ -56,6 +60,8 @@ class WeightBlenderInfo(object):
         self.pnt_typeDict = {}    # populated by _getNode method
         self.pnt_worldSpacePostionDict = {}
         self.pnt_cameraSpacePostionDict = {}
+        self.nodePointsDict = {}    # (key=node, value=(N, 3) world space points of the whole node, meshes only)
+        self.nodeCameraSpaceDict = {}    # (key=node, value=(N, 3) camera space points of the whole node)
         self.pnt_complexIndexDict = {}    # may be represented by multiple numbers ie: nurbs / lattice
         self.pnt_simpleIndexDict = {}    # corrispnds to components index in the skin cluster
 
@@ -91,7 +97,7 @@ class WeightBlenderInfo(object):
 
         # other info
         self.currentCamera = getCurrentCamera()
-        self.currentCameraMMatrix = getMMatrix(self.currentCamera, matrixType='worldInverseMatrix')
+        self.cameraSettings = getCameraSettings(self.currentCamera)
 
         # target icons
         self.deleteTargetIcons()
@@ -476,6 +482,14 @@ class WeightBlenderInfo(object):
             self.targetAWeightDict = {}
             self.targetBWeightDict = {}
 
+        # every point the blend needs, fetched in one go per mesh
+        pointIDs = list(self.iconPointsA) + list(self.iconPointsB)
+        for pointID in self.selectedPointIDs:
+            pointIDs.append(pointID)
+            pointIDs.extend(self.strandTargetSequencesA_dict[pointID][self.currentSequence])
+            pointIDs.extend(self.strandTargetSequencesB_dict[pointID][self.currentSequence])
+        self._storeSkinWeights(pointIDs)
+
         for targetA in self.iconPointsA:
             self._getSkinWeights(targetA)
 
@@ -607,20 +621,34 @@ class WeightBlenderInfo(object):
     def _getSkinWeights(self, pointID, refresh=False):
 
         if pointID not in self.weightDict:
-            node = self._getNode(pointID)
+            self._storeSkinWeights([pointID], refresh=refresh)
+
+    def _storeSkinWeights(self, pointIDs, refresh=False):
+        """Stores the weights of many points, one getWeights call per mesh instead of a skinPercent per point"""
+        pointsOfNode = {}
+        for pointID in pointIDs:
+            if pointID not in self.weightDict:
+                pointsOfNode.setdefault(self._getNode(pointID), {})[pointID] = None
+
+        for node, nodePointIDs in pointsOfNode.items():
+            nodePointIDs = list(nodePointIDs)
             skinCluster = self.skinClusterDict.get(node, None)
             if not skinCluster or refresh == True:
-                skinCluster =  findRelatedSkinCluster(self.pntDict[pointID])
+                skinCluster =  findRelatedSkinCluster(self.pntDict[nodePointIDs[0]])
                 self.skinClusterDict[node] = skinCluster
 
                 influences = self._getInfluences(skinCluster)
 
-            weights = pymel.skinPercent(skinCluster, self.pntDict[pointID], query=True, value=True )
-            self.weightDict[pointID] = {}
+            if self.pnt_typeDict[nodePointIDs[0]] == 'mesh':
+                vertIndices = [self._getComplexPointIndices(pointID)[0] for pointID in nodePointIDs]
+                weightMatrix = getSkinWeightMatrix(skinCluster, node, vertIndices)
+            else:
+                weightMatrix = [pymel.skinPercent(skinCluster, self.pntDict[pointID], query=True, value=True)
+                                for pointID in nodePointIDs]
 
-            for i, weight in enumerate(weights):
-                if weight:
-                    self.weightDict[pointID][i] = weight
+            for pointID, weights in zip(nodePointIDs, weightMatrix):
+                weights = np.asarray(weights, dtype=np.float64)
+                self.weightDict[pointID] = {int(i): float(weights[i]) for i in np.flatnonzero(weights)}
 
 
     def _getInfluences(self, skinCluster):
@@ -1295,8 +1323,11 @@ class WeightBlenderInfo(object):
             if pointID in self.pnt_worldSpacePostionDict:
                 return self.pnt_worldSpacePostionDict[pointID]
 
-        point = self.pntDict[pointID]
-        worldPosition = pymel.xform(point, query=True, translation=True, worldSpace=True)
+        nodePoints = self._getNodePoints(self._getNode(pointID), refresh=refresh)
+        if nodePoints is not None:
+            worldPosition = nodePoints[self._getComplexPointIndices(pointID)[0]].tolist()
+        else:
+            worldPosition = pymel.xform(self.pntDict[pointID], query=True, translation=True, worldSpace=True)
         self.pnt_worldSpacePostionDict[pointID] = worldPosition
 
         return worldPosition
@@ -1307,21 +1338,40 @@ class WeightBlenderInfo(object):
             if pointID in self.pnt_cameraSpacePostionDict:
                 return self.pnt_cameraSpacePostionDict[pointID]
 
-        if not refresh:
-            if pointID in self.pnt_worldSpacePostionDict:
-                pointWorldSpace = self.pnt_worldSpacePostionDict[pointID]
-            else:
-                pointWorldSpace = self._getWorldSpacePosition(pointID)
+        # meshes are projected whole, once, every point after that is a lookup
+        node = self._getNode(pointID)
+        if refresh:
+            self._getNodePoints(node, refresh=True)
+        cameraSpacePoints = self._getNodeCameraSpace(node)
+        if cameraSpacePoints is not None:
+            result = cameraSpacePoints[self._getComplexPointIndices(pointID)[0]]
+        else:
+            pointWorldSpace = self._getWorldSpacePosition(pointID, refresh=refresh)
+            result = projection.to_camera_space(pointWorldSpace, self.cameraSettings['world_inverse_matrix'])[0]
 
-        camera = self.currentCamera
+        self.pnt_cameraSpacePostionDict[pointID] = result.tolist()
+        return self.pnt_cameraSpacePostionDict[pointID]
 
+    def _getNodePoints(self, node, refresh=False):
+        """Returns the (N, 3) world space points of a whole mesh from one xform call, None for other types"""
+        if node not in self.nodePointsDict or refresh:
+            points = None
+            if pymel.nodeType(node) == 'mesh':
+                points = cmds.xform('%s.vtx[*]' % node, query=True, translation=True, worldSpace=True)
+                points = np.array(points, dtype=np.float64).reshape(-1, 3)
+            self.nodePointsDict[node] = points
+            self.nodeCameraSpaceDict.pop(node, None)
 
-        # get point in camera space
-        aPoint = OpenMaya.MPoint(pointWorldSpace[0], pointWorldSpace[1], pointWorldSpace[2])
-        result = aPoint * self.currentCameraMMatrix
+        return self.nodePointsDict[node]
 
-        self.pnt_cameraSpacePostionDict[pointID] = [result.x, result.y, result.z]
-        return self.pnt_cameraSpacePostionDict[pointID]
+    def _getNodeCameraSpace(self, node):
+        if node not in self.nodeCameraSpaceDict:
+            points = self._getNodePoints(node)
+            if points is not None:
+                points = projection.to_camera_space(points, self.cameraSettings['world_inverse_matrix'])
+            self.nodeCameraSpaceDict[node] = points
+
+        return self.nodeCameraSpaceDict[node]
 
     def _getNode(self, pointID):
         if pointID not in self.nodeOfpointDict:
@@ -1783,6 +1833,56 @@ def getCurrentCamera():
     return camera
 
 
+def getCameraSettings(camera=None, width=None, height=None):
+    """Returns the projection.camera_settings of a camera, sized to the active viewport by default"""
+    camera = str(camera or getCurrentCamera())
+    if width is None or height is None:
+        view = omui.M3dView.active3dView()
+        width, height = view.portWidth(), view.portHeight()
+
+    return projection.camera_settings(cmds.getAttr(camera+'.worldInverseMatrix'),
+                                      width,
+                                      height,
+                                      focal_length=cmds.getAttr(camera+'.focalLength'),
+                                      horizontal_aperture=cmds.getAttr(camera+'.horizontalFilmAperture'),
+                                      vertical_aperture=cmds.getAttr(camera+'.verticalFilmAperture'),
+                                      film_fit=cmds.getAttr(camera+'.filmFit'),
+                                      orthographic=cmds.getAttr(camera+'.orthographic'),
+                                      orthographic_width=cmds.getAttr(camera+'.orthographicWidth'),
+                                      near_clip=cmds.getAttr(camera+'.nearClipPlane'))
+
+
+def getSkinWeightMatrix(skinCluster, mesh, vertIndices=None):
+    """Returns the (N, influences) weights of a mesh's vertices from one MFnSkinCluster.getWeights call.
+
+    Columns are in influence order, the same order skinPercent -query -value gives.
+
+    kwArgs:
+        vertIndices - list of vertex indices, rows are in this order. Every vertex if None
+    """
+    selectionList = om2.MSelectionList()
+    selectionList.add(str(skinCluster))
+    selectionList.add(str(mesh))
+    skinFn = om2.MFnSkinCluster(selectionList.getDependNode(0))
+    dagPath = selectionList.getDagPath(1)
+
+    componentFn = om2.MFnSingleIndexedComponent()
+    component = componentFn.create(om2.MFn.kMeshVertComponent)
+    if vertIndices is None:
+        componentFn.setCompleteData(om2.MFnMesh(dagPath).numVertices)
+    else:
+        componentFn.addElements(list(vertIndices))
+
+    weights, influenceCount = skinFn.getWeights(dagPath, component)
+    weightMatrix = np.array(weights, dtype=np.float64).reshape(-1, influenceCount)
+    if vertIndices is None:
+        return weightMatrix
+
+    # getWeights gives the weights in ascending vertex order, whatever order they were added in
+    order = np.argsort(np.argsort(vertIndices, kind='stable'), kind='stable')
+    return weightMatrix[order]
+
+
 def getMMatrix(transform, matrixType='worldMatrix'):
     """Returns transform as MMatrix"""
     matrix = pymel.getAttr(transform+".%s" % matrixType)
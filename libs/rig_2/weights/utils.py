@@ -557,16 +557,12 @@ def get_weight_curves_dict(no_export_dict, do_weight_curves=True, do_falloff_wei
     weight_curve_dict = {}
     falloff_weight_curve_dict = {}
     if do_weight_curves:
-        for curve in weight_curves:
-            if curve in list(no_export_dict.keys()) and "NO_EXPORT" in no_export_dict[curve]:
-                continue
-            weight_curve_dict[curve] = animcurve_utils.getAnimCurve(curve)
+        weight_curve_dict = animcurve_utils.get_anim_curves([curve for curve in weight_curves
+                                                             if "NO_EXPORT" not in no_export_dict.get(curve, [])])
 
     if do_falloff_weight_curves:
-        for curve in falloff_weight_curves:
-            if curve in list(no_export_dict.keys()) and "NO_EXPORT" in no_export_dict[curve]:
-                continue
-            falloff_weight_curve_dict[curve] = animcurve_utils.getAnimCurve(curve)
+        falloff_weight_curve_dict = animcurve_utils.get_anim_curves([curve for curve in falloff_weight_curves
+                                                                     if "NO_EXPORT" not in no_export_dict.get(curve, [])])
     
     return weight_curve_dict, falloff_weight_curve_dict
 
@@ -577,23 +573,20 @@ def rebuildAnimCurveWeightsCurves(no_export_tag_dict,
                                   weight_curves=True,
                                   falloff_weight_curves=True):
 
+    shapes = {}
     if weight_curves and weight_curve_dict:
-        for curve in list(weight_curve_dict.keys()):
-            if curve in list(no_export_tag_dict.keys()) and "NO_EXPORT" in no_export_tag_dict[curve]:
-                continue
-            if not cmds.objExists(curve):
-                print(curve + " Does not exist anymore, will not be able to set it")
-                continue
-            animcurve_utils.setAnimCurveShape(curve, weight_curve_dict[curve])
-
+        shapes.update(weight_curve_dict)
     if falloff_weight_curves and falloff_weight_curve_dict:
-        for curve in list(falloff_weight_curve_dict.keys()):
-            if curve in list(no_export_tag_dict.keys()) and "NO_EXPORT" in no_export_tag_dict[curve]:
-                continue
-            if not cmds.objExists(curve):
-                print(curve + " Does not exist anymore, will not be able to set it")
-                continue
-            animcurve_utils.setAnimCurveShape(curve, falloff_weight_curve_dict[curve])
+        shapes.update(falloff_weight_curve_dict)
+    for curve in list(shapes.keys()):
+        if curve in list(no_export_tag_dict.keys()) and "NO_EXPORT" in no_export_tag_dict[curve]:
+            shapes.pop(curve)
+            continue
+        if not cmds.objExists(curve):
+            print(curve + " Does not exist anymore, will not be able to set it")
+            shapes.pop(curve)
+    # every curve is set in one pass
+    animcurve_utils.set_anim_curve_shapes(shapes)
 
 def removeAllCurveWeightsNodes():
     nodes = cmds.ls(type="LHCurveWeightNode_2")
@@ -2,6 +2,11 @@ import importlib
 import pkgutil
 import sys
 
+# submodules are imported on first attribute access, see rpdecorator.lazyload
+from rpdecorator import lazyload
+
+__getattr__, __dir__ = lazyload.lazy_submodules(__name__)
+
 def recursive_reload(package):
     """
     Recursively reloads all modules in a package.
@@ -3,38 +3,14 @@ from importlib import reload
 from functools import wraps
 from maya import cmds
 from rigbdp.build import locking
+from rpdecorator import nodetracker
 reload(locking)
+reload(nodetracker)
 
 import maya.cmds as cmds
 
-def return_created_nodes(func):
-    """
-    This function is to return nodes created by a maya command that doesn't return anything
-    
-    It does this by:
-    1. find all nodes before function runs
-    2. run function
-    3. find all nodes after the function runs
-    4. find the nodes that were not in the first list - these are the created nodes
-    5. return the newly created nodes
-
-    """
-    def wrapper(*args, **kwargs):
-        # Get the current list of all nodes in the scene before running the function
-        all_nodes_before = cmds.ls(long=True)
-        
-        # Run the function
-        result = func(*args, **kwargs)
-        
-        # Get the list of all nodes after running the function
-        all_nodes_after = cmds.ls(long=True)
-        
-        # Find the difference between nodes before and after
-        created_nodes = list(set(all_nodes_after) - set(all_nodes_before))
-        
-        return created_nodes  # Return the list of created nodes
-    
-    return wrapper
+# callback based, the cost scales with the number of new nodes instead of the scene size
+return_created_nodes = nodetracker.return_created_nodes
 
 
 def wrap_eyebrows():
@@ -0,0 +1,154 @@
+r'''
+Binary checkpoint snapshots for rig builds.
+
+Builds used to save the full mayaAscii scene after every stage, a checkpoint saves a mayaBinary
+snapshot to a temp directory instead, and the final .ma is only written once by finalize().
+The scene keeps its build output name the whole time, so a plain cmds.file(save=True) still
+writes to the right place.
+
+Until finalize() runs there is no .ma in the build output, a build that crashes part way only leaves the
+.mb checkpoints in checkpoint_dir. latest() is the one to open to pick the build up from there.
+
+# --- Example
+from rigbdp.build import checkpoint
+checkpoints = checkpoint.Checkpoints(cadence=1, keep=2)
+checkpoints.save('add_vendor_rig')
+checkpoints.save('import_correctives')
+checkpoints.list()                       # ['add_vendor_rig', 'import_correctives'] (keep=2)
+checkpoints.restore('add_vendor_rig')    # back to the scene right after the vendor rig import
+checkpoints.finalize()                   # one mayaAscii save to the scene's build output path
+'''
+# builtins
+import os, shutil, tempfile
+
+# third party
+from maya import cmds
+
+
+class Checkpoints:
+    def __init__(self, checkpoint_dir=None, cadence=1, keep=2, file_type='mayaBinary'):
+        """
+        Args:
+            checkpoint_dir (str): Where snapshots are written. Defaults to a new temp directory.
+            cadence (int): Only every nth call to save() writes a snapshot. 0 turns checkpoints off.
+            keep (int): How many snapshots to keep, older ones are deleted. 0 keeps all of them.
+            file_type (str): The maya file type for snapshots.
+        """
+        self.checkpoint_dir = checkpoint_dir
+        # only a temp dir made by this class is deleted on cleanup, a given dir only loses its snapshots
+        self._owns_dir = not checkpoint_dir
+        self.cadence = cadence
+        self.keep = keep
+        self.file_type = file_type
+        self.extension = '.mb' if file_type == 'mayaBinary' else '.ma'
+        self.save_calls = 0
+        # [(label, path)] oldest first
+        self.snapshots = []
+
+    def _get_dir(self):
+        if not self.checkpoint_dir:
+            self.checkpoint_dir = tempfile.mkdtemp(prefix='rigbdp_checkpoints_')
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        return self.checkpoint_dir
+
+    def save(self, label, force=False):
+        """
+        Saves a snapshot of the current scene if the cadence says so.
+
+        Args:
+            label (str): The name of the snapshot, usually the build stage that just finished.
+            force (bool): Save regardless of the cadence.
+
+        Returns:
+            str: The snapshot path, or None if nothing was saved.
+        """
+        self.save_calls += 1
+        if not force and (not self.cadence or self.save_calls % self.cadence):
+            return None
+
+        path = os.path.join(self._get_dir(), f'{len(self.snapshots):03}_{label}{self.extension}')
+        scene_name = cmds.file(query=True, sceneName=True)
+        # save under the snapshot name, then put the build output name back so the scene is unchanged
+        cmds.file(rename=path)
+        try:
+            cmds.file(save=True, type=self.file_type, force=True)
+        finally:
+            if scene_name:
+                cmds.file(rename=scene_name)
+
+        self.snapshots.append((label, path))
+        self._prune()
+        print(f'Checkpoint saved: {label} -> {path}')
+        return path
+
+    def _prune(self):
+        if not self.keep:
+            return
+        while len(self.snapshots) > self.keep:
+            _, path = self.snapshots.pop(0)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def list(self):
+        """
+        Returns the labels of the snapshots that are still on disk, oldest first.
+        """
+        return [label for label, _ in self.snapshots]
+
+    def latest(self):
+        """
+        Returns the path of the newest snapshot, None if there isn't one.
+        """
+        return self.snapshots[-1][1] if self.snapshots else None
+
+    def restore(self, label=None):
+        """
+        Opens a snapshot, the scene is renamed back to the build output name so the build can carry on.
+
+        Args:
+            label (str): The snapshot to restore. Defaults to the latest one.
+
+        Returns:
+            str: The restored snapshot path.
+        """
+        if not self.snapshots:
+            cmds.error('There are no checkpoints to restore.')
+        matches = [path for snapshot_label, path in self.snapshots if label is None or snapshot_label == label]
+        if not matches:
+            cmds.error(f'No checkpoint named {label}, available checkpoints are {self.list()}')
+        path = matches[-1]
+
+        scene_name = cmds.file(query=True, sceneName=True)
+        cmds.file(path, open=True, force=True)
+        if scene_name:
+            cmds.file(rename=scene_name)
+        print(f'Checkpoint restored: {path}')
+        return path
+
+    def finalize(self, output_path=None, file_type='mayaAscii', cleanup=True):
+        """
+        Writes the final scene once, then removes the snapshots.
+
+        Args:
+            output_path (str): Where to save. Defaults to the current scene name.
+            file_type (str): The maya file type of the final save.
+            cleanup (bool): Delete the checkpoint directory after saving.
+
+        Returns:
+            str: The saved path.
+        """
+        if output_path:
+            cmds.file(rename=output_path)
+        saved = cmds.file(save=True, type=file_type, force=True)
+        if cleanup:
+            self.cleanup()
+        return saved
+
+    def cleanup(self):
+        for _, path in self.snapshots:
+            if os.path.isfile(path):
+                os.remove(path)
+        if self._owns_dir and self.checkpoint_dir and os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+            self.checkpoint_dir = None
+        self.snapshots = []
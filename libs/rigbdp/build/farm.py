@@ -0,0 +1,280 @@
+r'''
+Batch build runner for rigbdp.builders characters.
+
+Every build runs in its own headless mayapy process, a pool of worker threads keeps up to
+"workers" of those processes busy at once. The parent only finds the builder scripts, streams the logs
+and collects results, it never initializes maya itself.
+
+A job builds the character's builder script, rigbdp.builders.<char_name>, through rigbuild_mini.run_builder,
+the same entry point the script runs by hand, so farm and hand builds can't drift apart. RigMerge checkpoints
+every stage, a failed stage is retried from the latest of those checkpoints.
+
+# --- Example, nightly rebuild of the cast
+from rigbdp.build import farm
+jobs = [
+    farm.BuildJob('aide', 8),
+    farm.BuildJob('ally', 14),
+    farm.BuildJob('jsh', 14, stages=['add_vendor_rig', 'import_correctives']),
+]
+report = farm.run_builds(jobs, dir_to_char=r'C:\Users\harri\Documents\BDP\cha', workers=3)
+
+# --- Or from a shell
+mayapy -m rigbdp.build.farm --dir-to-char C:/Users/harri/Documents/BDP/cha --workers 3 aide:8 ally:14 jsh:14
+'''
+# builtins
+import argparse, importlib, importlib.util, json, os, shutil, subprocess, sys, tempfile, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# every worker is a full mayapy with a character loaded, without a worker count only this many run at once
+MAX_DEFAULT_WORKERS = 2
+# the worker prints its result on a line starting with this so it can be picked out of the maya log
+RESULT_TAG = 'RIGBDP_FARM_RESULT '
+# serialize printing from the worker threads so streamed lines don't interleave mid-line
+_PRINT_LOCK = threading.Lock()
+
+
+class BuildJob:
+    def __init__(self,
+                 char_name,
+                 version,
+                 stages=None,
+                 rig_merge_kwargs=None,
+                 stage_retries=1):
+        """
+        One character build.
+
+        Args:
+            char_name (str): The character name, the directory name under dir_to_char.
+            version (int): The new version number used for the output filename.
+            stages (list): Names of the builder's STAGES functions to run. Defaults to all of them.
+            rig_merge_kwargs (dict): Extra RigMerge args on top of the builder's, for example {'checkpoint_dir': path}.
+            stage_retries (int): How many times a failed stage is retried before the build is marked failed.
+        """
+        self.char_name = char_name
+        self.version = version
+        self.stages = stages
+        self.rig_merge_kwargs = rig_merge_kwargs or {}
+        self.stage_retries = stage_retries
+
+    @property
+    def label(self):
+        return f'{self.char_name}_v{self.version:03}'
+
+
+def find_mayapy():
+    """
+    Finds the mayapy interpreter, first from MAYA_LOCATION then from the PATH.
+    Inside of a maya session the running interpreter's directory is also checked.
+    """
+    exe = 'mayapy.exe' if sys.platform.startswith('win') else 'mayapy'
+    candidates = []
+    if os.environ.get('MAYA_LOCATION'):
+        candidates.append(os.path.join(os.environ['MAYA_LOCATION'], 'bin', exe))
+    candidates.append(os.path.join(os.path.dirname(sys.executable), exe))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which(exe)
+
+
+def builder_module(char_name):
+    """
+    The module name of a character's builder script, found without importing it, the parent never loads maya.
+    """
+    module_name = f'rigbdp.builders.{char_name}'
+    if importlib.util.find_spec(module_name) is None:
+        return None
+    return module_name
+
+
+def _print_line(label, line):
+    with _PRINT_LOCK:
+        print(f'[{label}] {line}')
+
+
+def _run_job(job, dir_to_char, interpreter, log_dir, job_retries):
+    """
+    Runs a single job in a child interpreter and returns its report entry.
+    A build that crashes without reporting a result (maya segfault, killed process) is rerun from the start
+    up to job_retries times, failed stages inside a live build are retried by the worker itself.
+    """
+    entry = {'char_name': job.char_name,
+             'version': job.version,
+             'status': 'failed',
+             'attempts': 0,
+             'seconds': 0.0,
+             'stages': [],
+             'log_path': os.path.join(log_dir, f'{job.label}.log'),
+             'error': None}
+    start = time.perf_counter()
+
+    module_name = builder_module(job.char_name)
+    if not module_name:
+        entry['error'] = f'No builder script rigbdp/builders/{job.char_name}.py'
+        entry['seconds'] = time.perf_counter() - start
+        return entry
+
+    spec_path = os.path.join(log_dir, f'{job.label}.json')
+    with open(spec_path, 'w') as f:
+        json.dump({'builder': module_name,
+                   'dir_to_char': dir_to_char,
+                   'version': job.version,
+                   'rig_merge_kwargs': job.rig_merge_kwargs,
+                   'stages': job.stages,
+                   'stage_retries': job.stage_retries}, f, indent=4)
+
+    cmd = [interpreter, '-u', '-m', 'rigbdp.build.farm', '--worker', spec_path]
+    env = dict(os.environ)
+    # make sure the child finds this copy of the libs, not whatever is on the default path
+    libs_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([libs_dir, env.get('PYTHONPATH', '')])
+
+    for attempt in range(1, job_retries + 2):
+        entry['attempts'] = attempt
+        result = None
+        with open(entry['log_path'], 'a') as log:
+            log.write(f'\n######## attempt {attempt} ########\n')
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       env=env, text=True, bufsize=1)
+            for line in process.stdout:
+                line = line.rstrip('\n')
+                log.write(line + '\n')
+                if line.startswith(RESULT_TAG):
+                    result = json.loads(line[len(RESULT_TAG):])
+                    continue
+                _print_line(job.label, line)
+            returncode = process.wait()
+
+        if result is not None:
+            entry['status'] = result['status']
+            entry['stages'] = result['stages']
+            entry['error'] = result['error']
+            break
+        entry['error'] = f'Build process exited with code {returncode} without reporting a result'
+        _print_line(job.label, f'{entry["error"]}, attempt {attempt} of {job_retries + 1}')
+
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def run_builds(jobs, dir_to_char, workers=None, interpreter=None, log_dir=None, report_path=None,
+               job_retries=1):
+    """
+    Runs a list of builds in parallel, each in its own headless maya process.
+
+    Args:
+        jobs (list): BuildJob instances, or (char_name, version) tuples.
+        dir_to_char (str): The base directory where all characters live, same as the builder scripts.
+        workers (int): How many builds to run at once. Defaults to MAX_DEFAULT_WORKERS, each one is a full mayapy
+                       session, raise it only on machines with the memory for it.
+        interpreter (str): The interpreter to build with. Defaults to find_mayapy().
+        log_dir (str): Where per build logs, job specs and the report are written. Defaults to a temp dir.
+        report_path (str): The json report path. Defaults to build_report.json in the log_dir.
+        job_retries (int): How many times a build that crashed is rerun from scratch.
+
+    Returns:
+        list: One report dict per job, with status, per stage timings, log path and error.
+    """
+    jobs = [job if isinstance(job, BuildJob) else BuildJob(*job) for job in jobs]
+    workers = workers or min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1)
+    interpreter = interpreter or find_mayapy()
+    if not interpreter:
+        raise RuntimeError('Could not find mayapy, set MAYA_LOCATION or pass the interpreter in')
+    log_dir = log_dir or tempfile.mkdtemp(prefix='rigbdp_farm_')
+    os.makedirs(log_dir, exist_ok=True)
+    report_path = report_path or os.path.join(log_dir, 'build_report.json')
+
+    print(f'Building {len(jobs)} characters with {workers} workers, logs in {log_dir}')
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_job, job, dir_to_char, interpreter, log_dir, job_retries) for job in jobs]
+        report = [future.result() for future in futures]
+    total = time.perf_counter() - start
+
+    with open(report_path, 'w') as f:
+        json.dump({'total_seconds': total, 'workers': workers, 'builds': report}, f, indent=4)
+    print_report(report, total)
+    print(f'Report written to {report_path}')
+    return report
+
+
+def print_report(report, total=None):
+    print('\n############################################ BUILD REPORT ############################################')
+    for entry in report:
+        label = f'{entry["char_name"]}_v{entry["version"]:03}'
+        print(f'{label:<30}{entry["status"]:<10}{entry["seconds"]:>10.1f}s   attempts: {entry["attempts"]}')
+        for stage in entry['stages']:
+            print(f'    {stage["name"]:<26}{stage["status"]:<10}{stage["seconds"]:>10.1f}s   tries: {stage["tries"]}')
+        if entry['error']:
+            print(f'    error: {entry["error"]}')
+    if total is not None:
+        print(f'{"total":<40}{total:>10.1f}s')
+    print('######################################################################################################\n')
+
+
+def _worker(spec_path):
+    """
+    Runs inside the child mayapy process. Builds one character and prints the result as a tagged json line.
+    """
+    with open(spec_path, 'r') as f:
+        spec = json.load(f)
+    result = {'status': 'failed', 'stages': [], 'error': None}
+
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        from rigbdp.build import rigbuild_mini
+
+        # importing a builder script only defines its stages, the build runs here
+        builder = importlib.import_module(spec['builder'])
+        rigbuild_mini.run_builder(builder,
+                                  dir_to_char=spec['dir_to_char'],
+                                  version=spec['version'],
+                                  stages=spec['stages'],
+                                  stage_retries=spec['stage_retries'],
+                                  report=result['stages'],
+                                  **spec['rig_merge_kwargs'])
+        result['status'] = 'ok'
+    except Exception as e:
+        traceback.print_exc()
+        failed = [stage['name'] for stage in result['stages'] if stage['status'] != 'ok']
+        result['error'] = f'Stage {failed[0]} failed: {e}' if failed else str(e)
+
+    sys.stdout.flush()
+    print(RESULT_TAG + json.dumps(result))
+    sys.stdout.flush()
+    # maya.standalone.uninitialize can hang on some versions, the process is done anyway
+    os._exit(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch build rigbdp characters in parallel headless maya processes.')
+    parser.add_argument('builds', nargs='*', help='char_name:version pairs, for example aide:8 ally:14')
+    parser.add_argument('--dir-to-char', help='The base directory where all characters live.')
+    parser.add_argument('--workers', type=int, default=None, help=f'Builds to run at once, defaults to {MAX_DEFAULT_WORKERS}.')
+    parser.add_argument('--stages', nargs='+', default=None, help='Builder stages to run, defaults to all of them.')
+    parser.add_argument('--stage-retries', type=int, default=1)
+    parser.add_argument('--job-retries', type=int, default=1)
+    parser.add_argument('--interpreter', default=None)
+    parser.add_argument('--log-dir', default=None)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker(args.worker)
+        return
+
+    if not args.builds or not args.dir_to_char:
+        parser.error('builds and --dir-to-char are required')
+    jobs = []
+    for build in args.builds:
+        char_name, version = build.split(':')
+        jobs.append(BuildJob(char_name, int(version), stages=args.stages, stage_retries=args.stage_retries))
+    report = run_builds(jobs, args.dir_to_char, workers=args.workers, interpreter=args.interpreter,
+                        log_dir=args.log_dir, report_path=args.report, job_retries=args.job_retries)
+    sys.exit(0 if all(entry['status'] == 'ok' for entry in report) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+'''
+Lock plans, the lock state a rig should end up with written down as data.
+
+A plan maps plugs to the state they should have, only the keys given are set:
+    {"M_root_ctrl.visibility": {"lock": True, "keyable": False, "channel_box": False, "value": 1}}
+
+Locking a rig is then three steps, only the last one touches maya:
+1. plan   - make_plan / merge_plans build the full plan up front
+2. diff   - diff_plan compares it to the current state (see locking.get_lock_state) and keeps only what changes
+3. apply  - locking.apply_lock_plan runs the changes in one undo chunk, undoable as a whole
+
+Everything here is plain python so plans can be built, diffed and checked without maya, and saved
+to json to version and audit the lock state of a rig.
+
+Values are numeric (bool, int, float), which is what lock helpers set, visibility and the like.
+
+# --- Example
+from rigbdp.build import lock_plan
+plan = lock_plan.make_plan(['M_root_ctrl.visibility', 'M_cog_ctrl.visibility'], lock=True, keyable=False)
+current = {'M_root_ctrl.visibility': {'lock': False, 'keyable': True, 'channel_box': False},
+           'M_cog_ctrl.visibility': {'lock': True, 'keyable': False, 'channel_box': False}}
+changes, skipped = lock_plan.diff_plan(plan, current)
+# changes == {'M_root_ctrl.visibility': {'lock': True, 'keyable': False}}
+lock_plan.save_plan(plan, 'C:/rigs/teshi/teshi_LOCK_PLAN.json')
+'''
+# builtins
+import json
+
+PLAN_VERSION = 1
+# the order flags are written in, lock last so a locked plug can still get its value first
+STATE_KEYS = ('value', 'keyable', 'channel_box', 'lock')
+VALUE_TOLERANCE = 1e-6
+
+
+def make_plan(plugs, lock=None, keyable=None, channel_box=None, value=None):
+    """
+    The same state for many plugs, None leaves that part of the state alone.
+
+    Args:
+    - plugs (list): 'node.attr' names.
+    - lock (bool): Locked or unlocked.
+    - keyable (bool): Keyable, which also shows the attr in the channel box.
+    - channel_box (bool): Shown in the channel box while not keyable.
+    - value (float): The value to set, numeric only.
+    Returns:
+    - dict: {plug: {key: state}}
+    """
+    state = {key: val for key, val in (('lock', lock), ('keyable', keyable),
+                                       ('channel_box', channel_box), ('value', value)) if val is not None}
+    return {plug: dict(state) for plug in plugs}
+
+
+def merge_plans(*plans):
+    """
+    Merges plans in order, later plans win per plug and per key.
+    """
+    merged = {}
+    for plan in plans:
+        for plug, state in plan.items():
+            merged.setdefault(plug, {}).update(state)
+    return merged
+
+
+def _differs(key, wanted, current):
+    if key == 'value':
+        return abs(float(wanted) - float(current)) > VALUE_TOLERANCE
+    return bool(wanted) != bool(current)
+
+
+def diff_plan(plan, current):
+    """
+    What has to change to go from the current state to the plan.
+
+    Args:
+    - plan (dict): {plug: {key: state}}
+    - current (dict): {plug: state} as read by locking.get_lock_state, with 'lock', 'keyable', 'channel_box',
+                      'connected' and, for plugs the plan sets a value on, 'value'. Plugs that don't exist are left out.
+    Returns:
+    - tuple: (changes, skipped)
+             changes {plug: {key: new state}} only the keys that differ
+             skipped {plug: reason} for plugs that can't get their state, 'missing', 'connected' or 'locked'
+    """
+    changes = {}
+    skipped = {}
+    for plug, wanted in plan.items():
+        state = current.get(plug)
+        if state is None:
+            skipped[plug] = 'missing'
+            continue
+        change = {key: wanted[key] for key in STATE_KEYS if key in wanted and _differs(key, wanted[key], state[key])}
+        if 'value' in change:
+            # a value can't be set through an incoming connection, or on a locked plug the plan doesn't
+            # say anything about locking, a plan with a lock gets the value set in between unlocking and relocking
+            if state.get('connected'):
+                skipped[plug] = 'connected'
+                del change['value']
+            elif state['lock'] and 'lock' not in wanted:
+                skipped[plug] = 'locked'
+                del change['value']
+        if change:
+            changes[plug] = change
+    return changes, skipped
+
+
+def restore_plan(changes, current):
+    """
+    The plan that puts changed plugs back to how they were, to undo or audit an apply.
+    """
+    return {plug: {key: current[plug][key] for key in change} for plug, change in changes.items()}
+
+
+def _mel_value(value):
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(value)
+
+
+def changes_to_mel(changes, current):
+    """
+    The setAttr calls of a set of changes, one MEL string apply_lock_plan runs in one go.
+    Every call is wrapped in catchQuiet so one bad plug doesn't stop the rest, check what
+    didn't change by diffing again after applying.
+
+    Returns:
+    - str: MEL
+    """
+    lines = []
+    for plug, change in changes.items():
+        locked = current[plug]['lock']
+        if 'value' in change:
+            if locked:
+                lines.append(f'catchQuiet(`setAttr -lock 0 "{plug}"`);')
+                locked = False
+            lines.append(f'catchQuiet(`setAttr "{plug}" {_mel_value(change["value"])}`);')
+        flags = []
+        if 'keyable' in change:
+            flags.append(f'-keyable {int(change["keyable"])}')
+        if 'channel_box' in change:
+            flags.append(f'-channelBox {int(change["channel_box"])}')
+        final_lock = change.get('lock', current[plug]['lock'])
+        if bool(final_lock) != bool(locked):
+            flags.append(f'-lock {int(final_lock)}')
+        if flags:
+            lines.append(f'catchQuiet(`setAttr {" ".join(flags)} "{plug}"`);')
+    return '\n'.join(lines)
+
+
+def save_plan(plan, file_path, notes=''):
+    """
+    Writes a plan to json, plugs sorted so saved plans diff cleanly in version control.
+
+    Args:
+    - plan (dict): {plug: {key: state}}
+    - file_path (str): The json file.
+    - notes (str): Saved with the plan, e.g. what it locks and why.
+    """
+    data = {'version': PLAN_VERSION, 'notes': notes, 'plugs': plan}
+    with open(file_path, 'w') as json_file:
+        json.dump(data, json_file, indent=4, sort_keys=True)
+
+
+def load_plan(file_path):
+    """
+    Returns:
+    - dict: The plan saved with save_plan.
+    """
+    with open(file_path, 'r') as json_file:
+        data = json.load(json_file)
+    if data.get('version', PLAN_VERSION) > PLAN_VERSION:
+        raise ValueError(f'{file_path} is a version {data["version"]} lock plan, this reads up to version {PLAN_VERSION}.')
+    return data['plugs']
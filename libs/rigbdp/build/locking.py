@@ -2,10 +2,13 @@
 import importlib, os, sys, json
 
 # third party
-from maya import cmds
+from maya import cmds, mel
+import maya.api.OpenMaya as om2
 
 # bdp
 from rigbdp.import_export import get_scene_dir
+from rigbdp.build import lock_plan
+importlib.reload(lock_plan)
 
 ############################################################################################################################################################
 ##################################################################### Rig Unlocking ########################################################################
@@ -60,21 +63,144 @@ NODE_TYPES = [
     "lattice"
 ]
 
+############################################################################################################################################################
+####################################################################### Lock Engine ########################################################################
+############################################################################################################################################################
+# The helpers below don't setAttr plug by plug anymore, they build a lock plan (see rigbdp.build.lock_plan),
+# diff it against the scene and apply only what changes as setAttr calls in one undo chunk.
+
+def get_lock_state(plugs, value_plugs=()):
+    """
+    Reads the lock state of plugs through the API.
+    Args:
+    - plugs (list): 'node.attr' names.
+    - value_plugs (list): Plugs to also read the numeric value of.
+    Returns:
+    - dict: {plug: {'lock', 'keyable', 'channel_box', 'connected'[, 'value']}}, plugs that don't exist are left out.
+    """
+    value_plugs = set(value_plugs)
+    state = {}
+    for plug_name in plugs:
+        try:
+            plug = om2.MSelectionList().add(plug_name).getPlug(0)
+        except RuntimeError:
+            continue
+        state[plug_name] = {'lock': plug.isLocked,
+                            'keyable': plug.isKeyable,
+                            'channel_box': plug.isChannelBox,
+                            'connected': plug.isDestination}
+        if plug_name in value_plugs:
+            state[plug_name]['value'] = plug.asDouble()
+    return state
+
+
+def get_plan_state(plan):
+    return get_lock_state(list(plan), value_plugs=[plug for plug, wanted in plan.items() if 'value' in wanted])
+
+
+def apply_lock_plan(plan, dry_run=False, debug=False):
+    """
+    Diffs a lock plan against the scene and applies only the changes, as one undo chunk so a single
+    Ctrl-Z (cmds.undo()) reverts the whole apply. From a script, applying result['restore'] does the same.
+    Args:
+    - plan (dict): {plug: {key: state}}, see rigbdp.build.lock_plan.
+    - dry_run (bool): Only diff, nothing is changed.
+    - debug (bool): Print the changes and skipped plugs.
+    Returns:
+    - dict: 'changes' what was (or would be) changed, 'skipped' plugs that couldn't be, 'failed' plugs still
+            not matching the plan after applying, 'restore' the plan that puts everything back.
+    """
+    current = get_plan_state(plan)
+    changes, skipped = lock_plan.diff_plan(plan, current)
+    result = {'changes': changes,
+              'skipped': skipped,
+              'failed': {},
+              'restore': lock_plan.restore_plan(changes, current)}
+    if debug:
+        print(f'{len(changes)} plugs to change, {len(skipped)} skipped')
+        for plug, change in changes.items():
+            print(f'{plug}: {change}')
+        for plug, reason in skipped.items():
+            print(f'Skipping {plug}: {reason}')
+    if dry_run or not changes:
+        return result
+
+    # the setAttr calls are undoable themselves, the chunk makes them one undo step
+    cmds.undoInfo(openChunk=True, chunkName='apply_lock_plan')
+    try:
+        mel.eval(lock_plan.changes_to_mel(changes, current))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    # anything that still differs failed to apply, e.g. a plug on a referenced node
+    changed_plan = {plug: plan[plug] for plug in changes}
+    result['failed'], _ = lock_plan.diff_plan(changed_plan, get_plan_state(changed_plan))
+    if result['failed']:
+        print(f"Failed to apply the lock state of {list(result['failed'])}")
+    return result
+
+
+def capture_lock_plan(nodes, attrs=None):
+    """
+    The current lock state of nodes as a plan, to export, version and reapply.
+    Args:
+    - nodes (list): The nodes.
+    - attrs (list): The attrs to capture, by default every keyable, channel box and locked attr of each node.
+    Returns:
+    - dict: {plug: {'lock', 'keyable', 'channel_box'}}
+    """
+    plugs = []
+    for node in nodes:
+        node_attrs = attrs
+        if node_attrs is None:
+            node_attrs = (cmds.listAttr(node, keyable=True) or []) + (cmds.listAttr(node, channelBox=True) or []) + \
+                         (cmds.listAttr(node, locked=True) or [])
+        plugs += [f'{node}.{attr}' for attr in dict.fromkeys(node_attrs)]
+    return {plug: {key: state[key] for key in ('lock', 'keyable', 'channel_box')}
+            for plug, state in get_lock_state(plugs).items()}
+
+
+def export_lock_plan(plan, file_path=None, filename_prefix='', suffix='LOCK_PLAN', notes=''):
+    """
+    Saves a lock plan next to the scene, or in file_path, as {filename_prefix}_{suffix}.json.
+    """
+    if not file_path:
+        file_path = get_scene_dir()
+    full_file_path = os.path.normpath(os.path.join(file_path, f'{filename_prefix}_{suffix}.json'))
+    lock_plan.save_plan(plan, full_file_path, notes=notes)
+    print(f"Exported to {full_file_path}")
+    return full_file_path
+
+
+def import_lock_plan(file_path=None, filename_prefix='', suffix='LOCK_PLAN'):
+    if not file_path:
+        file_path = get_scene_dir()
+    full_file_path = os.path.normpath(os.path.join(file_path, f'{filename_prefix}_{suffix}.json'))
+    print(f"Imported from {full_file_path}")
+    return lock_plan.load_plan(full_file_path)
+####################################### Usage ########################################
+# # capture the lock state of every control, check it in with the rig
+# plan = capture_lock_plan(cmds.ls('*_ctrl', type='transform'))
+# export_lock_plan(plan, filename_prefix='teshi', notes='published lock state')
+# # later, put the rig back to that state, only plugs that differ are touched
+# result = apply_lock_plan(import_lock_plan(filename_prefix='teshi'), debug=True)
+# cmds.undo()  # revert, or apply_lock_plan(result['restore'])
+######################################################################################
+
 def unlock_unhide_grps(joint_radius=JOINT_RADIUS, unlock_groups = UNLOCK_GROUPS):
-    for grp in unlock_groups:
-        cmds.setAttr(grp + ".visibility", k=True, lock=0)
-        cmds.setAttr(grp + ".visibility", True, k=True, lock=0)
-    for i in cmds.ls(type="joint"):
-        cmds.setAttr(i+".radius", k=False, lock=0)
-        if joint_radius:
-            cmds.setAttr(i+".radius", joint_radius)
+    radius_value = joint_radius if joint_radius else None
+    plan = lock_plan.merge_plans(
+        lock_plan.make_plan([grp + ".visibility" for grp in unlock_groups], lock=False, keyable=True, value=True),
+        lock_plan.make_plan([i + ".radius" for i in cmds.ls(type="joint")], lock=False, keyable=False, value=radius_value))
+    return apply_lock_plan(plan)
 # Usage #
 # unlock_unhide_bones(joint_radius = JOINT_RADIUS, unlock_groups = UNLOCK_GROUPS)
 
 def vis_walkout_skin(skin=True, walkout=True):
-    for child in cmds.listRelatives(SKIN_JNTS, shapes=False, typ="transform"):
-        cmds.setAttr(child + ".visibility", skin, k=False, lock=0)
-    cmds.setAttr(WALKOUT_JNTS + ".visibility", walkout, k=False, lock=0)
+    children = cmds.listRelatives(SKIN_JNTS, shapes=False, typ="transform") or []
+    plan = lock_plan.merge_plans(
+        lock_plan.make_plan([child + ".visibility" for child in children], lock=False, keyable=False, value=skin),
+        lock_plan.make_plan([WALKOUT_JNTS + ".visibility"], lock=False, keyable=False, value=walkout))
+    return apply_lock_plan(plan)
 ####################################### Usage ########################################
 # # walkout only
 # vis_walkout_skin(skin=False, walkout=True)
@@ -126,17 +252,11 @@ def hidden_in_outliner_off():
     setIsHistoricallyInteresting(value=0)  # hide history from channelbox
     setIsHistoricallyInteresting(value=2)  # show history (a bit more than Maya's default)
     '''
-    allNodes = cmds.ls()
-    failed = []
-    for node in allNodes:
-        plug = f'{node}.hiddenInOutliner'
-        if cmds.objExists(plug):
-            try:
-                print('Unlocking!!')
-                cmds.setAttr(plug, lock=False)
-                cmds.setAttr(plug, False)
-            except:
-                failed.append(node)
+    # only dag nodes have the attr, plugs that don't exist are skipped by the plan
+    plan = lock_plan.make_plan([f'{node}.hiddenInOutliner' for node in cmds.ls(dag=True)], lock=False, value=False)
+    result = apply_lock_plan(plan)
+    failed = [plug.split('.')[0] for plug, reason in result['skipped'].items() if reason != 'missing']
+    failed += [plug.split('.')[0] for plug in result['failed']]
     if failed:
         print(f'Skipped the following nodes {failed}')
     print("script has ran")
@@ -152,15 +272,10 @@ def set_history_visibility(value=1):
     setIsHistoricallyInteresting(value=0)  # hide history from channelbox
     setIsHistoricallyInteresting(value=2)  # show history (a bit more than Maya's default)
     '''
-    allNodes = cmds.ls()
-    failed = []
-    for node in allNodes:
-        plug = '{}.isHistoricallyInteresting'.format(node)
-        if cmds.objExists(plug):
-            try:
-                cmds.setAttr(plug, value)
-            except:
-                failed.append(node)
+    plan = lock_plan.make_plan(['{}.isHistoricallyInteresting'.format(node) for node in cmds.ls()], value=value)
+    result = apply_lock_plan(plan)
+    failed = [plug.split('.')[0] for plug, reason in result['skipped'].items() if reason != 'missing']
+    failed += [plug.split('.')[0] for plug in result['failed']]
     if failed:
         print("Skipped the following nodes {}".format(failed))
 ####################################### Usage ########################################
@@ -168,48 +283,21 @@ def set_history_visibility(value=1):
 ######################################################################################
 
 def find_all_children_and_set_visibility(node, filter, object_type):
-    # List to store all child nodes and their parents
-    child_list = []
-    parent_list = []  # List to store parents for visibility updates
+    # Every child in one call, full paths so each child's parent can be read off its path
+    child_list = cmds.listRelatives(node, allDescendents=True, fullPath=True) or []
     visibility_changed = []  # List to store names of objects with visibility changed
-    # Recursive function to find all children
-    def get_children(current_node):
-        # Get immediate children of the current node
-        children = cmds.listRelatives(current_node, children=True, fullPath=True)
-        if not children:
-            return False  # Base case: no more children, exit early
-        found_env_child = False  # Flag to check if any child has the check_string
-        for child in children:
-            child_list.append(child)  # Add current child to the list
-            # Check if the child has the check string in its name
-            if filter in child:
-                # Check the object type
-                child_type = cmds.nodeType(child)
-                print(f"Found child: {child} of type: {child_type}")  # Debug information
-                if child_type == object_type:
-                    found_env_child = True  # Mark that we found a child with the check_string
-                    visibility_changed.append(child)  # Store child name for visibility change
-                    # Check the visibility of the child
-                    visibility = cmds.getAttr(child + ".visibility")
-                    if not visibility:  # If visibility is off
-                        cmds.setAttr(child + ".visibility", 1)  # Set visibility to on
-                        print(f"Turning on visibility for: {child}")  # Debug information
-            # Store the current child as a parent for future visibility setting
-            parent_list.append(current_node)
-            # Check if the current child has its own children
-            if cmds.listRelatives(child, children=True):
-                if get_children(child):  # Recursive call to find this child's children
-                    found_env_child = True  # If any child has the check_string, mark it
-        return found_env_child  # Return if any child has the check_string
-    if get_children(node):  # Start the recursion with the initial node
-        # If we found a child with the check string, set visibility for all parents
-        for parent in parent_list:
-            # Check and set visibility for the current parent
-            visibility = cmds.getAttr(parent + ".visibility")
-            if not visibility:  # If visibility is off
-                cmds.setAttr(parent + ".visibility", 1)  # Set visibility to on
-                visibility_changed.append(parent)  # Store parent name for visibility change
-                print(f"Turning on visibility for parent: {parent}")  # Debug information
+    # Children with the filter in their name and of the object type
+    # the exact type, ls -type would also match types derived from it
+    found = [child for child in child_list if filter in child and cmds.nodeType(child) == object_type]
+    if not found:
+        return child_list, visibility_changed
+    # If we found a child with the check string, set visibility for all parents
+    parent_list = list(dict.fromkeys(child.rpartition('|')[0] for child in child_list))
+    plan = lock_plan.make_plan([x + '.visibility' for x in found + parent_list], value=1)
+    changed = [plug.rpartition('.')[0] for plug in apply_lock_plan(plan)['changes']]
+    for name in changed:
+        print(f"Turning on visibility for: {name}")  # Debug information
+    visibility_changed = found + [parent for parent in parent_list if parent in changed and parent not in found]
     return child_list, visibility_changed
 ####################################### Verbose Usage ########################################
 # # Get the currently selected object
@@ -305,25 +393,30 @@ def get_compound_attr_connect_map(node, compound_attr):
         raise ValueError(f"The attribute {compound_attr} does not exist on node {node}.")
     if not cmds.attributeQuery(compound_attr, node=node, multi=True):
         raise ValueError(f"The attribute {compound_attr} is not a compound array.")
-    # Get all indices for the compound array
-    indices = cmds.getAttr(full_attr, multiIndices=True)
-    # Loop through all indices and find incoming connections
-    for index in indices:
+    # Every incoming connection of the array in one call, as [destination, source, ...] pairs
+    pairs = cmds.listConnections(full_attr, source=True, destination=False, plugs=True, connections=True) or []
+    connections = {}
+    for destination, source in zip(pairs[::2], pairs[1::2]):
+        index = int(destination.rpartition('[')[2].rstrip(']'))
+        connections[index] = source
+    # Then every matrixIn[0] of the connected mult matrix nodes in one call
+    mult_matrix_inputs = {index: f"{connection.split('.')[0]}.matrixIn[0]" for index, connection in connections.items()}
+    existing_inputs = [x for x in mult_matrix_inputs.values() if cmds.objExists(x)]
+    input_pairs = cmds.listConnections(existing_inputs, source=True, destination=False, plugs=True, connections=True) if existing_inputs else []
+    input_connections = dict(zip(input_pairs[::2], input_pairs[1::2])) if input_pairs else {}
+    # Loop through all indices
+    for index in cmds.getAttr(full_attr, multiIndices=True) or []:
         # Build the indexed attribute (e.g., skinCluster.matrix[0])
         indexed_attr = f"{full_attr}[{index}]"
-        connection = cmds.listConnections(indexed_attr, source=True, destination=False, plugs=True)[0]
-        mult_matrix_input0 = connection.split(".")[0]
-        mult_matrix_input0= f'{mult_matrix_input0}.matrixIn[0]'
-        if not cmds.objExists(mult_matrix_input0): continue
-        mult_matrix_input0_connection = cmds.listConnections(mult_matrix_input0, source=True, destination=False, plugs=True)[0]
+        connection = connections.get(index)
+        if not connection:
+            continue
+        mult_matrix_input0_connection = input_connections.get(mult_matrix_inputs[index])
+        if not mult_matrix_input0_connection: continue
         mult_matrix_input0_connection = f'{mult_matrix_input0_connection}[0]'
-        if connection:
-            # Store connections in the dictionary
-            matrix_connections_dict[connection] = indexed_attr
-            joint_connections_dict[mult_matrix_input0_connection] = indexed_attr
-        else:
-            matrix_connections_dict[connection] = None
-            joint_connections_dict[mult_matrix_input0_connection] = None
+        # Store connections in the dictionary
+        matrix_connections_dict[connection] = indexed_attr
+        joint_connections_dict[mult_matrix_input0_connection] = indexed_attr
 
 
     export_dict = {f'{node}_MATRIX_MULT':matrix_connections_dict,
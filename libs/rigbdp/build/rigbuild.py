@@ -2,11 +2,16 @@ import os, importlib, shutil
 from maya import cmds, mel
 from rigbdp.import_export import file as file_utils
 from rigbdp.import_export import mayafile
+from rigbdp.import_export import corrective_cache
+from rigbdp.build import checkpoint
 importlib.reload(file_utils)
 importlib.reload(mayafile)
+importlib.reload(corrective_cache)
+importlib.reload(checkpoint)
 
 class RigBuilder:
-    def __init__(self, local_build_dir, src_rig_file=None, debug=False, backup=True):
+    def __init__(self, local_build_dir, src_rig_file=None, debug=False, backup=True,
+                 checkpoint_cadence=1, checkpoint_keep=2, checkpoint_dir=None):
         if not src_rig_file:
             pass
         self.local_build_dir = local_build_dir
@@ -14,6 +19,10 @@ class RigBuilder:
         self.data_dirs = ["connection_data", "pivot_data", "model_data", "weight_data", "corrective_data", "build"]
         self.debug = debug
         self.backup = backup
+        # intermediate saves are binary snapshots, the .ma is only written once by save()
+        self.checkpoints = checkpoint.Checkpoints(checkpoint_dir=checkpoint_dir,
+                                                  cadence=checkpoint_cadence,
+                                                  keep=checkpoint_keep)
         # listing here for readability
         # dynamically created and set by self.__initialize_directories
         self.build_output_bak_dir=''
@@ -91,11 +100,29 @@ class RigBuilder:
         # Create a new Maya scene
         cmds.file(new=True, force=True)
         # Save the file if the save_file flag is True
+        # The scene is always named so the final save() lands in the build output dir
+        cmds.file(rename=self.src_file_path)
         if save_file:
-            cmds.file(rename=self.src_file_path)
-            cmds.file(save=True, type='mayaAscii')
+            self.checkpoints.save('new_scene', force=True)
         return self.src_file_path
 
+    def restore_checkpoint(self, label=None):
+        """
+        Reopens a checkpoint saved during the build.
+
+        Args:
+            label (str): The checkpoint name, for example 'new_scene'. Defaults to the latest checkpoint.
+        """
+        return self.checkpoints.restore(label)
+
+    def save(self):
+        """
+        Saves the finished build as mayaAscii to the build output dir and removes the checkpoints.
+        This is the only .ma the build writes, until then there are only the .mb checkpoints,
+        self.checkpoints.latest() is the newest one.
+        """
+        return self.checkpoints.finalize(self.src_file_path)
+
     def import_rig(self):
         """
         Imports the Minimo rig and flattens namespaces.
@@ -166,12 +193,13 @@ class RigBuilder:
         else:
             cmds.warning("The provided weight file path does not exist.")
 
-    def import_correctives(self, filepaths=None):
+    def import_correctives(self, filepaths=None, use_cache=True):
         """
         Imports corrective shapes for the rig.
 
         Args:
             filepath (str): The file path to the corrective shapes.
+            use_cache (bool): Rebuild from the corrective_cache payload when the .mel has not changed.
         Postscript:
             Users can add custom scripts that run after corrective shapes import.
         """
@@ -182,7 +210,7 @@ class RigBuilder:
             print(f'source "{file}";')
 
             if os.path.isfile(file):
-                mel.eval(f'source "{file}";')
+                corrective_cache.import_corrective(file, use_cache=use_cache)
             else:
                 cmds.warning("The provided corrective shapes file path does not exist.")
 
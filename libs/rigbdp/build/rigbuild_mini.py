@@ -1,18 +1,20 @@
-import os, importlib, glob
+import os, importlib, glob, functools, time, traceback
 
 from maya import cmds, mel
 from rigbdp.builders.rigmods import rig_mods
-from rigbdp.import_export import sdk_utils, corrective, skin, mayafile
-from rigbdp.build import post_scripts, vis_rig
+from rigbdp.import_export import sdk_utils, corrective, corrective_cache, skin, mayafile
+from rigbdp.build import post_scripts, vis_rig, checkpoint
 from rigbdp.build import build_utils as rig_utils
 
 importlib.reload(rig_mods)
 importlib.reload(mayafile)
 importlib.reload(sdk_utils)
 importlib.reload(corrective)
+importlib.reload(corrective_cache)
 importlib.reload(skin)
 importlib.reload(post_scripts)
 importlib.reload(vis_rig)
+importlib.reload(checkpoint)
 importlib.reload(rig_utils)
 
 r'''
@@ -53,6 +55,11 @@ sdk_utils.export_sdks(filepath=r'C:\Users\harri\Documents\BDP\cha_input\jsh\sdk_
 
 ### Step 3. The Build ####
 
+NOTE: the build output .ma is only written once, by rig_merge.save() at the end of the build. The stages
+save .mb checkpoints to a temp dir instead of saving the .ma after every stage, so a build that crashes part
+way leaves no .ma in the output dir. The path of the latest checkpoint is printed when a stage fails, open it
+to pick the build up from there.
+
 In order to build you need to provide the following arguments:
 
 1. char_name - The name of the char
@@ -94,6 +101,30 @@ def execute_mel_file_with_error_handling(file_path):
                 print(f"Error executing command '{line.strip()}': {e}")
 
 
+def _stage(func):
+    """
+    A RigMerge build stage, saves a checkpoint named after the method when it is done, prints the latest
+    checkpoint when it fails.
+    A stage in skip_stages was restored from its checkpoint by run_builder, its next call is skipped.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if func.__name__ in self.skip_stages:
+            self.skip_stages.discard(func.__name__)
+            print(f'{func.__name__} was restored from its checkpoint, skipping it')
+            return None
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception:
+            # no .ma is written until save(), the checkpoints are all there is of the build so far
+            if self.checkpoints.latest():
+                print(f'{func.__name__} failed, the latest checkpoint is {self.checkpoints.latest()}')
+            raise
+        self.checkpoints.save(func.__name__)
+        return result
+    return wrapper
+
+
 class RigMerge:
     def __init__(self,
                  char_name,
@@ -106,7 +137,12 @@ class RigMerge:
                  bs_conn_paths=None,
                  extra_geo_importpath='',
                  char_dir='',
-                 rig_vis_attr='preferences'):
+                 rig_vis_attr='preferences',
+                 use_corrective_cache=True,
+                 corrective_cache_dir=None,
+                 checkpoint_cadence=1,
+                 checkpoint_keep=2,
+                 checkpoint_dir=None):
         self.char_name = char_name
         self.input_rig_path = input_rig_path
         self.build_output_path = build_output_path
@@ -117,6 +153,15 @@ class RigMerge:
         self.rig_vis_attr = rig_vis_attr
         self.extra_geo_importpath = extra_geo_importpath
         self.char_dir = char_dir
+        # SHAPES exports are rebuilt from a binary cache when it is up to date, see corrective_cache
+        self.use_corrective_cache = use_corrective_cache
+        self.corrective_cache_dir = corrective_cache_dir
+        # stages save binary snapshots, the .ma is only written once by save()
+        self.checkpoints = checkpoint.Checkpoints(checkpoint_dir=checkpoint_dir,
+                                                  cadence=checkpoint_cadence,
+                                                  keep=checkpoint_keep)
+        # stages restored from their checkpoint, see _stage
+        self.skip_stages = set()
         self.body_geo = f'{self.char_name}_base_body_geo'
         self.__input_file_check()
         self.envelopes = []
@@ -130,6 +175,7 @@ class RigMerge:
         self.nowake_build = nowake_build
 
 
+    @_stage
     def add_vendor_rig(self):
         self.__input_file_check()
 
@@ -154,9 +200,8 @@ class RigMerge:
         # NOTE: Turn off the ffds for correctives import
         self.__minimo_add_vendor_overs()
 
-        cmds.file(save=True, type='mayaAscii')
-
 
+    @_stage
     def import_correctives(self, bs_cleanup=True):
         # # 3. Clean up the scene for corrective import
         # corrective.pre_import_bs_cleanup(char_name=self.char_name)
@@ -169,7 +214,9 @@ class RigMerge:
 
         # 4. Import correctives
         for path in self.SHAPES_mel_paths:
-            mel.eval(f'source "{path}";')
+            corrective_cache.import_corrective(path,
+                                               cache_dir=self.corrective_cache_dir,
+                                               use_cache=self.use_corrective_cache)
 
         # 4a. Turn on all model_fix blendshape targets for every blendShape in the scene
         blendshapes = cmds.ls(type='blendShape')
@@ -178,7 +225,6 @@ class RigMerge:
             if cmds.objExists(mod_fix_tgt):
                 cmds.setAttr(mod_fix_tgt, 1)
                 cmds.setAttr(mod_fix_tgt, edit=True, lock=True)
-        cmds.file(save=True, type='mayaAscii')
         rig_utils.clean_intermediate_nodes()
 
         if self.bs_conn_paths:
@@ -189,10 +235,18 @@ class RigMerge:
         self.__minimo_post_corrective_overs()
 
 
+    @_stage
     def import_sdk_data(self):
         # 5. Import and rebuild set driven key data
         sdk_utils.import_sdks(self.sdk_data_path)
-        cmds.file(save=True, type='mayaAscii')
+
+    def restore_checkpoint(self, label=None):
+        # label is the stage name, for example 'add_vendor_rig'. Defaults to the latest checkpoint
+        return self.checkpoints.restore(label)
+
+    def save(self):
+        # Post build save, the only mayaAscii write of the build
+        return self.checkpoints.finalize(self.build_output_path)
 
 
     def __import_rig_clean(self):
@@ -306,7 +360,107 @@ class RigMerge:
             # else:
             #     continue
 
+
+def _restore_latest(rig_merge, saved_by):
+    """
+    Puts the scene back to the latest checkpoint, the one the last stage RigMerge call saved.
+
+    Returns:
+        int: The index of the builder stage to rerun from, the one that made the checkpoint. Its RigMerge
+             stage is skipped, the steps after it run again on the restored scene.
+    """
+    if not rig_merge.checkpoints.snapshots:
+        # nothing was checkpointed yet, start over
+        cmds.file(new=True, force=True)
+        return 0
+    label, path = rig_merge.checkpoints.snapshots[-1]
+    rig_merge.restore_checkpoint(label)
+    rig_merge.skip_stages = {label}
+    return saved_by.get(path, 0)
+
+
+def run_builder(builder, dir_to_char=None, version=None, stages=None, stage_retries=0, report=None,
+                **rig_merge_kwargs):
+    """
+    Builds a character from its builder script in rigbdp.builders, the same way by hand and on the build farm.
+
+    A builder script defines:
+    - dir_to_char, char_name, version
+    - rig_merge_args(found_dirs), the RigMerge args from the build files build_pathing found
+    - STAGES, the functions that build the rig in order, each takes the RigMerge. A stage function starts with
+      the RigMerge stage it is named after (add_vendor_rig, import_correctives, ...) when it has one.
+
+    RigMerge saves a checkpoint at the end of each of its stages. A failed stage is retried from the latest one:
+    the stage function that saved it runs again without its RigMerge stage, then every function after it.
+    The output .ma is only written once every stage is done. A build that fails leaves no .ma, only the .mb
+    checkpoints, the path of the latest one is printed.
+
+    Args:
+        builder (module): The builder script, sys.modules[__name__] from inside the script.
+        dir_to_char (str): Overrides the builder's.
+        version (int): Overrides the builder's.
+        stages (list): Names of the STAGES functions to run, all of them by default.
+        stage_retries (int): How many times a failed stage is retried from the latest checkpoint.
+        report (list): One {'name', 'status', 'tries', 'seconds'} dict per stage is appended to it.
+        rig_merge_kwargs: RigMerge args on top of the builder's, for example checkpoint_dir.
+
+    Returns:
+        RigMerge: The builder, after the post build save.
+    """
+    from rigbdp.build import build_pathing
+
+    found_dirs = build_pathing.return_found_files(char_name=builder.char_name,
+                                                  dir_to_char=dir_to_char or builder.dir_to_char,
+                                                  new_version_number=version or builder.version)
+    kwargs = builder.rig_merge_args(found_dirs)
+    kwargs.update(rig_merge_kwargs)
+    rig_merge = RigMerge(**kwargs)
+
+    functions = [func for func in builder.STAGES if not stages or func.__name__ in stages]
+    report = [] if report is None else report
+    entries = []
+    # snapshot path -> the index of the stage function whose RigMerge stage saved it
+    saved_by = {}
+    index = 0
+    while index < len(functions):
+        func = functions[index]
+        if index == len(entries):
+            entries.append({'name': func.__name__, 'status': 'failed', 'tries': 0, 'seconds': 0.0})
+            report.append(entries[index])
+        entry = entries[index]
+        entry['tries'] += 1
+        latest = rig_merge.checkpoints.latest()
+        start = time.perf_counter()
+        try:
+            func(rig_merge)
+        except Exception:
+            traceback.print_exc()
+            if rig_merge.checkpoints.latest() != latest:
+                saved_by[rig_merge.checkpoints.latest()] = index
+            print(f'Stage {func.__name__} failed, try {entry["tries"]} of {stage_retries + 1}')
+            if entry['tries'] > stage_retries:
+                entry['seconds'] += time.perf_counter() - start
+                if rig_merge.checkpoints.latest():
+                    print(f'Stage {func.__name__} failed, no .ma was written, the latest checkpoint is '
+                          f'{rig_merge.checkpoints.latest()}')
+                raise
+            index = _restore_latest(rig_merge, saved_by)
+            entry['seconds'] += time.perf_counter() - start
+            continue
+        if rig_merge.checkpoints.latest() != latest:
+            saved_by[rig_merge.checkpoints.latest()] = index
+        rig_merge.skip_stages = set()
+        entry['status'] = 'ok'
+        entry['seconds'] += time.perf_counter() - start
+        index += 1
+
+    # Post build save - the only mayaAscii write of the build, also clears the checkpoints
+    rig_merge.save()
+    return rig_merge
+
+
 # ########################################### Example Usage #########################################
+# # the layout of a builder script in rigbdp.builders, run_builder builds it by hand and on the build farm
 
 # #########################################################
 # # Unique char args
@@ -315,74 +469,46 @@ class RigMerge:
 # version = 13
 # #########################################################
 
-# # If you don't have the directories, this will create them.
-# created_dirs = build_pathing.create_char_structure(char_name=char_name,
-#                                                    dir_to_char=dir_to_char)
-
-# # FIND BUILD FILES DYNAMICALLY - To bake out the directories see example snippets at the bottom
-# found_dirs = build_pathing.return_found_files(char_name=char_name,
-#                                               dir_to_char=dir_to_char,
-#                                               new_version_number=version)
-# char_name = found_dirs['char_name']
-# input_rig_path = found_dirs['input_rig_path']
-# SHAPES_mel_paths = found_dirs['SHAPES_mel_paths']
-# build_output_path = found_dirs['build_output_path']
-# sdk_data_path = found_dirs['sdk_data_path']
-
-
-# # Initialize your builder 
-# rig_merge = rigbuild_mini.RigMerge(
-#     char_name=char_name, 
-#     input_rig_path=input_rig_path,
-#     SHAPES_mel_paths=SHAPES_mel_paths,
-#     build_output_path=build_output_path,
-#     sdk_data_path=sdk_data_path,
-#     wrap_eyebrows=True,
-# )
-
-
-# #--------------------------------------------------------
-
-# # PRE. custom scripts can go here
-# # example.pre_function()
+# # Initialize your builder, found_dirs are the build files build_pathing.return_found_files finds dynamically
+# def rig_merge_args(found_dirs):
+#     return dict(char_name=found_dirs['char_name'],
+#                 input_rig_path=found_dirs['input_rig_path'],
+#                 SHAPES_mel_paths=found_dirs['SHAPES_mel_paths'],
+#                 build_output_path=found_dirs['build_output_path'],
+#                 sdk_data_path=found_dirs['sdk_data_path'],
+#                 wrap_eyebrows=True)
 
 # #--------------------------------------------------------
 
 # # 1. BUILDER - Create a new scene, Import the MnM rig build
-# rig_merge.add_vendor_rig()
-
-
-# # 1a. custom scripts
-# rig_mods.BDP_outSkel_rigMod()
-# # bdp_rig_mods.create_lips_sculpt_jnts()
-
-# #--------------------------------------------------------
+# def add_vendor_rig(rig_merge):
+#     rig_merge.add_vendor_rig()
+#     # 1a. custom scripts
+#     # bdp_rig_mods.create_lips_sculpt_jnts()
 
 # # 2. BUILDER - Import correctives
-# rig_merge.import_correctives()
-# geo_name='jsh_base_cloth_top_fabric_low_meshShape'
-# cmds.blendShape(geo_name, name = 'M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
-#                 before=True)
-# cmds.blendShape('M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
-#                 edit=True,
-#                 ip=r'C:\Users\harri\Documents\BDP\cha\jsh\maya_shapes\shirt.shp')
-
-# # 2a. custom scripts
-# rig_mods.connect_common_blendshapes(char_name='jsh')
-
-# #--------------------------------------------------------
+# def import_correctives(rig_merge):
+#     rig_merge.import_correctives()
+#     geo_name='jsh_base_cloth_top_fabric_low_meshShape'
+#     cmds.blendShape(geo_name, name = 'M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
+#                     before=True)
+#     # 2a. custom scripts
+#     rig_mods.connect_common_blendshapes(char_name='jsh')
 
 # # 3. BUILDER - Import and rebuild set driven key data
-# rig_merge.import_sdk_data()
-
-
-# # 3a. custom scripts can go here
-# # example.function()
-
-# #--------------------------------------------------------
-
-# # Post build save
-# cmds.file(save=True, type='mayaAscii')
+# def import_sdk_data(rig_merge):
+#     rig_merge.import_sdk_data()
+#     # 3a. custom scripts can go here
+#     # example.function()
+
+# STAGES = [add_vendor_rig, import_correctives, import_sdk_data]
+
+# if __name__ == '__main__':
+#     # If you don't have the directories, this will create them.
+#     created_dirs = build_pathing.create_char_structure(char_name=char_name,
+#                                                        dir_to_char=dir_to_char)
+#     # every stage, then the post build save
+#     rig_merge = rigbuild_mini.run_builder(sys.modules[__name__])
 
 # # #################################### Helpful export snippets ###################################
 
@@ -14,6 +14,8 @@ for mod in MODULES:
     importlib.reload(mod)
 ### DYNAMIC GEN
 
+import sys
+
 #########################################################
 # Unique char args
 dir_to_char = r'C:\Users\harri\Documents\BDP\cha'
@@ -21,33 +23,17 @@ char_name = 'ally'
 version = 13
 #########################################################
 
-# If you don't have the directories, this will create them.
-created_dirs = build_pathing.create_char_structure(char_name=char_name,
-                                                   dir_to_char=dir_to_char)
-
-# FIND BUILD FILES DYNAMICALLY - To bake out the directories see example snippets at the bottom
-found_dirs = build_pathing.return_found_files(char_name=char_name,
-                                              dir_to_char=dir_to_char,
-                                              new_version_number=version)
-
-char_name = found_dirs['char_name']
-input_rig_path = found_dirs['input_rig_path']
-SHAPES_mel_paths = found_dirs['SHAPES_mel_paths']
-build_output_path = found_dirs['build_output_path']
-sdk_data_path = found_dirs['sdk_data_path']
-bs_conn_paths = found_dirs['bs_connection_maps']
-
-# Initialize your builder 
-rig_merge = rigbuild_mini.RigMerge(
-    char_name=char_name, 
-    input_rig_path=input_rig_path,
-    SHAPES_mel_paths=SHAPES_mel_paths,
-    build_output_path=build_output_path,
-    sdk_data_path=sdk_data_path,
-    bs_conn_paths=bs_conn_paths,
-    wrap_eyebrows=True,
-    nowake_build=True
-)
+# Initialize your builder, found_dirs are the build files build_pathing.return_found_files finds dynamically
+# To bake out the directories see example snippets at the bottom
+def rig_merge_args(found_dirs):
+    return dict(char_name=found_dirs['char_name'],
+                input_rig_path=found_dirs['input_rig_path'],
+                SHAPES_mel_paths=found_dirs['SHAPES_mel_paths'],
+                build_output_path=found_dirs['build_output_path'],
+                sdk_data_path=found_dirs['sdk_data_path'],
+                bs_conn_paths=found_dirs['bs_connection_maps'],
+                nowake_build=True,
+                wrap_eyebrows=True)
 
 #--------------------------------------------------------
 
@@ -57,24 +43,29 @@ rig_merge = rigbuild_mini.RigMerge(
 #--------------------------------------------------------
 
 # 1. BUILDER - Create a new scene, Import the MnM rig build
-rig_merge.add_vendor_rig()
+def add_vendor_rig(rig_merge):
+    rig_merge.add_vendor_rig()
+    # 1a. custom scripts
 
-#--------------------------------------------------------
-# 1a. custom scripts
-#--------------------------------------------------------
 
 # 2. BUILDER - Import correctives
-rig_merge.import_correctives()
+def import_correctives(rig_merge):
+    rig_merge.import_correctives()
+    # 3a. custom scripts can go here
+    # example.function()
 
-
-#--------------------------------------------------------
-# 3a. custom scripts can go here
-# example.function()
 #--------------------------------------------------------
 
-# Post build save
-cmds.file(save=True, type='mayaAscii')
+# The stages run in this order, a failed stage on the build farm is retried from the latest RigMerge checkpoint
+STAGES = [add_vendor_rig, import_correctives]
 
+if __name__ == '__main__':
+    # If you don't have the directories, this will create them.
+    created_dirs = build_pathing.create_char_structure(char_name=char_name,
+                                                       dir_to_char=dir_to_char)
+    # Builds every stage, then the post build save - the only mayaAscii write of the build, also clears the checkpoints
+    # If a stage fails there is no .ma yet, only the .mb checkpoints, the latest checkpoint's path is printed
+    rig_merge = rigbuild_mini.run_builder(sys.modules[__name__])
 
 
 # # #################################### Helpful export snippets ###################################
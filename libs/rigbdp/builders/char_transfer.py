@@ -82,8 +82,8 @@ rig_merge.import_correctives(bs_cleanup=False)
 
 #--------------------------------------------------------
 
-# Post build save
-cmds.file(save=True, type='mayaAscii')
+# Post build save - the only mayaAscii write of the build, also clears the checkpoints
+rig_merge.save()
 
 
 
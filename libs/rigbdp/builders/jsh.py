@@ -14,6 +14,8 @@ for mod in MODULES:
     importlib.reload(mod)
 ### DYNAMIC GEN
 
+import sys
+
 #########################################################
 # Unique char args
 dir_to_char = r'C:\Users\harri\Documents\BDP\cha'
@@ -21,34 +23,17 @@ char_name = 'jsh'
 version = 16
 #########################################################
 
-# If you don't have the directories, this will create them.
-created_dirs = build_pathing.create_char_structure(char_name=char_name,
-                                                   dir_to_char=dir_to_char)
-
-# FIND BUILD FILES DYNAMICALLY - To bake out the directories see example snippets at the bottom
-found_dirs = build_pathing.return_found_files(char_name=char_name,
-                                              dir_to_char=dir_to_char,
-                                              new_version_number=version)
-char_name = found_dirs['char_name']
-input_rig_path = found_dirs['input_rig_path']
-SHAPES_mel_paths = found_dirs['SHAPES_mel_paths']
-build_output_path = found_dirs['build_output_path']
-sdk_data_path = found_dirs['sdk_data_path']
-char_dir = found_dirs['char_dir']
-extra_models = found_dirs['extra_models']
-
-# Initialize your builder 
-rig_merge = rigbuild_mini.RigMerge(
-    char_name=char_name, 
-    input_rig_path=input_rig_path,
-    SHAPES_mel_paths=SHAPES_mel_paths,
-    build_output_path=build_output_path,
-    sdk_data_path=sdk_data_path,
-    wrap_eyebrows=True,
-    extra_geo_importpath=extra_models,
-    char_dir=char_dir,
-
-)
+# Initialize your builder, found_dirs are the build files build_pathing.return_found_files finds dynamically
+# To bake out the directories see example snippets at the bottom
+def rig_merge_args(found_dirs):
+    return dict(char_name=found_dirs['char_name'],
+                input_rig_path=found_dirs['input_rig_path'],
+                SHAPES_mel_paths=found_dirs['SHAPES_mel_paths'],
+                build_output_path=found_dirs['build_output_path'],
+                sdk_data_path=found_dirs['sdk_data_path'],
+                extra_geo_importpath=found_dirs['extra_models'],
+                char_dir=found_dirs['char_dir'],
+                wrap_eyebrows=True)
 
 #--------------------------------------------------------
 
@@ -58,55 +43,61 @@ rig_merge = rigbuild_mini.RigMerge(
 #--------------------------------------------------------
 
 # 1. BUILDER - Create a new scene, Import the MnM rig build
-rig_merge.add_vendor_rig()
-rig_merge.smart_skin_copy('jsh_base_cloth_top_fabric_mesh',
-                          'jsh_base_cloth_top_fabric_low_mesh',
-                          'jsh_base_cloth_top_fabric_mesh_bodyMechanics_skinCluster')
-rig_merge.smart_skin_copy('jsh_base_cloth_pants_fabric_mesh',
-                          'jsh_base_cloth_pants_fabric_low_mesh',
-                          'jsh_base_cloth_pants_fabric_mesh_bodyMechanics_skinCluster')
-cmds.connectAttr('preferences.showClothes','jsh_base_cloth_low_grp.v')
-
-
-# 1a. custom scripts
+def add_vendor_rig(rig_merge):
+    rig_merge.add_vendor_rig()
+    rig_merge.smart_skin_copy('jsh_base_cloth_top_fabric_mesh',
+                              'jsh_base_cloth_top_fabric_low_mesh',
+                              'jsh_base_cloth_top_fabric_mesh_bodyMechanics_skinCluster')
+    rig_merge.smart_skin_copy('jsh_base_cloth_pants_fabric_mesh',
+                              'jsh_base_cloth_pants_fabric_low_mesh',
+                              'jsh_base_cloth_pants_fabric_mesh_bodyMechanics_skinCluster')
+    cmds.connectAttr('preferences.showClothes','jsh_base_cloth_low_grp.v')
+
+    # 1a. custom scripts
 
 #--------------------------------------------------------
 
 # 2. BUILDER - Import correctives
-rig_merge.import_correctives()
-
-
-# CUSTOM BLENDSHAPE CREATION because the body blendshape is driving all of the shirt blendshapes
-# we don't have to do a SHAPES build for it. This should become the standard for all clothing 
-# sculpts:
-
-
-geo_name='jsh_base_cloth_top_fabric_low_meshShape'
-cmds.blendShape(geo_name, name = 'M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
-                before=True)
-# cmds.blendShape('M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
-#                 edit=True,
-#                 ip=r'C:\Users\harri\Documents\BDP\cha\jsh\maya_shapes\shirt.shp')
-
-
-# # 2a. custom scripts
-# rig_mods.connect_common_blendshapes(char_name='jsh')
+def import_correctives(rig_merge):
+    rig_merge.import_correctives()
+
+    # CUSTOM BLENDSHAPE CREATION because the body blendshape is driving all of the shirt blendshapes
+    # we don't have to do a SHAPES build for it. This should become the standard for all clothing 
+    # sculpts:
+    geo_name='jsh_base_cloth_top_fabric_low_meshShape'
+    cmds.blendShape(geo_name, name = 'M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
+                    before=True)
+    # cmds.blendShape('M_jsh_base_cloth_top_fabric_low_geoShapes_blendShape',
+    #                 edit=True,
+    #                 ip=r'C:\Users\harri\Documents\BDP\cha\jsh\maya_shapes\shirt.shp')
+
+    # # 2a. custom scripts
+    # rig_mods.connect_common_blendshapes(char_name='jsh')
 
 #--------------------------------------------------------
 
 # 3. BUILDER - Import and rebuild set driven key data
-rig_merge.import_sdk_data()
+def import_sdk_data(rig_merge):
+    rig_merge.import_sdk_data()
 
+    # 3a. custom scripts can go here
+    # example.function()
 
-# 3a. custom scripts can go here
-# example.function()
+    cmds.delete(['jsh_base_cloth_top_fabric_mesh', 'jsh_base_cloth_pants_fabric_mesh'])
 
 #--------------------------------------------------------
 
-cmds.delete(['jsh_base_cloth_top_fabric_mesh', 'jsh_base_cloth_pants_fabric_mesh'])
+# The stages run in this order, a failed stage on the build farm is retried from the latest RigMerge checkpoint
+STAGES = [add_vendor_rig, import_correctives, import_sdk_data]
+
+if __name__ == '__main__':
+    # If you don't have the directories, this will create them.
+    created_dirs = build_pathing.create_char_structure(char_name=char_name,
+                                                       dir_to_char=dir_to_char)
+    # Builds every stage, then the post build save - the only mayaAscii write of the build, also clears the checkpoints
+    # If a stage fails there is no .ma yet, only the .mb checkpoints, the latest checkpoint's path is printed
+    rig_merge = rigbuild_mini.run_builder(sys.modules[__name__])
 
-# Post build save
-cmds.file(save=True, type='mayaAscii')
 
 # # #################################### Helpful export snippets ###################################
 
@@ -15,6 +15,8 @@ for mod in MODULES:
 # END DYNAMIC GEN
 #######################################
 
+import sys
+
 #########################################################
 # Unique char args
 dir_to_char = r'C:\Users\harri\Documents\BDP\cha'
@@ -22,62 +24,65 @@ char_name = 'teshi'
 version = 19
 #########################################################
 
-# If you don't have the directories, this will create them.
-created_dirs = build_pathing.create_char_structure(char_name=char_name,
-                                                   dir_to_char=dir_to_char)
-
-# FIND BUILD FILES DYNAMICALLY - To bake out the directories see example snippets at the bottom
-found_dirs = build_pathing.return_found_files(char_name=char_name,
-                                              dir_to_char=dir_to_char,
-                                              new_version_number=version)
-char_name = found_dirs['char_name']
-input_rig_path = found_dirs['input_rig_path']
-SHAPES_mel_paths = found_dirs['SHAPES_mel_paths']
-build_output_path = found_dirs['build_output_path']
-sdk_data_path = found_dirs['sdk_data_path']
-char_dir = found_dirs['char_dir']
-extra_models = found_dirs['extra_models']
-
-# Initialize your builder 
-rig_merge = rigbuild_mini.RigMerge(
-    char_name=char_name,
-    input_rig_path=input_rig_path,
-    SHAPES_mel_paths=SHAPES_mel_paths,
-    build_output_path=build_output_path,
-    sdk_data_path=sdk_data_path,
-    wrap_eyebrows=True,
-    extra_geo_importpath=extra_models,
-    char_dir=char_dir,
-
-)
+# Initialize your builder, found_dirs are the build files build_pathing.return_found_files finds dynamically
+# To bake out the directories see example snippets at the bottom
+def rig_merge_args(found_dirs):
+    return dict(char_name=found_dirs['char_name'],
+                input_rig_path=found_dirs['input_rig_path'],
+                SHAPES_mel_paths=found_dirs['SHAPES_mel_paths'],
+                build_output_path=found_dirs['build_output_path'],
+                sdk_data_path=found_dirs['sdk_data_path'],
+                extra_geo_importpath=found_dirs['extra_models'],
+                char_dir=found_dirs['char_dir'],
+                wrap_eyebrows=True)
+
+#--------------------------------------------------------
+
+# PRE. custom scripts can go here
+# example.pre_function()
+
+#--------------------------------------------------------
 
 # 1. Create a new scene, Import the MnM rig build
-rig_merge.add_vendor_rig()
+def add_vendor_rig(rig_merge):
+    rig_merge.add_vendor_rig()
 
-rig_merge.smart_skin_copy('teshi_base_cloth_top_fabric_mesh',
-                          'teshi_base_cloth_top_fabric_low_mesh',
-                          'teshi_base_cloth_top_fabric_mesh_bodyMechanics_skinCluster')
-cmds.connectAttr('preferences.showClothes','teshi_base_cloth_low_grp.v')
+    rig_merge.smart_skin_copy('teshi_base_cloth_top_fabric_mesh',
+                              'teshi_base_cloth_top_fabric_low_mesh',
+                              'teshi_base_cloth_top_fabric_mesh_bodyMechanics_skinCluster')
+    cmds.connectAttr('preferences.showClothes','teshi_base_cloth_low_grp.v')
 
 # --- pre corrective import scripts
 
 # 2. Import correctives
-rig_merge.import_correctives()
+def import_correctives(rig_merge):
+    rig_merge.import_correctives()
 
-geo_name='teshi_base_cloth_top_fabric_low_meshShape'
-cmds.blendShape(geo_name, name = 'M_teshi_base_cloth_top_fabric_low_geoShapes_blendShape',
-                before=True)
+    geo_name='teshi_base_cloth_top_fabric_low_meshShape'
+    cmds.blendShape(geo_name, name = 'M_teshi_base_cloth_top_fabric_low_geoShapes_blendShape',
+                    before=True)
 
 
 # --- pre sdk scripts
 
 # 3.  Import and rebuild set driven key data teshi doesn't have any custom sdks
-# rig_merge.import_sdk_data()
+def cleanup(rig_merge):
+    # rig_merge.import_sdk_data()
+
+    cmds.delete(['teshi_base_cloth_top_fabric_mesh'])
+
+#--------------------------------------------------------
 
-cmds.delete(['teshi_base_cloth_top_fabric_mesh'])
+# The stages run in this order, a failed stage on the build farm is retried from the latest RigMerge checkpoint
+STAGES = [add_vendor_rig, import_correctives, cleanup]
 
-# Post build save
-cmds.file(save=True, type='mayaAscii')
+if __name__ == '__main__':
+    # If you don't have the directories, this will create them.
+    created_dirs = build_pathing.create_char_structure(char_name=char_name,
+                                                       dir_to_char=dir_to_char)
+    # Builds every stage, then the post build save - the only mayaAscii write of the build, also clears the checkpoints
+    # If a stage fails there is no .ma yet, only the .mb checkpoints, the latest checkpoint's path is printed
+    rig_merge = rigbuild_mini.run_builder(sys.modules[__name__])
 
 
 # # #################################### Helpful export snippets ###################################
@@ -1,5 +1,8 @@
 import maya.api.OpenMaya as om2
 from maya import cmds
+import numpy as np
+
+from rpdecorator import meshsnapshot
 
 def get_dag_path(node_name):
     """
@@ -26,22 +29,53 @@ def get_dag_path(node_name):
 
 def get_mesh_vertices(mesh_name):
     """
-    Gets the world space vertex positions of a mesh using OpenMaya 2.
+    Gets the world space vertex positions of a mesh, shared through rpdecorator.meshsnapshot.
+
+    Args:
+        mesh_name (str): The name of the mesh.
+
+    Returns:
+        np.array: Read-only (N, 3) world space vertex positions, rows unpack like the old (x, y, z) tuples.
+    """
+    return get_points(mesh_name, space='world')
+
+SPACES = {'world': om2.MSpace.kWorld, 'object': om2.MSpace.kObject}
+
+
+def get_points(mesh_name, space='world'):
+    """
+    The vertex positions of a mesh as a read-only (N, 3) float64 array, no per vertex python objects.
+    Shared through rpdecorator.meshsnapshot, so the same source read for many targets is pulled once.
 
     Args:
         mesh_name (str): The name of the mesh.
+        space (str): 'world' or 'object'.
 
     Returns:
-        list: A list of world space vertex positions [(x, y, z), ...].
+        np.array: (N, 3) float64 positions.
     """
-    dag_path = get_dag_path(mesh_name)
-    mesh_fn = om2.MFnMesh(dag_path)
+    get_dag_path(mesh_name)
+    return meshsnapshot.get_points(mesh_name, SPACES[space])
 
-    # Get vertex positions in world space
-    points = mesh_fn.getPoints(om2.MSpace.kWorld)
-    
-    # Convert MPointArray to list of tuples
-    return [(point.x, point.y, point.z) for point in points]
+def set_points(mesh_name, points, space='world'):
+    """
+    Writes every vertex position of a mesh in one setPoints call.
+    setPoints only takes an MPointArray and neither maya api can build one from a buffer, so this write
+    still goes through a python row and an MPoint per vertex. Reads don't, see get_points.
+    There is no raw write path: getRawPoints is the mesh's own buffer, writing into it skips the dirty
+    propagation and undo. A ranged setAttr on .pnts only sets tweaks on top of the incoming mesh and still
+    takes a python float per value, so it isn't used either.
+
+    Args:
+        mesh_name (str): The name of the target mesh.
+        points (np.array): (N, 3) positions, one row per vertex of the mesh.
+        space (str): 'world' or 'object'.
+    """
+    mesh_fn = om2.MFnMesh(get_dag_path(mesh_name))
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(points) != mesh_fn.numVertices:
+        raise ValueError(f"Got {len(points)} points for '{mesh_name}', which has {mesh_fn.numVertices} vertices.")
+    mesh_fn.setPoints(om2.MPointArray(points.tolist()), SPACES[space])
 
 def set_mesh_vertices(mesh_name, positions):
     """
@@ -49,42 +83,72 @@ def set_mesh_vertices(mesh_name, positions):
 
     Args:
         mesh_name (str): The name of the target mesh.
-        positions (list): A list of world space vertex positions [(x, y, z), ...].
+        positions (list/np.array): World space vertex positions [(x, y, z), ...] or an (N, 3) array.
     """
-    dag_path = get_dag_path(mesh_name)
-    mesh_fn = om2.MFnMesh(dag_path)
+    set_points(mesh_name, positions, space='world')
 
-    # Create MPointArray from the list of positions
-    points = om2.MPointArray([om2.MPoint(pos) for pos in positions])
+def transfer_points(source_points, target_points, vertex_map=None, weights=None):
+    """
+    Moves a source point buffer onto a target point buffer, plain numpy.
 
-    # Set vertex positions in world space
-    mesh_fn.setPoints(points, om2.MSpace.kWorld)
+    Args:
+        source_points (np.array): (Ns, 3) source positions.
+        target_points (np.array): (Nt, 3) current target positions.
+        vertex_map (np.array): (Nt,) source vertex id for every target vertex, -1 leaves a target vertex alone.
+                               Defaults to the same ids, which needs matching vertex counts.
+        weights (np.array/float): (Nt,) or a single blend weight, 0 keeps the target and 1 takes the source.
 
-def match_mesh_verts(source_mesh, target_mesh):
+    Returns:
+        np.array: (Nt, 3) new target positions.
+    """
+    source_points = np.asarray(source_points, dtype=np.float64)
+    target_points = np.asarray(target_points, dtype=np.float64)
+    if vertex_map is None:
+        if len(source_points) != len(target_points):
+            raise ValueError(f"The source has {len(source_points)} vertices and the target {len(target_points)}, "
+                             "give a vertex_map to transfer between different topologies.")
+        mapped = source_points
+        valid = None
+    else:
+        vertex_map = np.asarray(vertex_map, dtype=np.int64)
+        if len(vertex_map) != len(target_points):
+            raise ValueError(f"vertex_map has {len(vertex_map)} entries for {len(target_points)} target vertices.")
+        valid = vertex_map >= 0
+        mapped = np.where(valid[:, None], source_points[np.where(valid, vertex_map, 0)], target_points)
+
+    if weights is None:
+        return mapped.copy() if valid is None else mapped
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), (len(target_points),))
+    return target_points + weights[:, None] * (mapped - target_points)
+
+def match_mesh_verts(source_mesh, target_mesh, vertex_map=None, weights=None, space='world'):
     """
-    Matches the vertex positions of the target mesh to the source mesh in world space using OpenMaya 2.
+    Matches the vertex positions of the target mesh to the source mesh using OpenMaya 2.
+    Points move as flat arrays, one read per mesh and one setPoints on the target.
 
     Args:
         source_mesh (str): The name of the source mesh whose vertex positions will be used.
         target_mesh (str): The name of the target mesh whose vertex positions will be updated.
+        vertex_map (np.array): (Nt,) source vertex id per target vertex, -1 to leave a vertex alone.
+        weights (np.array/float): Per target vertex blend toward the source, 1 by default.
+        space (str): 'world' or 'object'.
 
     Raises:
-        ValueError: If the source and target meshes don't have the same number of vertices.
+        ValueError: If the source and target meshes don't have the same number of vertices and
+                    no vertex_map is given.
     """
-    # Get vertex positions from the source mesh
-    source_positions = get_mesh_vertices(source_mesh)
-    print("SOURCE POSITIONS ARE WORKING")
-
-    # Get the number of vertices in both meshes
-    source_vert_count = len(source_positions)
-    target_vert_count = om2.MFnMesh(get_dag_path(target_mesh)).numVertices
-
-    # Check if the vertex count matches
-    if source_vert_count != target_vert_count:
+    source_points = get_points(source_mesh, space)
+    target_count = om2.MFnMesh(get_dag_path(target_mesh)).numVertices
+    if vertex_map is None and len(source_points) != target_count:
         raise ValueError(f"Meshes '{source_mesh}' and '{target_mesh}' have a different number of vertices.")
 
-    # Set the target mesh vertices to match the source mesh vertices
-    set_mesh_vertices(target_mesh, source_positions)
+    if vertex_map is None and weights is None:
+        # a straight copy, the source buffer goes to the target as is
+        set_points(target_mesh, source_points, space)
+    else:
+        # the current target points are only needed when some of them are kept
+        set_points(target_mesh, transfer_points(source_points, get_points(target_mesh, space),
+                                                vertex_map, weights), space)
 
     print(f"Successfully matched the vertex positions of '{target_mesh}' to '{source_mesh}'.")
 # Example usage:
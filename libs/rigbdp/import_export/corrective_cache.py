@@ -0,0 +1,373 @@
+r'''
+Binary cache for SHAPES corrective exports.
+
+Sourcing a SHAPES .mel export interprets every per-target setAttr in the file, on every build.
+The first time an export is imported it is sourced as usual, the blendShape it created is read back
+through the API and saved as a compressed .npz payload (targets, sparse deltas and component indices,
+in-betweens, paint weights and incoming connections), keyed by the sha1 of the .mel file.
+Every build after that rebuilds the blendShape from the payload with one plug write per target item.
+
+Editing or re-exporting the .mel changes its hash, so the next build re-sources it and refreshes the cache.
+
+Exports that create anything the payload can't rebuild (extra utility nodes, a blendShape that is not
+at the front of the chain, outgoing connections) are recorded as not cacheable and are always sourced.
+
+# --- Example
+from rigbdp.import_export import corrective_cache
+corrective_cache.import_corrective(r'C:\Users\harri\Documents\BDP\cha\jsh\SHAPES\M_jsh_base_body_geoShapes_blendShape.mel')
+'''
+# builtins
+import hashlib, json, os
+
+# third party
+import numpy as np
+import maya.api.OpenMaya as om
+from maya import cmds, mel
+
+# custom
+from rpdecorator import nodetracker
+
+CACHE_VERSION = 1
+CACHE_DIR_NAME = 'cache'
+# nodes the blendShape command creates for itself, anything else created by a SHAPES export can't be cached
+BLENDSHAPE_SIDE_EFFECT_TYPES = ['blendShape', 'objectSet', 'groupId', 'groupParts', 'tweak', 'mesh']
+# incoming connections on these attributes are made by the blendShape command
+DEFORMER_INPUT_ATTRS = ['input', 'originalGeometry', 'message']
+# in-between item indices are 5000 + weight * 1000, the full target is 6000
+FULL_TARGET_ITEM = 6000
+
+
+def file_hash(filepath):
+    """
+    Returns the sha1 hex digest of a file, read in chunks so large exports don't need to fit in memory.
+    """
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_path(mel_path, cache_dir=None, mel_hash=None):
+    """
+    Returns the payload path for a SHAPES .mel export.
+
+    Args:
+        mel_path (str): The SHAPES .mel export.
+        cache_dir (str): Where payloads are stored. Defaults to a "cache" directory next to the .mel file.
+        mel_hash (str): The hash of the .mel file, computed if not given.
+    """
+    mel_dir, mel_file = os.path.split(mel_path)
+    cache_dir = cache_dir or os.path.join(mel_dir, CACHE_DIR_NAME)
+    mel_hash = mel_hash or file_hash(mel_path)
+    name = os.path.splitext(mel_file)[0]
+    return os.path.join(cache_dir, f'{name}_{mel_hash[:16]}.npz')
+
+
+def _get_plug(plug_name):
+    sel = om.MSelectionList()
+    sel.add(plug_name)
+    return sel.getPlug(0)
+
+
+def _read_sparse_weights(plug_name):
+    """
+    Reads the existing elements of a float array plug, such as baseWeights or targetWeights.
+
+    Returns:
+        tuple: (indices int32 array, values float32 array)
+    """
+    plug = _get_plug(plug_name)
+    indices = plug.getExistingArrayAttributeIndices()
+    values = [plug.elementByLogicalIndex(i).asFloat() for i in indices]
+    return np.array(indices, dtype=np.int32), np.array(values, dtype=np.float32)
+
+
+def _read_target_item(item_plug_name):
+    """
+    Reads the sparse deltas and component indices of one inputTargetItem.
+
+    Returns:
+        tuple: (component indices int32 array, deltas float32 (N, 3) array)
+    """
+    points_obj = _get_plug(f'{item_plug_name}.inputPointsTarget').asMObject()
+    components_obj = _get_plug(f'{item_plug_name}.inputComponentsTarget').asMObject()
+    if points_obj.isNull() or components_obj.isNull():
+        return np.zeros(0, dtype=np.int32), np.zeros((0, 3), dtype=np.float32)
+
+    deltas = np.array(om.MFnPointArrayData(points_obj).array(), dtype=np.float64)
+    deltas = deltas[:, :3].astype(np.float32) if len(deltas) else np.zeros((0, 3), dtype=np.float32)
+
+    components = om.MFnComponentListData(components_obj)
+    indices = []
+    for i in range(components.length()):
+        indices.extend(om.MFnSingleIndexedComponent(components.get(i)).getElements())
+    return np.array(indices, dtype=np.int32), deltas
+
+
+def _incoming_connections(blendshape):
+    """
+    Returns the [source, destination] connections into a blendShape that the blendShape command doesn't make itself.
+    """
+    connections = cmds.listConnections(blendshape, source=True, destination=False, plugs=True,
+                                       connections=True, skipConversionNodes=True) or []
+    result = []
+    # listConnections with connections=True returns a flat [destination, source, destination, source...] list
+    for dst, src in zip(connections[::2], connections[1::2]):
+        attr = dst.split('.', 1)[1].split('[')[0]
+        if attr in DEFORMER_INPUT_ATTRS:
+            continue
+        result.append([src, dst])
+    return result
+
+
+def _is_front_of_chain(blendshape, geometry):
+    deformers = cmds.listHistory(geometry, pruneDagObjects=True, interestLevel=1) or []
+    deformers = [d for d in deformers if 'geometryFilter' in cmds.nodeType(d, inherited=True)
+                 and cmds.nodeType(d) != 'tweak']
+    return bool(deformers) and deformers[-1] == blendshape
+
+
+def capture_blendshape(blendshape):
+    """
+    Reads a blendShape into a payload dict of plain python data and numpy arrays.
+
+    Args:
+        blendshape (str): The blendShape node.
+
+    Returns:
+        dict: The payload, see apply_payload for how it is rebuilt.
+    """
+    geometry = cmds.blendShape(blendshape, query=True, geometry=True)[0]
+    geometry = cmds.listRelatives(geometry, parent=True)[0] if cmds.nodeType(geometry) == 'mesh' else geometry
+    aliases = cmds.aliasAttr(blendshape, query=True) or []
+    # aliasAttr query is a flat [alias, weight[i], alias, weight[i]...] list
+    alias_by_index = {int(attr.split('[')[1][:-1]): alias for alias, attr in zip(aliases[::2], aliases[1::2])}
+
+    payload = {'name': blendshape,
+               'geometry': geometry,
+               'envelope': cmds.getAttr(f'{blendshape}.envelope'),
+               'base_weights': _read_sparse_weights(f'{blendshape}.inputTarget[0].baseWeights'),
+               'targets': [],
+               'connections': _incoming_connections(blendshape)}
+
+    group_indices = cmds.getAttr(f'{blendshape}.inputTarget[0].inputTargetGroup', multiIndices=True) or []
+    for target_index in group_indices:
+        group = f'{blendshape}.inputTarget[0].inputTargetGroup[{target_index}]'
+        target = {'index': target_index,
+                  'alias': alias_by_index.get(target_index, ''),
+                  'weight': cmds.getAttr(f'{blendshape}.weight[{target_index}]'),
+                  'target_weights': _read_sparse_weights(f'{group}.targetWeights'),
+                  'items': []}
+        item_indices = cmds.getAttr(f'{group}.inputTargetItem', multiIndices=True) or []
+        for item_index in item_indices:
+            components, deltas = _read_target_item(f'{group}.inputTargetItem[{item_index}]')
+            target['items'].append((item_index, components, deltas))
+        payload['targets'].append(target)
+    return payload
+
+
+def write_payload(payloads, filepath, mel_hash):
+    """
+    Writes a list of blendShape payloads to a compressed .npz.
+    Arrays are stored as named npz members, everything else goes in a json header member.
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    arrays = {}
+    header = {'version': CACHE_VERSION, 'mel_hash': mel_hash, 'cacheable': True, 'blendshapes': []}
+    for b, payload in enumerate(payloads):
+        arrays[f'b{b}_base_idx'], arrays[f'b{b}_base_val'] = payload['base_weights']
+        bs_header = {key: payload[key] for key in ('name', 'geometry', 'envelope', 'connections')}
+        bs_header['targets'] = []
+        for t, target in enumerate(payload['targets']):
+            arrays[f'b{b}_t{t}_tw_idx'], arrays[f'b{b}_t{t}_tw_val'] = target['target_weights']
+            items = []
+            for item_index, components, deltas in target['items']:
+                arrays[f'b{b}_t{t}_i{item_index}_idx'] = components
+                arrays[f'b{b}_t{t}_i{item_index}_delta'] = deltas
+                items.append(item_index)
+            bs_header['targets'].append({'index': target['index'], 'alias': target['alias'],
+                                         'weight': target['weight'], 'items': items})
+        header['blendshapes'].append(bs_header)
+    arrays['header'] = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+    np.savez_compressed(filepath, **arrays)
+
+
+def write_uncacheable(filepath, mel_hash, reason):
+    """
+    Records that an export can't be cached, so later builds source it straight away without capturing.
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    header = {'version': CACHE_VERSION, 'mel_hash': mel_hash, 'cacheable': False, 'reason': reason}
+    np.savez_compressed(filepath, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8))
+
+
+def read_payload(filepath):
+    """
+    Reads a payload written by write_payload.
+
+    Returns:
+        dict: The json header. When cacheable, each blendshape entry has its arrays filled back in.
+    """
+    with np.load(filepath) as data:
+        header = json.loads(data['header'].tobytes().decode('utf-8'))
+        for b, bs_header in enumerate(header.get('blendshapes', [])):
+            bs_header['base_weights'] = (data[f'b{b}_base_idx'], data[f'b{b}_base_val'])
+            for t, target in enumerate(bs_header['targets']):
+                target['target_weights'] = (data[f'b{b}_t{t}_tw_idx'], data[f'b{b}_t{t}_tw_val'])
+                target['items'] = [(i, data[f'b{b}_t{t}_i{i}_idx'], data[f'b{b}_t{t}_i{i}_delta'])
+                                   for i in target['items']]
+    return header
+
+
+def _contiguous_runs(indices):
+    """
+    Splits sorted indices into runs of consecutive indices.
+
+    Returns:
+        list: (start, stop) positions into indices, one per run, stop exclusive.
+    """
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(indices)]))
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def _write_sparse_weights(plug_name, weights):
+    """
+    Writes a float array plug one multi index range per run of consecutive indices, painted weights
+    are mostly a few long runs so this is a handful of setAttr calls instead of one per vertex.
+    """
+    indices, values = weights
+    if not len(indices):
+        return
+    order = np.argsort(indices, kind='stable')
+    indices, values = indices[order], values[order]
+    for start, stop in _contiguous_runs(indices):
+        first, last = int(indices[start]), int(indices[stop - 1])
+        cmds.setAttr(f'{plug_name}[{first}:{last}]', *values[start:stop].tolist(), size=stop - start)
+
+
+def _write_target_item(item_plug_name, components, deltas):
+    """
+    Writes one inputTargetItem with a single pointArray and a single componentList, instead of
+    the per target setAttr calls the .mel export makes.
+    """
+    points_data = om.MFnPointArrayData()
+    points_obj = points_data.create(om.MPointArray(deltas.tolist()))
+
+    component_fn = om.MFnSingleIndexedComponent()
+    component_obj = component_fn.create(om.MFn.kMeshVertComponent)
+    component_fn.addElements(components.tolist())
+    components_data = om.MFnComponentListData()
+    components_obj = components_data.create()
+    components_data.add(component_obj)
+
+    _get_plug(f'{item_plug_name}.inputPointsTarget').setMObject(points_obj)
+    _get_plug(f'{item_plug_name}.inputComponentsTarget').setMObject(components_obj)
+
+
+def apply_payload(payload):
+    """
+    Rebuilds a blendShape from a payload read with read_payload.
+
+    Returns:
+        str: The new blendShape node.
+    """
+    blendshape = cmds.blendShape(payload['geometry'], name=payload['name'], frontOfChain=True)[0]
+    cmds.setAttr(f'{blendshape}.envelope', payload['envelope'])
+    _write_sparse_weights(f'{blendshape}.inputTarget[0].baseWeights', payload['base_weights'])
+
+    for target in payload['targets']:
+        index = target['index']
+        group = f'{blendshape}.inputTarget[0].inputTargetGroup[{index}]'
+        for item_index, components, deltas in target['items']:
+            _write_target_item(f'{group}.inputTargetItem[{item_index}]', components, deltas)
+        _write_sparse_weights(f'{group}.targetWeights', target['target_weights'])
+        cmds.setAttr(f'{blendshape}.weight[{index}]', target['weight'])
+        if target['alias']:
+            cmds.aliasAttr(target['alias'], f'{blendshape}.weight[{index}]')
+
+    for src, dst in payload['connections']:
+        # the destination was recorded with the original node name, it may have been renamed on creation
+        dst = f'{blendshape}.{dst.split(".", 1)[1]}'
+        if cmds.objExists(src.split('.')[0]):
+            cmds.connectAttr(src, dst, force=True)
+        else:
+            cmds.warning(f'Corrective cache could not reconnect {src} -> {dst}, {src} does not exist')
+    return blendshape
+
+
+def _uncacheable_reason(created_nodes, blendshapes):
+    for node in created_nodes:
+        node_type = cmds.nodeType(node)
+        if node_type not in BLENDSHAPE_SIDE_EFFECT_TYPES:
+            return f'the export creates a {node_type} node ({node})'
+        if node_type == 'mesh' and not cmds.getAttr(f'{node}.intermediateObject'):
+            return f'the export creates a mesh ({node})'
+    if not blendshapes:
+        return 'the export does not create a blendShape'
+    for blendshape in blendshapes:
+        geometry = cmds.blendShape(blendshape, query=True, geometry=True) or []
+        if len(geometry) != 1:
+            return f'{blendshape} deforms {len(geometry)} geometries'
+        if not _is_front_of_chain(blendshape, geometry[0]):
+            return f'{blendshape} is not at the front of the deformer chain'
+        outgoing = cmds.listConnections(f'{blendshape}.weight', source=False, destination=True) or []
+        if outgoing:
+            return f'{blendshape} weights drive other nodes'
+    return None
+
+
+def source_and_capture(mel_path, payload_path, mel_hash):
+    """
+    Sources a SHAPES export the normal way and writes what it built to the cache.
+    """
+    with nodetracker.NodeTracker() as tracker:
+        mel.eval(f'source "{mel_path}";')
+    created_nodes = tracker.created
+    blendshapes = cmds.ls(created_nodes, type='blendShape')
+
+    reason = _uncacheable_reason(created_nodes, blendshapes)
+    if reason:
+        print(f'Corrective cache: not caching {mel_path}, {reason}')
+        write_uncacheable(payload_path, mel_hash, reason)
+        return
+    write_payload([capture_blendshape(bs) for bs in blendshapes], payload_path, mel_hash)
+    print(f'Corrective cache: cached {mel_path} to {payload_path}')
+
+
+def import_corrective(mel_path, cache_dir=None, use_cache=True):
+    """
+    Imports a SHAPES corrective export, from the binary cache when there is an up to date one.
+
+    Args:
+        mel_path (str): The SHAPES .mel export.
+        cache_dir (str): Where payloads are stored. Defaults to a "cache" directory next to the .mel file.
+        use_cache (bool): If False the .mel is sourced exactly like before and the cache is left alone.
+
+    Returns:
+        bool: True if the corrective was rebuilt from the cache.
+    """
+    mel_path = mel_path.replace('\\', '/')
+    if not use_cache:
+        mel.eval(f'source "{mel_path}";')
+        return False
+
+    mel_hash = file_hash(mel_path)
+    payload_path = cache_path(mel_path, cache_dir=cache_dir, mel_hash=mel_hash)
+    if not os.path.isfile(payload_path):
+        source_and_capture(mel_path, payload_path, mel_hash)
+        return False
+
+    header = read_payload(payload_path)
+    if header.get('version') != CACHE_VERSION or header.get('mel_hash') != mel_hash:
+        source_and_capture(mel_path, payload_path, mel_hash)
+        return False
+    if not header['cacheable']:
+        mel.eval(f'source "{mel_path}";')
+        return False
+
+    for payload in header['blendshapes']:
+        apply_payload(payload)
+    return True
@@ -1,7 +1,5 @@
 import importlib
-from rigbdp.ui import lockui
 from rigbdp.shelf import refresh
-importlib.reload(lockui)
 importlib.reload(refresh)
 
 import maya.cmds as cmds
@@ -67,4 +65,5 @@ def refresh_shelf():
 
 # Example usage
 # import myModule  # Import your module here
+# from rigbdp.ui import lockui
 # create_shelf_tab_with_button(lockui, 'BDP Rigging', debug=False)
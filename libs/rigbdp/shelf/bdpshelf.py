@@ -1,8 +1,9 @@
 import importlib
 from rigbdp.shelf import add
-from rigbdp.ui import lockui
 importlib.reload(add)
-importlib.reload(lockui)
 
 def create():
+    # the ui is only imported when the shelf is actually built, not when this module is loaded
+    from rigbdp.ui import lockui
+    importlib.reload(lockui)
     add.create_shelf_tab_with_button(lockui, 'BDP Rigging', debug=False)
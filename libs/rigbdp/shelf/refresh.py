@@ -1,7 +1,2 @@
-import importlib
-
-import maya.cmds as cmds
-import inspect
-
 def refresh_shelf():
     print("This is a placeholder for code updates")
@@ -0,0 +1,169 @@
+# builtins
+import importlib
+import importlib.abc
+import pkgutil
+import sys
+import time
+
+# module name -> (inclusive seconds, self seconds) of every import made while the import timer was installed,
+# the same two numbers python -X importtime prints
+IMPORT_TIMES = {}
+
+# the installed _ImportTimer, None when imports aren't being timed
+_TIMER = None
+
+
+class _TimedLoader(object):
+    """
+    Wraps the loader of a module so executing it is timed, everything else is passed through to the real loader.
+    """
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        timer = self._timer
+        timer.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            inclusive = time.perf_counter() - start
+            nested = timer.stack.pop()
+            if timer.stack:
+                timer.stack[-1] += inclusive
+            IMPORT_TIMES[module.__name__] = (inclusive, inclusive - nested)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    A sys.meta_path finder that finds nothing itself, it asks the finders after it and wraps the loader they return.
+    Every import is timed, "import x", "from x import y" and importlib alike.
+    """
+    def __init__(self):
+        # seconds spent in nested imports of every module being executed, innermost last
+        self.stack = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module') and \
+                not isinstance(spec.loader, _TimedLoader):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+
+def start_import_timing():
+    """
+    Times every import from here on, as early as possible in userSetup.py to measure startup.
+    """
+    global _TIMER
+    if _TIMER is None:
+        _TIMER = _ImportTimer()
+        sys.meta_path.insert(0, _TIMER)
+
+
+def stop_import_timing():
+    global _TIMER
+    if _TIMER is not None and _TIMER in sys.meta_path:
+        sys.meta_path.remove(_TIMER)
+    _TIMER = None
+
+
+def lazy_submodules(package_name, submodules=None):
+    """
+    Builds a module level __getattr__ and __dir__ for a package so its submodules are imported
+    the first time they are accessed as attributes (PEP 562).
+
+    "rig_2.shape" then works without importing rig_2.shape first. Importing the package itself
+    costs what its __init__ costs, normal "from rig_2.shape import meshcompare" imports are unaffected.
+
+    Args:
+        package_name (str): The __name__ of the package, pass __name__ from the package __init__.
+        submodules (list): Optional explicit list of submodule names.
+                           If None the package directory is scanned (no code is executed to do so).
+
+    Returns:
+        tuple: (__getattr__, __dir__) to be assigned in the package __init__.
+
+    Example:
+        from rpdecorator import lazyload
+        __getattr__, __dir__ = lazyload.lazy_submodules(__name__)
+    """
+    package = sys.modules[package_name]
+    if submodules is None:
+        submodules = [name for _, name, _ in pkgutil.iter_modules(package.__path__)]
+    submodules = frozenset(submodules)
+
+    def __getattr__(name):
+        if name in submodules:
+            module = importlib.import_module(f'{package_name}.{name}')
+            # cache on the package so __getattr__ is not hit again for this name
+            setattr(package, name, module)
+            return module
+        raise AttributeError(f"module '{package_name}' has no attribute '{name}'")
+
+    def __dir__():
+        return sorted(set(package.__dict__) | submodules)
+
+    return __getattr__, __dir__
+
+
+def import_report(package_name=None, walk=False, print_report=True):
+    """
+    Reports the import cost of modules, every import made while start_import_timing was active.
+    Modules loaded before the timer was started are already paid for and are not listed.
+
+    Self times don't include the modules a module imports, so they add up to the total. Inclusive times do,
+    a module that is the first to pull in PySide2 or numpy carries that cost.
+
+    Args:
+        package_name (str): Only report modules inside this package. If None, everything recorded is reported.
+        walk (bool): Import every submodule of package_name first, timing each one that was not loaded yet.
+                     Use this in a fresh session to find out what a package would cost if everything was imported.
+        print_report (bool): Print a table sorted from most to least expensive self time.
+
+    Returns:
+        list: (module_name, inclusive seconds, self seconds) tuples sorted from most to least expensive self time.
+    """
+    if walk and package_name:
+        timing = _TIMER is not None
+        start_import_timing()
+        try:
+            package = importlib.import_module(package_name)
+            for _, mod_name, _ in pkgutil.walk_packages(package.__path__, package_name + '.',
+                                                        onerror=lambda name: None):
+                try:
+                    importlib.import_module(mod_name)
+                except Exception as e:
+                    # outside of maya, or a broken scratch module, should not stop the report
+                    print(f'Could not import {mod_name}: {e}')
+        finally:
+            if not timing:
+                stop_import_timing()
+
+    report = [(name, inclusive, own) for name, (inclusive, own) in IMPORT_TIMES.items()
+              if package_name is None or name == package_name or name.startswith(package_name + '.')]
+    report.sort(key=lambda item: item[2], reverse=True)
+
+    if print_report:
+        print(f'\n{"module":<70}{"self ms":>10}{"incl ms":>10}')
+        print('-' * 90)
+        for name, inclusive, own in report:
+            print(f'{name:<70}{own * 1000.0:>10.1f}{inclusive * 1000.0:>10.1f}')
+        print('-' * 90)
+        print(f'{"total":<70}{sum(own for _, _, own in report) * 1000.0:>10.1f}\n')
+
+    return report
@@ -0,0 +1,326 @@
+'''
+Shared, cached numpy snapshots of mesh geometry.
+
+Analysis tools all need the same few arrays of a mesh: points, normals, triangles, vertex adjacency.
+Each of them used to pull its own copy through the API and convert it to tuples or MPoints, so a tool
+session re-marshalled the same mesh over and over. A snapshot pulls each array once, on first use,
+and hands out the same read-only arrays to every caller until the mesh changes.
+
+Dirty tracking:
+- a node dirty callback on the shape marks points and normals stale when anything upstream of the mesh changes
+- world space snapshots also get a world matrix callback, moving a parent marks them stale
+- a poly topology changed callback marks the connectivity stale
+- when stale, the vertex, polygon and face vertex counts are compared as well, the connectivity is only pulled
+  again and hashed when one of them changed or the topology callback fired. The connectivity is not hashed
+  on every dirty, so an edit that rewires faces but keeps every count (spin edge) and doesn't fire the
+  topology callback (an upstream node feeding new face lists) serves stale triangles, edges and adjacency.
+  refresh(force=True) after those
+- every snapshot is released before a new scene or a scene open
+- points come straight from the mesh's float buffer, there is no MPoint per vertex
+
+Arrays are read-only views, copy them before editing.
+Edges are the unique sorted vertex pairs of the polygon borders, in vertex order, not maya's edge ids.
+
+# --- Example
+from rpdecorator import meshsnapshot
+snapshot = meshsnapshot.get_snapshot('body_geo')
+points = snapshot.points
+indptr, neighbours = snapshot.adjacency
+neighbours[indptr[10]:indptr[11]]  # the vertices connected to vertex 10
+'''
+# builtins
+import ctypes, hashlib
+
+import numpy as np
+
+# the array math is plain numpy, maya is only needed to pull the data
+try:
+    import maya.api.OpenMaya as om
+    # only for MFnMesh.getRawPoints, the api 2.0 MFnMesh has no raw buffer access
+    import maya.OpenMaya as om1
+except ImportError:
+    om = None
+    om1 = None
+
+# (full path of the shape, space) -> MeshSnapshot
+_SNAPSHOTS = {}
+# the before new / before open callbacks that release every snapshot, added with the first snapshot
+_SCENE_CALLBACK_IDS = []
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
+def read_points(dag_path, space):
+    """
+    Copies the vertex positions of a mesh straight out of its float buffer, world space is applied in numpy.
+
+    Args:
+        dag_path (om.MDagPath): Path to the mesh shape.
+        space (int): om.MSpace.kWorld or om.MSpace.kObject.
+
+    Returns:
+        np.array: (N, 3) float64 positions.
+    """
+    sel = om1.MSelectionList()
+    sel.add(dag_path.fullPathName())
+    path = om1.MDagPath()
+    sel.getDagPath(0, path)
+    mesh_fn = om1.MFnMesh(path)
+    count = mesh_fn.numVertices()
+    if not count:
+        return np.zeros((0, 3), dtype=np.float64)
+    buffer = (ctypes.c_float * (count * 3)).from_address(int(mesh_fn.getRawPoints()))
+    # astype copies, the buffer belongs to the mesh and is gone on its next evaluation
+    points = np.frombuffer(buffer, dtype=np.float32).reshape(-1, 3).astype(np.float64)
+    if space == om.MSpace.kWorld:
+        matrix = np.array(dag_path.inclusiveMatrix(), dtype=np.float64).reshape(4, 4)
+        points = points @ matrix[:3, :3] + matrix[3, :3]
+    return points
+
+
+class MeshSnapshot:
+    def __init__(self, dag_path, space):
+        """
+        Args:
+            dag_path (om.MDagPath): Path to the mesh shape.
+            space (int): om.MSpace.kWorld or om.MSpace.kObject.
+        """
+        self.dag_path = om.MDagPath(dag_path)
+        self.handle = om.MObjectHandle(dag_path.node())
+        self.space = space
+        self.name = dag_path.fullPathName()
+        # bumped every time the points are refetched, lets other caches key on the snapshot
+        self.version = 0
+        self.topology_hash = None
+        # (numVertices, numPolygons, numFaceVertices) the topology arrays were built from
+        self.topology_counts = None
+        self._stale_points = True
+        self._stale_topology = True
+        self._arrays = {}
+        self._callback_ids = []
+        self._register()
+
+    # ---- Dirty Tracking ----
+    def _register(self):
+        node = self.dag_path.node()
+        self._callback_ids.append(om.MNodeMessage.addNodeDirtyCallback(node, self._mark_dirty))
+        self._callback_ids.append(om.MPolyMessage.addPolyTopologyChangedCallback(node, self._mark_topology_dirty))
+        if self.space == om.MSpace.kWorld:
+            self._callback_ids.append(om.MDagMessage.addWorldMatrixModifiedCallback(self.dag_path,
+                                                                                    self._mark_dirty))
+
+    def _mark_dirty(self, *args):
+        self._stale_points = True
+
+    def _mark_topology_dirty(self, *args):
+        self._stale_points = True
+        self._stale_topology = True
+
+    def release(self):
+        """
+        Removes the callbacks, the snapshot is no longer kept up to date.
+        """
+        for callback_id in self._callback_ids:
+            om.MMessage.removeCallback(callback_id)
+        self._callback_ids = []
+
+    def is_valid(self):
+        return self.handle.isValid() and self.handle.isAlive()
+
+    def _mesh_fn(self):
+        return om.MFnMesh(self.dag_path)
+
+    def refresh(self, force=False):
+        """
+        Drops the arrays that are stale. Called by every property, so there is no need to call it directly.
+        """
+        if force:
+            self._stale_points = True
+            self._stale_topology = True
+        if not self._stale_points:
+            return
+        mesh_fn = self._mesh_fn()
+        topology_counts = (mesh_fn.numVertices, mesh_fn.numPolygons, mesh_fn.numFaceVertices)
+        if topology_counts != self.topology_counts:
+            self._stale_topology = True
+
+        if self._stale_topology:
+            counts, face_vertices = mesh_fn.getVertices()
+            counts = np.array(counts, dtype=np.int64)
+            face_vertices = np.array(face_vertices, dtype=np.int64)
+            sha = hashlib.sha1(counts.tobytes())
+            sha.update(face_vertices.tobytes())
+            self._arrays = {}
+            self.topology_hash = sha.hexdigest()
+            self.topology_counts = topology_counts
+            self._arrays['face_counts'] = _readonly(counts)
+            self._arrays['face_vertices'] = _readonly(face_vertices)
+            self._stale_topology = False
+        else:
+            for key in ('points', 'normals'):
+                self._arrays.pop(key, None)
+        self._stale_points = False
+        self.version += 1
+
+    def _get(self, key, build):
+        self.refresh()
+        if key not in self._arrays:
+            self._arrays[key] = build()
+        return self._arrays[key]
+
+    # ---- Arrays ----
+    @property
+    def points(self):
+        """(N, 3) float64 vertex positions."""
+        return self._get('points', lambda: _readonly(read_points(self.dag_path, self.space)))
+
+    @property
+    def normals(self):
+        """(N, 3) float64 per vertex normals, the average of the face normals around each vertex."""
+        return self._get('normals', lambda: _readonly(
+            np.array(self._mesh_fn().getVertexNormals(False, self.space), dtype=np.float64)))
+
+    @property
+    def face_counts(self):
+        """(F,) vertex count of every polygon."""
+        return self._get('face_counts', lambda: None)
+
+    @property
+    def face_vertices(self):
+        """The vertex ids of every polygon back to back, face_counts says where each polygon ends."""
+        return self._get('face_vertices', lambda: None)
+
+    @property
+    def face_indptr(self):
+        """(F + 1,) CSR offsets, the vertices of face f are face_vertices[face_indptr[f]:face_indptr[f + 1]]."""
+        def build():
+            indptr = np.zeros(len(self.face_counts) + 1, dtype=np.int64)
+            np.cumsum(self.face_counts, out=indptr[1:])
+            return _readonly(indptr)
+        return self._get('face_indptr', build)
+
+    def _build_triangles(self):
+        triangle_counts, triangle_vertices = self._mesh_fn().getTriangles()
+        self._arrays['triangle_faces'] = _readonly(np.repeat(np.arange(len(triangle_counts)),
+                                                             np.array(triangle_counts, dtype=np.int64)))
+        return _readonly(np.array(triangle_vertices, dtype=np.int64).reshape(-1, 3))
+
+    @property
+    def triangles(self):
+        """(T, 3) vertex ids of the triangulated mesh."""
+        return self._get('triangles', self._build_triangles)
+
+    @property
+    def triangle_faces(self):
+        """(T,) the polygon each triangle belongs to."""
+        self.triangles
+        return self._arrays['triangle_faces']
+
+    @property
+    def edges(self):
+        """(E, 2) unique vertex pairs, the smaller vertex id first, sorted."""
+        def build():
+            indptr = self.face_indptr
+            # the next vertex around each polygon, wrapping the last vertex back to the first
+            following = np.arange(1, len(self.face_vertices) + 1)
+            following[indptr[1:] - 1] = indptr[:-1]
+            pairs = np.sort(np.stack([self.face_vertices, self.face_vertices[following]], axis=1), axis=1)
+            return _readonly(np.unique(pairs, axis=0))
+        return self._get('edges', build)
+
+    @property
+    def adjacency(self):
+        """
+        CSR vertex adjacency, (indptr (N + 1,), neighbours). The neighbours of vertex v are
+        neighbours[indptr[v]:indptr[v + 1]], sorted.
+        """
+        def build():
+            edges = self.edges
+            num_vertices = self._mesh_fn().numVertices
+            both = np.concatenate([edges, edges[:, ::-1]])
+            both = both[np.lexsort((both[:, 1], both[:, 0]))]
+            indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+            np.cumsum(np.bincount(both[:, 0], minlength=num_vertices), out=indptr[1:])
+            return _readonly(indptr), _readonly(np.ascontiguousarray(both[:, 1]))
+        return self._get('adjacency', build)
+
+
+def _shape_path(mesh):
+    sel = om.MSelectionList()
+    sel.add(mesh)
+    dag_path = sel.getDagPath(0)
+    # a transform gives its first mesh shape
+    if not dag_path.node().hasFn(om.MFn.kMesh):
+        dag_path.extendToShape()
+    return dag_path
+
+
+def get_snapshot(mesh, space=None):
+    """
+    Returns the shared snapshot of a mesh, created on first use.
+
+    The connectivity is refetched when the mesh's counts change or its topology changed callback fires,
+    not hashed on every dirty. If the faces were rewired some other way with the same counts, call
+    snapshot.refresh(force=True) before reading triangles, edges or adjacency.
+
+    Args:
+        mesh (str): The mesh shape or its transform.
+        space (int): om.MSpace.kWorld (default) or om.MSpace.kObject.
+
+    Returns:
+        MeshSnapshot
+    """
+    space = om.MSpace.kWorld if space is None else space
+    if not _SCENE_CALLBACK_IDS:
+        for message in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+            _SCENE_CALLBACK_IDS.append(om.MSceneMessage.addCallback(message, _scene_changed))
+    dag_path = _shape_path(mesh)
+    key = (dag_path.fullPathName(), space)
+    snapshot = _SNAPSHOTS.get(key)
+    if snapshot and snapshot.is_valid() and snapshot.dag_path.node() == dag_path.node():
+        return snapshot
+    if snapshot:
+        snapshot.release()
+    snapshot = MeshSnapshot(dag_path, space)
+    _SNAPSHOTS[key] = snapshot
+    return snapshot
+
+
+def get_points(mesh, space=None):
+    return get_snapshot(mesh, space).points
+
+
+def get_normals(mesh, space=None):
+    return get_snapshot(mesh, space).normals
+
+
+def get_triangles(mesh, space=None):
+    return get_snapshot(mesh, space).triangles
+
+
+def release(mesh=None):
+    """
+    Removes the callbacks and cached arrays of a mesh, or of every mesh.
+    """
+    for key in list(_SNAPSHOTS):
+        if mesh is None or key[0] == _shape_path(mesh).fullPathName():
+            _SNAPSHOTS.pop(key).release()
+
+
+def _scene_changed(*args):
+    release()
+
+
+def remove_scene_callbacks():
+    """
+    Removes the before new / before open callbacks, get_snapshot adds them again.
+    """
+    for callback_id in _SCENE_CALLBACK_IDS:
+        try:
+            om.MMessage.removeCallback(callback_id)
+        except RuntimeError:
+            pass
+    del _SCENE_CALLBACK_IDS[:]
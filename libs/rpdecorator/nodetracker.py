@@ -0,0 +1,116 @@
+'''
+Tracks the nodes created (and optionally deleted) while a block of code runs.
+
+The old approach listed the whole scene before and after and diffed the two, which costs two full
+scene listings per call no matter how few nodes are made. This registers node added/removed callbacks
+for the duration of the block instead, so the cost scales with the number of new nodes.
+
+Only one pair of callbacks is registered no matter how deeply trackers are nested, every active
+tracker gets every event.
+
+# --- Example
+from rpdecorator import nodetracker
+with nodetracker.NodeTracker() as tracker:
+    cmds.CreateWrap()
+print(tracker.created)
+
+# --- Or as a decorator that returns the created nodes in place of the function's result
+wrapped_function = nodetracker.return_created_nodes(cmds.CreateWrap)
+created_nodes = wrapped_function()
+'''
+# builtins
+from functools import wraps
+
+# third party
+import maya.api.OpenMaya as om
+
+# trackers that are currently inside their with block, outermost first
+_ACTIVE_TRACKERS = []
+_CALLBACK_IDS = []
+
+
+def _node_added(node, client_data):
+    handle = om.MObjectHandle(node)
+    for tracker in _ACTIVE_TRACKERS:
+        tracker._added.append(handle)
+
+
+def _node_removed(node, client_data):
+    # the name has to be read now, the node is gone by the time the tracker exits
+    name = _node_name(node)
+    for tracker in _ACTIVE_TRACKERS:
+        if tracker.track_deleted:
+            tracker._removed.append(name)
+
+
+def _node_name(node, long=True):
+    """
+    Returns the same name cmds.ls(long=True) would, full dag paths for dag nodes.
+    """
+    if node.hasFn(om.MFn.kDagNode):
+        dag_path = om.MDagPath.getAPathTo(node)
+        return dag_path.fullPathName() if long else dag_path.partialPathName()
+    return om.MFnDependencyNode(node).name()
+
+
+def _register():
+    if _CALLBACK_IDS:
+        return
+    _CALLBACK_IDS.append(om.MDGMessage.addNodeAddedCallback(_node_added, 'dependNode'))
+    _CALLBACK_IDS.append(om.MDGMessage.addNodeRemovedCallback(_node_removed, 'dependNode'))
+
+
+def _unregister():
+    for callback_id in _CALLBACK_IDS:
+        om.MMessage.removeCallback(callback_id)
+    del _CALLBACK_IDS[:]
+
+
+class NodeTracker:
+    def __init__(self, track_deleted=False, long=True):
+        """
+        Args:
+            track_deleted (bool): Also collect the names of nodes deleted inside the block.
+            long (bool): Return full dag paths for dag nodes, like cmds.ls(long=True).
+        """
+        self.track_deleted = track_deleted
+        self.long = long
+        self.created = []
+        self.deleted = []
+        self._added = []
+        self._removed = []
+
+    def __enter__(self):
+        _register()
+        _ACTIVE_TRACKERS.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        _ACTIVE_TRACKERS.remove(self)
+        if not _ACTIVE_TRACKERS:
+            _unregister()
+
+        # nodes that were created and then deleted inside the block are no longer valid, skip them
+        # names are resolved here so renames and reparents made inside the block are picked up
+        self.created = [_node_name(handle.object(), long=self.long) for handle in self._added if handle.isValid()]
+        self.deleted = list(self._removed)
+        self._added = []
+        self._removed = []
+        return False
+
+
+def return_created_nodes(func):
+    """
+    This function is to return nodes created by a maya command that doesn't return anything
+
+    It does this by:
+    1. start a NodeTracker
+    2. run function
+    3. return the nodes created while the function ran, in creation order
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with NodeTracker() as tracker:
+            func(*args, **kwargs)
+        return tracker.created
+    return wrapper
@@ -0,0 +1,479 @@
+'''
+Shared, cached numpy snapshots of transforms.
+
+Sorting joints, placing guides and mirroring all query the same world transforms over and over with
+cmds.xform, one command per node per value. A snapshot captures the world and local matrices of a set of
+DAG nodes in one pass through the API and serves positions, rotations, scales and mirrored matrices from
+numpy arrays until the nodes move.
+
+Dirty tracking:
+- every captured node gets a world matrix callback, moving it or any of its parents marks it stale
+- stale nodes are refetched on the next query, the rest of the snapshot is untouched
+- deleted or renamed nodes are recaptured by name the next time they are asked for, so after
+  rename A B and a new A, 'A' is the new node, the old row's callback is removed
+- the shared snapshot is released before a new scene or a scene open
+
+Conventions follow maya:
+- matrices are 4x4 row major with the translation on the last row, points are row vectors (p * M)
+- rotations are euler degrees in the node's rotate order (0 xyz, 1 yzx, 2 zxy, 3 xzy, 4 yxz, 5 zyx),
+  the values cmds.xform(query=True, worldSpace=True, rotation=True) gives
+
+Mirroring is matrix math, no temp joints:
+- behavior, the mirrorJoint -mirrorBehavior result, every axis is reflected and negated
+- orientation, the aim / up result of rig_2.mirror.utils.standard_mirror, the axes are reflected and
+  flip_axis is negated to keep the matrix right handed
+
+The matrix math is plain numpy, from_matrices builds a snapshot out of reference matrices without maya.
+
+# --- Example
+from rpdecorator import transformsnapshot
+snapshot = transformsnapshot.get_snapshot(['L_arm_JNT', 'L_elbow_JNT', 'L_wrist_JNT'])
+positions = snapshot.positions()
+translations, rotations, scales = snapshot.mirrored_transforms(['L_arm_JNT'], plane='YZ', behavior=True)
+'''
+import numpy as np
+
+# the matrix math is plain numpy, maya is only needed to pull the data
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+ROTATE_ORDERS = ('xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx')
+# mirror plane -> the world axis it flips, the planes mirrorJoint takes
+MIRROR_PLANES = {'YZ': 0, 'XZ': 1, 'XY': 2}
+_EPSILON = 1e-9
+
+# the shared snapshot get_snapshot hands out
+_SNAPSHOT = None
+_SCENE_CALLBACK_IDS = []
+
+
+# ---- Matrix Math ----
+def as_matrices(matrices):
+    """
+    (N, 4, 4) float64 matrices from flat 16 value lists, 4x4 nested lists or MMatrix values.
+    """
+    return np.array(matrices, dtype=np.float64).reshape(-1, 4, 4)
+
+
+def _axis_rotations(axis, radians):
+    """
+    (N, 3, 3) row vector rotations about one axis, rotating +90 about x takes y to z.
+    """
+    cos, sin = np.cos(radians), np.sin(radians)
+    # the other two axes in cyclic order, +90 about y takes z to x
+    first, second = (axis + 1) % 3, (axis + 2) % 3
+    rotations = np.zeros((len(radians), 3, 3))
+    rotations[:, axis, axis] = 1.0
+    rotations[:, first, first] = cos
+    rotations[:, first, second] = sin
+    rotations[:, second, first] = -sin
+    rotations[:, second, second] = cos
+    return rotations
+
+
+def _orders(rotate_order, count):
+    return np.broadcast_to(np.asarray(rotate_order, dtype=np.int64), (count,))
+
+
+def euler_to_matrix(rotations, rotate_order=0):
+    """
+    Euler degrees to rotation matrices, the first axis of the rotate order is applied first.
+
+    Args:
+        rotations (list): (N, 3) x, y, z degrees.
+        rotate_order (int or list): One order for all, or one per rotation.
+
+    Returns:
+        np.array: (N, 3, 3) rotation matrices.
+    """
+    radians = np.radians(np.asarray(rotations, dtype=np.float64).reshape(-1, 3))
+    orders = _orders(rotate_order, len(radians))
+    matrices = np.empty((len(radians), 3, 3))
+    for order in np.unique(orders):
+        rows = orders == order
+        matrix = np.broadcast_to(np.eye(3), (rows.sum(), 3, 3))
+        for char in ROTATE_ORDERS[order]:
+            axis = 'xyz'.index(char)
+            matrix = matrix @ _axis_rotations(axis, radians[rows, axis])
+        matrices[rows] = matrix
+    return matrices
+
+
+def matrix_to_euler(matrices, rotate_order=0):
+    """
+    Rotation matrices to euler degrees, the inverse of euler_to_matrix.
+    At gimbal lock the last axis of the rotate order is 0.
+
+    Args:
+        matrices (list): (N, 3, 3) orthonormal rotations, or (N, 4, 4) matrices without scale.
+        rotate_order (int or list): One order for all, or one per matrix.
+
+    Returns:
+        np.array: (N, 3) x, y, z degrees.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    matrices = matrices.reshape(-1, *matrices.shape[-2:])[:, :3, :3]
+    orders = _orders(rotate_order, len(matrices))
+    # column vector form, the first rotation applied is the rightmost
+    columns = np.transpose(matrices, (0, 2, 1))
+    eulers = np.empty((len(matrices), 3))
+    for order in np.unique(orders):
+        rows = orders == order
+        i, j, k = ['xyz'.index(char) for char in ROTATE_ORDERS[order]]
+        # xyz, yzx and zxy are even permutations
+        sign = 1.0 if order < 3 else -1.0
+        m = columns[rows]
+        sin_b = np.clip(-sign * m[:, k, i], -1.0, 1.0)
+        b = np.arcsin(sin_b)
+        locked = np.abs(sin_b) > 1.0 - _EPSILON
+        a = np.where(locked,
+                     np.arctan2(-sign * m[:, j, k], m[:, j, j]),
+                     np.arctan2(sign * m[:, k, j], m[:, k, k]))
+        c = np.where(locked, 0.0, np.arctan2(sign * m[:, j, i], m[:, i, i]))
+        angles = np.empty((rows.sum(), 3))
+        angles[:, i], angles[:, j], angles[:, k] = a, b, c
+        eulers[rows] = np.degrees(angles)
+    return eulers
+
+
+def decompose(matrices):
+    """
+    Splits matrices into translation, rotation and scale, shear is dropped.
+    A negative determinant is put on the x scale, the rotation is always right handed.
+
+    Returns:
+        tuple: (translations (N, 3), rotations (N, 3, 3), scales (N, 3))
+    """
+    matrices = as_matrices(matrices)
+    axes = matrices[:, :3, :3]
+    scales = np.linalg.norm(axes, axis=2)
+    rotations = axes / np.where(scales < _EPSILON, 1.0, scales)[:, :, None]
+    flipped = np.linalg.det(rotations) < 0
+    scales[flipped, 0] *= -1
+    rotations[flipped, 0] *= -1
+    return matrices[:, 3, :3].copy(), rotations, scales
+
+
+def compose(translations, rotations, scales=None, rotate_order=0):
+    """
+    (N, 4, 4) matrices from translations, euler degrees and scales, scale * rotation * translation.
+    """
+    rotation_matrices = euler_to_matrix(rotations, rotate_order)
+    count = len(rotation_matrices)
+    scales = np.ones((count, 3)) if scales is None else np.asarray(scales, dtype=np.float64).reshape(-1, 3)
+    matrices = np.zeros((count, 4, 4))
+    matrices[:, :3, :3] = rotation_matrices * scales[:, :, None]
+    matrices[:, 3, :3] = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def reflection(plane='YZ'):
+    """
+    The 4x4 reflection across a world plane, 'YZ' flips x.
+    """
+    reflect = np.eye(4)
+    reflect[MIRROR_PLANES[plane.upper()], MIRROR_PLANES[plane.upper()]] = -1.0
+    return reflect
+
+
+def mirror_matrices(matrices, plane='YZ', behavior=True, flip_axis=0):
+    """
+    Mirrors world matrices across a world plane, the result never has a negative scale.
+
+    Args:
+        matrices (list): (N, 4, 4) world matrices.
+        plane (str): 'YZ', 'XZ' or 'XY'.
+        behavior (bool): Negate every reflected axis, equal rotations on both sides then move mirrored,
+                         what mirrorJoint -mirrorBehavior does. Otherwise only flip_axis is negated.
+        flip_axis (int): The local axis negated when not mirroring behavior, 0 x, 1 y, 2 z.
+
+    Returns:
+        np.array: (N, 4, 4) mirrored matrices.
+    """
+    mirrored = as_matrices(matrices) @ reflection(plane)
+    if behavior:
+        mirrored[:, :3, :3] *= -1.0
+    else:
+        mirrored[:, flip_axis, :3] *= -1.0
+    return mirrored
+
+
+def mirror_rotation(rotation, rotate_order=0, plane='YZ', behavior=True, flip_axis=0):
+    """
+    Mirrors world space euler degrees, the values to put on the opposite side with xform.
+
+    Returns:
+        tuple: (rotate, scale) lists, scale is always 1, the mirrored matrix is right handed.
+    """
+    matrix = compose([0, 0, 0], rotation, rotate_order=rotate_order)
+    mirrored = mirror_matrices(matrix, plane=plane, behavior=behavior, flip_axis=flip_axis)
+    return matrix_to_euler(mirrored, rotate_order)[0].tolist(), [1.0, 1.0, 1.0]
+
+
+# ---- Snapshot ----
+class TransformSnapshot:
+    def __init__(self, nodes=()):
+        """
+        Args:
+            nodes (list): DAG nodes to capture right away.
+        """
+        # name -> row in the arrays, names are kept the way they were asked for
+        self._rows = {}
+        self.names = []
+        self._paths = []
+        # the partial path name of each row when it was captured, a rename shows up as a different name
+        self._path_names = []
+        self._handles = []
+        self._callback_ids = []
+        self._world = np.zeros((0, 4, 4))
+        self._local = np.zeros((0, 4, 4))
+        self._rotate_orders = np.zeros(0, dtype=np.int64)
+        self._stale = set()
+        # bumped every time matrices are refetched, lets other caches key on the snapshot
+        self.version = 0
+        if nodes:
+            self.capture(nodes)
+
+    @classmethod
+    def from_matrices(cls, names, world_matrices, local_matrices=None, rotate_orders=0):
+        """
+        A snapshot of given matrices, e.g. reference data, nothing is tracked or refetched.
+        """
+        snapshot = cls()
+        snapshot.names = list(names)
+        snapshot._rows = {name: row for row, name in enumerate(snapshot.names)}
+        snapshot._paths = [None] * len(snapshot.names)
+        snapshot._path_names = [None] * len(snapshot.names)
+        snapshot._handles = [None] * len(snapshot.names)
+        snapshot._callback_ids = [None] * len(snapshot.names)
+        snapshot._world = as_matrices(world_matrices)
+        snapshot._local = snapshot._world.copy() if local_matrices is None else as_matrices(local_matrices)
+        snapshot._rotate_orders = np.array(_orders(rotate_orders, len(snapshot.names)))
+        return snapshot
+
+    # ---- Dirty Tracking ----
+    def _mark_dirty(self, node, modified, row):
+        self._stale.add(row)
+
+    def invalidate(self, nodes=None):
+        """
+        Marks nodes stale by hand, every node by default.
+        """
+        rows = range(len(self.names)) if nodes is None else [self._rows[node] for node in nodes if node in self._rows]
+        self._stale.update(rows)
+
+    def release(self):
+        """
+        Removes the callbacks, the snapshot is no longer kept up to date.
+        """
+        for callback_id in self._callback_ids:
+            if callback_id is not None:
+                om.MMessage.removeCallback(callback_id)
+        self._callback_ids = [None] * len(self._callback_ids)
+
+    def _is_alive(self, row):
+        handle = self._handles[row]
+        return handle is None or (handle.isValid() and handle.isAlive())
+
+    def _is_current(self, node):
+        """
+        The node has a row and it is still the node the name was captured from, not deleted or renamed.
+        """
+        row = self._rows.get(node)
+        if row is None or not self._is_alive(row):
+            return False
+        dag_path = self._paths[row]
+        return dag_path is None or (dag_path.isValid() and dag_path.partialPathName() == self._path_names[row])
+
+    def _drop_row(self, row):
+        # the row stays in the arrays so the other rows keep their place, it is only no longer tracked
+        callback_id = self._callback_ids[row]
+        if callback_id is not None:
+            try:
+                om.MMessage.removeCallback(callback_id)
+            except RuntimeError:
+                pass
+        self._callback_ids[row] = None
+        self._paths[row] = None
+        self._path_names[row] = None
+        self._handles[row] = None
+        self._stale.discard(row)
+
+    # ---- Capture ----
+    def capture(self, nodes):
+        """
+        Adds nodes to the snapshot and fetches every node that is new or stale, in one pass.
+        """
+        new_nodes = [node for node in dict.fromkeys(nodes) if not self._is_current(node)]
+        for node in new_nodes:
+            if node in self._rows:
+                self._drop_row(self._rows[node])
+        if new_nodes:
+            sel = om.MSelectionList()
+            for node in new_nodes:
+                sel.add(node)
+            count = len(new_nodes)
+            self._world = np.concatenate([self._world, np.zeros((count, 4, 4))])
+            self._local = np.concatenate([self._local, np.zeros((count, 4, 4))])
+            self._rotate_orders = np.concatenate([self._rotate_orders, np.zeros(count, dtype=np.int64)])
+            for index, node in enumerate(new_nodes):
+                dag_path = sel.getDagPath(index)
+                row = len(self.names)
+                # a deleted or renamed node's old row is left behind, its name points at the new row
+                self._rows[node] = row
+                self.names.append(node)
+                self._paths.append(dag_path)
+                self._path_names.append(dag_path.partialPathName())
+                self._handles.append(om.MObjectHandle(dag_path.node()))
+                self._callback_ids.append(om.MDagMessage.addWorldMatrixModifiedCallback(dag_path, self._mark_dirty, row))
+                self._stale.add(row)
+        self.refresh()
+
+    def refresh(self, force=False):
+        """
+        Refetches the stale nodes. Called by every query, so there is no need to call it directly.
+        """
+        if force:
+            self.invalidate()
+        rows = [row for row in sorted(self._stale) if self._paths[row] is not None and self._is_alive(row)]
+        self._stale = set()
+        if not rows:
+            return
+        for row in rows:
+            dag_path = self._paths[row]
+            world = np.array(list(dag_path.inclusiveMatrix()), dtype=np.float64).reshape(4, 4)
+            parent_inverse = np.array(list(dag_path.exclusiveMatrixInverse()), dtype=np.float64).reshape(4, 4)
+            self._world[row] = world
+            self._local[row] = world @ parent_inverse
+            if dag_path.node().hasFn(om.MFn.kTransform):
+                # MTransformationMatrix orders start at kXYZ = 1
+                self._rotate_orders[row] = om.MFnTransform(dag_path).rotationOrder() - 1
+        self.version += 1
+
+    def _select(self, nodes):
+        if nodes is None:
+            self.refresh()
+            return np.array([self._rows[name] for name in dict.fromkeys(self.names)], dtype=np.int64)
+        nodes = [nodes] if isinstance(nodes, str) else list(nodes)
+        missing = [node for node in nodes if not self._is_current(node)]
+        if missing:
+            self.capture(missing)
+        else:
+            self.refresh()
+        return np.array([self._rows[node] for node in nodes], dtype=np.int64)
+
+    # ---- Queries ----
+    # every query takes a list of nodes, in the order the results should come back, every node by default
+    # the rows are selected before the arrays are read, capturing a missing node grows the arrays
+    def world_matrices(self, nodes=None):
+        """(N, 4, 4) world matrices."""
+        rows = self._select(nodes)
+        return self._world[rows]
+
+    def local_matrices(self, nodes=None):
+        """(N, 4, 4) matrices relative to the parent."""
+        rows = self._select(nodes)
+        return self._local[rows]
+
+    def rotate_orders(self, nodes=None):
+        rows = self._select(nodes)
+        return self._rotate_orders[rows]
+
+    def positions(self, nodes=None):
+        """(N, 3) world space translations."""
+        return self.world_matrices(nodes)[:, 3, :3]
+
+    def rotations(self, nodes=None, world=True):
+        """(N, 3) euler degrees in each node's rotate order, world or local."""
+        rows = self._select(nodes)
+        matrices = self._world[rows] if world else self._local[rows]
+        return matrix_to_euler(decompose(matrices)[1], self._rotate_orders[rows])
+
+    def scales(self, nodes=None, world=True):
+        """(N, 3) world or local scales."""
+        rows = self._select(nodes)
+        return decompose(self._world[rows] if world else self._local[rows])[2]
+
+    def world_matrix(self, node):
+        return self.world_matrices([node])[0]
+
+    def position(self, node):
+        return self.positions([node])[0]
+
+    def mirrored_matrices(self, nodes=None, plane='YZ', behavior=True, flip_axis=0):
+        """(N, 4, 4) world matrices mirrored across a world plane, see mirror_matrices."""
+        return mirror_matrices(self.world_matrices(nodes), plane=plane, behavior=behavior, flip_axis=flip_axis)
+
+    def mirrored_transforms(self, nodes=None, plane='YZ', behavior=True, flip_axis=0, rotate_orders=None):
+        """
+        The world space translate, rotate and scale that put nodes' mirror images on the opposite side.
+
+        Args:
+            rotate_orders (list): The rotate orders of the nodes the values are for, the nodes' own by default.
+
+        Returns:
+            tuple: (translations (N, 3), rotations (N, 3), scales (N, 3)) ready for cmds.xform(worldSpace=True).
+        """
+        rows = self._select(nodes)
+        mirrored = mirror_matrices(self._world[rows], plane=plane, behavior=behavior, flip_axis=flip_axis)
+        translations, rotations, scales = decompose(mirrored)
+        rotate_orders = self._rotate_orders[rows] if rotate_orders is None else rotate_orders
+        return translations, matrix_to_euler(rotations, rotate_orders), scales
+
+
+def get_snapshot(nodes=None):
+    """
+    Returns the shared snapshot, with nodes captured.
+
+    Args:
+        nodes (list): DAG nodes to capture, or refetch if they are stale.
+
+    Returns:
+        TransformSnapshot
+    """
+    global _SNAPSHOT
+    if not _SCENE_CALLBACK_IDS:
+        for message in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+            _SCENE_CALLBACK_IDS.append(om.MSceneMessage.addCallback(message, _scene_changed))
+    if _SNAPSHOT is None:
+        _SNAPSHOT = TransformSnapshot()
+    if nodes:
+        _SNAPSHOT.capture(nodes)
+    return _SNAPSHOT
+
+
+def get_positions(nodes):
+    return get_snapshot(nodes).positions(nodes)
+
+
+def get_world_matrices(nodes):
+    return get_snapshot(nodes).world_matrices(nodes)
+
+
+def release():
+    """
+    Removes the callbacks and cached matrices of the shared snapshot.
+    """
+    global _SNAPSHOT
+    if _SNAPSHOT is not None:
+        _SNAPSHOT.release()
+    _SNAPSHOT = None
+
+
+def _scene_changed(*args):
+    release()
+
+
+def remove_scene_callbacks():
+    """
+    Removes the before new / before open callbacks, get_snapshot adds them again.
+    """
+    for callback_id in _SCENE_CALLBACK_IDS:
+        try:
+            om.MMessage.removeCallback(callback_id)
+        except RuntimeError:
+            pass
+    del _SCENE_CALLBACK_IDS[:]
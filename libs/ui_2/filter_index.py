@@ -0,0 +1,117 @@
+'''
+Filtering and ranking of node lists for Filtered_List, plain python so it runs without maya or Qt.
+
+The maya side builds one NodeRecord per node when the list is refreshed, name, type and tags are looked up
+once there. Searching after that never goes back to maya:
+- the records are sorted once, grouped by type and alphabetic within a type, filtering keeps that order
+- typing more characters onto a plain text search narrows the previous result instead of starting over
+
+Searches are regular expressions like they always were, a search that isn't a valid expression yet
+(e.g. a lone "[" while typing) is matched as plain text.
+
+# --- Example
+from ui_2 import filter_index
+node_filter = filter_index.NodeFilter([filter_index.NodeRecord("L_brow_CTL", "transform", ["CONTROL"]),
+                                       filter_index.NodeRecord("L_brow_GUIDE", "transform", ["GUIDE"])])
+[record.name for record in node_filter.filter(search="brow", tag_pattern="CONT")]
+# ['L_brow_CTL']
+'''
+import re
+
+# characters that make a search more than plain text
+_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+
+
+class NodeRecord(object):
+    __slots__ = ("name", "short_name", "namespace", "type", "tags", "icon_type", "sort_key")
+
+    def __init__(self, name, node_type="", tags=(), icon_type=None):
+        """
+        Args:
+            name (str): The node name as it shows in the list.
+            node_type (str): cmds.objectType of the node.
+            tags (list): The node's tags.
+            icon_type (str): The type the outliner icon is taken from, the shape's type for transforms.
+        """
+        self.name = name
+        self.short_name = name.rpartition("|")[2]
+        self.namespace = self.short_name.rpartition(":")[0]
+        self.type = node_type
+        self.tags = frozenset(tags)
+        self.icon_type = icon_type or node_type
+        # grouped by type, alphabetic within a type, the order Filtered_List.sort_list always gave
+        self.sort_key = (node_type, name.lower())
+
+
+def _is_literal(pattern):
+    return _SPECIAL.isdisjoint(pattern)
+
+
+def _compile(pattern):
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return re.compile(re.escape(pattern))
+
+
+def _narrows(previous, pattern):
+    # only plain text is guaranteed to match less when it gets longer, "a" -> "a|b" matches more
+    return pattern.startswith(previous) and _is_literal(previous) and _is_literal(pattern)
+
+
+class NodeFilter(object):
+    def __init__(self, records=(), all_tags=None):
+        self.set_records(records, all_tags)
+
+    def set_records(self, records, all_tags=None):
+        """
+        Replaces the records, done once per refresh of the list.
+
+        Args:
+            records (list): NodeRecords, the first record of a name wins.
+            all_tags (list): The tags tag patterns are matched against, every tag of the records by default.
+        """
+        unique = {}
+        for record in records:
+            unique.setdefault(record.name, record)
+        self.records = sorted(unique.values(), key=lambda record: record.sort_key)
+        self._by_name = {record.name: record for record in self.records}
+        if all_tags is None:
+            all_tags = sorted(set().union(*[record.tags for record in self.records]))
+        self.all_tags = list(all_tags)
+        # (search, tag_pattern, result) of the last filter
+        self._last = None
+
+    def record(self, name):
+        return self._by_name.get(name)
+
+    def matching_tags(self, tag_pattern):
+        tag_expression = _compile(tag_pattern)
+        return [tag for tag in self.all_tags if tag_expression.search(tag)]
+
+    def filter(self, search="", tag_pattern=""):
+        """
+        Args:
+            search (str): Regular expression searched for in the node names.
+            tag_pattern (str): Regular expression searched for in all_tags, nodes need one of the matching tags.
+                               A pattern that matches no tag matches no node.
+
+        Returns:
+            list: The matching NodeRecords in sort order.
+        """
+        candidates = self.records
+        if self._last is not None:
+            last_search, last_tag_pattern, last_result = self._last
+            if _narrows(last_search, search) and _narrows(last_tag_pattern, tag_pattern):
+                candidates = last_result
+
+        result = candidates
+        if search:
+            search_expression = _compile(search)
+            result = [record for record in result if search_expression.search(record.name)]
+        if tag_pattern:
+            tags = frozenset(self.matching_tags(tag_pattern))
+            result = [record for record in result if not record.tags.isdisjoint(tags)]
+
+        self._last = (search, tag_pattern, result)
+        return result
@@ -3,6 +3,7 @@ from PySide2 import QtWidgets, QtCore, QtGui
 from maya import OpenMayaUI as OpenMayaUI
 from shiboken2 import wrapInstance
 from maya import cmds
+import maya.api.OpenMaya as om2
 from ui_2 import ui_utils
 import importlib
 importlib.reload(ui_utils)
@@ -14,6 +15,75 @@ from rig_2.tag import constants as tag_constants
 importlib.reload(tag_utils)
 from rig_2 import decorator
 importlib.reload(decorator)
+from ui_2 import filter_index
+importlib.reload(filter_index)
+
+# ms the search boxes wait for typing to pause before filtering
+FILTER_DELAY = 150
+
+
+def build_node_records(nodes, tags=()):
+    """
+    One filter_index.NodeRecord per node, type and icon type come from the API and the tags
+    from the tag index, so nothing is looked up per node once the list is filtered or sorted.
+    Nodes that don't exist are skipped.
+    """
+    tag_index = tag_utils.get_tag_index(list(tags))
+    records = []
+    for node in dict.fromkeys(nodes):
+        try:
+            sel = om2.MSelectionList().add(node)
+        except RuntimeError:
+            continue
+        node_type = om2.MFnDependencyNode(sel.getDependNode(0)).typeName
+        icon_type = node_type
+        # transforms show the icon of their shape, like the outliner
+        if node_type == "transform":
+            dag_path = sel.getDagPath(0)
+            if dag_path.numberOfShapesDirectlyBelow():
+                icon_type = om2.MFnDependencyNode(dag_path.extendToShape(0).node()).typeName
+        records.append(filter_index.NodeRecord(node, node_type, tag_index.tags(node), icon_type))
+    return records
+
+
+class Node_List_Model(QtCore.QAbstractListModel):
+    """
+    The node list only hands Qt the rows that are on screen, so 50k+ nodes don't mean 50k list items.
+    Icons are made once per node type.
+    """
+    def __init__(self, parent=None):
+        super(Node_List_Model, self).__init__(parent)
+        self.records = []
+        self.icons = {}
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = list(records)
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.records)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return record.name
+        if role == QtCore.Qt.DecorationRole:
+            return self.get_icon(record.icon_type)
+        return None
+
+    def get_icon(self, icon_type):
+        if icon_type not in self.icons:
+            file_dir = ":/{0}.svg".format(icon_type)
+            if not QtCore.QFile(file_dir).exists():
+                file_dir = ":/default.svg"
+            self.icons[icon_type] = QtGui.QIcon(file_dir)
+        return self.icons[icon_type]
+
 
 class Filtered_List(QtWidgets.QWidget):
     def __init__(self,
@@ -65,7 +135,19 @@ class Filtered_List(QtWidgets.QWidget):
         self.get_components()
         self.nodes_from_selected_components = []
         self.tag_checklist_contents = None
-        
+        self.node_filter = filter_index.NodeFilter()
+        self.final_records = []
+
+        # the searches wait for typing to pause, every key press restarts the timers
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY)
+        self.filter_timer.timeout.connect(self.filter_data)
+        self.tag_filter_timer = QtCore.QTimer(self)
+        self.tag_filter_timer.setSingleShot(True)
+        self.tag_filter_timer.setInterval(FILTER_DELAY)
+        self.tag_filter_timer.timeout.connect(self.trigger_multi_filter)
+
         self.get_all_tags()
         
         if self.label:
@@ -73,18 +155,18 @@ class Filtered_List(QtWidgets.QWidget):
             self.add_widget_to_layout(self.label_widget)
 
         if self.do_component_selector:
-            self.component_select_layout, self.component_list = ui_utils.label_list("Component",list_height=100, color=self.color,selection_changed_func=self.filter_data)
+            self.component_select_layout, self.component_list = ui_utils.label_list("Component",list_height=100, color=self.color,selection_changed_func=self.refresh_data)
             self.refresh_button = ui_utils.create_button("Get Components", color=self.color, button_pressed_func=self.populate_component_list)
             self.add_widget_to_layout(self.component_select_layout)
             self.add_widget_to_layout(self.refresh_button)
             self.populate_component_list()
 
         if self.do_tag_filter:
-            self.tag_filter_layout, self.tag_filter_line_edit = ui_utils.label_text_box("Filter Tag", color=self.color, text_changed_func=self.trigger_multi_filter)
+            self.tag_filter_layout, self.tag_filter_line_edit = ui_utils.label_text_box("Filter Tag", color=self.color, text_changed_func=lambda text: self.tag_filter_timer.start())
             self.add_widget_to_layout(self.tag_filter_layout)
     
         if self.do_search_filter:
-            self.search_layout, self.search_line_edit = ui_utils.label_text_box("Search", color=self.color, text_changed_func=self.filter_data)
+            self.search_layout, self.search_line_edit = ui_utils.label_text_box("Search", color=self.color, text_changed_func=lambda text: self.filter_timer.start())
             self.add_widget_to_layout(self.search_layout)
 
         if self.do_component_tag_buttons:            
@@ -123,11 +205,18 @@ class Filtered_List(QtWidgets.QWidget):
 
         
         self.add_widget_to_layout(ui_utils.create_label("Nodes Associated With Component", color = self.color))
-        self.list_widget = ui_utils.collection_list(color=self.color, list_height=200, selection_changed_func=self.list_widget_selection_changed)
+        self.list_model = Node_List_Model(self)
+        self.list_widget = QtWidgets.QListView()
+        self.list_widget.setModel(self.list_model)
+        # uniform rows let the view skip measuring every row
+        self.list_widget.setUniformItemSizes(True)
+        self.list_widget.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.list_widget.setFixedHeight(200)
+        self.list_widget.selectionModel().selectionChanged.connect(self.list_widget_selection_changed)
         self.add_widget_to_layout(self.list_widget)
         
         self.setLayout(self.layout)
-        self.filter_data()
+        self.refresh_data()
 
         # This is the tag to search for if you would like to populate based on tag
         self.tag_name = None
@@ -190,7 +279,7 @@ class Filtered_List(QtWidgets.QWidget):
 
     def list_widget_selection_changed(self):
 
-        cmds.select([item.text() for item in self.list_widget.selectedItems()])
+        cmds.select([self.list_model.records[index.row()].name for index in self.list_widget.selectionModel().selectedRows()])
 
 
     def populate_component_list(self):
@@ -337,97 +426,47 @@ class Filtered_List(QtWidgets.QWidget):
                 self.select_all_dict[component] = True
                 self.selectable_checkbox.setChecked(True)
 
-    def filter_data(self):
+    def refresh_data(self):
+        # Looks up the nodes of the selected components once, the searches only filter these
         self.update_tag_all_checklists()
 
-        self.final_list = []
-        self.tag_filter_tag_list = []
         self.nodes_from_selected_components = self.get_nodes_from_selected_components()
-        if not self.tag_filter_line_edit and not self.search_layout and not self.tag_filter and not self.nodes_from_selected_components:
-            return
+        if not self.tag_filter:
+            nodes = self.nodes_from_selected_components
+        else:
+            nodes = tag_utils.get_all_with_tag(self.tag_filter)
+            # If you are using component selection to narrow down the results, make sure to only include nodes that are in the selected component
+            if self.nodes_from_selected_components:
+                component_nodes = set(self.nodes_from_selected_components)
+                nodes = [x for x in nodes if x in component_nodes]
+
+        self.node_filter.set_records(build_node_records(nodes, self.all_tags), self.all_tags)
+        self.filter_data()
 
+    def filter_data(self):
         if self.tag_filter_line_edit:
             self.tag_filter_text = self.tag_filter_line_edit.text()
 
         if self.search_line_edit:
             self.search_text = self.search_line_edit.text()
 
-        if not self.tag_filter and not self.tag_filter_text:
-            self.final_list = self.nodes_from_selected_components
-            self.populate_list()
-            return
-        
-        self.final_list = tag_utils.get_all_with_tag(self.tag_filter)
-
-        # If you are using component selection to narrow down the results, make sure to only include nodes that are in the selected component
-        if self.nodes_from_selected_components:
-            self.final_list = [x for x in self.final_list if x in self.nodes_from_selected_components]
-
-        if not self.search_text and not self.tag_filter_text:
-            self.populate_list()
-            return
-        
-        # Search name using regular expression module
-        final_text = re.compile(self.search_text)
-        self.final_list = list(filter(final_text.search, self.final_list))
-        
-        # Search using TAGS with regular expression
-        filtered_tags = []  
-        if self.tag_filter_line_edit.text():
-            final_text = re.compile(self.tag_filter_line_edit.text())
-            final_list = list(filter(final_text.search, self.all_tags))
-            if final_list:
-                filtered_tags = final_list
-            tmp_list = []
-            for tag in filtered_tags:
-                tag=str(tag)
-                if not tag:
-                    continue
-                if tag == " " or tag == str(" "):
-                    continue
-                if " " in tag:
-                    tag.replace(" ", "")
-                tmp_list += [x for x in self.final_list if cmds.objExists(x + "." + tag)]
-
-            self.final_list = tmp_list
-
-        ###################
+        # Search name and TAGS using regular expressions, extending a search narrows the last result
+        self.final_records = self.node_filter.filter(self.search_text, self.tag_filter_text)
+        self.final_list = [record.name for record in self.final_records]
         self.populate_list()
 
-
-
     def sort_list(self, by_type=True, alphabetic=True):
-        type_dict = {}
-        self.final_list =[str(x) for x in self.final_list]
+        records = [self.node_filter.record(str(x)) or filter_index.NodeRecord(str(x)) for x in self.final_list]
         if alphabetic:
-            self.final_list.sort(key=str.lower)
-        if not by_type:
-            return
-        for node in self.final_list:
-            if cmds.objectType(node) not in type_dict:
-                type_dict[cmds.objectType(node)] = []
-            type_dict[cmds.objectType(node)].append(node)
-        self.final_list = []
-        for key, value in sorted(type_dict.items()):
-            self.final_list += value
-
-
+            records.sort(key=lambda record: record.name.lower())
+        if by_type:
+            records.sort(key=lambda record: record.type)
+        self.final_list = [record.name for record in records]
 
     def populate_list(self):
         self.update_tag_all_checklists()
-        if not self.final_list:
-            return
-
-        self.list_widget.clear()
-
-        # Get rid of duplicates...
-        self.final_list = list(dict.fromkeys(self.final_list))
-        self.sort_list()
-
-        for item in self.final_list:
-            icon = ui_utils.get_outliner_icon(item)
-            item = QtWidgets.QListWidgetItem(icon, item)
-            self.list_widget.addItem(item)
+        # the records come out of the filter without duplicates and sorted
+        self.list_model.set_records(self.final_records)
 
 
 
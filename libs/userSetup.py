@@ -12,4 +12,8 @@
 
 
 
+# to measure startup, time every import from here on, then report once maya is up:
+# from rpdecorator import lazyload
+# lazyload.start_import_timing()
 # import rigbdp
+# lazyload.import_report('rigbdp')
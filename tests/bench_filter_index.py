@@ -0,0 +1,92 @@
+'''
+Timings of ui_2.filter_index.NodeFilter on a synthetic rig sized node list, not collected by pytest.
+
+python tests/bench_filter_index.py
+python tests/bench_filter_index.py --records 120000 --repeat 10
+'''
+# builtins
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'libs'))
+
+from ui_2 import filter_index
+
+SIDES = ('L', 'R', 'C')
+PARTS = ('brow', 'lid', 'lip', 'cheek', 'jaw', 'nose', 'ear', 'neck', 'arm', 'leg', 'finger', 'spine')
+SUFFIXES = {'transform': ('CTL', 'BUF', 'GUIDE', 'GRP'), 'joint': ('JNT', 'BND'), 'mesh': ('GEOShape',),
+            'multiplyDivide': ('MDV',), 'animCurveTU': ('ACV',)}
+TAGS = ('CONTROL', 'GUIDE', 'NO_EXPORT', 'SKIN', 'WEIGHT_CURVE', 'COMPONENT_MEMBERSHIP', 'EXPORT_OVERRIDE')
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    types = list(SUFFIXES)
+    records = []
+    for index in range(count):
+        node_type = rng.choice(types)
+        name = '{0}_{1}{2:03}_{3}'.format(rng.choice(SIDES), rng.choice(PARTS), index % 1000,
+                                          rng.choice(SUFFIXES[node_type]))
+        if rng.random() < 0.1:
+            name = 'char{0}:{1}'.format(rng.randint(1, 4), name)
+        records.append(filter_index.NodeRecord(name, node_type, rng.sample(TAGS, rng.randint(0, 2))))
+    return records
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=60000)
+    parser.add_argument('--repeat', type=int, default=5, help='The best of this many runs is reported.')
+    args = parser.parse_args(argv)
+
+    records = make_records(args.records)
+    print('{0} records, best of {1}'.format(len(records), args.repeat))
+
+    seconds, node_filter = timed(lambda: filter_index.NodeFilter(records), args.repeat)
+    print('{0:<40}{1:>10.1f} ms'.format('index and sort', seconds * 1000))
+
+    # typing "L_brow0" one character at a time, every keystroke after the first narrows the last result
+    typed = 'L_brow0'
+    def type_search():
+        node_filter.set_records(records)
+        return [node_filter.filter(search=typed[:length]) for length in range(1, len(typed) + 1)]
+    seconds, results = timed(type_search, args.repeat)
+    print('{0:<40}{1:>10.1f} ms'.format('set_records + typing "{0}"'.format(typed), seconds * 1000))
+
+    for length in range(1, len(typed) + 1):
+        search = typed[:length]
+        node_filter.filter(search=typed[:length - 1])
+        narrow, result = timed(lambda: node_filter.filter(search=search), 1)
+        print('{0:<40}{1:>10.2f} ms   {2} matches'.format('  keystroke "{0}"'.format(search), narrow * 1000,
+                                                          len(result)))
+
+    def full_search():
+        node_filter._last = None
+        return node_filter.filter(search='L_brow0')
+    seconds, result = timed(full_search, args.repeat)
+    print('{0:<40}{1:>10.1f} ms   {2} matches'.format('full search "L_brow0"', seconds * 1000, len(result)))
+
+    def regex_search():
+        node_filter._last = None
+        return node_filter.filter(search='^[LR]_(brow|lid).*CTL$')
+    seconds, result = timed(regex_search, args.repeat)
+    print('{0:<40}{1:>10.1f} ms   {2} matches'.format('regex search', seconds * 1000, len(result)))
+
+    def tag_search():
+        node_filter._last = None
+        return node_filter.filter(search='brow', tag_pattern='CONTROL|GUIDE')
+    seconds, result = timed(tag_search, args.repeat)
+    print('{0:<40}{1:>10.1f} ms   {2} matches'.format('search + tag pattern', seconds * 1000, len(result)))
+
+
+if __name__ == '__main__':
+    main()
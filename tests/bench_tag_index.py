@@ -0,0 +1,95 @@
+'''
+Timings of rig_2.tag.index.TagIndex against the old per node scan, on the 1115 entry no_export_tag_dict of
+builders/oldMan/guides.py, not collected by pytest.
+
+The old get_tag_dict walked cmds.ls() and asked objExists for every node and tag, here that walk is a loop over
+the same nodes with a set of "node.tag" plugs standing in for objExists.
+
+python tests/bench_tag_index.py
+python tests/bench_tag_index.py --copies 20 --repeat 10
+'''
+# builtins
+import argparse, json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'libs'))
+
+from rig_2.tag import index
+
+GUIDES = os.path.join(ROOT, 'libs', 'builders', 'oldMan', 'guides.py')
+TAGS = ('NO_EXPORT', 'EXPORT_OVERRIDE')
+
+
+def load_tag_dict(copies):
+    # the guides file is a json dict, the tag lists repeat a tag once per component that added it
+    with open(GUIDES) as f:
+        no_export_tag_dict = json.load(f)['no_export_tag_dict']
+    tag_dict = {}
+    for copy in range(copies):
+        prefix = 'char{0}:'.format(copy) if copy else ''
+        for node, tags in no_export_tag_dict.items():
+            tag_dict[prefix + node] = list(dict.fromkeys(tags))
+    # a few overrides so the exclude has something to do
+    for node in list(tag_dict)[::50]:
+        tag_dict[node].append('EXPORT_OVERRIDE')
+    return tag_dict
+
+
+def scan_tag_dict(nodes, plugs, tag_filter, exclude):
+    # the old get_tag_dict, every node of the scene against every tag
+    tag_dict = {}
+    for node in nodes:
+        if any(node + '.' + tag in plugs for tag in exclude):
+            continue
+        for tag in tag_filter:
+            if node + '.' + tag in plugs:
+                tag_dict.setdefault(node, []).append(tag)
+    return tag_dict
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--copies', type=int, default=1, help='Namespaced copies of the guides in the scene.')
+    parser.add_argument('--repeat', type=int, default=20, help='The best of this many runs is reported.')
+    args = parser.parse_args(argv)
+
+    tag_dict = load_tag_dict(args.copies)
+    nodes = list(tag_dict)
+    plugs = {node + '.' + tag for node, tags in tag_dict.items() for tag in tags}
+    print('{0} nodes, {1} tags set, best of {2}'.format(len(nodes), len(plugs), args.repeat))
+
+    seconds, tag_index = timed(lambda: index.TagIndex.from_tag_dict(tag_dict), args.repeat)
+    print('{0:<40}{1:>10.2f} ms'.format('build the index', seconds * 1000))
+
+    scan, scanned = timed(lambda: scan_tag_dict(nodes, plugs, ['NO_EXPORT'], ['EXPORT_OVERRIDE']), args.repeat)
+    print('{0:<40}{1:>10.2f} ms   {2} nodes'.format('tag_dict, old scan', scan * 1000, len(scanned)))
+    seconds, indexed = timed(lambda: tag_index.tag_dict(['NO_EXPORT'], exclude=['EXPORT_OVERRIDE']), args.repeat)
+    print('{0:<40}{1:>10.2f} ms   {2} nodes'.format('tag_dict, index', seconds * 1000, len(indexed)))
+    assert indexed == scanned
+
+    seconds, result = timed(lambda: tag_index.query(all_of=['NO_EXPORT'], none_of=['EXPORT_OVERRIDE']), args.repeat)
+    print('{0:<40}{1:>10.2f} ms   {2} nodes'.format('query NO_EXPORT and not OVERRIDE', seconds * 1000,
+                                                     len(result)))
+
+    # missing against a full index is the rebuild of a rig that already has its tags, against an empty one
+    # it is the first build
+    seconds, result = timed(lambda: tag_index.missing(tag_dict), args.repeat)
+    print('{0:<40}{1:>10.2f} ms   {2} tags'.format('missing, all tagged', seconds * 1000, len(result)))
+    empty = index.TagIndex()
+    seconds, result = timed(lambda: empty.missing(tag_dict), args.repeat)
+    print('{0:<40}{1:>10.2f} ms   {2} nodes'.format('missing, nothing tagged', seconds * 1000,
+                                                     sum(len(nodes) for nodes in result.values())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# the maya free modules under libs are tested without installing the package
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'libs'))
@@ -0,0 +1,179 @@
+import numpy as np
+import pytest
+
+from rig_2.animcurve import bulk
+
+# keyTangent flag -> the key field the stand-in stores it in
+TANGENT_FLAGS = {"inTangentX": "in_x", "inTangentY": "in_y", "outTangentX": "out_x", "outTangentY": "out_y",
+                 "inTangentType": "in_type", "outTangentType": "out_type",
+                 "lock": "lock", "weightLock": "weight_lock"}
+
+# anim curve key attribute -> the key field the stand-in stores it in
+KEY_ATTR_FIELDS = {"keyTanInX": "in_x", "keyTanInY": "in_y", "keyTanOutX": "out_x", "keyTanOutY": "out_y",
+                   "keyTanLocked": "lock", "keyWeightLocked": "weight_lock", "keyBreakdown": "breakdown"}
+
+
+class FakeCmds:
+    """
+    The cmds calls bulk makes, on curves kept as lists of key dicts.
+    """
+    def __init__(self):
+        self.curves = {}
+        self.weighted = {}
+        self.calls = []
+
+    def _indices(self, anim_curve, index):
+        if index is None:
+            return range(len(self.curves[anim_curve]))
+        ranges = [index] if isinstance(index, tuple) else index
+        return [i for start, end in ranges for i in range(start, end + 1)]
+
+    def cutKey(self, anim_curve, clear=False):
+        self.calls.append("cutKey")
+        self.curves[anim_curve] = []
+
+    def setAttr(self, plug, *values, size=None):
+        self.calls.append("setAttr")
+        anim_curve, attr = plug.split(".", 1)
+        attr, index_range = attr[:-1].split("[")
+        assert index_range == f"0:{size - 1}"
+        if attr == "keyTimeValue":
+            assert len(values) == size * 2
+            # new keys come in like maya makes them, locked auto tangents
+            self.curves[anim_curve] = [{"time": time, "value": value, "in_x": 1.0, "in_y": 0.0, "out_x": 1.0,
+                                        "out_y": 0.0, "in_type": "auto", "out_type": "auto", "lock": True,
+                                        "weight_lock": True, "breakdown": False}
+                                       for time, value in zip(values[0::2], values[1::2])]
+            return
+        # the key attributes set the raw values, a locked tangent doesn't drag the other side along
+        keys = self.curves[anim_curve]
+        assert len(values) == size == len(keys)
+        for key, value in zip(keys, values):
+            key[KEY_ATTR_FIELDS[attr]] = value
+
+    def keyframe(self, anim_curve, query=False, edit=False, index=None, timeChange=False, valueChange=False,
+                 breakdown=False):
+        self.calls.append("keyframe")
+        keys = self.curves.get(anim_curve, [])
+        if query:
+            if timeChange:
+                return [key["time"] for key in keys] or None
+            if valueChange:
+                return [key["value"] for key in keys] or None
+            return [key["time"] for key in keys if key["breakdown"]] or None
+        for i in self._indices(anim_curve, index):
+            keys[i]["breakdown"] = breakdown
+
+    def keyTangent(self, anim_curve, query=False, edit=False, index=None, **flags):
+        self.calls.append("keyTangent")
+        if "weightedTangents" in flags:
+            if query:
+                return [self.weighted.get(anim_curve, False)]
+            self.weighted[anim_curve] = flags["weightedTangents"]
+            return None
+        keys = self.curves[anim_curve]
+        if query:
+            (flag,) = flags
+            return [key[TANGENT_FLAGS[flag]] for key in keys]
+        sides = {TANGENT_FLAGS[flag][:TANGENT_FLAGS[flag].index("_")] for flag in flags
+                 if TANGENT_FLAGS[flag] in ("in_x", "in_y", "out_x", "out_y")}
+        for i in self._indices(anim_curve, index):
+            key = keys[i]
+            for flag, value in flags.items():
+                field = TANGENT_FLAGS[flag]
+                key[field] = value
+                # like maya, editing one side of a locked tangent drags the other side along
+                if key["lock"] and sides in ({"in"}, {"out"}) and field[:field.index("_")] in sides:
+                    key[("out" if field.startswith("in") else "in") + field[field.index("_"):]] = value
+
+
+@pytest.fixture
+def fake_cmds(monkeypatch):
+    fake = FakeCmds()
+    monkeypatch.setattr(bulk, "cmds", fake)
+    return fake
+
+
+def curve_dict(num_keys, seed=0, weighted=True):
+    rng = np.random.default_rng(seed)
+    type_ids = sorted(bulk.TANGENT_TYPE_NAMES)
+    return {"name": "L_brow00_ACV",
+            "frame_times": np.cumsum(rng.uniform(0.5, 3.0, num_keys)).tolist(),
+            "frame_values": rng.uniform(-1.0, 1.0, num_keys).tolist(),
+            "tangents_locked": rng.integers(0, 2, num_keys).astype(bool).tolist(),
+            "weights_locked": rng.integers(0, 2, num_keys).astype(bool).tolist(),
+            "is_weighted": [weighted] * num_keys,
+            "is_breakdown": rng.integers(0, 2, num_keys).astype(bool).tolist(),
+            "in_x_tangents": rng.uniform(0.01, 0.5, num_keys).tolist(),
+            "in_y_tangents": rng.uniform(-1.0, 1.0, num_keys).tolist(),
+            "out_x_tangents": rng.uniform(0.01, 0.5, num_keys).tolist(),
+            "out_y_tangents": rng.uniform(-1.0, 1.0, num_keys).tolist(),
+            "in_tangents_type": [type_ids[i % len(type_ids)] for i in range(num_keys)],
+            "out_tangents_type": [type_ids[(i + 5) % len(type_ids)] for i in range(num_keys)]}
+
+
+@pytest.mark.parametrize("weighted", [True, False])
+def test_dict_arrays_dict_round_trip(fake_cmds, weighted):
+    source = curve_dict(24, weighted=weighted)
+    bulk.write_curve_arrays("L_brow00_ACV", bulk.dict_to_arrays(source))
+    result = bulk.arrays_to_dict(bulk.read_curve_arrays("L_brow00_ACV"), "L_brow00_ACV")
+    assert result == source
+
+
+def test_arrays_keep_their_dtypes(fake_cmds):
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(curve_dict(5)))
+    arrays = bulk.read_curve_arrays("curve")
+    for _, array_key, dtype in bulk.DICT_KEYS:
+        assert arrays[array_key].dtype == np.dtype(dtype)
+        assert arrays[array_key].shape == (5,)
+
+
+def test_write_replaces_existing_keys(fake_cmds):
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(curve_dict(30, seed=1)))
+    source = curve_dict(4, seed=2)
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(source))
+    assert bulk.arrays_to_dict(bulk.read_curve_arrays("curve"), source["name"]) == source
+
+
+def test_empty_curve(fake_cmds):
+    source = curve_dict(0)
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(source))
+    assert fake_cmds.curves["curve"] == []
+    assert bulk.arrays_to_dict(bulk.read_curve_arrays("curve"), source["name"]) == source
+
+
+def test_shared_flags_are_one_call_per_value(fake_cmds):
+    # a long curve with the same tangents everywhere only needs a handful of calls
+    num_keys = 500
+    source = curve_dict(num_keys)
+    for key in ("in_x_tangents", "out_x_tangents"):
+        source[key] = [0.25] * num_keys
+    for key in ("in_y_tangents", "out_y_tangents"):
+        source[key] = [0.0] * num_keys
+    source["in_tangents_type"] = source["out_tangents_type"] = [bulk.evaluate.TANGENT_SPLINE] * num_keys
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(source))
+    # cutKey, keyTimeValue, weightedTangents, a setAttr per key attribute and one call per tangent type
+    assert len(fake_cmds.calls) == 3 + len(bulk.KEY_ATTRS) + 2
+    assert bulk.arrays_to_dict(bulk.read_curve_arrays("curve"), source["name"]) == source
+
+
+def test_read_is_one_query_per_attribute(fake_cmds):
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(curve_dict(200)))
+    fake_cmds.calls = []
+    bulk.read_curve_arrays("curve")
+    assert len(fake_cmds.calls) == 12
+
+
+def test_tangent_type_names_round_trip():
+    for index, name in bulk.TANGENT_TYPE_NAMES.items():
+        assert bulk._tangent_types([name]).tolist() == [index]
+
+
+def test_per_key_tangents_are_ranged_setattrs(fake_cmds):
+    # every key has its own tangents, the tangent values still cost one setAttr per key attribute
+    source = curve_dict(300, seed=3)
+    source["in_tangents_type"] = source["out_tangents_type"] = [bulk.evaluate.TANGENT_FLAT] * 300
+    bulk.write_curve_arrays("curve", bulk.dict_to_arrays(source))
+    assert fake_cmds.calls.count("setAttr") == 1 + len(bulk.KEY_ATTRS)
+    assert len(fake_cmds.calls) == 3 + len(bulk.KEY_ATTRS) + 2
+    assert bulk.arrays_to_dict(bulk.read_curve_arrays("curve"), source["name"]) == source
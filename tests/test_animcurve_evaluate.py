@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from rig_2.animcurve import evaluate
+
+
+def typed_curve(times, values, tangent, pre_infinity="constant", post_infinity="constant"):
+    # no stored tangents, the slopes come from the tangent types
+    return {"name": "curve",
+            "frame_times": list(times),
+            "frame_values": list(values),
+            "in_tangents_type": [tangent] * len(times),
+            "out_tangents_type": [tangent] * len(times),
+            "pre_infinity": pre_infinity,
+            "post_infinity": post_infinity}
+
+
+def stored_curve(in_tangents, out_tangents, weighted, fps=24.0):
+    # tangents in (frames, value) like maya resolves them, converted to the API's seconds
+    return {"frame_times": [0.0, 10.0],
+            "frame_values": [0.0, 10.0],
+            "in_tangents_type": ["fixed", "fixed"],
+            "out_tangents_type": ["fixed", "fixed"],
+            "in_x_tangents": [x / fps for x, _ in in_tangents],
+            "in_y_tangents": [y for _, y in in_tangents],
+            "out_x_tangents": [x / fps for x, _ in out_tangents],
+            "out_y_tangents": [y for _, y in out_tangents],
+            "is_weighted": [weighted, weighted]}
+
+
+PEAK = ([0.0, 10.0, 20.0], [0.0, 10.0, 0.0])
+SHELF = ([0.0, 10.0, 20.0], [0.0, 10.0, 10.0])
+RAMP = ([0.0, 10.0, 20.0], [0.0, 1.0, 20.0])
+
+# (keys, tangent type, sample times, expected values), worked out by hand from the hermite basis
+TANGENT_GOLDEN = [
+    (PEAK, "linear", [0.0, 5.0, 10.0, 15.0, 20.0], [0.0, 5.0, 10.0, 5.0, 0.0]),
+    (PEAK, "flat", [2.5, 5.0, 17.5], [1.5625, 5.0, 1.5625]),
+    (PEAK, "step", [0.0, 5.0, 9.99, 10.0, 15.0, 20.0], [0.0, 0.0, 0.0, 10.0, 10.0, 0.0]),
+    (PEAK, "stepnext", [0.0, 5.0, 10.0, 15.0, 20.0], [0.0, 10.0, 10.0, 0.0, 0.0]),
+    # the ends take the slope of their segment, the peak is flat from its equal neighbours
+    (PEAK, "spline", [5.0, 15.0], [6.25, 6.25]),
+    (PEAK, "smooth", [5.0, 15.0], [6.25, 6.25]),
+    (PEAK, "clamped", [5.0, 15.0], [6.25, 6.25]),
+    # plateau and auto go flat on the ends and on extremes
+    (PEAK, "plateau", [2.5, 5.0, 15.0], [1.5625, 5.0, 5.0]),
+    (PEAK, "auto", [2.5, 5.0, 15.0], [1.5625, 5.0, 5.0]),
+    # spline overshoots the shelf, clamped goes flat next to the equal key
+    (SHELF, "spline", [5.0, 15.0], [5.625, 10.625]),
+    (SHELF, "clamped", [5.0, 15.0], [6.25, 10.0]),
+    # plateau clips the spline slope of 1 to 3x the shallow side, 0.3
+    (RAMP, "spline", [5.0], [-0.625]),
+    (RAMP, "plateau", [5.0], [0.125]),
+    # fixed, global, slow and fast evaluate as spline without maya's stored tangents
+    (PEAK, "fixed", [5.0], [6.25]),
+    (PEAK, "global", [5.0], [6.25]),
+    (PEAK, "slow", [5.0], [6.25]),
+    (PEAK, "fast", [5.0], [6.25]),
+]
+
+
+@pytest.mark.parametrize("keys, tangent, samples, expected", TANGENT_GOLDEN,
+                         ids=[f"{row[1]}-{i}" for i, row in enumerate(TANGENT_GOLDEN)])
+def test_tangent_types(keys, tangent, samples, expected):
+    curve = evaluate.AnimCurve(typed_curve(*keys, tangent))
+    np.testing.assert_allclose(curve.evaluate(samples), expected, atol=1e-9)
+
+
+def test_tangent_type_ints_match_names():
+    for name, index in evaluate.TANGENT_NAMES.items():
+        by_name = evaluate.evaluate_curve(typed_curve(*PEAK, name), [2.5, 5.0, 12.5])
+        by_index = evaluate.evaluate_curve(typed_curve(*PEAK, index), [2.5, 5.0, 12.5])
+        np.testing.assert_allclose(by_name, by_index)
+
+
+# (infinity mode, sample times, expected values) on a 0 -> 10 linear ramp over frames 0 -> 10
+INFINITY_GOLDEN = [
+    ("constant", [-5.0, 2.5, 15.0, 40.0], [0.0, 2.5, 10.0, 10.0]),
+    ("linear", [-5.0, 2.5, 15.0, 40.0], [-5.0, 2.5, 15.0, 40.0]),
+    ("cycle", [-7.5, -2.5, 12.5, 22.5, 37.5], [2.5, 7.5, 2.5, 2.5, 7.5]),
+    ("cycleRelative", [-7.5, -2.5, 12.5, 22.5, 37.5], [-7.5, -2.5, 12.5, 22.5, 37.5]),
+    ("oscillate", [-7.5, -2.5, 12.5, 22.5, 37.5], [7.5, 2.5, 7.5, 2.5, 2.5]),
+]
+
+
+@pytest.mark.parametrize("mode, samples, expected", INFINITY_GOLDEN, ids=[row[0] for row in INFINITY_GOLDEN])
+def test_infinity_modes(mode, samples, expected):
+    curve_dict = typed_curve([0.0, 10.0], [0.0, 10.0], "linear", pre_infinity=mode, post_infinity=mode)
+    np.testing.assert_allclose(evaluate.evaluate_curve(curve_dict, samples), expected, atol=1e-9)
+    # the int modes and the keyword overrides give the same result
+    index = evaluate.INFINITY_NAMES[mode]
+    np.testing.assert_allclose(evaluate.evaluate_curve(typed_curve([0.0, 10.0], [0.0, 10.0], "linear"), samples,
+                                                       pre_infinity=index, post_infinity=index),
+                               expected, atol=1e-9)
+
+
+def test_pre_and_post_infinity_are_independent():
+    curve_dict = typed_curve([0.0, 10.0], [0.0, 10.0], "linear", pre_infinity="linear", post_infinity="cycle")
+    np.testing.assert_allclose(evaluate.evaluate_curve(curve_dict, [-5.0, 12.5]), [-5.0, 2.5])
+
+
+def test_stored_tangents_are_seconds():
+    # a slope of 1 per frame stored as 1 value per 1/24 of a second is a straight line
+    curve_dict = stored_curve([(1.0, 1.0)] * 2, [(1.0, 1.0)] * 2, weighted=False)
+    np.testing.assert_allclose(evaluate.evaluate_curve(curve_dict, [2.5, 5.0, 7.5]), [2.5, 5.0, 7.5])
+
+
+def test_weighted_tangents():
+    # control points (0, 0) (5/3, 5/3) (20/3, 10) (10, 10), at bezier parameter 0.5 that is (4.375, 5.625)
+    curve_dict = stored_curve([(10.0, 0.0)] * 2, [(5.0, 5.0)] * 2, weighted=True)
+    np.testing.assert_allclose(evaluate.evaluate_curve(curve_dict, [0.0, 4.375, 10.0]), [0.0, 5.625, 10.0],
+                               atol=1e-9)
+    # the same tangents unweighted only keep their slopes
+    curve_dict = stored_curve([(10.0, 0.0)] * 2, [(5.0, 5.0)] * 2, weighted=False)
+    np.testing.assert_allclose(evaluate.evaluate_curve(curve_dict, [5.0]), [6.25])
+
+
+def test_single_key_and_sample_shape():
+    curve = evaluate.AnimCurve(typed_curve([3.0], [0.5], "spline"))
+    assert curve.evaluate(np.zeros((2, 3))).shape == (2, 3)
+    np.testing.assert_allclose(curve.evaluate([-10.0, 3.0, 10.0]), 0.5)
+
+
+def test_evaluate_stack_normalize():
+    rising = typed_curve([0.0, 10.0], [0.0, 1.0], "linear")
+    falling = typed_curve([0.0, 10.0], [1.0, 0.0], "linear")
+    zero = typed_curve([0.0, 10.0], [0.0, 0.0], "linear")
+    stack = evaluate.evaluate_stack([rising, rising, falling], [0.0, 5.0, 10.0], normalize=True)
+    np.testing.assert_allclose(stack, [[0.0, 1 / 3, 0.5], [0.0, 1 / 3, 0.5], [1.0, 1 / 3, 0.0]])
+    np.testing.assert_allclose(evaluate.evaluate_stack([zero, zero], [5.0], normalize=True), [[0.0], [0.0]])
+
+
+def test_evaluate_weights_falloff():
+    rising = typed_curve([0.0, 10.0], [0.0, 1.0], "linear")
+    falling = typed_curve([0.0, 10.0], [1.0, 0.0], "linear")
+    falloff = typed_curve([0.0, 1.0], [1.0, 0.0], "linear")
+    weights = evaluate.evaluate_weights([rising, falling], [2.5, 7.5], falloff_dicts=falloff, v_samples=[0.0, 0.5])
+    np.testing.assert_allclose(weights, [[0.25, 0.375], [0.75, 0.125]])
+
+
+# curves with the tangents getAnimCurve stores and samples in place of getAttr .output, read the file's provenance
+# note before trusting them as maya's
+with open(os.path.join(os.path.dirname(__file__), "data", "animcurve_maya_samples.json")) as f:
+    MAYA_SAMPLES = json.load(f)
+
+
+@pytest.mark.parametrize("entry", MAYA_SAMPLES["curves"],
+                         ids=[entry["curve"]["name"] for entry in MAYA_SAMPLES["curves"]])
+def test_maya_samples(entry):
+    times, expected = np.array(entry["samples"], dtype=np.float64).T
+    values = evaluate.evaluate_curve(entry["curve"], times, frames_per_second=MAYA_SAMPLES["frames_per_second"])
+    np.testing.assert_allclose(values, expected, atol=1e-6)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from rig_2.tools import drag_session
+
+
+def test_func_session_cancel_calls_cancel_func():
+    calls = []
+    session = drag_session.Func_Drag_Session(start_func=lambda: calls.append("start"),
+                                             change_func=lambda value: calls.append(value),
+                                             end_func=lambda: calls.append("end"),
+                                             cancel_func=lambda: calls.append("cancel"),
+                                             frame_rate=0)
+    drag_session.replay(session, [(0.0, "press", 0.0), (0.1, "drag", 5.0), (0.2, "cancel", None)])
+    assert calls == ["start", 5.0, "cancel"]
+    assert not session.active
+    # a release after the cancel does nothing
+    session.end(10.0)
+    assert calls == ["start", 5.0, "cancel"]
+
+
+def test_func_session_cancel_without_cancel_func():
+    calls = []
+    session = drag_session.Func_Drag_Session(change_func=calls.append, end_func=lambda: calls.append("end"),
+                                             frame_rate=0)
+    drag_session.replay(session, [(0.0, "press", 0.0), (0.1, "drag", 5.0), (0.2, "cancel", None)])
+    assert calls == [5.0]
+
+
+def test_array_session_cancel_restores_snapshot():
+    values = np.zeros(6)
+
+    def write(indices, current):
+        values[indices] = current[indices]
+
+    session = drag_session.Array_Drag_Session(read_func=lambda: values.copy(),
+                                              compute_func=lambda snapshot, value: snapshot + value,
+                                              write_func=write, frame_rate=0)
+    drag_session.replay(session, [(0.0, "press", 0.0), (0.1, "drag", 0.5)])
+    np.testing.assert_allclose(values, 0.5)
+    session.cancel(now=0.2)
+    np.testing.assert_allclose(values, 0.0)
+    np.testing.assert_allclose(session.current, session.snapshot)
+
+
+def test_throttled_drag_writes_only_changed_indices():
+    session = drag_session.Array_Drag_Session(read_func=lambda: np.zeros(10),
+                                              compute_func=lambda snapshot, value: np.where(np.arange(10) < 3,
+                                                                                            value, snapshot),
+                                              write_func=lambda indices, current: None)
+    stats = drag_session.replay(session, [(0.0, "press", 0.0), (0.001, "drag", 0.1), (0.002, "drag", 0.2),
+                                          (0.1, "drag", 0.3), (0.2, "release", 0.3)])
+    # the second event is inside the first frame, the release value was already written
+    assert stats == {"events": 5, "writes": 2, "written_indices": 6}
@@ -0,0 +1,96 @@
+import pytest
+
+from ui_2 import filter_index
+from ui_2.filter_index import NodeFilter, NodeRecord
+
+
+def records():
+    return [NodeRecord("R_brow_CTL", "transform", ["CONTROL"]),
+            NodeRecord("L_brow_CTL", "transform", ["CONTROL"]),
+            NodeRecord("l_brow_GUIDE", "transform", ["GUIDE", "NO_EXPORT"]),
+            NodeRecord("L_brow_JNT", "joint", ["SKIN"]),
+            NodeRecord("face_GEO[1]", "mesh", []),
+            NodeRecord("ns:L_lip_CTL", "transform", ["CONTROL"]),
+            NodeRecord("L_brow_CTL", "joint", ["SKIN"])]
+
+
+def names(result):
+    return [record.name for record in result]
+
+
+def test_sorted_by_type_then_name():
+    node_filter = NodeFilter(records())
+    # case insensitive within a type, the first record of a name wins, L_brow_CTL stays a transform
+    assert names(node_filter.records) == ["L_brow_JNT", "face_GEO[1]", "L_brow_CTL", "l_brow_GUIDE",
+                                          "ns:L_lip_CTL", "R_brow_CTL"]
+    assert node_filter.record("L_brow_CTL").type == "transform"
+    assert node_filter.record("ns:L_lip_CTL").namespace == "ns"
+
+
+def test_filter_keeps_sort_order():
+    node_filter = NodeFilter(records())
+    assert names(node_filter.filter(search="brow")) == ["L_brow_JNT", "L_brow_CTL", "l_brow_GUIDE", "R_brow_CTL"]
+    assert names(node_filter.filter(search="^L_")) == ["L_brow_JNT", "L_brow_CTL"]
+
+
+def test_invalid_regex_is_plain_text():
+    node_filter = NodeFilter(records())
+    assert names(node_filter.filter(search="GEO[")) == ["face_GEO[1]"]
+    assert names(node_filter.filter(search="(")) == []
+    assert names(node_filter.filter(search="GEO\\[1")) == ["face_GEO[1]"]
+
+
+@pytest.mark.parametrize("previous, pattern, narrows", [("", "b", True),
+                                                         ("br", "bro", True),
+                                                         ("bro", "br", False),
+                                                         ("br", "xbr", False),
+                                                         ("L", "L|R", False),
+                                                         ("L.", "L.b", False),
+                                                         ("L_", "L_[bl]", False)])
+def test_narrows(previous, pattern, narrows):
+    assert filter_index._narrows(previous, pattern) is narrows
+
+
+def test_narrowing_reuses_the_previous_result():
+    node_filter = NodeFilter(records())
+    first = node_filter.filter(search="br")
+    # only the previous result is searched, drop a record from it to see that it is used
+    first.remove(node_filter.record("R_brow_CTL"))
+    assert "R_brow_CTL" not in names(node_filter.filter(search="bro"))
+
+
+@pytest.mark.parametrize("sequence", [["L", "L|R"], ["br", "b"], ["L_", "L_[bl]", "L_[bl]r"],
+                                      ["C", "CT", "CTL", "GUIDE"], ["bro", "brow_C"]])
+def test_incremental_matches_fresh(sequence):
+    node_filter = NodeFilter(records())
+    for search in sequence:
+        assert names(node_filter.filter(search=search)) == names(NodeFilter(records()).filter(search=search))
+
+
+def test_tag_patterns():
+    node_filter = NodeFilter(records())
+    assert node_filter.matching_tags("^CON|GUI") == ["CONTROL", "GUIDE"]
+    assert names(node_filter.filter(tag_pattern="CONTROL")) == ["L_brow_CTL", "ns:L_lip_CTL", "R_brow_CTL"]
+    assert names(node_filter.filter(tag_pattern="EXPORT|SKIN")) == ["L_brow_JNT", "l_brow_GUIDE"]
+    assert names(node_filter.filter(search="brow", tag_pattern="CONT")) == ["L_brow_CTL", "R_brow_CTL"]
+    # a pattern that matches no tag matches no node, untagged nodes included
+    assert names(node_filter.filter(tag_pattern="NOPE")) == []
+    # tag narrowing, "CON" -> "CONTROL" searches the previous result
+    node_filter.filter(tag_pattern="CON")
+    assert names(node_filter.filter(tag_pattern="CONTROL")) == ["L_brow_CTL", "ns:L_lip_CTL", "R_brow_CTL"]
+    # widening the tag pattern starts over
+    assert names(node_filter.filter(tag_pattern="CON|SKIN")) == ["L_brow_JNT", "L_brow_CTL", "ns:L_lip_CTL",
+                                                                  "R_brow_CTL"]
+
+
+def test_all_tags_override():
+    node_filter = NodeFilter(records(), all_tags=["GUIDE"])
+    assert node_filter.matching_tags("") == ["GUIDE"]
+    assert names(node_filter.filter(tag_pattern="CONTROL")) == []
+
+
+def test_set_records_resets_the_previous_result():
+    node_filter = NodeFilter(records())
+    node_filter.filter(search="br")
+    node_filter.set_records([NodeRecord("brow_new", "transform")])
+    assert names(node_filter.filter(search="bro")) == ["brow_new"]
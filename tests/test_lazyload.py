@@ -0,0 +1,63 @@
+import importlib
+import sys
+
+import pytest
+
+from rpdecorator import lazyload
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    # lazypkg/__init__.py uses lazy_submodules, heavy imports light like a module pulling in a dependency
+    root = tmp_path / 'lazypkg'
+    root.mkdir()
+    (root / '__init__.py').write_text('from rpdecorator import lazyload\n'
+                                      '__getattr__, __dir__ = lazyload.lazy_submodules(__name__)\n')
+    (root / 'light.py').write_text('import time\ntime.sleep(0.02)\nVALUE = 1\n')
+    (root / 'heavy.py').write_text('import time\nfrom lazypkg import light\ntime.sleep(0.05)\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(lazyload, 'IMPORT_TIMES', {})
+    yield 'lazypkg'
+    lazyload.stop_import_timing()
+    for name in [name for name in sys.modules if name == 'lazypkg' or name.startswith('lazypkg.')]:
+        del sys.modules[name]
+    importlib.invalidate_caches()
+
+
+def test_plain_imports_are_timed(package):
+    lazyload.start_import_timing()
+    from lazypkg import heavy  # noqa: F401
+    report = {name: (inclusive, own) for name, inclusive, own in lazyload.import_report(package, print_report=False)}
+    assert set(report) == {'lazypkg', 'lazypkg.heavy', 'lazypkg.light'}
+    heavy_inclusive, heavy_self = report['lazypkg.heavy']
+    light_inclusive, light_self = report['lazypkg.light']
+    # heavy's inclusive time carries light's, its self time doesn't
+    assert heavy_inclusive >= heavy_self + light_inclusive * 0.99
+    assert 0.04 < heavy_self < heavy_inclusive
+    assert light_self == pytest.approx(light_inclusive)
+
+
+def test_nothing_is_timed_after_stop(package):
+    lazyload.start_import_timing()
+    lazyload.stop_import_timing()
+    assert not any(isinstance(finder, lazyload._ImportTimer) for finder in sys.meta_path)
+    import lazypkg.light  # noqa: F401
+    assert lazyload.IMPORT_TIMES == {}
+
+
+def test_walk_times_every_submodule(package):
+    report = lazyload.import_report(package, walk=True, print_report=False)
+    assert [name for name, _, _ in report][:1] == ['lazypkg.heavy']
+    assert {name for name, _, _ in report} == {'lazypkg', 'lazypkg.heavy', 'lazypkg.light'}
+    # walking on its own leaves no timer behind
+    assert lazyload._TIMER is None
+
+
+def test_lazy_submodules(package):
+    lazypkg = importlib.import_module(package)
+    assert 'lazypkg.light' not in sys.modules
+    assert 'light' in dir(lazypkg)
+    assert lazypkg.light.VALUE == 1
+    assert 'light' in vars(lazypkg)
+    with pytest.raises(AttributeError):
+        lazypkg.missing
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from rigbdp.build import lock_plan
+
+
+def state(lock=False, keyable=True, channel_box=False, connected=False, **extra):
+    return dict(lock=lock, keyable=keyable, channel_box=channel_box, connected=connected, **extra)
+
+
+def test_make_and_merge_plans():
+    plan = lock_plan.make_plan(['a.v', 'b.v'], lock=True, keyable=False)
+    assert plan == {'a.v': {'lock': True, 'keyable': False}, 'b.v': {'lock': True, 'keyable': False}}
+    # every plug gets its own state dict
+    plan['a.v']['lock'] = False
+    assert plan['b.v']['lock'] is True
+    merged = lock_plan.merge_plans(plan, lock_plan.make_plan(['b.v', 'c.v'], keyable=True, value=0))
+    assert merged == {'a.v': {'lock': False, 'keyable': False},
+                      'b.v': {'lock': True, 'keyable': True, 'value': 0},
+                      'c.v': {'keyable': True, 'value': 0}}
+
+
+def test_diff_keeps_only_what_changes():
+    plan = lock_plan.make_plan(['a.v', 'b.v'], lock=True, keyable=False)
+    current = {'a.v': state(), 'b.v': state(lock=True, keyable=False)}
+    changes, skipped = lock_plan.diff_plan(plan, current)
+    assert changes == {'a.v': {'keyable': False, 'lock': True}}
+    assert skipped == {}
+
+
+def test_diff_value_tolerance():
+    plan = lock_plan.make_plan(['a.v'], value=1.0)
+    assert lock_plan.diff_plan(plan, {'a.v': state(value=1.0 + 1e-9)}) == ({}, {})
+    assert lock_plan.diff_plan(plan, {'a.v': state(value=0.0)}) == ({'a.v': {'value': 1.0}}, {})
+
+
+def test_diff_skip_reasons():
+    plan = lock_plan.make_plan(['gone.v', 'driven.v', 'locked.v'], value=0)
+    current = {'driven.v': state(connected=True, value=1.0),
+               'locked.v': state(lock=True, value=1.0)}
+    changes, skipped = lock_plan.diff_plan(plan, current)
+    assert changes == {}
+    assert skipped == {'gone.v': 'missing', 'driven.v': 'connected', 'locked.v': 'locked'}
+
+
+def test_diff_skipped_value_keeps_the_other_changes():
+    plan = lock_plan.make_plan(['driven.v'], value=0, keyable=False)
+    changes, skipped = lock_plan.diff_plan(plan, {'driven.v': state(connected=True, value=1.0)})
+    assert changes == {'driven.v': {'keyable': False}}
+    assert skipped == {'driven.v': 'connected'}
+
+
+def test_diff_value_on_locked_plug_with_a_lock_in_the_plan():
+    # the plan says what the lock ends up as, so the value is set in between unlocking and relocking
+    plan = lock_plan.make_plan(['locked.v'], value=0, lock=True)
+    changes, skipped = lock_plan.diff_plan(plan, {'locked.v': state(lock=True, value=1.0)})
+    assert changes == {'locked.v': {'value': 0}}
+    assert skipped == {}
+
+
+def test_changes_to_mel_unlocks_sets_and_relocks():
+    current = {'locked.v': state(lock=True, value=1.0)}
+    changes = {'locked.v': {'value': 0}}
+    assert lock_plan.changes_to_mel(changes, current).splitlines() == [
+        'catchQuiet(`setAttr -lock 0 "locked.v"`);',
+        'catchQuiet(`setAttr "locked.v" 0`);',
+        'catchQuiet(`setAttr -lock 1 "locked.v"`);']
+
+
+def test_changes_to_mel_flags():
+    current = {'a.v': state(), 'b.v': state(lock=True)}
+    changes = {'a.v': {'value': True, 'keyable': False, 'channel_box': True, 'lock': True},
+               'b.v': {'lock': False, 'keyable': False}}
+    assert lock_plan.changes_to_mel(changes, current).splitlines() == [
+        'catchQuiet(`setAttr "a.v" 1`);',
+        'catchQuiet(`setAttr -keyable 0 -channelBox 1 -lock 1 "a.v"`);',
+        'catchQuiet(`setAttr -keyable 0 -lock 0 "b.v"`);']
+    # a value that unlocks a plug the plan leaves unlocked doesn't lock it again
+    mel = lock_plan.changes_to_mel({'b.v': {'value': 2.5, 'lock': False}}, current)
+    assert mel.splitlines() == ['catchQuiet(`setAttr -lock 0 "b.v"`);', 'catchQuiet(`setAttr "b.v" 2.5`);']
+
+
+def test_restore_plan():
+    plan = lock_plan.make_plan(['a.v', 'b.v'], lock=True, value=1)
+    current = {'a.v': state(value=0.0), 'b.v': state(lock=True, value=1.0)}
+    changes, _ = lock_plan.diff_plan(plan, current)
+    restore = lock_plan.restore_plan(changes, current)
+    assert restore == {'a.v': {'value': 0.0, 'lock': False}}
+    # diffing the restore plan against the applied state gives the changes back in reverse
+    applied = {'a.v': state(lock=True, value=1.0)}
+    assert lock_plan.diff_plan(restore, applied) == ({'a.v': {'value': 0.0, 'lock': False}}, {})
+
+
+def test_save_load_round_trip(tmp_path):
+    plan = lock_plan.merge_plans(lock_plan.make_plan(['M_root_ctrl.visibility'], lock=True, keyable=False),
+                                 lock_plan.make_plan(['M_cog_ctrl.visibility'], value=1))
+    file_path = str(tmp_path / 'teshi_LOCK_PLAN.json')
+    lock_plan.save_plan(plan, file_path, notes='visibility locks')
+    assert lock_plan.load_plan(file_path) == plan
+    with open(file_path) as json_file:
+        data = json.load(json_file)
+    assert data['version'] == lock_plan.PLAN_VERSION
+    assert data['notes'] == 'visibility locks'
+
+
+def test_load_newer_version(tmp_path):
+    file_path = tmp_path / 'future.json'
+    file_path.write_text(json.dumps({'version': lock_plan.PLAN_VERSION + 1, 'plugs': {}}))
+    with pytest.raises(ValueError, match='version'):
+        lock_plan.load_plan(str(file_path))
+    # files saved before plans had a version load as the current one
+    file_path.write_text(json.dumps({'plugs': {'a.v': {'lock': True}}}))
+    assert lock_plan.load_plan(str(file_path)) == {'a.v': {'lock': True}}
@@ -0,0 +1,181 @@
+import numpy as np
+import pytest
+
+from rig_2.weights import projection
+
+# a 2 x 1 inch film back, 50.8 x 25.4 mm, so the pixels per mm come out round
+FILM = dict(focal_length=50.0, horizontal_aperture=2.0, vertical_aperture=1.0)
+
+
+def translate(x, y, z):
+    matrix = np.eye(4)
+    matrix[3, :3] = [x, y, z]
+    return matrix
+
+
+# +90 about y, row vectors so the camera's -z looks down world -x, then moved 10 along x
+ROTATE_Y_MOVE_X = np.array([[0.0, 0.0, -1.0, 0.0],
+                            [0.0, 1.0, 0.0, 0.0],
+                            [1.0, 0.0, 0.0, 0.0],
+                            [10.0, 0.0, 0.0, 1.0]])
+
+
+@pytest.mark.parametrize("width, height, film_fit, pixels_per_mm", [
+    # 1016 x 254 is 20 pixels per mm across and 10 up
+    (1016, 254, "fill", 20.0),
+    (1016, 254, "horizontal", 20.0),
+    (1016, 254, "vertical", 10.0),
+    (1016, 254, "overscan", 10.0),
+    # 508 x 508 is 10 pixels per mm across and 20 up
+    (508, 508, "fill", 20.0),
+    (508, 508, "horizontal", 10.0),
+    (508, 508, "vertical", 20.0),
+    (508, 508, "overscan", 10.0),
+])
+def test_perspective_film_fits(width, height, film_fit, pixels_per_mm):
+    # camera at z=10 looking at the origin, (1, 0.5, 0) is (1, 0.5, -10) in camera space, on the film at
+    # 50mm * (0.1, 0.05) = (5, 2.5) mm from the middle
+    camera = projection.camera_settings(translate(0.0, 0.0, -10.0), width, height, film_fit=film_fit, **FILM)
+    screen, depth = projection.world_to_screen([[1.0, 0.5, 0.0], [0.0, 0.0, 0.0]], camera)
+    np.testing.assert_allclose(screen, [[width / 2 + 5.0 * pixels_per_mm, height / 2 + 2.5 * pixels_per_mm],
+                                        [width / 2, height / 2]])
+    np.testing.assert_allclose(depth, [10.0, 10.0])
+
+
+def test_film_fit_enum_index():
+    assert projection.camera_settings(np.eye(4), 960, 540, film_fit=2)["film_fit"] == "vertical"
+    assert projection.camera_settings(np.eye(4), 960, 540)["film_fit"] == "fill"
+
+
+def test_rotated_camera():
+    # the flat 16 values getAttr gives, the point sits at (1, 0.5, -10) in camera space like above
+    world_inverse = np.linalg.inv(ROTATE_Y_MOVE_X).reshape(-1).tolist()
+    camera = projection.camera_settings(world_inverse, 1016, 254, **FILM)
+    np.testing.assert_allclose(projection.to_camera_space([0.0, 0.5, -1.0], camera["world_inverse_matrix"]),
+                               [[1.0, 0.5, -10.0]])
+    screen, depth = projection.world_to_screen([0.0, 0.5, -1.0], camera)
+    np.testing.assert_allclose(screen, [[608.0, 177.0]])
+    np.testing.assert_allclose(depth, [10.0])
+
+
+def test_points_behind_the_camera_are_nan():
+    camera = projection.camera_settings(np.eye(4), 960, 540, near_clip=0.1)
+    screen, depth = projection.camera_to_screen([[0.0, 0.0, -5.0], [1.0, 1.0, 5.0], [0.0, 0.0, 0.0],
+                                                 [1.0, 0.0, -0.1]], camera)
+    np.testing.assert_allclose(screen[0], [480.0, 270.0])
+    # behind, on the camera and on the near clip plane
+    assert np.isnan(screen[1:]).all()
+    np.testing.assert_allclose(depth, [5.0, -5.0, 0.0, 0.1])
+
+
+def test_orthographic():
+    # 30 units across the 960 pixels, 32 pixels per unit both ways, depth doesn't scale anything
+    camera = projection.camera_settings(translate(0.0, 0.0, -10.0), 960, 540, orthographic=True,
+                                        orthographic_width=30.0)
+    screen, depth = projection.world_to_screen([[3.0, -1.5, 5.0], [3.0, -1.5, -20.0], [0.0, 0.0, 15.0]], camera)
+    np.testing.assert_allclose(screen, [[576.0, 222.0], [576.0, 222.0], [480.0, 270.0]])
+    np.testing.assert_allclose(depth, [5.0, 30.0, -5.0])
+    # the orthographic width fits the larger side, a tall viewport is 32 pixels per unit up
+    camera = projection.camera_settings(np.eye(4), 540, 960, orthographic=True, orthographic_width=30.0)
+    np.testing.assert_allclose(projection.camera_to_screen([[3.0, -1.5, -1.0]], camera)[0], [[366.0, 432.0]])
+
+
+def test_radius_select():
+    screen = [[0.0, 0.0], [3.0, 4.0], [3.0, 4.1], [-5.0, 0.0], [np.nan, np.nan]]
+    assert projection.radius_select(screen, (0.0, 0.0), 5.0).tolist() == [True, True, False, True, False]
+    # the last in front of the camera is at the near clip
+    depth = [1.0, -1.0, 1.0, 0.1, 1.0]
+    assert projection.radius_select(screen, (0.0, 0.0), 5.0, depth=depth,
+                                    near_clip=0.1).tolist() == [True, False, False, False, False]
+
+
+def test_selections_skip_points_behind_the_camera():
+    camera = projection.camera_settings(np.eye(4), 960, 540, **FILM)
+    # straight ahead and straight behind, the one behind has no screen position
+    screen, depth = projection.camera_to_screen([[0.0, 0.0, -10.0], [0.0, 0.0, 10.0]], camera)
+    square = [(430.0, 220.0), (530.0, 220.0), (530.0, 320.0), (430.0, 320.0)]
+    assert projection.radius_select(screen, (480.0, 270.0), 1000.0, depth=depth).tolist() == [True, False]
+    assert projection.lasso_select(screen, square, depth=depth).tolist() == [True, False]
+    # orthographic points behind keep their screen position, the depth leaves them out
+    camera = projection.camera_settings(np.eye(4), 960, 540, orthographic=True)
+    screen, depth = projection.camera_to_screen([[0.0, 0.0, -10.0], [0.0, 0.0, 10.0]], camera)
+    assert projection.lasso_select(screen, square).tolist() == [True, True]
+    assert projection.lasso_select(screen, square, depth=depth, near_clip=0.1).tolist() == [True, False]
+    assert projection.nearest(screen, (480.0, 270.0), depth=depth, near_clip=0.1) == 0
+
+
+def test_lasso_select():
+    square = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    screen = [[5.0, 5.0], [-1.0, 5.0], [11.0, 5.0], [5.0, 11.0], [0.5, 9.5]]
+    assert projection.lasso_select(screen, square).tolist() == [True, False, False, False, True]
+    # the lasso closes itself, and lassos with fewer than 3 points select nothing
+    assert projection.lasso_select(screen, square + [square[0]]).tolist() == [True, False, False, False, True]
+    assert not projection.lasso_select(screen, square[:2]).any()
+
+
+def test_self_intersecting_lassos_are_even_odd():
+    # a bow tie crossing itself at (5, 5), the left and right triangles are inside, above and below are not
+    bow_tie = [(0.0, 0.0), (10.0, 10.0), (10.0, 0.0), (0.0, 10.0)]
+    screen = [[2.0, 5.0], [8.0, 5.0], [5.0, 2.0], [5.0, 8.0]]
+    assert projection.lasso_select(screen, bow_tie).tolist() == [True, True, False, False]
+    # a five point star drawn in one stroke goes round its middle twice, the middle is outside
+    angles = np.radians(90.0 + 144.0 * np.arange(5))
+    star = np.stack([np.cos(angles), np.sin(angles)], axis=1) * 100.0
+    screen = [[0.0, 0.0], [0.0, 70.0], [0.0, -90.0]]
+    assert projection.lasso_select(screen, star).tolist() == [False, True, False]
+
+
+def test_distance_to_polygon():
+    square = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    distance = projection.distance_to_polygon([[5.0, 5.0], [13.0, 14.0], [-2.0, 5.0], [5.0, 0.0]], square)
+    np.testing.assert_allclose(distance, [5.0, 5.0, 2.0, 0.0])
+
+
+@pytest.mark.parametrize("falloff, expected", [
+    ("constant", [1.0, 1.0, 1.0, 0.0, 0.0, 0.0]),
+    ("linear", [1.0, 0.75, 0.5, 0.0, 0.0, 0.0]),
+    # 1 - t^2 (3 - 2t)
+    ("smooth", [1.0, 0.84375, 0.5, 0.0, 0.0, 0.0]),
+    # exp(-4.6 t^2), cut to 0 at the edge
+    ("gaussian", [1.0, np.exp(-0.2875), np.exp(-1.15), 0.0, 0.0, 0.0]),
+])
+def test_falloff_curves(falloff, expected):
+    # past the edge and nan are 0, below 0 is the middle
+    t = [0.0, 0.25, 0.5, 1.0, 1.5, np.nan]
+    np.testing.assert_allclose(projection.falloff_curve(t, falloff), expected)
+    assert projection.falloff_curve([-1.0], falloff)[0] == 1.0
+
+
+def test_unknown_falloff():
+    with pytest.raises(ValueError, match="Unknown falloff"):
+        projection.falloff_curve([0.5], "cubic")
+
+
+def test_radius_falloff():
+    screen = [[0.0, 0.0], [5.0, 0.0], [0.0, 10.0], [20.0, 0.0], [np.nan, np.nan]]
+    np.testing.assert_allclose(projection.radius_falloff(screen, (0.0, 0.0), 10.0, falloff="linear"),
+                               [1.0, 0.5, 0.0, 0.0, 0.0])
+    # a 0 radius brush only weights what is right under it
+    np.testing.assert_allclose(projection.radius_falloff(screen, (0.0, 0.0), 0.0), [1.0, 0.0, 0.0, 0.0, 0.0])
+    np.testing.assert_allclose(projection.radius_falloff(screen, (0.0, 0.0), 10.0, falloff="linear",
+                                                         depth=[-1.0, 1.0, 1.0, 1.0, 1.0]),
+                               [0.0, 0.5, 0.0, 0.0, 0.0])
+
+
+def test_lasso_falloff():
+    square = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+    screen = [[5.0, 5.0], [12.0, 5.0], [5.0, -3.0], [20.0, 5.0]]
+    np.testing.assert_allclose(projection.lasso_falloff(screen, square, 4.0, falloff="linear"),
+                               [1.0, 0.5, 0.25, 0.0])
+    np.testing.assert_allclose(projection.lasso_falloff(screen, square, 0.0), [1.0, 0.0, 0.0, 0.0])
+    np.testing.assert_allclose(projection.lasso_falloff(screen, square, 4.0, falloff="linear",
+                                                        depth=[-1.0, 1.0, 1.0, 1.0]), [0.0, 0.5, 0.25, 0.0])
+
+
+def test_nearest():
+    screen = [[0.0, 0.0], [4.0, 4.0], [1.0, 1.0], [np.nan, np.nan]]
+    assert projection.nearest(screen, (5.0, 5.0)) == 1
+    # the closest is behind the camera
+    assert projection.nearest(screen, (5.0, 5.0), depth=[1.0, -1.0, 1.0, 1.0]) == 2
+    assert projection.nearest(screen, (5.0, 5.0), depth=[-1.0, -1.0, -1.0, -1.0]) is None
+    assert projection.nearest(np.zeros((0, 2)), (5.0, 5.0)) is None
@@ -0,0 +1,92 @@
+import pytest
+
+from rig_2.tag import index
+
+
+@pytest.fixture
+def tag_index():
+    return index.TagIndex.from_tag_dict({"L_brow_CTL": ["CONTROL"],
+                                         "L_brow_GUIDE": ["GUIDE", "NO_EXPORT"],
+                                         "R_brow_GUIDE": ["GUIDE"],
+                                         "C_jaw_CTL": ["CONTROL", "NO_EXPORT", "EXPORT_OVERRIDE"],
+                                         "C_root_JNT": ["SKIN"]})
+
+
+def test_query_and_or_not(tag_index):
+    assert tag_index.query(all_of=["CONTROL", "NO_EXPORT"]) == ["C_jaw_CTL"]
+    assert tag_index.query(any_of=["CONTROL", "GUIDE"]) == ["L_brow_CTL", "C_jaw_CTL", "L_brow_GUIDE",
+                                                             "R_brow_GUIDE"]
+    assert tag_index.query(any_of=["CONTROL", "GUIDE"], none_of=["NO_EXPORT"]) == ["L_brow_CTL", "R_brow_GUIDE"]
+    assert tag_index.query(all_of=["GUIDE"], any_of=["NO_EXPORT", "SKIN"]) == ["L_brow_GUIDE"]
+    # only NOT is every indexed node without the tags, in index order
+    assert tag_index.query(none_of=["CONTROL", "GUIDE"]) == ["C_root_JNT"]
+    # a tag nothing has matches nothing
+    assert tag_index.query(all_of=["CONTROL", "MISSING"]) == []
+    assert tag_index.query(any_of=["MISSING"]) == []
+
+
+def test_set_tag_marks_empty_tags_indexed(tag_index):
+    assert not tag_index.is_indexed("WEIGHT_CURVE")
+    tag_index.set_tag("WEIGHT_CURVE", [])
+    assert tag_index.is_indexed("WEIGHT_CURVE")
+    assert tag_index.nodes("WEIGHT_CURVE") == []
+    tag_index.set_tag("GUIDE", ["C_root_JNT"])
+    assert tag_index.nodes("GUIDE") == ["C_root_JNT"]
+    assert tag_index.tags("L_brow_GUIDE") == ["NO_EXPORT"]
+
+
+def test_rename_node(tag_index):
+    tag_index.rename_node("L_brow_GUIDE", "L_browInner_GUIDE")
+    assert "L_brow_GUIDE" not in tag_index
+    assert tag_index.tags("L_browInner_GUIDE") == ["GUIDE", "NO_EXPORT"]
+    assert tag_index.query(all_of=["GUIDE", "NO_EXPORT"]) == ["L_browInner_GUIDE"]
+    # a node that isn't indexed is left alone
+    tag_index.rename_node("pCube1", "pCube2")
+    assert "pCube2" not in tag_index
+
+
+def test_remove_node(tag_index):
+    tag_index.remove_node("C_jaw_CTL")
+    assert "C_jaw_CTL" not in tag_index
+    assert tag_index.nodes("CONTROL") == ["L_brow_CTL"]
+    assert tag_index.nodes("NO_EXPORT") == ["L_brow_GUIDE"]
+    # the tags stay indexed, they are only empty
+    assert tag_index.is_indexed("EXPORT_OVERRIDE")
+    tag_index.remove_node("C_jaw_CTL")
+    tag_index.remove("C_root_JNT", "SKIN")
+    assert "C_root_JNT" not in tag_index
+
+
+def test_clear_one_tag(tag_index):
+    tag_index.clear("NO_EXPORT")
+    assert not tag_index.is_indexed("NO_EXPORT")
+    assert tag_index.tags("C_jaw_CTL") == ["CONTROL", "EXPORT_OVERRIDE"]
+    assert tag_index.has("L_brow_GUIDE", "GUIDE")
+
+
+def test_tag_dict_exclude(tag_index):
+    assert tag_index.tag_dict(["NO_EXPORT", "GUIDE"]) == {"L_brow_GUIDE": ["NO_EXPORT", "GUIDE"],
+                                                          "C_jaw_CTL": ["NO_EXPORT"],
+                                                          "R_brow_GUIDE": ["GUIDE"]}
+    assert tag_index.tag_dict(["NO_EXPORT", "GUIDE"], exclude=["EXPORT_OVERRIDE"]) == {
+        "L_brow_GUIDE": ["NO_EXPORT", "GUIDE"], "R_brow_GUIDE": ["GUIDE"]}
+    assert tag_index.tag_dict(["MISSING"]) == {}
+
+
+def test_missing(tag_index):
+    wanted = {"L_brow_CTL": ["CONTROL", "NO_EXPORT"], "R_brow_CTL": ["CONTROL", "NO_EXPORT"],
+              "C_root_JNT": ["SKIN"]}
+    assert tag_index.missing(wanted) == {"NO_EXPORT": ["L_brow_CTL", "R_brow_CTL"], "CONTROL": ["R_brow_CTL"]}
+    # adding what is missing leaves nothing
+    for tag, nodes in tag_index.missing(wanted).items():
+        for node in nodes:
+            tag_index.add(node, tag)
+    assert tag_index.missing(wanted) == {}
+
+
+def test_from_tag_dict_round_trip(tag_index):
+    tags = tag_index.all_tags()
+    rebuilt = index.TagIndex.from_tag_dict(tag_index.tag_dict(tags))
+    # tag_dict is grouped by node, so the nodes of a tag can come back in another order
+    for tag in tags:
+        assert set(rebuilt.nodes(tag)) == set(tag_index.nodes(tag))
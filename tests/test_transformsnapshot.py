@@ -0,0 +1,367 @@
+import numpy as np
+import pytest
+
+from rpdecorator import transformsnapshot as ts
+
+ORDERS = list(range(len(ts.ROTATE_ORDERS)))
+
+
+def random_rotations(count, seed=0, middle_limit=85.0):
+    # the middle axis of each order is kept off +-90 so the eulers come back the same
+    rng = np.random.default_rng(seed)
+    rotations = rng.uniform(-179.0, 179.0, (count, 3))
+    return rotations, rng.uniform(-middle_limit, middle_limit, count)
+
+
+def with_middle(rotations, middle, rotate_order):
+    rotations = rotations.copy()
+    rotations[:, 'xyz'.index(ts.ROTATE_ORDERS[rotate_order][1])] = middle
+    return rotations
+
+
+def axis_matrix(axis, degrees):
+    # row vector rotation written out by hand, +90 about x takes y to z
+    cos, sin = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    return {'x': np.array([[1, 0, 0], [0, cos, sin], [0, -sin, cos]]),
+            'y': np.array([[cos, 0, -sin], [0, 1, 0], [sin, 0, cos]]),
+            'z': np.array([[cos, sin, 0], [-sin, cos, 0], [0, 0, 1]])}[axis]
+
+
+def test_axis_directions():
+    # +90 about x takes y to z, about y takes z to x, about z takes x to y
+    np.testing.assert_allclose(np.array([0, 1, 0]) @ ts.euler_to_matrix([90, 0, 0])[0], [0, 0, 1], atol=1e-12)
+    np.testing.assert_allclose(np.array([0, 0, 1]) @ ts.euler_to_matrix([0, 90, 0])[0], [1, 0, 0], atol=1e-12)
+    np.testing.assert_allclose(np.array([1, 0, 0]) @ ts.euler_to_matrix([0, 0, 90])[0], [0, 1, 0], atol=1e-12)
+
+
+@pytest.mark.parametrize('rotate_order', ORDERS, ids=ts.ROTATE_ORDERS)
+def test_euler_to_matrix_applies_first_axis_first(rotate_order):
+    rotation = [20.0, -35.0, 70.0]
+    expected = np.eye(3)
+    for char in ts.ROTATE_ORDERS[rotate_order]:
+        expected = expected @ axis_matrix(char, rotation['xyz'.index(char)])
+    np.testing.assert_allclose(ts.euler_to_matrix(rotation, rotate_order)[0], expected, atol=1e-12)
+
+
+@pytest.mark.parametrize('rotate_order', ORDERS, ids=ts.ROTATE_ORDERS)
+def test_euler_round_trip(rotate_order):
+    rotations, middle = random_rotations(200, seed=rotate_order)
+    rotations = with_middle(rotations, middle, rotate_order)
+    matrices = ts.euler_to_matrix(rotations, rotate_order)
+    np.testing.assert_allclose(ts.matrix_to_euler(matrices, rotate_order), rotations, atol=1e-9)
+    # 4x4 matrices without scale give the same
+    full = ts.compose(np.zeros((200, 3)), rotations, rotate_order=rotate_order)
+    np.testing.assert_allclose(ts.matrix_to_euler(full, rotate_order), rotations, atol=1e-9)
+
+
+def test_euler_round_trip_mixed_orders():
+    rotations = np.random.default_rng(7).uniform(-80.0, 80.0, (60, 3))
+    orders = np.arange(60) % 6
+    matrices = ts.euler_to_matrix(rotations, orders)
+    for order in ORDERS:
+        np.testing.assert_allclose(matrices[orders == order],
+                                   ts.euler_to_matrix(rotations[orders == order], order), atol=1e-12)
+    np.testing.assert_allclose(ts.matrix_to_euler(matrices, orders), rotations, atol=1e-9)
+
+
+@pytest.mark.parametrize('middle', [90.0, -90.0])
+@pytest.mark.parametrize('rotate_order', ORDERS, ids=ts.ROTATE_ORDERS)
+def test_gimbal_lock(rotate_order, middle):
+    # at gimbal lock the first and last axes turn about the same axis, the last one comes back 0
+    rotations, _ = random_rotations(50, seed=rotate_order)
+    rotations = with_middle(rotations, middle, rotate_order)
+    matrices = ts.euler_to_matrix(rotations, rotate_order)
+    eulers = ts.matrix_to_euler(matrices, rotate_order)
+    last = 'xyz'.index(ts.ROTATE_ORDERS[rotate_order][2])
+    middle_axis = 'xyz'.index(ts.ROTATE_ORDERS[rotate_order][1])
+    np.testing.assert_allclose(eulers[:, last], 0.0, atol=1e-9)
+    np.testing.assert_allclose(eulers[:, middle_axis], middle, atol=1e-6)
+    # a different euler, the same rotation
+    np.testing.assert_allclose(ts.euler_to_matrix(eulers, rotate_order), matrices, atol=1e-9)
+
+
+def test_decompose_compose_round_trip():
+    rng = np.random.default_rng(3)
+    rotations = rng.uniform(-80.0, 80.0, (40, 3))
+    translations = rng.uniform(-10.0, 10.0, (40, 3))
+    scales = rng.uniform(0.5, 2.0, (40, 3))
+    matrices = ts.compose(translations, rotations, scales, rotate_order=4)
+    result_translations, result_rotations, result_scales = ts.decompose(matrices)
+    np.testing.assert_allclose(result_translations, translations)
+    np.testing.assert_allclose(result_scales, scales)
+    np.testing.assert_allclose(ts.matrix_to_euler(result_rotations, 4), rotations, atol=1e-9)
+
+
+def test_decompose_negative_scale_goes_on_x():
+    matrix = ts.compose([1, 2, 3], [10, 20, 30], [2.0, -3.0, 4.0])
+    _, rotations, scales = ts.decompose(matrix)
+    np.testing.assert_allclose(scales, [[-2.0, 3.0, 4.0]])
+    assert np.linalg.det(rotations[0]) > 0
+
+
+def test_mirror_identity():
+    identity = np.eye(4)[None]
+    # behavior reflects and negates every axis, x stays, y and z turn around
+    np.testing.assert_allclose(ts.mirror_matrices(identity, behavior=True)[0], np.diag([1.0, -1.0, -1.0, 1.0]))
+    # orientation only negates flip_axis after reflecting
+    np.testing.assert_allclose(ts.mirror_matrices(identity, behavior=False, flip_axis=0)[0], np.eye(4))
+    np.testing.assert_allclose(ts.mirror_matrices(identity, behavior=False, flip_axis=1)[0],
+                               np.diag([-1.0, -1.0, 1.0, 1.0]))
+    # the XZ plane flips y instead
+    np.testing.assert_allclose(ts.mirror_matrices(identity, plane='XZ', behavior=True)[0],
+                               np.diag([-1.0, 1.0, -1.0, 1.0]))
+
+
+def test_mirror_rotation_of_zero():
+    rotation, scale = ts.mirror_rotation([0.0, 0.0, 0.0])
+    np.testing.assert_allclose(rotation, [-180.0, 0.0, 0.0], atol=1e-9)
+    assert scale == [1.0, 1.0, 1.0]
+    rotation, _ = ts.mirror_rotation([0.0, 0.0, 0.0], behavior=False)
+    np.testing.assert_allclose(rotation, [0.0, 0.0, 0.0], atol=1e-9)
+
+
+def random_matrices(count, seed):
+    rng = np.random.default_rng(seed)
+    return ts.compose(rng.uniform(-10.0, 10.0, (count, 3)), rng.uniform(-80.0, 80.0, (count, 3)),
+                      rotate_order=rng.integers(0, 6, count))
+
+
+@pytest.mark.parametrize('plane', list(ts.MIRROR_PLANES))
+@pytest.mark.parametrize('behavior, flip_axis', [(True, 0), (False, 0), (False, 1), (False, 2)])
+def test_mirror_matrices(plane, behavior, flip_axis):
+    matrices = random_matrices(30, seed=1)
+    mirrored = ts.mirror_matrices(matrices, plane=plane, behavior=behavior, flip_axis=flip_axis)
+    axis = ts.MIRROR_PLANES[plane]
+    # the position is reflected across the plane
+    expected = matrices[:, 3, :3].copy()
+    expected[:, axis] *= -1
+    np.testing.assert_allclose(mirrored[:, 3, :3], expected)
+    # always right handed, never a negative scale
+    assert np.all(np.linalg.det(mirrored[:, :3, :3]) > 0)
+    # every axis is the reflection of the original, negated in behavior mode and for flip_axis
+    reflected = matrices[:, :3, :3].copy()
+    reflected[:, :, axis] *= -1
+    signs = -np.ones(3) if behavior else np.where(np.arange(3) == flip_axis, -1.0, 1.0)
+    np.testing.assert_allclose(mirrored[:, :3, :3], reflected * signs[None, :, None], atol=1e-12)
+    # mirroring twice is the original
+    np.testing.assert_allclose(ts.mirror_matrices(mirrored, plane=plane, behavior=behavior, flip_axis=flip_axis),
+                               matrices, atol=1e-12)
+
+
+def test_behavior_mirror_keeps_local_rotations():
+    # equal local rotations on both sides is what makes behavior mirrored rigs move mirrored,
+    # the local translation is negated like the translates of mirrorJoint -mirrorBehavior joints
+    parent, child = random_matrices(2, seed=2)
+    mirrored_parent, mirrored_child = ts.mirror_matrices([parent, child], behavior=True)
+    local = child @ np.linalg.inv(parent)
+    mirrored_local = mirrored_child @ np.linalg.inv(mirrored_parent)
+    np.testing.assert_allclose(mirrored_local[:3, :3], local[:3, :3], atol=1e-12)
+    np.testing.assert_allclose(mirrored_local[3, :3], -local[3, :3], atol=1e-12)
+
+
+def snapshot(rotate_orders=(0, 3, 5)):
+    world = ts.compose([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [-1.0, 0.5, 2.0]],
+                       [[10.0, 20.0, 30.0], [-40.0, 15.0, 60.0], [0.0, -70.0, 5.0]],
+                       [[1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [0.5, 1.0, 1.5]],
+                       rotate_order=list(rotate_orders))
+    return ts.TransformSnapshot.from_matrices(['L_arm_JNT', 'L_elbow_JNT', 'L_wrist_JNT'], world,
+                                              rotate_orders=list(rotate_orders)), world
+
+
+def test_snapshot_from_matrices_queries():
+    snap, world = snapshot()
+    np.testing.assert_allclose(snap.positions(), world[:, 3, :3])
+    np.testing.assert_allclose(snap.position('L_elbow_JNT'), [4.0, 5.0, 6.0])
+    # the nodes come back in the order they are asked for
+    np.testing.assert_allclose(snap.world_matrices(['L_wrist_JNT', 'L_arm_JNT']), world[[2, 0]])
+    assert snap.rotate_orders().tolist() == [0, 3, 5]
+    np.testing.assert_allclose(snap.rotations(), [[10.0, 20.0, 30.0], [-40.0, 15.0, 60.0], [0.0, -70.0, 5.0]],
+                               atol=1e-9)
+    np.testing.assert_allclose(snap.scales(), [[1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [0.5, 1.0, 1.5]])
+    # without local matrices they are the world ones
+    np.testing.assert_allclose(snap.local_matrices(), world)
+
+
+@pytest.mark.parametrize('behavior', [True, False])
+def test_snapshot_mirrored_transforms(behavior):
+    snap, world = snapshot()
+    mirrored = snap.mirrored_matrices(behavior=behavior)
+    np.testing.assert_allclose(mirrored, ts.mirror_matrices(world, behavior=behavior))
+    translations, rotations, scales = snap.mirrored_transforms(behavior=behavior)
+    np.testing.assert_allclose(translations, world[:, 3, :3] * [-1.0, 1.0, 1.0])
+    assert np.all(scales > 0)
+    # the values put on the opposite side in the nodes' rotate orders give back the mirrored matrices
+    np.testing.assert_allclose(ts.compose(translations, rotations, scales, rotate_order=[0, 3, 5]), mirrored,
+                               atol=1e-9)
+    # or in other rotate orders
+    _, rotations, _ = snap.mirrored_transforms(behavior=behavior, rotate_orders=[1, 2, 4])
+    np.testing.assert_allclose(ts.compose(translations, rotations, scales, rotate_order=[1, 2, 4]), mirrored,
+                               atol=1e-9)
+
+
+class FakeNode:
+    def __init__(self, name, translation):
+        self.name = name
+        self.matrix = ts.compose(translation, [0.0, 0.0, 0.0])[0]
+        self.alive = True
+
+    def hasFn(self, fn):
+        return False
+
+
+class FakeOm:
+    """
+    The OpenMaya calls a snapshot makes, on a scene of FakeNodes found by their current name.
+    """
+    class MFn:
+        kTransform = 'kTransform'
+
+    def __init__(self):
+        self.scene = []
+        self.callbacks = {}
+        self.scene_callbacks = {}
+        self._next_id = 0
+        fake = self
+
+        class MSelectionList:
+            def __init__(self):
+                self.nodes = []
+
+            def add(self, name):
+                self.nodes.append(next(node for node in fake.scene if node.alive and node.name == name))
+
+            def getDagPath(self, index):
+                return MDagPath(self.nodes[index])
+
+        class MDagPath:
+            def __init__(self, node):
+                self._node = node
+
+            def node(self):
+                return self._node
+
+            def isValid(self):
+                return True
+
+            def partialPathName(self):
+                return self._node.name
+
+            def inclusiveMatrix(self):
+                return self._node.matrix.reshape(-1).tolist()
+
+            def exclusiveMatrixInverse(self):
+                return np.eye(4).reshape(-1).tolist()
+
+        class MObjectHandle:
+            def __init__(self, node):
+                self._node = node
+
+            def isValid(self):
+                return True
+
+            def isAlive(self):
+                return self._node.alive
+
+        class MDagMessage:
+            @staticmethod
+            def addWorldMatrixModifiedCallback(dag_path, func, client_data):
+                return fake._add(fake.callbacks, (dag_path.node(), func, client_data))
+
+        class MSceneMessage:
+            kBeforeNew = 'kBeforeNew'
+            kBeforeOpen = 'kBeforeOpen'
+
+            @staticmethod
+            def addCallback(message, func):
+                return fake._add(fake.scene_callbacks, (message, func))
+
+        class MMessage:
+            @staticmethod
+            def removeCallback(callback_id):
+                if fake.callbacks.pop(callback_id, None) is None and \
+                        fake.scene_callbacks.pop(callback_id, None) is None:
+                    raise RuntimeError('No callback {0}'.format(callback_id))
+
+        self.MSelectionList, self.MDagPath, self.MObjectHandle = MSelectionList, MDagPath, MObjectHandle
+        self.MDagMessage, self.MSceneMessage, self.MMessage = MDagMessage, MSceneMessage, MMessage
+
+    def _add(self, callbacks, value):
+        self._next_id += 1
+        callbacks[self._next_id] = value
+        return self._next_id
+
+    def create(self, name, translation):
+        node = FakeNode(name, translation)
+        self.scene.append(node)
+        return node
+
+    def move(self, node, translation):
+        node.matrix = ts.compose(translation, [0.0, 0.0, 0.0])[0]
+        for callback_node, func, client_data in list(self.callbacks.values()):
+            if callback_node is node:
+                func(node, None, client_data)
+
+    def watched(self):
+        return sorted(node.name for node, _, _ in self.callbacks.values())
+
+
+@pytest.fixture
+def fake_om(monkeypatch):
+    fake = FakeOm()
+    monkeypatch.setattr(ts, 'om', fake)
+    monkeypatch.setattr(ts, '_SNAPSHOT', None)
+    monkeypatch.setattr(ts, '_SCENE_CALLBACK_IDS', [])
+    return fake
+
+
+def test_capture_refetches_moved_nodes(fake_om):
+    arm = fake_om.create('L_arm_JNT', [1.0, 0.0, 0.0])
+    fake_om.create('L_elbow_JNT', [2.0, 0.0, 0.0])
+    snap = ts.TransformSnapshot(['L_arm_JNT', 'L_elbow_JNT'])
+    version = snap.version
+    fake_om.move(arm, [5.0, 0.0, 0.0])
+    np.testing.assert_allclose(snap.positions(), [[5.0, 0.0, 0.0], [2.0, 0.0, 0.0]])
+    assert snap.version == version + 1
+    assert fake_om.watched() == ['L_arm_JNT', 'L_elbow_JNT']
+
+
+def test_renamed_node_is_not_served_under_its_old_name(fake_om):
+    old = fake_om.create('A', [1.0, 0.0, 0.0])
+    snap = ts.TransformSnapshot(['A'])
+    # rename A B, then a new A
+    old.name = 'B'
+    fake_om.create('A', [7.0, 0.0, 0.0])
+    np.testing.assert_allclose(snap.position('A'), [7.0, 0.0, 0.0])
+    np.testing.assert_allclose(snap.position('B'), [1.0, 0.0, 0.0])
+    # the old row's callback went with it, B has its own
+    assert fake_om.watched() == ['A', 'B']
+    # moving B doesn't touch A
+    fake_om.move(old, [3.0, 0.0, 0.0])
+    np.testing.assert_allclose(snap.positions(['A', 'B']), [[7.0, 0.0, 0.0], [3.0, 0.0, 0.0]])
+
+
+def test_deleted_node_recapture_removes_the_old_callback(fake_om):
+    old = fake_om.create('L_arm_JNT', [1.0, 0.0, 0.0])
+    snap = ts.get_snapshot(['L_arm_JNT'])
+    old.alive = False
+    fake_om.create('L_arm_JNT', [4.0, 0.0, 0.0])
+    np.testing.assert_allclose(ts.get_positions(['L_arm_JNT']), [[4.0, 0.0, 0.0]])
+    assert len(fake_om.callbacks) == 1
+    assert snap.names == ['L_arm_JNT', 'L_arm_JNT']
+    np.testing.assert_allclose(snap.positions(), [[4.0, 0.0, 0.0]])
+
+
+def test_scene_change_releases_the_shared_snapshot(fake_om):
+    fake_om.create('L_arm_JNT', [1.0, 0.0, 0.0])
+    snap = ts.get_snapshot(['L_arm_JNT'])
+    assert ts.get_snapshot() is snap
+    # registered once, before new and before open
+    assert sorted(message for message, _ in fake_om.scene_callbacks.values()) == ['kBeforeNew', 'kBeforeOpen']
+    for _, func in list(fake_om.scene_callbacks.values())[:1]:
+        func(None)
+    assert fake_om.callbacks == {}
+    assert ts.get_snapshot() is not snap
+    assert len(fake_om.scene_callbacks) == 2
+    ts.remove_scene_callbacks()
+    assert fake_om.scene_callbacks == {}
+    assert ts._SCENE_CALLBACK_IDS == []
@@ -0,0 +1,52 @@
+import numpy as np
+
+from rig.utils import weightColors
+
+
+def test_colormaps():
+    np.testing.assert_allclose(weightColors.weightsToColors([0.0, 0.5, 2.0]),
+                               [[0, 0, 0, 1], [0.5, 0.5, 0.5, 1], [1, 1, 1, 1]])
+    np.testing.assert_allclose(weightColors.weightsToColors([0.0, 0.5, 1.0], "heat"),
+                               [[0, 0, 1, 1], [0, 1, 0, 1], [1, 0, 0, 1]])
+
+
+def test_cache_only_fetches_dirty_weights():
+    cache = weightColors.WeightColorCache()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return [0.0, 1.0]
+
+    cache.getColors("geo.weights", fetch)
+    cache.getColors("geo.weights", fetch)
+    assert len(fetches) == 1
+    cache.getColors("geo.weights", fetch, "heat")
+    assert len(fetches) == 2
+    cache.markDirty("geo.weights")
+    cache.getColors("geo.weights", fetch, "heat")
+    assert len(fetches) == 3
+
+
+def test_derived_is_kept_until_the_colors_change():
+    cache = weightColors.WeightColorCache()
+    builds = []
+
+    def build(colors):
+        builds.append(1)
+        return colors.tolist()
+
+    cache.getColors("geo.weights", lambda: [0.0, 1.0])
+    first = cache.getDerived("geo.weights", "colors", build)
+    assert cache.getDerived("geo.weights", "colors", build) is first
+    assert len(builds) == 1
+
+    cache.markDirty("geo.weights")
+    cache.getColors("geo.weights", lambda: [1.0, 1.0])
+    assert cache.getDerived("geo.weights", "colors", build) == [[1, 1, 1, 1], [1, 1, 1, 1]]
+    assert len(builds) == 2
+
+    cache.clear("geo.weights")
+    cache.getColors("geo.weights", lambda: [0.0])
+    cache.getDerived("geo.weights", "colors", build)
+    assert len(builds) == 3
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from rig_2.weights import reference
+
+
+def translate(x, y, z):
+    matrix = np.eye(4)
+    matrix[3, :3] = [x, y, z]
+    return matrix
+
+
+# +90 about z, row vectors so x goes to y, then moved 1 along x
+ROTATE_Z_MOVE_X = np.array([[0.0, 1.0, 0.0, 0.0],
+                            [-1.0, 0.0, 0.0, 0.0],
+                            [0.0, 0.0, 1.0, 0.0],
+                            [1.0, 0.0, 0.0, 1.0]])
+
+
+@pytest.mark.parametrize("operations, expected", [
+    (["add", "add"], [3.5, 6.0]),
+    (["add", "subtract"], [-2.5, -2.0]),
+    # a stack that starts with multiply starts from 1, not 0
+    (["multiply", "add"], [3.5, 6.0]),
+    (["multiply", "multiply"], [1.5, 8.0]),
+    (["divide", "add"], [5.0, 4.5]),
+    ([2, 1], [-2.5, -2.0]),
+])
+def test_weight_stack_operations(operations, expected):
+    weights = reference.evaluate_weight_stack([[0.5, 2.0], [3.0, 4.0]], operations=operations)
+    np.testing.assert_allclose(weights, expected)
+
+
+def test_weight_stack_factors():
+    weights = reference.evaluate_weight_stack([[0.5, 2.0], [3.0, 4.0]], factors=[2.0, 0.5],
+                                              operations=["add", "multiply"])
+    np.testing.assert_allclose(weights, [1.5, 8.0])
+
+
+def test_divide_by_zero_leaves_the_value():
+    weights = reference.evaluate_weight_stack([[2.0, 3.0, 0.0], [0.0, 4.0, 0.0]], operations=["add", "divide"])
+    np.testing.assert_allclose(weights, [2.0, 0.75, 0.0])
+    # a stack that starts with divide keeps its 1 where the weight is 0
+    np.testing.assert_allclose(reference.evaluate_weight_stack([[0.0, 0.5]], operations=["divide"]), [1.0, 2.0])
+
+
+def test_weight_stack_normalize_and_clamp():
+    input_weights = [[1.0, 3.0, 0.0], [3.0, 1.0, 0.0]]
+    # normalized inputs sum to 1 per point, points without weights stay 0
+    np.testing.assert_allclose(reference.evaluate_weight_stack(input_weights, factors=[2.0, 1.0], normalize=True),
+                               [1.25, 1.75, 0.0])
+    np.testing.assert_allclose(reference.evaluate_weight_stack(input_weights, operations=["add", "subtract"],
+                                                               clamp=True), [0.0, 1.0, 0.0])
+
+
+def test_weight_stack_data_against_out_weights():
+    # the dict getWeightStackData exports, out_weights is the node's output for these inputs
+    stack_data = {"input_weights": [[0.2, 0.8, 1.0], [0.6, 0.6, 0.0], [0.5, 0.5, 0.5]],
+                  "factors": [1.0, 1.0, 2.0],
+                  "operations": [0, 0, 2],
+                  "normalize": False,
+                  "clamp": True,
+                  "out_weights": [0.8, 1.0, 1.0]}
+    weights = reference.evaluate_weight_stack_data(stack_data)
+    assert reference.compare_weights(weights, stack_data["out_weights"])["num_different"] == 0
+    # the same stack without clamp is different on the points that go over 1
+    stack_data["clamp"] = None
+    result = reference.compare_weights(reference.evaluate_weight_stack_data(stack_data), stack_data["out_weights"])
+    assert result["different"].tolist() == [1]
+    assert result["max_difference"] == pytest.approx(0.4)
+
+
+def test_matrix_deform_is_point_times_inverse_base_times_matrix():
+    points = [[2.0, 0.0, 0.0], [0.0, 3.0, 1.0]]
+    base = translate(1.0, 0.0, 0.0)
+    expected = (reference._homogeneous(points) @ np.linalg.inv(base) @ ROTATE_Z_MOVE_X)[:, :3]
+    np.testing.assert_allclose(expected[0], [1.0, 1.0, 0.0])
+    np.testing.assert_allclose(reference.matrix_deform(points, [ROTATE_Z_MOVE_X], [base.reshape(-1)], [[1.0, 1.0]]),
+                               expected)
+    # half a weight goes half way
+    np.testing.assert_allclose(reference.matrix_deform(points, [ROTATE_Z_MOVE_X], [base], [[0.5, 0.0]]),
+                               [[1.5, 0.5, 0.0], [0.0, 3.0, 1.0]])
+
+
+def test_matrix_deform_inputs_add_up():
+    points = [[1.0, 2.0, 3.0]]
+    matrices = [translate(1.0, 0.0, 0.0), translate(0.0, 2.0, 0.0), translate(5.0, 5.0, 5.0)]
+    # the last input sits on its base and doesn't move anything
+    base_matrices = [np.eye(4), np.eye(4), translate(5.0, 5.0, 5.0)]
+    deformed = reference.matrix_deform(points, matrices, base_matrices, [[1.0], [0.5], [1.0]])
+    np.testing.assert_allclose(deformed, [[2.0, 3.0, 3.0]])
+    deformed = reference.matrix_deform(points, matrices, base_matrices, [[1.0], [0.5], [1.0]], envelope=0.5)
+    np.testing.assert_allclose(deformed, [[1.5, 2.5, 3.0]])
+    deformed = reference.matrix_deform(points, matrices, base_matrices, [[1.0], [0.5], [1.0]],
+                                       membership_weights=[0.0])
+    np.testing.assert_allclose(deformed, points)
+
+
+def test_matrix_deform_frames():
+    frames = [[translate(0.0, 0.0, frame)] for frame in range(3)]
+    deformed = reference.matrix_deform_frames([[0.0, 0.0, 0.0]], frames, [np.eye(4)], [[1.0]])
+    np.testing.assert_allclose(deformed[:, 0, 2], [0.0, 1.0, 2.0])